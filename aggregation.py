@@ -0,0 +1,181 @@
+"""
+Compliance Aggregation Engine
+=============================
+Vectorized rollups of raw per-resource evaluation rows.
+
+- Dimension columns are categorical, so every groupby runs over integer codes
+- Raw rows are reduced once into an account x rule cube; OU, portfolio,
+  account, rule and framework rollups are all derived from that cube
+- Frameworks map many-to-many onto rules and are joined after the reduction,
+  so the raw rows are never exploded per framework
+
+Input rows need account_id, ou, portfolio, rule_name and either a boolean
+`compliant` column or a Config `compliance_type` column.
+"""
+
+from typing import Dict, Iterable, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ["account_id", "ou", "portfolio", "rule_name"]
+
+# Which compliance frameworks each managed Config rule provides evidence for
+RULE_FRAMEWORKS: Dict[str, tuple] = {
+    "s3-bucket-server-side-encryption-enabled": ("CIS", "SOC2", "PCI", "HIPAA"),
+    "ec2-imdsv2-check": ("CIS", "SOC2"),
+    "rds-storage-encrypted": ("SOC2", "PCI", "HIPAA"),
+    "ebs-encrypted-volumes": ("CIS", "PCI", "HIPAA"),
+    "iam-password-policy": ("CIS", "SOC2", "PCI"),
+}
+
+ROLLUP_COLUMNS = ["accounts", "evaluations", "compliant", "non_compliant", "score"]
+
+
+def prepare_evaluations(frame: pd.DataFrame) -> pd.DataFrame:
+    """Normalize raw rows to categorical dimensions and a boolean compliant flag"""
+    prepared = pd.DataFrame(index=frame.index)
+    for column in DIMENSIONS:
+        values = frame[column] if column in frame else pd.Series("Unassigned", index=frame.index)
+        prepared[column] = values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype("category")
+    if "compliant" in frame:
+        prepared["compliant"] = frame["compliant"].astype(bool)
+    else:
+        prepared["compliant"] = frame["compliance_type"].eq("COMPLIANT").to_numpy()
+    return prepared
+
+
+def framework_map_frame(rule_frameworks: Mapping[str, Iterable[str]]) -> pd.DataFrame:
+    """Long rule_name -> framework table"""
+    pairs = [(rule, framework) for rule, frameworks in rule_frameworks.items() for framework in frameworks]
+    return pd.DataFrame(pairs, columns=["rule_name", "framework"])
+
+
+def _finish(grouped: pd.DataFrame, key: str, placement: Iterable[str] = ()) -> pd.DataFrame:
+    grouped = grouped.reset_index()
+    grouped["non_compliant"] = grouped["evaluations"] - grouped["compliant"]
+    grouped["score"] = np.round(100.0 * grouped["compliant"] / grouped["evaluations"].clip(lower=1), 1)
+    for column in ("accounts", "evaluations", "compliant", "non_compliant"):
+        grouped[column] = grouped[column].astype(np.int64)
+    placement = list(placement)
+    for column in [key] + placement:
+        grouped[column] = grouped[column].astype(str)
+    return grouped[[key] + placement + ROLLUP_COLUMNS]
+
+
+class ComplianceAggregator:
+    """Rollups by OU, portfolio, account, rule and framework"""
+
+    def __init__(self, evaluations: pd.DataFrame,
+                 rule_frameworks: Optional[Mapping[str, Iterable[str]]] = None):
+        rows = prepare_evaluations(evaluations)
+        accounts = rows["account_id"].cat
+        rules = rows["rule_name"].cat
+        account_codes = accounts.codes.to_numpy()
+        rule_codes = rules.codes.to_numpy()
+        compliant = rows["compliant"].to_numpy()
+        valid = (account_codes >= 0) & (rule_codes >= 0)
+        keep = None if valid.all() else valid
+        if keep is not None:
+            account_codes, rule_codes, compliant = account_codes[keep], rule_codes[keep], compliant[keep]
+        n_accounts, n_rules = len(accounts.categories), len(rules.categories)
+        # Stage 1: reduce raw rows to one row per (account, rule). Grouping on
+        # the combined category codes is a single bincount pass.
+        cell = account_codes.astype(np.int64) * n_rules + rule_codes
+        size = n_accounts * n_rules
+        evaluations_per_cell = np.bincount(cell, minlength=size)
+        compliant_per_cell = np.bincount(cell, weights=compliant, minlength=size)
+        present = np.flatnonzero(evaluations_per_cell)
+        cube_accounts = present // n_rules
+        # First OU / portfolio seen per account (assigning reversed keeps the first)
+        placement = {}
+        for column in ("ou", "portfolio"):
+            codes = rows[column].cat.codes.to_numpy()
+            if keep is not None:
+                codes = codes[keep]
+            first = np.full(n_accounts, -1, dtype=codes.dtype)
+            first[account_codes[::-1]] = codes[::-1]
+            placement[column] = pd.Categorical.from_codes(first[cube_accounts], rows[column].cat.categories)
+        cube = pd.DataFrame({
+            "account_id": pd.Categorical.from_codes(cube_accounts, accounts.categories),
+            "rule_name": pd.Categorical.from_codes(present % n_rules, rules.categories),
+            "ou": placement["ou"],
+            "portfolio": placement["portfolio"],
+            "evaluations": evaluations_per_cell[present],
+            "compliant": compliant_per_cell[present].astype(np.int64),
+        })
+        cube["account_ok"] = cube["compliant"] == cube["evaluations"]
+        self.cube = cube
+        self.rule_frameworks = framework_map_frame(rule_frameworks if rule_frameworks is not None else RULE_FRAMEWORKS)
+
+    @classmethod
+    def from_cube(cls, cube: pd.DataFrame,
+                  rule_frameworks: Optional[Mapping[str, Iterable[str]]] = None) -> "ComplianceAggregator":
+        """Rollups over an already reduced cube, e.g. one limited to some portfolios"""
+        aggregator = cls.__new__(cls)
+        aggregator.cube = cube
+        aggregator.rule_frameworks = framework_map_frame(rule_frameworks if rule_frameworks is not None else RULE_FRAMEWORKS)
+        return aggregator
+
+    def _rollup(self, key: str, *placement: str) -> pd.DataFrame:
+        grouped = self.cube.groupby(key, observed=True, sort=True).agg(
+            accounts=("account_id", "nunique"),
+            evaluations=("evaluations", "sum"),
+            compliant=("compliant", "sum"),
+            **{column: (column, "first") for column in placement},
+        )
+        return _finish(grouped, key, placement)
+
+    def by_ou(self) -> pd.DataFrame:
+        """Per OU, with the portfolio it sits under (entitlements scope on it)"""
+        return self._rollup("ou", "portfolio")
+
+    def by_portfolio(self) -> pd.DataFrame:
+        return self._rollup("portfolio")
+
+    def by_account(self) -> pd.DataFrame:
+        grouped = self.cube.groupby("account_id", observed=True, sort=True).agg(
+            ou=("ou", "first"),
+            portfolio=("portfolio", "first"),
+            evaluations=("evaluations", "sum"),
+            compliant=("compliant", "sum"),
+        )
+        grouped["accounts"] = 1
+        return _finish(grouped, "account_id", ("ou", "portfolio"))
+
+    def by_rule(self) -> pd.DataFrame:
+        """Per rule, plus how many accounts are fully compliant with it"""
+        grouped = self.cube.groupby("rule_name", observed=True, sort=True).agg(
+            accounts=("account_id", "nunique"),
+            evaluations=("evaluations", "sum"),
+            compliant=("compliant", "sum"),
+            accounts_compliant=("account_ok", "sum"),
+        )
+        result = _finish(grouped, "rule_name")
+        result["accounts_compliant"] = grouped["accounts_compliant"].to_numpy().astype(np.int64)
+        result["accounts_non_compliant"] = result["accounts"] - result["accounts_compliant"]
+        return result
+
+    def by_framework(self) -> pd.DataFrame:
+        rules = self.cube.groupby("rule_name", observed=True).agg(
+            evaluations=("evaluations", "sum"),
+            compliant=("compliant", "sum"),
+        ).reset_index()
+        rules["rule_name"] = rules["rule_name"].astype(str)
+        joined = rules.merge(self.rule_frameworks, on="rule_name", how="inner")
+        accounts = self.cube[["account_id", "rule_name"]].astype(str).merge(self.rule_frameworks, on="rule_name")
+        grouped = joined.groupby("framework", sort=True).agg(
+            evaluations=("evaluations", "sum"),
+            compliant=("compliant", "sum"),
+        )
+        grouped["accounts"] = accounts.groupby("framework")["account_id"].nunique()
+        return _finish(grouped, "framework")
+
+    def rollups(self) -> Dict[str, pd.DataFrame]:
+        return {
+            "ou": self.by_ou(),
+            "portfolio": self.by_portfolio(),
+            "account": self.by_account(),
+            "rule": self.by_rule(),
+            "framework": self.by_framework(),
+        }
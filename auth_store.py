@@ -0,0 +1,372 @@
+"""
+Authentication Store
+====================
+Hashed credentials, login throttling and signed session tokens.
+
+- Users are loaded once per process from a pluggable store: the demo users,
+  a JSON / YAML users file (AUTH_USERS_FILE) or the `auth_users` table
+- Passwords are stored as scrypt hashes whose cost (log2 N, AUTH_HASH_COST)
+  is encoded in the hash, so it can be raised without invalidating existing
+  hashes; a login upgrades an older hash when the store is writable
+- Hashes are checked on a small worker pool: scrypt releases the GIL, and
+  the pool bounds how many 16 MiB hashes run at once however many sessions
+  sign in together
+- Each username gets AUTH_MAX_ATTEMPTS attempts per AUTH_LOCKOUT_SECONDS;
+  further attempts are rejected before any hashing
+- A successful login returns an HMAC-signed token (AUTH_SECRET_KEY) valid
+  for AUTH_COOKIE_EXPIRY_DAYS; reruns check the token, never the password
+
+A users-file entry looks like
+{"alice": {"password_hash": "scrypt$14$8$1$...", "role": "AUDITOR", "full_name": "Alice"}};
+hashes come from `python -c "from auth_store import hash_password; print(hash_password('...'))"`.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterable, List, Optional
+
+from cachetools import TTLCache
+
+from database import Database
+
+try:
+    import yaml
+except ImportError:  # JSON users files only
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+SCHEME = "scrypt"
+DEFAULT_COST = 14           # log2 of scrypt N: 16 MiB and ~50 ms per hash
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+KEY_BYTES = 32
+REVOKED_TOKENS = 65536
+
+DEMO = "demo"
+FILE = "file"
+DATABASE = "database"
+
+# Shown on the login page outside production; replaced by real stores in live deployments
+DEMO_USERS = {
+    "admin": ("admin123", "SUPER_ADMIN", "Admin User"),
+    "security_lead": ("security123", "SECURITY_ADMIN", "Security Lead"),
+    "compliance_mgr": ("compliance123", "COMPLIANCE_OFFICER", "Compliance Manager"),
+    "cloud_arch": ("architect123", "CLOUD_ARCHITECT", "Cloud Architect"),
+    "finops": ("finops123", "FINOPS_ANALYST", "FinOps Analyst"),
+    "devsecops": ("devsec123", "DEVSECOPS_ENGINEER", "DevSecOps Engineer"),
+    "auditor": ("audit123", "AUDITOR", "Auditor"),
+    "viewer": ("viewer123", "VIEWER", "Viewer"),
+}
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS auth_users (
+        username TEXT PRIMARY KEY,
+        password_hash TEXT NOT NULL,
+        role TEXT NOT NULL,
+        full_name TEXT NOT NULL DEFAULT '',
+        disabled INTEGER NOT NULL DEFAULT 0,
+        updated_at DOUBLE PRECISION NOT NULL
+    )
+    """,
+]
+
+
+# ----------------------------------------------------------------------------
+# Password hashing
+# ----------------------------------------------------------------------------
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password: str, salt: bytes, cost: int, r: int, p: int) -> bytes:
+    n = 1 << cost
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=KEY_BYTES,
+                          maxmem=256 * r * n + (1 << 20))
+
+
+def hash_password(password: str, cost: int = DEFAULT_COST) -> str:
+    """'scrypt$<cost>$<r>$<p>$<salt>$<key>'"""
+    salt = secrets.token_bytes(SALT_BYTES)
+    key = _scrypt(password, salt, cost, SCRYPT_R, SCRYPT_P)
+    return f"{SCHEME}${cost}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(key)}"
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    try:
+        scheme, cost, r, p, salt, key = encoded.split("$")
+        if scheme != SCHEME:
+            return False
+        candidate = _scrypt(password, _unb64(salt), int(cost), int(r), int(p))
+    except (ValueError, TypeError):
+        return False
+    return hmac.compare_digest(candidate, _unb64(key))
+
+
+def hash_cost(encoded: str) -> int:
+    try:
+        return int(encoded.split("$")[1])
+    except (IndexError, ValueError):
+        return 0
+
+
+# ----------------------------------------------------------------------------
+# Stores
+# ----------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class UserRecord:
+    """One account as the store holds it"""
+
+    username: str
+    password_hash: str
+    role: str
+    full_name: str = ""
+
+    def public(self) -> dict:
+        """What the session keeps: never the hash"""
+        return {"username": self.username, "role": self.role, "full_name": self.full_name or self.username}
+
+
+class CredentialStore:
+    """Users held in memory; subclasses decide where they are loaded from and saved to"""
+
+    writable = False
+
+    def __init__(self, users: Iterable[UserRecord] = ()):
+        self._users: Dict[str, UserRecord] = {user.username: user for user in users}
+        self._lock = threading.Lock()
+
+    def get(self, username: str) -> Optional[UserRecord]:
+        return self._users.get(username)
+
+    def usernames(self) -> List[str]:
+        return sorted(self._users)
+
+    def update_hash(self, username: str, encoded: str) -> None:
+        """Replace a user's hash (a cost upgrade); in memory only unless the store is writable"""
+        with self._lock:
+            user = self._users.get(username)
+            if user is not None:
+                self._users[username] = UserRecord(username, encoded, user.role, user.full_name)
+
+
+def demo_store(cost: int = DEFAULT_COST) -> CredentialStore:
+    """The demo users, hashed once at startup"""
+    return CredentialStore(UserRecord(username, hash_password(password, cost), role, full_name)
+                           for username, (password, role, full_name) in DEMO_USERS.items())
+
+
+class FileCredentialStore(CredentialStore):
+    """Users from a JSON or YAML file of username -> {password_hash, role, full_name}"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "r", encoding="utf-8") as fp:
+            if path.endswith((".yaml", ".yml")):
+                if yaml is None:
+                    raise RuntimeError("PyYAML is required for a YAML users file")
+                entries = yaml.safe_load(fp) or {}
+            else:
+                entries = json.load(fp)
+        super().__init__(
+            UserRecord(username, entry["password_hash"], entry.get("role", "VIEWER"), entry.get("full_name", ""))
+            for username, entry in entries.items() if not entry.get("disabled")
+        )
+
+
+class DatabaseCredentialStore(CredentialStore):
+    """Users from the `auth_users` table, read once; hash upgrades are written back"""
+
+    writable = True
+
+    def __init__(self, db: Database):
+        self.db = db
+        self.db.executescript(SCHEMA)
+        super().__init__(UserRecord(*row) for row in self.db.query(
+            "SELECT username, password_hash, role, full_name FROM auth_users WHERE disabled = 0"
+        ))
+
+    def upsert(self, username: str, password_hash: str, role: str, full_name: str = "") -> None:
+        self.db.execute(
+            "INSERT INTO auth_users (username, password_hash, role, full_name, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (username) DO UPDATE SET password_hash = excluded.password_hash, role = excluded.role, "
+            "full_name = excluded.full_name, updated_at = excluded.updated_at",
+            (username, password_hash, role, full_name, time.time()),
+        )
+        with self._lock:
+            self._users[username] = UserRecord(username, password_hash, role, full_name)
+
+    def update_hash(self, username: str, encoded: str) -> None:
+        self.db.execute("UPDATE auth_users SET password_hash = ?, updated_at = ? WHERE username = ?",
+                        (encoded, time.time(), username))
+        super().update_hash(username, encoded)
+
+
+# ----------------------------------------------------------------------------
+# Throttling
+# ----------------------------------------------------------------------------
+
+class AttemptThrottle:
+    """At most `max_attempts` sign-in attempts per key in a sliding `window_s`
+
+    Only keys with an attempt inside the window are held, so trying many
+    usernames does not grow memory past one window's worth of attempts.
+    """
+
+    def __init__(self, max_attempts: int, window_s: float):
+        self.max_attempts = max(1, max_attempts)
+        self.window_s = window_s
+        self._attempts: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, now: Optional[float] = None) -> float:
+        """Record an attempt; returns 0, or the seconds to wait when the key is throttled"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            # Keys are kept in order of their latest attempt, so expired ones are dropped from the front
+            attempts = self._attempts.pop(key, None) or deque()
+            self._attempts[key] = attempts
+            while True:
+                oldest = next(iter(self._attempts))
+                if oldest == key or now - self._attempts[oldest][-1] < self.window_s:
+                    break
+                del self._attempts[oldest]
+            while attempts and now - attempts[0] >= self.window_s:
+                attempts.popleft()
+            if len(attempts) >= self.max_attempts:
+                return attempts[0] + self.window_s - now
+            # Counted when made, not when it fails, so a burst of parallel guesses is capped too
+            attempts.append(now)
+            return 0.0
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._attempts.pop(key, None)
+
+
+# ----------------------------------------------------------------------------
+# Authenticator
+# ----------------------------------------------------------------------------
+
+@dataclass
+class AuthResult:
+    """Outcome of one sign-in"""
+
+    user: Optional[dict] = None
+    token: str = ""
+    error: str = ""
+    retry_after_s: float = 0.0
+
+
+class Authenticator:
+    """Verifies passwords off the script thread and issues signed session tokens"""
+
+    def __init__(self, store: CredentialStore, secret_key: bytes, token_ttl_s: float, cost: int = DEFAULT_COST,
+                 workers: int = 4, max_attempts: int = 5, lockout_s: float = 300):
+        self.store = store
+        self.cost = cost
+        self.token_ttl_s = token_ttl_s
+        self._key = secret_key
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="auth")
+        self.throttle = AttemptThrottle(max_attempts, lockout_s)
+        self._revoked: TTLCache = TTLCache(maxsize=REVOKED_TOKENS, ttl=max(token_ttl_s, 1))
+        # Unknown usernames are checked against this, so they take as long as a wrong password
+        self._dummy_hash = hash_password(secrets.token_hex(8), cost)
+
+    @classmethod
+    def from_settings(cls, settings, db: Optional[Database] = None) -> "Authenticator":
+        if settings.auth_backend == FILE:
+            store = FileCredentialStore(settings.auth_users_file)
+        elif settings.auth_backend == DATABASE:
+            store = DatabaseCredentialStore(db)
+        else:
+            store = demo_store(settings.auth_hash_cost)
+        secret = settings.auth_secret_key
+        if not secret or secret == "your-secret-key-for-jwt":
+            logger.warning("AUTH_SECRET_KEY is not set; sessions will not survive a restart")
+            secret = secrets.token_hex(32)
+        return cls(store, secret.encode(), settings.auth_cookie_expiry_days * 86400, cost=settings.auth_hash_cost,
+                   workers=settings.auth_workers, max_attempts=settings.auth_max_attempts,
+                   lockout_s=settings.auth_lockout_seconds)
+
+    # ------------------------------------------------------------------
+    # Sign-in
+    # ------------------------------------------------------------------
+
+    def submit(self, username: str, password: str) -> "Future[AuthResult]":
+        """Queue a password check on the hashing pool"""
+        username = username.strip()
+        retry_after = self.throttle.acquire(username.lower())
+        if retry_after > 0:
+            future: Future = Future()
+            future.set_result(AuthResult(error="Too many sign-in attempts", retry_after_s=retry_after))
+            return future
+        return self._pool.submit(self._verify, username, password)
+
+    def login(self, username: str, password: str) -> AuthResult:
+        """Check a password; the caller waits on the pool, which does the hashing"""
+        return self.submit(username, password).result()
+
+    def _verify(self, username: str, password: str) -> AuthResult:
+        user = self.store.get(username)
+        encoded = user.password_hash if user is not None else self._dummy_hash
+        if not verify_password(password, encoded) or user is None:
+            return AuthResult(error="Invalid credentials")
+        self.throttle.reset(username.lower())
+        if hash_cost(encoded) < self.cost:
+            self.store.update_hash(username, hash_password(password, self.cost))
+        return AuthResult(user=user.public(), token=self.issue_token(username))
+
+    # ------------------------------------------------------------------
+    # Tokens
+    # ------------------------------------------------------------------
+
+    def _sign(self, payload: bytes) -> str:
+        return _b64(hmac.new(self._key, payload, hashlib.sha256).digest())
+
+    def issue_token(self, username: str, now: Optional[float] = None) -> str:
+        issued = time.time() if now is None else now
+        payload = json.dumps({"u": username, "exp": int(issued + self.token_ttl_s), "n": secrets.token_hex(8)},
+                             separators=(",", ":")).encode()
+        return f"{_b64(payload)}.{self._sign(payload)}"
+
+    def verify_token(self, token: Optional[str], now: Optional[float] = None) -> Optional[dict]:
+        """The signed-in user, or None for a forged, expired, revoked or orphaned token"""
+        if not token or token in self._revoked:
+            return None
+        try:
+            encoded, signature = token.split(".")
+            payload = _unb64(encoded)
+        except ValueError:
+            return None
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            return None
+        claims = json.loads(payload)
+        if claims["exp"] < (time.time() if now is None else now):
+            return None
+        # Roles come from the store, so a changed or removed account applies on the next rerun
+        user = self.store.get(claims["u"])
+        return user.public() if user is not None else None
+
+    def revoke(self, token: str) -> None:
+        self._revoked[token] = True
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,572 @@
+"""
+Cross-Account AWS Config Collector
+==================================
+Pulls Config rule compliance for every member account of the organization.
+
+- One shared boto3 session; member credentials come from STS AssumeRole
+  into AWS_ASSUME_ROLE (with AWS_EXTERNAL_ID) and are cached until expiry
+- (account, region) pairs are fanned out across a bounded pool with
+  per-service concurrency limits and per-API token buckets (region_fanout);
+  with FEATURE_MULTI_REGION every enabled region of each account is swept,
+  otherwise only AWS_DEFAULT_REGION
+- Clients use botocore adaptive retry; throttling responses are counted
+- When AWS_CONFIG_AGGREGATOR is set the organization aggregator is queried
+  instead of assuming into each account (still sharded per account); the
+  aggregator reports no rule evaluation times, so that mode re-reads every
+  endpoint each sync and only non-compliant rules whose resources are
+  expanded carry a Last Evaluated time
+- With COLLECT_RESOURCE_DETAILS, non-compliant rules are expanded into their
+  non-compliant resources for the findings explorer
+
+The session is injectable, so the collector runs unchanged against moto or
+any other local stand-in for the AWS endpoints.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import pandas as pd
+
+from region_fanout import ApiRateLimiter, FanOut, RegionDiscovery, Task, describe_enabled_regions
+
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+except ImportError:  # the dashboard still runs in demo mode without boto3
+    boto3 = None
+    BotoConfig = None
+
+THROTTLE_CODES = frozenset({
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+    "SlowDown",
+})
+
+CREDENTIAL_REFRESH_MARGIN = 300  # seconds before expiry to re-assume
+MANAGEMENT = "mgmt"  # rate-limit / region-discovery scope of the management account
+
+logger = logging.getLogger(__name__)
+
+
+def watermark_scope(account_id: str, region: str) -> str:
+    """Sync watermark key of one (account, region) endpoint"""
+    return f"{account_id}:{region}"
+
+
+@dataclass
+class RuleCompliance:
+    """Compliance of one Config rule in one account"""
+
+    account_id: str
+    rule_name: str
+    compliance_type: str
+    non_compliant_resources: int = 0
+    last_evaluated: Optional[datetime] = None
+    region: str = ""
+    resources: List[dict] = field(default_factory=list)  # non-compliant resource_type / resource_id
+
+
+@dataclass
+class AccountResult:
+    """Outcome of collecting a single account in one region"""
+
+    account_id: str
+    account_name: str = ""
+    region: str = ""
+    ou: Optional[str] = None
+    portfolio: Optional[str] = None
+    rules: List[RuleCompliance] = field(default_factory=list)
+    unchanged: bool = False
+    latency_s: float = 0.0
+    throttles: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class CollectionReport:
+    """Outcome of a full organization sweep"""
+
+    results: List[AccountResult]
+    wall_time_s: float
+
+    @property
+    def accounts(self) -> int:
+        return len(self.results)
+
+    @property
+    def failed(self) -> List[AccountResult]:
+        return [r for r in self.results if r.error]
+
+    @property
+    def throttles(self) -> int:
+        return sum(r.throttles for r in self.results)
+
+    @property
+    def unchanged(self) -> int:
+        return sum(1 for r in self.results if r.unchanged)
+
+    def rules(self) -> Iterable[RuleCompliance]:
+        for result in self.results:
+            yield from result.rules
+
+    def latency_frame(self) -> pd.DataFrame:
+        """Per-endpoint latency and throttle counts"""
+        return pd.DataFrame({
+            "Account": [r.account_id for r in self.results],
+            "Name": [r.account_name for r in self.results],
+            "Region": [r.region for r in self.results],
+            "Rules": [len(r.rules) for r in self.results],
+            "Unchanged": [r.unchanged for r in self.results],
+            "Latency (s)": [round(r.latency_s, 3) for r in self.results],
+            "Throttles": [r.throttles for r in self.results],
+            "Error": [r.error or "" for r in self.results],
+        })
+
+
+class CredentialCache:
+    """Caches AssumeRole credentials per account until shortly before expiry"""
+
+    def __init__(self, session, role_name: str, external_id: str = "",
+                 session_name: str = "guardrails-collector",
+                 refresh_margin: int = CREDENTIAL_REFRESH_MARGIN):
+        self._session = session
+        self._role_name = role_name
+        self._external_id = external_id
+        self._session_name = session_name
+        self._refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._account_locks: Dict[str, threading.Lock] = {}
+        self._credentials: Dict[str, dict] = {}
+        self._sts = None
+        self.assume_calls = 0
+
+    def _sts_client(self):
+        with self._lock:
+            if self._sts is None:
+                self._sts = self._session.client("sts")
+            return self._sts
+
+    def _account_lock(self, account_id: str) -> threading.Lock:
+        with self._lock:
+            return self._account_locks.setdefault(account_id, threading.Lock())
+
+    def role_arn(self, account_id: str) -> str:
+        return f"arn:aws:iam::{account_id}:role/{self._role_name}"
+
+    def get(self, account_id: str) -> dict:
+        """Return valid credentials for the account, assuming the role if needed"""
+        cached = self._credentials.get(account_id)
+        if cached and not self._expiring(cached):
+            return cached
+        # One assume per account even when several workers ask at once
+        with self._account_lock(account_id):
+            cached = self._credentials.get(account_id)
+            if cached and not self._expiring(cached):
+                return cached
+            kwargs = {"RoleArn": self.role_arn(account_id), "RoleSessionName": self._session_name}
+            if self._external_id:
+                kwargs["ExternalId"] = self._external_id
+            response = self._sts_client().assume_role(**kwargs)
+            self.assume_calls += 1
+            creds = response["Credentials"]
+            cached = {
+                "aws_access_key_id": creds["AccessKeyId"],
+                "aws_secret_access_key": creds["SecretAccessKey"],
+                "aws_session_token": creds["SessionToken"],
+                "expiration": creds["Expiration"],
+            }
+            self._credentials[account_id] = cached
+            return cached
+
+    def invalidate(self, account_id: str) -> None:
+        self._credentials.pop(account_id, None)
+
+    def _expiring(self, creds: dict) -> bool:
+        expiration = _as_utc(creds["expiration"])
+        remaining = (expiration - datetime.now(timezone.utc)).total_seconds()
+        return remaining < self._refresh_margin
+
+
+class _ThrottleCounter:
+    """botocore needs-retry hook that counts throttled attempts per thread"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def reset(self) -> None:
+        self._local.count = 0
+
+    @property
+    def count(self) -> int:
+        return getattr(self._local, "count", 0)
+
+    def __call__(self, response=None, **kwargs):
+        if not response:
+            return None
+        parsed = response[1] if isinstance(response, tuple) and len(response) > 1 else {}
+        code = (parsed or {}).get("Error", {}).get("Code")
+        if code in THROTTLE_CODES:
+            self._local.count = self.count + 1
+        return None  # never alter botocore's own retry decision
+
+
+class ConfigCollector:
+    """Collects AWS Config rule compliance across the organization in parallel"""
+
+    def __init__(self, session=None, role_name: str = "GuardrailsComplianceRole",
+                 external_id: str = "", region: str = "us-east-1",
+                 aggregator_name: str = "", max_workers: int = 32,
+                 max_attempts: int = 10, resource_details: bool = True,
+                 multi_region: bool = False, regions: Iterable[str] = (),
+                 service_limits: Optional[Mapping[str, float]] = None,
+                 api_rates: Optional[Mapping[str, float]] = None):
+        if session is None:
+            if boto3 is None:
+                raise RuntimeError("boto3 is required for live AWS collection")
+            session = boto3.Session(region_name=region)
+        self.session = session
+        self.region = region
+        self.aggregator_name = aggregator_name
+        self.max_workers = max(1, max_workers)
+        self.resource_details = resource_details
+        self.multi_region = multi_region
+        self.credentials = CredentialCache(session, role_name, external_id)
+        self.fanout = FanOut(self.max_workers, service_limits, thread_name_prefix="config-collector")
+        self.rate_limiter = ApiRateLimiter(api_rates)
+        self.region_discovery = RegionDiscovery(self._describe_regions, allowed=regions)
+        self._client_lock = threading.Lock()
+        self._clients: Dict[tuple, object] = {}
+        self._throttles = _ThrottleCounter()
+        self._boto_config = BotoConfig(
+            retries={"mode": "adaptive", "max_attempts": max_attempts},
+            max_pool_connections=self.max_workers,
+        ) if BotoConfig is not None else None
+
+    @classmethod
+    def from_settings(cls, settings, session=None) -> "ConfigCollector":
+        from region_fanout import parse_limits
+        return cls(
+            session=session,
+            role_name=settings.aws_assume_role,
+            external_id=settings.aws_external_id,
+            region=settings.aws_default_region,
+            aggregator_name=settings.aws_config_aggregator,
+            max_workers=settings.collector_max_workers,
+            resource_details=settings.collect_resource_details,
+            multi_region=settings.multi_region,
+            regions=[r.strip() for r in settings.collector_regions.split(",") if r.strip()],
+            service_limits=parse_limits(settings.collector_service_limits) or None,
+            api_rates=parse_limits(settings.collector_api_rates) or None,
+        )
+
+    # ------------------------------------------------------------------
+    # Clients
+    # ------------------------------------------------------------------
+
+    def _make_client(self, service: str, region: str, scope: str, **credentials):
+        # boto3 sessions are not thread-safe when creating clients
+        with self._client_lock:
+            client = self.session.client(service, region_name=region,
+                                         config=self._boto_config, **credentials)
+        client.meta.events.register("needs-retry", self._throttles)
+        # API quotas are per account and region
+        self.rate_limiter.attach(client, (scope, region))
+        return client
+
+    def management_client(self, service: str, region: Optional[str] = None):
+        region = region or self.region
+        key = ("mgmt", service, region)
+        client = self._clients.get(key)
+        if client is None:
+            client = self._make_client(service, region, MANAGEMENT)
+            self._clients[key] = client
+        return client
+
+    def member_client(self, account_id: str, service: str, region: Optional[str] = None):
+        region = region or self.region
+        creds = self.credentials.get(account_id)
+        key = (account_id, service, region)
+        cached = self._clients.get(key)
+        # Reuse the client for as long as the credentials it was built with
+        if cached is not None and cached[0] is creds:
+            return cached[1]
+        client = self._make_client(service, region, account_id,
+                                   **{k: v for k, v in creds.items() if k != "expiration"})
+        self._clients[key] = (creds, client)
+        return client
+
+    # ------------------------------------------------------------------
+    # Discovery
+    # ------------------------------------------------------------------
+
+    def list_accounts(self, with_placement: bool = True) -> List[dict]:
+        """Active member accounts, annotated with their OU and portfolio
+
+        The portfolio is the top-level OU under the root; the OU is the
+        account's direct parent.
+        """
+        org = self.management_client("organizations")
+        accounts = []
+        for page in org.get_paginator("list_accounts").paginate():
+            accounts.extend(a for a in page["Accounts"] if a.get("Status", "ACTIVE") == "ACTIVE")
+        if with_placement:
+            placement = self.account_placement()
+            for account in accounts:
+                account["Ou"], account["Portfolio"] = placement.get(account["Id"], ("Root", "Root"))
+        return accounts
+
+    def account_placement(self) -> Dict[str, tuple]:
+        """Map account id -> (OU name, portfolio name) by walking the OU tree"""
+        org = self.management_client("organizations")
+        placement = {}
+        roots = org.list_roots()["Roots"]
+        stack = [(root["Id"], "Root", None) for root in roots]
+        while stack:
+            parent_id, parent_name, portfolio = stack.pop()
+            for page in org.get_paginator("list_accounts_for_parent").paginate(ParentId=parent_id):
+                for account in page["Accounts"]:
+                    placement[account["Id"]] = (parent_name, portfolio or parent_name)
+            for page in org.get_paginator("list_organizational_units_for_parent").paginate(ParentId=parent_id):
+                for ou in page["OrganizationalUnits"]:
+                    stack.append((ou["Id"], ou["Name"], portfolio or ou["Name"]))
+        return placement
+
+    def _describe_regions(self, scope: str) -> List[str]:
+        if scope == MANAGEMENT:
+            return describe_enabled_regions(self.management_client("ec2"))
+        return describe_enabled_regions(self.member_client(scope, "ec2"))
+
+    def regions_for(self, account_id: str) -> List[str]:
+        """Regions to sweep for an account: its enabled regions, or the home region"""
+        if not self.multi_region:
+            return [self.region]
+        # The aggregator answers for every account from the management account
+        scope = MANAGEMENT if self.aggregator_name else account_id
+        try:
+            return self.region_discovery.regions(scope) or [self.region]
+        except Exception as exc:  # no ec2:DescribeRegions: fall back to the home region
+            logger.warning("Region discovery failed for %s (%s); using %s", scope, exc, self.region)
+            return [self.region]
+
+    # ------------------------------------------------------------------
+    # Collection
+    # ------------------------------------------------------------------
+
+    def collect(self, accounts: Optional[List[dict]] = None,
+                on_result: Optional[Callable[[AccountResult], None]] = None,
+                region: Optional[str] = None,
+                watermarks: Optional[Dict[str, datetime]] = None,
+                on_planned: Optional[Callable[[int], None]] = None) -> CollectionReport:
+        """Collect every (account, region) concurrently; on_result streams partial results
+
+        A fixed `region` skips discovery. Endpoints whose rules were all last
+        evaluated at or before their watermark come back with unchanged=True
+        and no rules (per-account mode only; the aggregator has no evaluation
+        times to compare). `on_planned` receives the number of endpoints known so far.
+        """
+        started = time.perf_counter()
+        accounts = accounts if accounts is not None else self.list_accounts()
+        fetch = self._collect_from_aggregator if self.aggregator_name else self._collect_from_account
+        watermarks = watermarks or {}
+        results = []
+        endpoints = [0]
+
+        def collect_task(account: dict, account_region: str) -> Task:
+            since = watermarks.get(watermark_scope(account["Id"], account_region))
+            return Task("config", self._timed, (fetch, account, account_region, since))
+
+        def planned(tasks: List[Task]) -> List[Task]:
+            endpoints[0] += len(tasks)
+            if on_planned is not None:
+                on_planned(endpoints[0])
+            return tasks
+
+        def on_done(task: Task, future) -> Optional[List[Task]]:
+            if task.service == "ec2":
+                return planned([collect_task(task.key, r) for r in future.result()])
+            result = future.result()
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+            return None
+
+        if region is not None or not self.multi_region:
+            tasks = planned([collect_task(account, region or self.region) for account in accounts])
+        else:
+            tasks = [Task("ec2", self.regions_for, (account["Id"],), key=account) for account in accounts]
+        self.fanout.run(tasks, on_done)
+        results.sort(key=lambda r: (r.account_id, r.region))
+        return CollectionReport(results=results, wall_time_s=time.perf_counter() - started)
+
+    def _timed(self, fetch, account: dict, region: str, since: Optional[datetime]) -> AccountResult:
+        result = AccountResult(
+            account_id=account["Id"], account_name=account.get("Name", ""), region=region,
+            ou=account.get("Ou"), portfolio=account.get("Portfolio"),
+        )
+        self._throttles.reset()
+        started = time.perf_counter()
+        try:
+            rules = fetch(account["Id"], region, since)
+            if rules is None:
+                result.unchanged = True
+            else:
+                result.rules = rules
+        except Exception as exc:  # one broken account must not fail the sweep
+            result.error = f"{type(exc).__name__}: {exc}"
+        result.latency_s = time.perf_counter() - started
+        result.throttles = self._throttles.count
+        return result
+
+    def _collect_from_account(self, account_id: str, region: str,
+                              since: Optional[datetime] = None) -> Optional[List[RuleCompliance]]:
+        client = self.member_client(account_id, "config", region)
+        evaluated = {}
+        # describe_config_rule_evaluation_status has no paginator; follow NextToken
+        token = None
+        while True:
+            kwargs = {"NextToken": token} if token else {}
+            page = client.describe_config_rule_evaluation_status(**kwargs)
+            for status in page.get("ConfigRulesEvaluationStatus", []):
+                evaluated[status.get("ConfigRuleName")] = status.get("LastSuccessfulEvaluationTime")
+            token = page.get("NextToken")
+            if not token:
+                break
+        # Nothing re-evaluated since the last sync: skip the compliance pages
+        if since is not None and evaluated and all(
+            ts is not None and _as_utc(ts) <= since for ts in evaluated.values()
+        ):
+            return None
+        rules = []
+        for page in client.get_paginator("describe_compliance_by_config_rule").paginate():
+            for item in page.get("ComplianceByConfigRules", []):
+                compliance = item.get("Compliance", {})
+                contributors = compliance.get("ComplianceContributorCount", {})
+                rules.append(RuleCompliance(
+                    account_id=account_id,
+                    rule_name=item["ConfigRuleName"],
+                    compliance_type=compliance.get("ComplianceType", "INSUFFICIENT_DATA"),
+                    non_compliant_resources=contributors.get("CappedCount", 0),
+                    last_evaluated=evaluated.get(item["ConfigRuleName"]),
+                    region=region,
+                ))
+        if self.resource_details:
+            for rule in rules:
+                if rule.compliance_type == "NON_COMPLIANT":
+                    pages = client.get_paginator("get_compliance_details_by_config_rule").paginate(
+                        ConfigRuleName=rule.rule_name, ComplianceTypes=["NON_COMPLIANT"],
+                    )
+                    rule.resources, _ = _evaluated_resources(pages, "EvaluationResults")
+        return rules
+
+    def _collect_from_aggregator(self, account_id: str, region: str,
+                                 since: Optional[datetime] = None) -> List[RuleCompliance]:
+        # `since` is not used: aggregate compliance carries no evaluation times, so nothing can be skipped
+        client = self.management_client("config")
+        paginator = client.get_paginator("describe_aggregate_compliance_by_config_rules")
+        rules = []
+        pages = paginator.paginate(
+            ConfigurationAggregatorName=self.aggregator_name,
+            Filters={"AccountId": account_id, "AwsRegion": region},
+        )
+        for page in pages:
+            for item in page.get("AggregateComplianceByConfigRules", []):
+                compliance = item.get("Compliance", {})
+                contributors = compliance.get("ComplianceContributorCount", {})
+                rules.append(RuleCompliance(
+                    account_id=item.get("AccountId", account_id),
+                    rule_name=item["ConfigRuleName"],
+                    compliance_type=compliance.get("ComplianceType", "INSUFFICIENT_DATA"),
+                    non_compliant_resources=contributors.get("CappedCount", 0),
+                    region=item.get("AwsRegion", region),
+                ))
+        if self.resource_details:
+            details = client.get_paginator("get_aggregate_compliance_details_by_config_rule")
+            for rule in rules:
+                if rule.compliance_type == "NON_COMPLIANT":
+                    pages = details.paginate(
+                        ConfigurationAggregatorName=self.aggregator_name, ConfigRuleName=rule.rule_name,
+                        AccountId=rule.account_id, AwsRegion=rule.region, ComplianceType="NON_COMPLIANT",
+                    )
+                    # The detail pages are the only evaluation times the aggregator gives
+                    rule.resources, rule.last_evaluated = _evaluated_resources(pages, "AggregateEvaluationResults")
+        return rules
+
+
+def _evaluated_resources(pages, key: str) -> Tuple[List[dict], Optional[datetime]]:
+    """resource_type / resource_id of each evaluation result in a compliance-details listing,
+    and the latest time a result was recorded"""
+    resources = []
+    latest = None
+    for page in pages:
+        for item in page.get(key, []):
+            qualifier = item.get("EvaluationResultIdentifier", {}).get("EvaluationResultQualifier", {})
+            resources.append({"resource_type": qualifier.get("ResourceType", ""),
+                              "resource_id": qualifier.get("ResourceId", "")})
+            recorded = item.get("ResultRecordedTime")
+            if recorded is not None and (latest is None or _as_utc(recorded) > latest):
+                latest = _as_utc(recorded)
+    return resources, latest
+
+
+def _as_utc(timestamp: datetime) -> datetime:
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+def format_age(timestamp: Optional[datetime], now: Optional[datetime] = None) -> str:
+    """Render a timestamp as '5 min ago' for dashboard tables"""
+    if timestamp is None:
+        return "Never"
+    now = now or datetime.now(timezone.utc)
+    timestamp = _as_utc(timestamp)
+    seconds = max(0, int((now - timestamp).total_seconds()))
+    if seconds < 60:
+        return "just now"
+    if seconds < 3600:
+        return f"{seconds // 60} min ago"
+    if seconds < 86400:
+        return f"{seconds // 3600} hours ago"
+    return f"{seconds // 86400} days ago"
+
+
+def rule_summary_frame(rules: Iterable[RuleCompliance]) -> pd.DataFrame:
+    """Roll per-account rule compliance up into the Config Rules table"""
+    frame = pd.DataFrame(
+        [(r.rule_name, r.account_id, r.compliance_type, r.last_evaluated) for r in rules],
+        columns=["rule_name", "account_id", "compliance_type", "last_evaluated"],
+    )
+    frame["last_evaluated"] = pd.to_datetime(frame["last_evaluated"], utc=True)
+    frame["compliant"] = frame["account_id"].where(frame["compliance_type"].eq("COMPLIANT"))
+    frame["non_compliant"] = frame["account_id"].where(frame["compliance_type"].eq("NON_COMPLIANT"))
+    summary = frame.groupby("rule_name", sort=True).agg(
+        compliant=("compliant", "nunique"),
+        non_compliant=("non_compliant", "nunique"),
+        last_evaluated=("last_evaluated", "max"),
+    ).reset_index()
+    return format_rule_summary(summary)
+
+
+def format_rule_summary(summary: pd.DataFrame) -> pd.DataFrame:
+    """Format rule_name/compliant/non_compliant/last_evaluated rows for display"""
+    columns = ["Rule", "Compliant", "Non-Compliant", "Compliance %", "Last Evaluated"]
+    if summary.empty:
+        return pd.DataFrame(columns=columns)
+    evaluated = summary["compliant"] + summary["non_compliant"]
+    pct = (summary["compliant"] / evaluated.where(evaluated > 0)).mul(100).round(1)
+    last_evaluated = pd.to_datetime(summary["last_evaluated"], utc=True)
+    return pd.DataFrame({
+        "Rule": summary["rule_name"],
+        "Compliant": summary["compliant"].astype(int),
+        "Non-Compliant": summary["non_compliant"].astype(int),
+        "Compliance %": [f"{p:g}%" if pd.notna(p) else "n/a" for p in pct],
+        # "—" is an unknown time (aggregator mode), not a rule that never ran
+        "Last Evaluated": [format_age(ts) if pd.notna(ts) else "—" for ts in last_evaluated],
+    })
@@ -0,0 +1,73 @@
+"""
+Aggregation Benchmark
+=====================
+Times the full OU / portfolio / account / rule / framework rollup over
+synthetic per-resource evaluation rows.
+
+Usage: python benchmarks/bench_aggregation.py [--accounts 500] [--rules 150] [--resources 20]
+       (--resources 67 gives ~5M rows)
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from aggregation import ComplianceAggregator
+
+OUS = ["Production", "Development", "Staging", "Security", "Data Analytics", "Shared Services", "Sandbox"]
+FRAMEWORKS = ["CIS", "SOC2", "PCI", "HIPAA", "NIST", "ISO27001"]
+
+
+def synthetic_evaluations(accounts: int, rules: int, resources: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    rows = accounts * rules * resources
+    account_codes = np.repeat(np.arange(accounts, dtype=np.int32), rules * resources)
+    rule_codes = np.tile(np.repeat(np.arange(rules, dtype=np.int32), resources), accounts)
+    account_ou = rng.integers(0, len(OUS), accounts)
+    account_portfolio = rng.integers(0, 8, accounts)
+    return pd.DataFrame({
+        "account_id": pd.Categorical.from_codes(account_codes, [f"{100000000000 + i}" for i in range(accounts)]),
+        "ou": pd.Categorical.from_codes(account_ou[account_codes], OUS),
+        "portfolio": pd.Categorical.from_codes(account_portfolio[account_codes], [f"Portfolio {i + 1}" for i in range(8)]),
+        "rule_name": pd.Categorical.from_codes(rule_codes, [f"rule-{i:03d}" for i in range(rules)]),
+        "resource_id": np.arange(rows, dtype=np.int64),
+        "compliant": rng.random(rows) > 0.06,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--accounts", type=int, default=500)
+    parser.add_argument("--rules", type=int, default=150)
+    parser.add_argument("--resources", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    frame = synthetic_evaluations(args.accounts, args.rules, args.resources)
+    rng = np.random.default_rng(0)
+    rule_frameworks = {
+        rule: tuple(rng.choice(FRAMEWORKS, size=rng.integers(1, 4), replace=False))
+        for rule in frame["rule_name"].cat.categories
+    }
+    print(f"{len(frame):,} evaluation rows, {frame.memory_usage(deep=True).sum() / 1e6:.0f} MB")
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        rollups = ComplianceAggregator(frame, rule_frameworks).rollups()
+        timings.append(time.perf_counter() - started)
+    print(f"full rollup: best {min(timings) * 1000:.0f} ms, median {np.median(timings) * 1000:.0f} ms "
+          f"({len(frame) / min(timings) / 1e6:.1f}M rows/s)")
+    for name, table in rollups.items():
+        print(f"  {name:<10} {len(table):>6} groups")
+    print(rollups["ou"].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Authentication Benchmark
+========================
+Sign-in latency with 100 sessions logging in at the same moment.
+
+- Each session is a thread released from one barrier, as Streamlit runs one
+  script thread per session
+- "per-session hashing" runs scrypt on every session thread at once;
+  the Authenticator runs the same hashes on its bounded pool
+- Rerun cost compares checking the signed session token with re-checking
+  the password; the throttle run sends 100 parallel guesses at one user
+
+Usage: python benchmarks/bench_auth.py [--logins 100] [--cost 14]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth_store import DEMO_USERS, Authenticator, demo_store, verify_password
+
+
+def concurrent(logins: int, sign_in) -> tuple:
+    """Latencies (s) of `logins` simultaneous sign-ins, and the wall time"""
+    barrier = threading.Barrier(logins + 1)
+    latencies = [0.0] * logins
+    users = list(DEMO_USERS.items())
+
+    def session(i):
+        username, (password, _, _) = users[i % len(users)]
+        barrier.wait()
+        started = time.perf_counter()
+        assert sign_in(username, password), username
+        latencies[i] = time.perf_counter() - started
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(logins)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies), time.perf_counter() - started
+
+
+def report(label: str, latencies: list, wall: float, peak: int, cost: int):
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:>28} {statistics.median(latencies) * 1000:8.0f} {p95 * 1000:8.0f} {latencies[-1] * 1000:8.0f} "
+          f"{len(latencies) / wall:8.1f}/s {peak:>6} {peak * 128 * 8 * (1 << cost) / 2**20:8,.0f} MiB")
+
+
+class Gauge:
+    """Counts hashes in flight"""
+
+    def __init__(self):
+        self.current = self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.current -= 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--cost", type=int, default=14, help="scrypt cost, log2 N")
+    args = parser.parse_args()
+
+    store = demo_store(args.cost)
+    print(f"{args.logins} simultaneous sign-ins, scrypt cost {args.cost} ({(128 * 8 << args.cost) >> 20} MiB each), "
+          f"{os.cpu_count()} CPUs")
+    print(f"{'sign-in':>28} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'rate':>10} {'peak':>6} {'scrypt mem':>12}")
+
+    plaintext = {name: password for name, (password, _, _) in DEMO_USERS.items()}
+    latencies, wall = concurrent(args.logins, lambda u, p: plaintext.get(u) == p)
+    report("inline dict (previous)", latencies, wall, 0, args.cost)
+
+    gauge = Gauge()
+
+    def per_session(username, password):
+        with gauge:
+            return verify_password(password, store.get(username).password_hash)
+
+    latencies, wall = concurrent(args.logins, per_session)
+    report("per-session hashing", latencies, wall, gauge.peak, args.cost)
+
+    for workers in (2, 4, 8):
+        auth = Authenticator(store, b"bench", 86400, cost=args.cost, workers=workers, max_attempts=10 ** 6)
+        latencies, wall = concurrent(args.logins, lambda u, p: auth.login(u, p).user)
+        report(f"Authenticator, {workers} workers", latencies, wall, workers, args.cost)
+        auth.close()
+
+    # What every rerun pays once signed in
+    auth = Authenticator(store, b"bench", 86400, cost=args.cost)
+    token = auth.login("admin", "admin123").token
+    started = time.perf_counter()
+    for _ in range(10_000):
+        auth.verify_token(token)
+    token_us = (time.perf_counter() - started) / 10_000 * 1e6
+    started = time.perf_counter()
+    verify_password("admin123", store.get("admin").password_hash)
+    print(f"rerun check: signed token {token_us:.1f} us vs password {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    # 100 parallel guesses at one account: only the first few are hashed
+    hashed = []
+    original = auth._verify
+    auth._verify = lambda username, password: hashed.append(username) or original(username, password)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(auth.login("viewer", "guess")))
+               for _ in range(args.logins)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    throttled = sum(1 for r in results if r.retry_after_s)
+    print(f"{args.logins} parallel guesses at one user: {len(hashed)} hashed, {throttled} throttled")
+    auth.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Card Rendering Benchmark
+========================
+Rerun time and websocket payload for a list of KICS finding cards.
+
+- Per-item: the previous rendering, one inline-styled f-string and one
+  `st.markdown` call per card
+- Batched: cards.FINDING.render_many, one `st.markdown` call for the
+  list; measured with a cold card cache and again with a warm one
+- Reruns go through Streamlit's AppTest harness; the payload is the
+  serialized size of the ForwardMsg deltas the reruns would send
+
+Usage: python benchmarks/bench_cards.py [--cards 500] [--reruns 10]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.testing.v1 import AppTest
+
+import cards
+
+SETUP = f"""
+import sys
+sys.path.insert(0, {ROOT!r})
+import streamlit as st
+import cards
+
+SEVERITIES = ["CRITICAL", "HIGH", "MEDIUM", "LOW"]
+findings = [
+    {{"severity": SEVERITIES[i % 4], "query": f"Security Group Open to Internet ({{i}})",
+      "file": f"terraform/modules/vpc{{i % 40}}/security.tf", "line": i % 300}}
+    for i in range(st.session_state.get("cards", 500))
+]
+"""
+
+PER_ITEM = SETUP + """
+for finding in findings:
+    sev_color = "#ef4444" if finding['severity'] in ("CRITICAL", "HIGH") else "#f59e0b"
+    st.markdown(f\"\"\"
+    <div style="background: #1a1f2e; border-left: 3px solid {sev_color}; padding: 0.75rem; margin-bottom: 0.5rem; border-radius: 0 8px 8px 0;">
+        <div style="display: flex; justify-content: space-between;">
+            <span style="color: #e5e7eb;">{finding['query']}</span>
+            <span style="color: {sev_color}; font-weight: 600;">{finding['severity']}</span>
+        </div>
+        <div style="color: #6b7280; font-size: 0.8rem; margin-top: 0.25rem;">
+            📁 {finding['file']}:{finding['line']}
+        </div>
+    </div>
+    \"\"\", unsafe_allow_html=True)
+"""
+
+BATCHED = SETUP + """
+st.markdown(cards.FINDING.render_many(
+    {**finding, "color": cards.severity_color(finding["severity"])} for finding in findings
+), unsafe_allow_html=True)
+"""
+
+
+def payload_bytes(at: AppTest) -> tuple:
+    """(deltas, bytes) of the markdown elements one rerun sends"""
+    total = 0
+    elements = list(at.markdown)
+    for i, element in enumerate(elements):
+        msg = ForwardMsg()
+        msg.metadata.delta_path[:] = [0, i]
+        msg.delta.new_element.markdown.CopyFrom(element.proto)
+        total += msg.ByteSize()
+    return len(elements), total
+
+
+def measure(label: str, script: str, count: int, reruns: int, warm: bool):
+    at = AppTest.from_string(script, default_timeout=120)
+    at.session_state["cards"] = count
+    timings = []
+    for _ in range(reruns):
+        if not warm:
+            cards.clear()
+        started = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - started)
+        assert not at.exception, at.exception
+    deltas, size = payload_bytes(at)
+    timings.sort()
+    print(f"{label:>24} {deltas:>7,} {size / 1024:9,.1f} KiB {timings[len(timings) // 2] * 1000:9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cards", type=int, default=500)
+    parser.add_argument("--reruns", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{args.cards:,} finding cards, median of {args.reruns} reruns")
+    print(f"{'rendering':>24} {'deltas':>7} {'payload':>13} {'rerun':>12}")
+    measure("per-item f-strings", PER_ITEM, args.cards, args.reruns, warm=True)
+    measure("batched, cold cache", BATCHED, args.cards, args.reruns, warm=False)
+    measure("batched, warm cache", BATCHED, args.cards, args.reruns, warm=True)
+    stats = cards.card_stats().set_index("template").loc["finding"]
+    print(f"finding template: {int(stats['renders']):,} renders, {int(stats['hits']):,} cache hits")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Chart Factory Benchmark
+=======================
+Per-chart cost of building the dashboard figures from demo data on every
+rerun vs. a figure-cache hit, including what st.plotly_chart then spends
+turning the figure into its JSON spec.
+
+Usage: python benchmarks/bench_charts.py [--repeat 50]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import plotly.io as pio
+import plotly.tools
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import charts
+import demo_data
+
+
+def chart_calls() -> dict:
+    """The builder arguments each tab passes, from the demo datasets"""
+    rollups = demo_data.compliance_rollups()
+    policy_index = demo_data.policy_index()
+    pipeline = demo_data.pipeline_runs()
+    kics = demo_data.kics_results()
+    counts = kics["severity_counts"]
+    high = counts.get("CRITICAL", 0) + counts.get("HIGH", 0)
+    return {
+        charts.policy_distribution: (list(policy_index["by_type"]), list(policy_index["by_type"].values())),
+        charts.framework_scores: (rollups["framework"]["framework"].tolist(), rollups["framework"]["score"].tolist()),
+        charts.pipeline_metrics: (pipeline["days"], pipeline["runs"], pipeline["failures"]),
+        charts.kics_donut: (kics["checks_passed"], counts.get("LOW", 0), counts.get("MEDIUM", 0), high,
+                            kics["checks_passed"] + sum(counts.values())),
+        charts.ou_compliance: (rollups["ou"]["ou"].tolist(), rollups["ou"]["score"].tolist(),
+                               rollups["ou"]["accounts"].tolist()),
+        charts.compliance_trend: (demo_data.compliance_trend(365),),
+        charts.findings_trend: (demo_data.findings_trend(),),
+        charts.deployment_frequency: (demo_data.deployment_frequency(),),
+    }
+
+
+def serialize(figure):
+    """What st.plotly_chart does with the figure it is handed"""
+    return pio.to_json(plotly.tools.return_figure_from_figure_or_data(figure, validate_figure=True), validate=False)
+
+
+def median_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    calls = chart_calls()
+    for builder, arguments in calls.items():  # warm up imports and plotly's validators
+        serialize(builder.__wrapped__(*arguments))
+
+    print(f"{'chart':>22} {'build':>9} {'cache hit':>10} {'to spec':>9} {'saved':>8}")
+    total_build = total_hit = 0.0
+    for builder, arguments in calls.items():
+        build = median_ms(lambda: builder.__wrapped__(*arguments), args.repeat)
+        builder(*arguments)
+        hit = median_ms(lambda: builder(*arguments), args.repeat)
+        spec = median_ms(lambda: serialize(builder(*arguments)), args.repeat) - hit
+        total_build, total_hit = total_build + build, total_hit + hit
+        print(f"{builder.__name__:>22} {build:7.2f}ms {hit:8.3f}ms {spec:7.2f}ms {build - hit:6.2f}ms")
+    print(f"{'all charts':>22} {total_build:7.2f}ms {total_hit:8.3f}ms {'':>9} {total_build - total_hit:6.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
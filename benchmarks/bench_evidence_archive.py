@@ -0,0 +1,96 @@
+"""
+Evidence Archive Benchmark
+==========================
+Snapshot and export of a large findings table: the streaming Parquet archive
+and batch-wise CSV / XLSX writers vs. loading the table into pandas and
+calling to_excel (openpyxl). Each phase runs in a fresh process so its peak
+RSS is reported on its own.
+
+Usage: python benchmarks/bench_evidence_archive.py [--rows 2000000] [--baseline-rows 200000]
+"""
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from evidence_archive import CSV, FINDINGS, XLSX, EvidenceArchive
+from findings_store import SCHEMA
+
+OUS = ["Production", "Development", "Staging", "Security", "Data Analytics", "Shared Services", "Sandbox"]
+RULES = ["s3-bucket-server-side-encryption-enabled", "ec2-imdsv2-check", "rds-storage-encrypted",
+         "ebs-encrypted-volumes", "iam-password-policy", "restricted-ssh"]
+DATE = "2026-03-31"
+
+
+def populate(db: Database, rows: int, chunk: int = 200000):
+    """Findings rows without the explorer indexes (only the table is read here)"""
+    db.executescript(SCHEMA[:1])
+    rng = np.random.default_rng(7)
+    now = time.time()
+    for offset in range(0, rows, chunk):
+        size = min(chunk, rows - offset)
+        accounts = rng.integers(0, 487, size)
+        db.executemany(
+            "INSERT INTO findings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((f"{offset + i:040x}", "bench", str(100000000000 + int(a)), OUS[int(a) % len(OUS)], "us-east-1",
+              RULES[int(r)], int(s), "AWS::EC2::Instance", f"i-{offset + i:017x}", now - float(age), now)
+             for i, (a, r, s, age) in enumerate(zip(accounts, rng.integers(0, len(RULES), size),
+                                                     rng.integers(0, 4, size), rng.exponential(4e6, size)))),
+        )
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def phase(name: str, db_path: str, root: str, baseline_rows: int) -> tuple:
+    """Run one phase in this (fresh) process; returns (seconds, peak RSS MB, detail)"""
+    db = Database.sqlite(db_path)
+    archive = EvidenceArchive(os.path.join(root, "archive"), os.path.join(root, "exports"))
+    started = time.perf_counter()
+    if name == "snapshot":
+        detail = f"{archive.snapshot(db, FINDINGS, DATE):,} rows"
+    elif name in (CSV, XLSX):
+        result = archive.export(FINDINGS, DATE, name)
+        detail = f"{result.rows:,} rows, {result.bytes / 1e6:,.0f} MB"
+    elif name == "history":
+        detail = f"{int(archive.history(FINDINGS, 3650).to_numpy().sum()):,} rows counted"
+    else:
+        frame = db.query_frame(f"SELECT * FROM findings LIMIT {baseline_rows}")
+        frame.to_excel(os.path.join(root, "baseline.xlsx"), engine="openpyxl", index=False)
+        detail = f"{len(frame):,} rows"
+    return time.perf_counter() - started, peak_rss_mb(), detail
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--baseline-rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        db_path = os.path.join(root, "findings.db")
+        started = time.perf_counter()
+        populate(Database.sqlite(db_path), args.rows)
+        print(f"populated {args.rows:,} findings in {time.perf_counter() - started:.1f}s")
+        print(f"{'phase':>26} {'time':>9} {'peak RSS':>10}")
+        phases = [("snapshot", "snapshot → Parquet"), ("history", "history (lazy scan)"),
+                  (CSV, "export CSV"), (XLSX, "export XLSX"), ("baseline", "pandas + openpyxl")]
+        for name, label in phases:
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                elapsed, rss, detail = pool.submit(phase, name, db_path, root, args.baseline_rows).result()
+            print(f"{label:>26} {elapsed:8.1f}s {rss:7.0f} MB  {detail}")
+
+
+if __name__ == "__main__":
+    main()
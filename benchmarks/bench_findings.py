@@ -0,0 +1,100 @@
+"""
+Findings Explorer Benchmark
+===========================
+Server-side filter / sort / page queries against the findings store vs.
+loading every row into pandas and slicing there (what handing the whole
+table to st.dataframe amounts to).
+
+Usage: python benchmarks/bench_findings.py [--rows 1000000] [--page-size 50]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from findings_store import PAGE_COLUMNS, FindingsFilter, FindingsStore
+from kics_ingest import SEVERITIES
+
+RULES = ["s3-bucket-server-side-encryption-enabled", "ec2-imdsv2-check", "rds-storage-encrypted",
+         "ebs-encrypted-volumes", "iam-password-policy", "restricted-ssh", "vpc-flow-logs-enabled",
+         "cloudtrail-enabled", "kms-cmk-not-scheduled-for-deletion", "lambda-function-public-access-prohibited"]
+OUS = ["Production", "Development", "Staging", "Security", "Data Analytics", "Shared Services", "Sandbox"]
+
+
+def synthetic(rows: int, accounts: int = 487, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    account_ids = np.array([str(100000000000 + i) for i in range(accounts)])
+    account_ou = np.array(OUS)[rng.integers(0, len(OUS), accounts)]
+    picks = rng.integers(0, accounts, rows)
+    now = time.time()
+    return pd.DataFrame({
+        "account_id": account_ids[picks],
+        "ou": account_ou[picks],
+        "region": np.array(["us-east-1", "us-west-2", "eu-west-1"])[rng.integers(0, 3, rows)],
+        "rule_name": np.array(RULES)[rng.integers(0, len(RULES), rows)],
+        "severity": np.array(SEVERITIES[:4])[rng.choice(4, rows, p=[0.05, 0.25, 0.5, 0.2])],
+        "resource_type": "AWS::EC2::Instance",
+        "resource_id": [f"i-{n:017x}" for n in range(rows)],
+        "first_seen": now - rng.exponential(45 * 86400, rows),
+        "last_seen": now,
+    })[PAGE_COLUMNS]
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FindingsStore(Database.sqlite(os.path.join(tmp, "findings.db")))
+        frame = synthetic(args.rows)
+        started = time.perf_counter()
+        store.load_frame("bench", frame)
+        print(f"loaded {args.rows:,} findings in {time.perf_counter() - started:.1f}s")
+
+        cases = [
+            ("newest first, page 1", FindingsFilter(), "first_seen", True, 1),
+            ("newest first, page 2,000", FindingsFilter(), "first_seen", True, 2000),
+            ("OU + severity", FindingsFilter(ous=("Production",), severities=("CRITICAL", "HIGH")),
+             "severity", False, 1),
+            ("account + rule", FindingsFilter(accounts=("100000000042",), rules=(RULES[1],)), "first_seen", True, 1),
+            ("older than 90 days", FindingsFilter(min_age_days=90), "first_seen", False, 1),
+            ("resource prefix", FindingsFilter(resource_prefix="i-000000000000abc"), "resource_id", False, 1),
+        ]
+
+        def pandas_page():
+            everything = store.db.query_frame("SELECT * FROM findings")
+            subset = everything[everything["ou"] == "Production"]
+            return subset.sort_values("first_seen", ascending=False).head(args.page_size)
+
+        print(f"{'query':>26} {'count + page':>13} {'page only':>10} {'rows matched':>13}")
+        for name, filters, sort, descending, page in cases:
+            result = store.page(filters, sort, descending, page, args.page_size)
+            first = best_of(lambda: store.page(filters, sort, descending, page, args.page_size))
+            paging = best_of(lambda: store.page(filters, sort, descending, page, args.page_size, total=result.total))
+            print(f"{name:>26} {first * 1000:10.1f} ms {paging * 1000:7.1f} ms {result.total:13,}")
+        elapsed = best_of(pandas_page, repeat=2)
+        print(f"{'load all + pandas filter':>26} {elapsed * 1000:9.1f} ms  (one OU, newest first)")
+
+
+if __name__ == "__main__":
+    main()
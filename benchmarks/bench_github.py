@@ -0,0 +1,171 @@
+"""
+GitHub Ingestion Benchmark
+==========================
+Request count and wall time of a GitHub sync against a local mock API
+(pull requests with Link pagination, per-commit check runs, workflow runs).
+
+- serial:  one request at a time, no ETag store (the old page-by-page loop)
+- cold:    concurrent requests, empty ETag store
+- warm:    concurrent requests revalidated with If-None-Match (all 304s)
+
+The mock answers 304 to a matching If-None-Match, adds a fixed latency to
+every response, and can inject a secondary rate limit (403 + retry-after).
+
+Usage: python benchmarks/bench_github.py [--prs 1000] [--concurrency 8] [--latency-ms 20]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from github_client import ETagStore, GitHubClient
+
+REPO = "company/aws-governance-policies"
+
+
+def build_repo(prs: int, runs: int) -> dict:
+    rng = random.Random(7)
+    now = datetime.now(timezone.utc)
+    pulls = [{
+        "number": number,
+        "title": f"Policy change {number}",
+        "state": rng.choice(["open", "closed"]),
+        "merged_at": None,
+        "user": {"login": rng.choice(["alice", "bob", "carol", "dave"])},
+        "updated_at": (now - timedelta(minutes=number)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "head": {"sha": f"{number:040x}"},
+    } for number in range(prs, 0, -1)]
+    checks = {
+        pr["head"]["sha"]: [{"name": name, "status": "completed",
+                             "conclusion": rng.choice(["success"] * 9 + ["failure"])}
+                            for name in ("kics", "opa", "terraform-plan")]
+        for pr in pulls
+    }
+    workflow_runs = [{
+        "id": index,
+        "created_at": (now - timedelta(hours=rng.uniform(0, 24 * 7))).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "conclusion": rng.choice(["success"] * 6 + ["failure"]),
+    } for index in range(runs)]
+    return {"pulls": pulls, "checks": checks, "runs": workflow_runs}
+
+
+def make_handler(repo: dict, latency_s: float, limit_every: int):
+    counter = {"requests": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # keep-alive responses otherwise stall on delayed ACKs
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: bytes = b"", headers: dict = None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _page(self, items: list, query: dict, key: str = None):
+            per_page = int(query.get("per_page", ["30"])[0])
+            page = int(query.get("page", ["1"])[0])
+            last = max(1, -(-len(items) // per_page))
+            chunk = items[(page - 1) * per_page:page * per_page]
+            link = f'<{self.path.split("?")[0]}?per_page={per_page}&page={last}>; rel="last"'
+            return ({key: chunk, "total_count": len(items)} if key else chunk), link
+
+        def do_GET(self):
+            time.sleep(latency_s)
+            with lock:
+                counter["requests"] += 1
+                throttled = limit_every and counter["requests"] % limit_every == 0
+            if throttled:
+                body = b'{"message": "You have exceeded a secondary rate limit."}'
+                return self._send(403, body, {"Retry-After": "1"})
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            parts = url.path.strip("/").split("/")
+            link = ""
+            if url.path.endswith("/pulls"):
+                payload, link = self._page(repo["pulls"], query)
+            elif url.path.endswith("/check-runs"):
+                payload = {"check_runs": repo["checks"].get(parts[-2], [])}
+            elif url.path.endswith("/actions/runs"):
+                payload, link = self._page(repo["runs"], query, key="workflow_runs")
+            else:
+                return self._send(404, b'{"message": "Not Found"}')
+            body = json.dumps(payload).encode()
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                return self._send(304, headers={"ETag": etag})
+            headers = {"ETag": etag, "Content-Type": "application/json"}
+            if link:
+                headers["Link"] = link
+            self._send(200, body, headers)
+
+    return Handler
+
+
+def run_sync(base_url: str, concurrency: int, db, prs: int) -> tuple:
+    client = GitHubClient(REPO, base_url=base_url, concurrency=concurrency,
+                          etags=ETagStore(db) if db is not None else None)
+    started = time.perf_counter()
+    result = asyncio.run(client.sync(pr_limit=prs, checks_for=prs))
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--prs", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=500, help="workflow runs in the last 7 days")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--limit-every", type=int, default=0,
+                        help="answer every Nth request with a secondary rate limit (0 = never)")
+    args = parser.parse_args()
+
+    repo = build_repo(args.prs, args.runs)
+    server = ThreadingHTTPServer(("127.0.0.1", 0),
+                                 make_handler(repo, args.latency_ms / 1000, args.limit_every))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database.sqlite(os.path.join(tmp, "etags.db"))
+        modes = [("serial", 1, None), ("cold", args.concurrency, db), ("warm", args.concurrency, db)]
+        rows = []
+        for name, concurrency, store in modes:
+            elapsed, result = run_sync(base_url, concurrency, store, args.prs)
+            rows.append((name, elapsed, result))
+    server.shutdown()
+
+    print(f"{args.prs} PRs, {args.runs} workflow runs, {args.latency_ms:.0f} ms latency, "
+          f"concurrency {args.concurrency}")
+    for name, elapsed, result in rows:
+        stats = result["stats"]
+        billable = stats["requests"] - stats["not_modified"]
+        print(f"{name:>6}: {elapsed:6.2f} s, {stats['requests']:5d} requests, {stats['not_modified']:5d} x 304, "
+              f"{billable:5d} billable, {stats['retries']} retries ({stats['rate_limit_wait_s']:.1f} s waiting)")
+    assert rows[1][2]["pull_requests"] == rows[2][2]["pull_requests"], "304 replay differs from fresh fetch"
+    print(f"speedup: {rows[0][1] / rows[1][1]:.1f}x concurrent, "
+          f"{rows[0][1] / rows[2][1]:.1f}x concurrent + ETag")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+KICS Ingestion Benchmark
+========================
+Streaming ingestion vs. json.load on a synthetic KICS results.json.
+
+Each parser runs in a fresh subprocess so peak RSS is measured in isolation.
+
+Usage: python benchmarks/bench_kics_ingest.py [--findings 1000000]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SEVERITIES = ["HIGH", "MEDIUM", "LOW", "INFO"]
+
+CHILD = r"""
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+if {mode!r} == "stream":
+    from kics_ingest import ingest_kics
+    summary = ingest_kics({path!r}).summary()
+    total = sum(summary["severity_counts"].values())
+else:
+    with open({path!r}) as fp:
+        doc = json.load(fp)
+    total = sum(len(q["files"]) for q in doc["queries"])
+elapsed = time.perf_counter() - started
+print(json.dumps({{"elapsed": elapsed, "findings": total,
+                  "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+"""
+
+
+def write_results(path: str, findings: int, queries: int = 400) -> None:
+    """Write a KICS-shaped document without holding it in memory"""
+    rng = random.Random(1)
+    per_query = max(1, findings // queries)
+    with open(path, "w") as fp:
+        fp.write('{"kics_version": "v1.7.13", "files_scanned": 10000, "queries_total": 1200, "queries": [')
+        for q in range(queries):
+            if q:
+                fp.write(",")
+            fp.write(json.dumps({
+                "query_name": f"Synthetic Query {q}",
+                "query_id": f"{q:08x}-0000-0000-0000-000000000000",
+                "severity": rng.choice(SEVERITIES),
+                "platform": "Terraform",
+                "category": "Encryption",
+                "description": "Synthetic description " * 4,
+            })[:-1])
+            fp.write(', "files": [')
+            for f in range(per_query):
+                if f:
+                    fp.write(",")
+                fp.write(json.dumps({
+                    "file_name": f"terraform/modules/m{rng.randrange(2000)}/main.tf",
+                    "similarity_id": f"{rng.getrandbits(128):032x}",
+                    "line": rng.randrange(1, 500),
+                    "issue_type": "MissingAttribute",
+                    "search_key": "aws_s3_bucket[example].server_side_encryption_configuration",
+                    "expected_value": "'server_side_encryption_configuration' should be defined",
+                    "actual_value": "'server_side_encryption_configuration' is undefined",
+                }))
+            fp.write("]}")
+        fp.write('], "severity_counters": {}, "total_counter": %d}' % (per_query * queries))
+
+
+def run_child(mode: str, path: str) -> dict:
+    code = CHILD.format(root=ROOT, mode=mode, path=path)
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--findings", type=int, default=1_000_000)
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "results.json")
+        write_results(path, args.findings)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"results.json: {size_mb:.0f} MB")
+        modes = ["stream"] if args.skip_baseline else ["stream", "json.load"]
+        for mode in modes:
+            result = run_child(mode, path)
+            print(f"{mode:>10}: {result['findings']:,} findings in {result['elapsed']:.2f}s "
+                  f"({size_mb / result['elapsed']:.0f} MB/s), peak RSS {result['max_rss_mb']:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
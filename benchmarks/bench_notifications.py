@@ -0,0 +1,263 @@
+"""
+Notification Pipeline Benchmark
+===============================
+An SCP rollout flipping 30 Config rules in 487 accounts, delivered through
+local stand-ins for Slack, PagerDuty, Jira and SMTP.
+
+- The stand-ins are one threaded HTTP server (webhook, Events API, Jira
+  issue create / search) and a minimal SMTP server; each records what it
+  received and fails on cue: a Slack 429 with Retry-After, a PagerDuty 500,
+  a Jira issue created before a 502, an SMTP 451
+- 14,610 Config events (HIGH) and 3 Security Hub findings (CRITICAL) are
+  published in sweep-sized batches, then all of them again
+- Delivery runs like the scheduled job; halfway through, the notifier is
+  replaced by a fresh one over the same database, one message is left
+  leased as if its process died mid-send
+- Checks: every channel gets a handful of digests, each message id lands
+  once at each endpoint (Jira and email included despite the injected
+  failures), and nothing is left pending
+- A backlog of 20 closed windows per channel then measures the send rate
+  each channel's token bucket allows
+
+Usage: python benchmarks/bench_notifications.py [--accounts 487] [--rules 30]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from notifications import (DEAD, DEFAULT_RATES, EMAIL, JIRA, PAGERDUTY, PENDING, SENT, SLACK, EmailChannel,
+                           Event, JiraChannel, Notifier, PagerDutyChannel, SlackChannel)
+
+WINDOWS = {SLACK: 2.0, PAGERDUTY: 1.0, JIRA: 3.0, EMAIL: 3.0}
+RATES = {SLACK: 4.0, PAGERDUTY: 8.0, JIRA: 4.0, EMAIL: 2.0}
+
+
+class StandIns:
+    """What the fake endpoints received, and the failures still to inject"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.received = {SLACK: [], PAGERDUTY: [], JIRA: [], EMAIL: []}
+        self.sent_at = {SLACK: [], PAGERDUTY: [], JIRA: [], EMAIL: []}
+        self.jira_labels = {}
+        self.fail = {SLACK: 1, PAGERDUTY: 1, JIRA: 1, EMAIL: 1}
+
+    def record(self, channel: str, key: str) -> bool:
+        """Store a delivery; returns True if this one should fail"""
+        with self.lock:
+            self.received[channel].append(key)
+            self.sent_at[channel].append(time.monotonic())
+            if self.fail[channel]:
+                self.fail[channel] -= 1
+                return True
+            return False
+
+
+def http_handler(state: StandIns):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status: int, body: dict, headers: dict = None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/jira/rest/api/2/search":
+                label = parse_qs(url.query)["jql"][0].split('"')[1]
+                with state.lock:
+                    found = label in state.jira_labels
+                return self.reply(200, {"total": int(found), "issues": []})
+            self.reply(404, {})
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if self.path == "/slack":
+                if state.record(SLACK, body["text"]):
+                    return self.reply(429, {}, {"Retry-After": "1"})
+                return self.reply(200, {})
+            if self.path == "/pagerduty":
+                if state.record(PAGERDUTY, body["dedup_key"]):
+                    return self.reply(500, {})
+                return self.reply(202, {"status": "success", "dedup_key": body["dedup_key"]})
+            if self.path == "/jira/rest/api/2/issue":
+                label = body["fields"]["labels"][1]
+                fail = state.record(JIRA, label)
+                with state.lock:
+                    state.jira_labels[label] = f"SEC-{len(state.jira_labels) + 1}"
+                if fail:
+                    return self.reply(502, {})  # created, but the response never made it back
+                return self.reply(201, {"key": state.jira_labels[label]})
+            self.reply(404, {})
+
+    return Handler
+
+
+def smtp_handler(state: StandIns):
+    class Handler(socketserver.StreamRequestHandler):
+        def say(self, line: str):
+            self.wfile.write((line + "\r\n").encode())
+
+        def handle(self):
+            self.say("220 stand-in ESMTP")
+            while True:
+                line = self.rfile.readline().decode().strip()
+                command = line[:4].upper()
+                if not line or command == "QUIT":
+                    self.say("221 bye")
+                    return
+                if command == "DATA":
+                    self.say("354 go ahead")
+                    message_id = ""
+                    while True:
+                        data = self.rfile.readline().decode().rstrip("\r\n")
+                        if data == ".":
+                            break
+                        if data.lower().startswith("message-id:"):
+                            message_id = data.split(":", 1)[1].strip()
+                    self.say("451 try again later" if state.record(EMAIL, message_id) else "250 queued")
+                else:
+                    self.say("250 ok")
+
+    return Handler
+
+
+def events(accounts: int, rules: int, batch: int):
+    """Sweep-sized batches of the rollout's Config events"""
+    regions = ["us-east-1", "eu-west-1"]
+    pending = []
+    for a in range(accounts):
+        for r in range(rules):
+            account, region = str(100000000000 + a), regions[a % 2]
+            pending.append(Event(f"config/{account}/{region}/rule-{r}/1760000000.0", "config", "HIGH",
+                                 f"scp-rollout-rule-{r:02d}", f"{account} {region}", "3 non-compliant resources"))
+            if len(pending) == batch:
+                yield pending
+                pending = []
+    yield pending + [Event(f"securityhub/finding-{i}", "securityhub", "CRITICAL", "Root account used",
+                           f"{100000000000 + i} us-east-1") for i in range(3)]
+
+
+def counts(db: Database) -> dict:
+    return dict(db.query("SELECT status, COUNT(*) FROM notification_outbox GROUP BY status"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--accounts", type=int, default=487)
+    parser.add_argument("--rules", type=int, default=30)
+    args = parser.parse_args()
+
+    state = StandIns()
+    http = ThreadingHTTPServer(("127.0.0.1", 0), http_handler(state))
+    smtp = socketserver.ThreadingTCPServer(("127.0.0.1", 0), smtp_handler(state))
+    for server in (http, smtp):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{http.server_address[1]}"
+    channels = {
+        SLACK: SlackChannel(f"{base}/slack"),
+        PAGERDUTY: PagerDutyChannel("routing-key", f"{base}/pagerduty"),
+        JIRA: JiraChannel(f"{base}/jira", "bot@example.com", "token", "SEC"),
+        EMAIL: EmailChannel("127.0.0.1", smtp.server_address[1], "alerts@example.com", ["secops@example.com"],
+                            starttls=False),
+    }
+
+    with tempfile.TemporaryDirectory() as root:
+        db = Database.sqlite(os.path.join(root, "notify.db"))
+
+        def notifier():
+            return Notifier(db, channels, windows=WINDOWS, rates=RATES, backoff_s=0.5, lease_s=2.0)
+
+        first = notifier()
+        started = time.perf_counter()
+        total = 0
+        batches = list(events(args.accounts, args.rules, batch=2000))
+        sweep = time.time()  # one sweep, so every batch lands in the same windows
+        for batch in batches:
+            first.publish(batch, now=sweep)
+            total += len(batch)
+        published = time.perf_counter() - started
+        stored = db.query_one("SELECT COUNT(*) FROM notification_events")[0]
+        for batch in batches:
+            first.publish(batch)
+        again = db.query_one("SELECT COUNT(*) FROM notification_events")[0] - stored
+        print(f"{total:,} events published in {published:.2f} s -> {stored:,} channel rows; "
+              f"publishing them all again added {again}")
+        per_finding = dict(db.query("SELECT channel, COUNT(*) FROM notification_events GROUP BY channel"))
+        print("one alert per event would be " + ", ".join(
+            f"{name} {per_finding[name]:,} ({per_finding[name] / rate / 3600:,.1f} h at {rate:g}/s)"
+            for name, rate in DEFAULT_RATES.items()))
+
+        # Let every window close, then run deliveries like the scheduler would
+        time.sleep(max(WINDOWS.values()))
+        started = time.perf_counter()
+        stats = first.run()
+        print(f"run 1: {stats['digests']} digests, {stats['sent']} sent, {stats['retried']} to retry")
+
+        # The process dies: a message it had leased is never resolved
+        leased = db.query_one("SELECT message_id FROM notification_outbox WHERE status = ? LIMIT 1", (PENDING,))
+        if leased:
+            first._claim(leased[0])
+        second = notifier()
+        runs = 1
+        while counts(db).get(PENDING) and time.perf_counter() - started < 60:
+            time.sleep(0.5)
+            stats = second.run()
+            runs += 1
+        outbox = counts(db)
+        print(f"after {runs} runs ({time.perf_counter() - started:.1f} s): {outbox.get(SENT, 0)} sent, "
+              f"{outbox.get(DEAD, 0)} dead, {outbox.get(PENDING, 0)} pending")
+        assert not outbox.get(PENDING) and not outbox.get(DEAD), outbox
+
+        print(f"{'channel':>10} {'events':>8} {'messages':>9} {'requests':>9} {'unique ids':>11}")
+        for name in channels:
+            messages, digested = db.query_one(
+                "SELECT COUNT(*), SUM(events) FROM notification_outbox WHERE channel = ?", (name,))
+            received = state.received[name]
+            print(f"{name:>10} {int(digested):>8,} {messages:>9} {len(received):>9} {len(set(received)):>11}")
+            assert len(set(received)) == messages, name
+        assert len(state.jira_labels) == len(set(state.received[JIRA])), "duplicate Jira issue"
+        print(f"jira: {len(state.jira_labels)} issue(s); the retry after the 502 found it by label instead of "
+              f"creating another")
+
+        # A backlog: 20 closed windows per channel, drained at each channel's rate
+        for name in state.sent_at:
+            state.sent_at[name].clear()
+        backlog = time.time() - 40 * max(WINDOWS.values())
+        for i in range(20):
+            second.publish([Event(f"backlog/{i}", "securityhub", "CRITICAL", "Root account used", f"account-{i}")],
+                           now=backlog + i * max(WINDOWS.values()))
+        second.digest()
+        stats = asyncio.run(second.deliver())
+        print(f"backlog of 20 digests per channel: {stats.sent} sent in {stats.wall_time_s:.1f} s, "
+              f"{stats.rate_limit_wait_s:.0f} s spent waiting on token buckets")
+        for name, sent_at in state.sent_at.items():
+            burst = int(second.buckets[name].burst)
+            rate = (len(sent_at) - burst - 1) / (sent_at[-1] - sent_at[burst])
+            print(f"{name:>10} {burst} at once, then {rate:5.2f}/s (limit {RATES[name]:g}/s)")
+
+    http.shutdown()
+    smtp.shutdown()
+
+
+if __name__ == "__main__":
+    main()
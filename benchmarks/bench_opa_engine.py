@@ -0,0 +1,109 @@
+"""
+OPA Engine Benchmark
+====================
+Per-plan, per-policy `opa eval` processes (what conftest does in CI) vs. the
+pooled OPA servers in opa_engine, on synthetic plans and Rego policies.
+
+Needs an `opa` binary on PATH (or --opa).
+
+Usage: python benchmarks/bench_opa_engine.py [--plans 150] [--policies 10] [--workers 4]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from opa_engine import OpaEngine, plan_files
+
+POLICY = """package terraform.policy_{index}
+
+import rego.v1
+
+resources contains change.address if {{
+    some change in input.resource_changes
+    change.type == "{resource_type}"
+}}
+
+deny contains {{"address": change.address, "msg": "missing encryption"}} if {{
+    some change in input.resource_changes
+    change.type == "{resource_type}"
+    not change.change.after.encrypted
+}}
+"""
+
+RESOURCE_TYPES = ["aws_s3_bucket", "aws_ebs_volume", "aws_db_instance", "aws_sqs_queue", "aws_sns_topic"]
+
+
+def write_fixtures(root: str, plans: int, policies: int, resources: int):
+    rng = random.Random(7)
+    os.makedirs(os.path.join(root, "policies"))
+    os.makedirs(os.path.join(root, "plans"))
+    for index in range(policies):
+        with open(os.path.join(root, "policies", f"policy_{index}.rego"), "w") as fp:
+            fp.write(POLICY.format(index=index, resource_type=RESOURCE_TYPES[index % len(RESOURCE_TYPES)]))
+    for index in range(plans):
+        changes = []
+        for n in range(resources):
+            resource_type = rng.choice(RESOURCE_TYPES)
+            changes.append({
+                "address": f"module.m{n % 7}.{resource_type}.r{n}",
+                "type": resource_type,
+                "change": {"actions": ["create"], "after": {"encrypted": rng.random() > 0.05}},
+            })
+        with open(os.path.join(root, "plans", f"plan_{index}.json"), "w") as fp:
+            json.dump({"format_version": "1.2", "resource_changes": changes}, fp)
+
+
+def run_per_process(binary: str, root: str, policies: int) -> float:
+    started = time.perf_counter()
+    policy_dir = os.path.join(root, "policies")
+    for _, path in plan_files(os.path.join(root, "plans")):
+        for index in range(policies):
+            subprocess.run([binary, "eval", "--format", "json", "-d", policy_dir, "-i", path,
+                            f"data.terraform.policy_{index}"], check=True, capture_output=True)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--opa", default="opa")
+    parser.add_argument("--plans", type=int, default=150)
+    parser.add_argument("--policies", type=int, default=10)
+    parser.add_argument("--resources", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    if shutil.which(args.opa) is None:
+        sys.exit(f"{args.opa} not found; install OPA or pass --opa")
+
+    with tempfile.TemporaryDirectory() as root:
+        write_fixtures(root, args.plans, args.policies, args.resources)
+        print(f"{args.plans} plans x {args.policies} policies, {args.resources} resources per plan")
+
+        if not args.skip_baseline:
+            elapsed = run_per_process(args.opa, root, args.policies)
+            print(f"  opa eval per plan/policy: {elapsed:.2f}s ({args.plans / elapsed:.1f} plans/s)")
+
+        engine = OpaEngine(args.opa, [os.path.join(root, "policies")], workers=args.workers)
+        started = time.perf_counter()
+        engine.start()
+        startup = time.perf_counter() - started
+        report = engine.evaluate(plan_files(os.path.join(root, "plans")))
+        engine.close()
+        print(f"  pooled servers ({args.workers}): {report.wall_time_s:.2f}s "
+              f"({report.plans / report.wall_time_s:.1f} plans/s) + {startup:.2f}s startup, "
+              f"{len(report.findings())} findings, {len(report.failed)} failed plans")
+        print(report.timing_frame().head(5).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
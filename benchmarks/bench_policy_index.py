@@ -0,0 +1,103 @@
+"""
+Policy Index Benchmark
+======================
+Full index, no-op re-index and incremental re-index of a synthetic policy
+repository (git checkout with policies/ and terraform/ trees).
+
+Usage: python benchmarks/bench_policy_index.py [--files 10000] [--changed 25]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from policy_index import PolicyIndex
+
+TF_SCP = 'resource "aws_organizations_policy" "p{index}" {{\n  name = "p{index}"\n  content = "{{}}"\n}}\n'
+TF_RULE = 'resource "aws_config_config_rule" "r{index}" {{\n  name = "r{index}"\n}}\n'
+
+
+def write_file(root: str, path: str, content: str):
+    full = os.path.join(root, path)
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    with open(full, "w") as fp:
+        fp.write(content)
+
+
+def generate(root: str, files: int) -> list:
+    rng = random.Random(11)
+    kinds = [
+        ("policies/scp/{team}/scp_{index}.json", lambda i: json.dumps({"Version": "2012-10-17", "Statement": [
+            {"Sid": f"S{i}", "Effect": "Deny", "Action": "ec2:*", "Resource": "*"}]})),
+        ("policies/opa/{team}/policy_{index}.rego", lambda i: f"package terraform.p{i}\n\ndeny[msg] {{ false }}\n"),
+        ("policies/opa/{team}/policy_{index}_test.rego", lambda i: f"package terraform.p{i}\n"),
+        ("policies/sentinel/{team}/policy_{index}.sentinel", lambda i: "main = rule { true }\n"),
+        ("policies/config-rules/{team}/rule_{index}.yaml", lambda i: f"name: rule-{i}\n"),
+        ("policies/custom/{team}/check_{index}.py", lambda i: f"def check_{i}(resource):\n    return True\n"),
+        ("terraform/scp-deployment/{team}/scp_{index}.tf", lambda i: TF_SCP.format(index=i)),
+        ("terraform/config-rules/{team}/rules_{index}.tf", lambda i: TF_RULE.format(index=i) * 3),
+        ("terraform/stacksets/{team}/main_{index}.tf", lambda i: f'variable "v{i}" {{}}\n'),
+    ]
+    paths = []
+    for index in range(files):
+        template, render = rng.choice(kinds)
+        path = template.format(team=f"team{index % 40}", index=index)
+        write_file(root, path, render(index))
+        paths.append(path)
+    return paths
+
+
+def git(root: str, *args: str):
+    subprocess.run(["git", "-C", root, *args], check=True, capture_output=True)
+
+
+def commit(root: str, message: str):
+    git(root, "add", "-A")
+    git(root, "-c", "user.name=bench", "-c", "user.email=bench@example.com", "commit", "-qm", message)
+
+
+def timed(index: PolicyIndex) -> tuple:
+    started = time.perf_counter()
+    stats = index.sync()
+    return time.perf_counter() - started, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=10000)
+    parser.add_argument("--changed", type=int, default=25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = os.path.join(tmp, "repo")
+        git(tmp, "init", "-q", repo)
+        paths = generate(repo, args.files)
+        commit(repo, "initial policies")
+        index = PolicyIndex(Database.sqlite(os.path.join(tmp, "index.db")), repo)
+
+        rows = [("full", *timed(index)), ("no-op", *timed(index))]
+        for path in random.Random(3).sample(paths, args.changed):
+            with open(os.path.join(repo, path), "a") as fp:
+                fp.write("\n# edited\n")
+        os.remove(os.path.join(repo, paths[0]))
+        commit(repo, "edit policies")
+        rows.append(("incremental", *timed(index)))
+        counts = index.counts()
+
+    print(f"{args.files} files, {args.changed} edited + 1 deleted in the second commit")
+    for name, elapsed, stats in rows:
+        print(f"{name:>11}: {elapsed * 1000:8.1f} ms, {stats.candidates:5d} candidates, "
+              f"{stats.parsed:5d} parsed, {stats.removed} removed")
+    print("policies:", ", ".join(f"{kind} {count}" for kind, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Region Fan-Out Benchmark
+========================
+Multi-region Config sweeps against a moto-backed local stand-in.
+
+- Member mode: accounts x regions swept region by region with the
+  single-region collector vs. one (account, region) fan-out; a second
+  fan-out sweep shows the cached region discovery
+- Aggregator mode: every call comes from the management account, so the
+  stand-in enforces a per-region, per-API request quota; the fan-out runs
+  with and without its token buckets to show throttles avoided
+- Time to first result shows how early partial results stream out
+
+Usage: python benchmarks/bench_region_fanout.py [--accounts 60] [--latency-ms 30] [--quota 10]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boto3
+from moto import mock_aws
+from moto.config.responses import ConfigResponse
+
+from aws_collector import ConfigCollector
+
+REGIONS = ["us-east-1", "us-east-2", "us-west-1", "us-west-2", "ca-central-1", "eu-west-1", "eu-west-2",
+           "eu-west-3", "eu-central-1", "eu-north-1", "ap-south-1", "ap-northeast-1", "ap-northeast-2",
+           "ap-northeast-3", "ap-southeast-1", "ap-southeast-2", "sa-east-1"]
+RULES = ["s3-bucket-server-side-encryption-enabled", "ec2-imdsv2-check", "rds-storage-encrypted",
+         "ebs-encrypted-volumes", "iam-password-policy"]
+
+
+class Quota:
+    """Per (region, API) request quota: requests beyond `rate` per second are throttled"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._state = {}
+        self._lock = threading.Lock()
+        self.enabled = False
+
+    def allow(self, key) -> bool:
+        if not self.enabled:
+            return True
+        with self._lock:
+            tokens, updated = self._state.get(key, (self.rate, time.monotonic()))
+            now = time.monotonic()
+            tokens = min(self.rate, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            self._state[key] = (tokens - 1 if allowed else tokens, now)
+            return allowed
+
+
+def install_config_stand_in(latency_s: float, quota: Quota) -> None:
+    """Teach moto's Config responder the compliance APIs the collector calls"""
+    evaluated_at = time.time() - 300
+    throttled = (json.dumps({"__type": "ThrottlingException", "message": "Rate exceeded"}), {"status": 400})
+
+    def compliance(account_id=None, region=None):
+        return [{"ConfigRuleName": rule, "Compliance": {"ComplianceType": "COMPLIANT"},
+                 **({"AccountId": account_id, "AwsRegion": region} if account_id else {})} for rule in RULES]
+
+    def describe_compliance_by_config_rule(self):
+        time.sleep(latency_s)
+        return json.dumps({"ComplianceByConfigRules": compliance()})
+
+    def describe_config_rule_evaluation_status(self):
+        time.sleep(latency_s)
+        return json.dumps({"ConfigRulesEvaluationStatus": [
+            {"ConfigRuleName": rule, "LastSuccessfulEvaluationTime": evaluated_at} for rule in RULES
+        ]})
+
+    def describe_aggregate_compliance_by_config_rules(self):
+        time.sleep(latency_s)
+        if not quota.allow((self.region, "DescribeAggregateComplianceByConfigRules")):
+            return throttled
+        filters = self._get_param("Filters") or {}
+        return json.dumps({"AggregateComplianceByConfigRules": compliance(filters.get("AccountId"),
+                                                                            filters.get("AwsRegion"))})
+
+    ConfigResponse.describe_compliance_by_config_rule = describe_compliance_by_config_rule
+    ConfigResponse.describe_config_rule_evaluation_status = describe_config_rule_evaluation_status
+    ConfigResponse.describe_aggregate_compliance_by_config_rules = describe_aggregate_compliance_by_config_rules
+
+
+def sweep(label: str, collector: ConfigCollector, accounts, by_region: bool = False):
+    started = time.perf_counter()
+    first = []
+
+    def on_result(result):
+        if not first:
+            first.append(time.perf_counter() - started)
+
+    lookups = collector.region_discovery.lookups
+    if by_region:
+        results, throttles = [], 0
+        for region in REGIONS:
+            report = collector.collect(accounts, on_result=on_result, region=region)
+            results.extend(report.results)
+            throttles += report.throttles
+        endpoints, failed = len(results), sum(1 for r in results if r.error)
+    else:
+        report = collector.collect(accounts, on_result=on_result)
+        endpoints, failed, throttles = report.accounts, len(report.failed), report.throttles
+    elapsed = time.perf_counter() - started
+    print(f"{label:>34} {endpoints:>9,} {elapsed:7.1f}s {first[0] if first else 0:7.2f}s {throttles:>9,} "
+          f"{failed:>6} {collector.region_discovery.lookups - lookups:>8}")
+
+
+def run(accounts: int, latency_s: float, quota_rate: float, workers: int):
+    quota = Quota(quota_rate)
+    install_config_stand_in(latency_s, quota)
+    with mock_aws():
+        session = boto3.Session(region_name="us-east-1")
+        org = session.client("organizations")
+        org.create_organization(FeatureSet="ALL")
+        for i in range(accounts):
+            org.create_account(Email=f"acct{i}@example.com", AccountName=f"member-{i:03d}")
+
+        def collector(**kwargs):
+            return ConfigCollector(session=session, max_workers=workers, external_id="bench", max_attempts=4,
+                                   resource_details=False, multi_region=True, regions=REGIONS, **kwargs)
+
+        print(f"{'sweep':>34} {'endpoints':>9} {'time':>8} {'first':>8} {'throttles':>9} {'failed':>6} "
+              f"{'lookups':>8}")
+        members = collector()
+        member_accounts = members.list_accounts()
+        # moto builds each account's EC2 backend on first use; keep that out of the timings
+        warm = collector()
+        for account in member_accounts:
+            warm.regions_for(account["Id"])
+        sweep("members, region by region", collector(), member_accounts, by_region=True)
+        sweep("members, fan-out", members, member_accounts)
+        sweep("members, fan-out (regions cached)", members, member_accounts)
+
+        quota.enabled = True
+        unlimited = collector(aggregator_name="org", api_rates={"config": 1e6, "ec2": 1e6})
+        sweep("aggregator, no token buckets", unlimited, member_accounts)
+        limited = collector(aggregator_name="org", api_rates={"config": quota_rate * 0.9, "ec2": 10})
+        sweep("aggregator, token buckets", limited, member_accounts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--accounts", type=int, default=60)
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--quota", type=float, default=10.0, help="aggregator calls per second per region")
+    parser.add_argument("--workers", type=int, default=32)
+    args = parser.parse_args()
+    run(args.accounts, args.latency_ms / 1000, args.quota, args.workers)
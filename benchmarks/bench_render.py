@@ -0,0 +1,69 @@
+"""
+Render Benchmark
+================
+Full-page rerun time with every tab built (TAB_ROUTING=tabs) vs. only the
+selected view (TAB_ROUTING=lazy), measured with Streamlit's AppTest.
+
+Each mode runs in its own subprocess because settings are read once per
+process.
+
+Usage: python benchmarks/bench_render.py [--reruns 20] [--view overview]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, logging, statistics, time, warnings
+logging.disable(logging.WARNING)
+warnings.filterwarnings("ignore")
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({app!r}, default_timeout=120)
+app.query_params["tab"] = {view!r}
+app.run()
+# Sign in the way the login form does; the app only trusts a signed session token
+from data_access import get_authenticator
+app.session_state["auth_token"] = get_authenticator().login("admin", "admin123").token
+app.run()  # warm the data caches
+assert "auth_token" in app.session_state, "sign-in failed"
+timings = []
+for _ in range({reruns}):
+    started = time.perf_counter()
+    app.run()
+    timings.append(time.perf_counter() - started)
+assert not app.exception, [e.value for e in app.exception]
+charts = len(app.get("plotly_chart"))
+assert charts > 0, "no charts built; the login page was timed"
+print(json.dumps({{"median": statistics.median(timings), "best": min(timings), "charts": charts}}))
+"""
+
+
+def run_mode(mode: str, view: str, reruns: int) -> dict:
+    code = CHILD.format(app=os.path.join(ROOT, "streamlit_app.py"), view=view, reruns=reruns)
+    env = dict(os.environ, TAB_ROUTING=mode, SQLITE_PATH=os.path.join(ROOT, "data", "bench_render.db"))
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--view", default="overview",
+                        choices=["overview", "github", "scans", "compliance", "trends"])
+    args = parser.parse_args()
+
+    results = {mode: run_mode(mode, args.view, args.reruns) for mode in ("tabs", "lazy")}
+    for mode, result in results.items():
+        print(f"{mode:>5}: median {result['median'] * 1000:6.1f} ms, best {result['best'] * 1000:6.1f} ms, "
+              f"{result['charts']} charts built")
+    print(f"speedup: {results['tabs']['median'] / results['lazy']['median']:.1f}x on the {args.view} view")
+
+
+if __name__ == "__main__":
+    main()
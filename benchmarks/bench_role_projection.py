@@ -0,0 +1,160 @@
+"""
+Role Projection Benchmark
+=========================
+Per-rerun cost of reading the org-wide frames as each user is entitled to.
+
+- Frames: OU / portfolio / account / rule / framework rollups plus an
+  account x rule cube, each row carrying the portfolio it belongs to
+- Users sign in across every role; a share of them are limited to a few
+  portfolios by the entitlements file, the rest see every portfolio
+- "filter per rerun" checks the role's datasets and masks every frame on
+  each rerun, as a tab would without projections; "projected" reads the view
+  the shared snapshot built once per entitlement at publish time
+- Also timed: publishing a snapshot (projections included) and the
+  re-projection after an entitlements change
+
+Usage: python benchmarks/bench_role_projection.py [--accounts 5000] [--rules 300] [--reruns 2000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from entitlements import ROLE_DATASETS, EntitlementModel
+from shared_snapshot import SharedSnapshot
+
+PORTFOLIOS = [f"portfolio-{p:02d}" for p in range(24)]
+
+
+def org_frames(accounts: int, rules: int) -> dict:
+    rng = np.random.default_rng(23)
+    ous = [f"ou-{o:03d}" for o in range(accounts // 25)]
+    ou_portfolio = np.arange(len(ous)) % len(PORTFOLIOS)
+    account_ou = rng.integers(0, len(ous), accounts)
+    account_ids = [str(100000000000 + a) for a in range(accounts)]
+    cells = accounts * rules
+    evaluations = rng.integers(1, 40, cells)
+    cube = pd.DataFrame({
+        "account_id": pd.Categorical.from_codes(np.repeat(np.arange(accounts), rules), account_ids),
+        "rule_name": pd.Categorical.from_codes(np.tile(np.arange(rules), accounts), [f"rule-{r}" for r in range(rules)]),
+        "portfolio": pd.Categorical.from_codes(np.repeat(ou_portfolio[account_ou], rules), PORTFOLIOS),
+        "evaluations": evaluations,
+        "compliant": (evaluations * rng.uniform(0.6, 1.0, cells)).astype(np.int64),
+    })
+
+    def rollup(keys):
+        frame = cube.groupby(keys, observed=True)[["evaluations", "compliant"]].sum().reset_index()
+        frame["score"] = (100 * frame["compliant"] / frame["evaluations"]).round(1)
+        return frame
+
+    account = rollup(["account_id", "portfolio"])
+    account["ou"] = [ous[o] for o in account_ou]
+    ou = account.groupby(["ou", "portfolio"], observed=True)[["evaluations", "compliant"]].sum().reset_index()
+    return {
+        "cube": cube,
+        "account": account,
+        "ou": ou,
+        "portfolio": rollup(["portfolio"]),
+        "rule": rollup(["rule_name"]),
+        "framework": pd.DataFrame({"framework": ["CIS", "SOC2", "PCI", "HIPAA"], "score": [96, 94, 88, 92]}),
+    }
+
+
+def users(count: int, scoped_share: float) -> tuple:
+    """Signed-in users across every role, and the entitlements file limiting some of them"""
+    rng = np.random.default_rng(5)
+    roles = list(ROLE_DATASETS)
+    signed_in = [{"username": f"user{i}", "role": roles[i % len(roles)]} for i in range(count)]
+    grants = {}
+    for user in signed_in[: int(count * scoped_share)]:
+        grants[user["username"]] = {"portfolios": list(rng.choice(PORTFOLIOS, 3, replace=False))}
+    return signed_in, grants
+
+
+def filter_per_rerun(frames: dict, entitlement) -> dict:
+    """What each rerun did without projections: dataset check plus a mask per frame"""
+    result = {}
+    for name, frame in frames.items():
+        if entitlement.datasets is not None and name not in entitlement.datasets:
+            result[name] = frame.iloc[0:0]
+        elif entitlement.portfolios is not None:
+            # An org-wide frame cannot be scoped, so a portfolio-limited user gets none of it
+            scoped = "portfolio" in frame
+            result[name] = frame[frame["portfolio"].isin(entitlement.portfolios)] if scoped else frame.iloc[0:0]
+        else:
+            result[name] = frame
+    return result
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--accounts", type=int, default=5000)
+    parser.add_argument("--rules", type=int, default=300)
+    parser.add_argument("--users", type=int, default=400)
+    parser.add_argument("--scoped", type=float, default=0.25, help="share of users limited to some portfolios")
+    parser.add_argument("--reruns", type=int, default=2000)
+    args = parser.parse_args()
+
+    signed_in, grants = users(args.users, args.scoped)
+    entitlements = EntitlementModel(users=grants)
+    frames = org_frames(args.accounts, args.rules)
+    shared = SharedSnapshot(lambda: frames, entitlements)
+    snapshot, publish_s = timed(shared.current)
+    print(f"{args.accounts:,} accounts x {args.rules} rules ({len(frames['cube']):,} cube rows), "
+          f"{args.users} users, {len(grants)} limited to 3 of {len(PORTFOLIOS)} portfolios")
+    print(f"publish: {publish_s * 1000:,.0f} ms for {len(snapshot.projections)} projections")
+
+    rng = np.random.default_rng(11)
+    sessions = [signed_in[i] for i in rng.integers(0, len(signed_in), args.reruns)]
+    for user in sessions[:20]:
+        expected = filter_per_rerun(snapshot.frames, entitlements.for_user(user))
+        view = snapshot.view(entitlements.for_user(user))
+        for name, frame in expected.items():
+            assert len(view.frame(name)) == len(frame), (user, name)
+
+    def naive():
+        for user in sessions:
+            projected = filter_per_rerun(snapshot.frames, entitlements.for_user(user))
+            for name in projected:
+                projected[name].shape
+
+    def projected():
+        for user in sessions:
+            view = shared.current().view(entitlements.for_user(user))
+            for name in frames:
+                view.frame(name).shape
+
+    print(f"{'read path':>32} {'per rerun':>12} {'reruns/s':>10}")
+    for label, fn in (("filter per rerun", naive), ("projected, first sight of users", projected),
+                      ("projected", projected)):
+        _, elapsed = timed(fn)
+        print(f"{label:>32} {elapsed / args.reruns * 1e6:9,.0f} us {args.reruns / elapsed:10,.0f}")
+    print(f"{len(snapshot.projections)} projections held")
+
+    # The next publish projects every entitlement in use before the swap
+    _, elapsed = timed(shared.refresh)
+    print(f"republish: {elapsed * 1000:,.0f} ms for {len(shared.current().projections)} projections")
+    snapshot = shared.current()
+
+    # An entitlements change: only the new grants are projected, the rest are reused
+    grants["user0"] = {"portfolios": PORTFOLIOS[:2]}
+    entitlements.update({}, grants)
+    _, elapsed = timed(shared.reproject)
+    print(f"entitlements change: re-projected in {elapsed * 1000:,.0f} ms, "
+          f"{len(snapshot.projections)} projections kept")
+
+
+if __name__ == "__main__":
+    main()
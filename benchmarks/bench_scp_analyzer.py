@@ -0,0 +1,124 @@
+"""
+SCP Analyzer Benchmark
+======================
+Per-account effective-deny queries against a synthetic organization: walking
+the OU path and fnmatch-ing every attached statement per query vs. the
+precomputed profiles and pattern tries in scp_analyzer.
+
+Usage: python benchmarks/bench_scp_analyzer.py [--accounts 487] [--policies 40] [--queries 20000]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from fnmatch import fnmatchcase
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scp_analyzer import ScpAnalyzer
+
+SERVICES = ["s3", "ec2", "iam", "rds", "kms", "lambda", "cloudtrail", "guardduty", "config", "sts",
+            "dynamodb", "sns", "sqs", "logs", "ecr", "eks", "organizations", "securityhub"]
+VERBS = ["Get", "Put", "Delete", "Create", "Update", "List", "Describe", "Modify", "Stop", "Disable"]
+NOUNS = ["Bucket", "Instance", "Role", "Key", "Function", "Trail", "Detector", "Rule", "Policy", "Cluster"]
+
+
+def build_org(accounts: int, policies: int, seed: int = 5) -> dict:
+    rng = random.Random(seed)
+    nodes = {"r-1": {"name": "Root", "parent": None, "kind": "root"}}
+    ous = []
+    for index in range(8):
+        nodes[f"ou-{index}"] = {"name": f"Portfolio {index}", "parent": "r-1", "kind": "ou"}
+        ous.append(f"ou-{index}")
+        for child in range(3):
+            nodes[f"ou-{index}-{child}"] = {"name": f"Portfolio {index} / {child}", "parent": f"ou-{index}",
+                                            "kind": "ou"}
+            ous.append(f"ou-{index}-{child}")
+    leaves = [ou for ou in ous if ou.count("-") == 2]
+    for number in range(accounts):
+        nodes[str(200000000000 + number)] = {"name": f"acct-{number:04d}", "parent": rng.choice(leaves),
+                                             "kind": "account"}
+
+    documents = {"p-full": {"name": "FullAWSAccess", "content": json.dumps(
+        {"Version": "2012-10-17", "Statement": [{"Effect": "Allow", "Action": "*", "Resource": "*"}]})}}
+    for index in range(policies):
+        statements = []
+        for sid in range(rng.randint(1, 4)):
+            actions = [f"{rng.choice(SERVICES)}:{rng.choice(VERBS)}{rng.choice(NOUNS + ['*'])}"
+                       for _ in range(rng.randint(2, 10))]
+            statement = {"Sid": f"S{sid}", "Effect": "Deny", "Action": actions, "Resource": "*"}
+            if rng.random() < 0.3:
+                statement["Condition"] = {"StringNotEquals": {"aws:RequestedRegion": ["us-east-1"]}}
+            statements.append(statement)
+        documents[f"p-{index}"] = {"name": f"Guardrail {index}", "content": json.dumps(
+            {"Version": "2012-10-17", "Statement": statements})}
+
+    attachments = {node_id: ["p-full"] for node_id in nodes}
+    targets = ["r-1"] + ous
+    for index in range(policies):
+        attachments[rng.choice(targets)].append(f"p-{index}")
+    return {"nodes": nodes, "policies": documents, "attachments": attachments}
+
+
+def naive_denied(snapshot: dict, account_id: str, action: str) -> bool:
+    """What answering the question looks like without precomputation"""
+    nodes, attachments = snapshot["nodes"], snapshot["attachments"]
+    node_id = account_id
+    while node_id is not None:
+        for policy_id in attachments.get(node_id, []):
+            for statement in json.loads(snapshot["policies"][policy_id]["content"])["Statement"]:
+                if statement["Effect"] != "Deny" or statement.get("Condition"):
+                    continue
+                patterns = statement["Action"] if isinstance(statement["Action"], list) else [statement["Action"]]
+                if any(fnmatchcase(action.lower(), pattern.lower()) for pattern in patterns):
+                    return True
+        node_id = nodes[node_id]["parent"]
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--accounts", type=int, default=487)
+    parser.add_argument("--policies", type=int, default=40)
+    parser.add_argument("--queries", type=int, default=20000)
+    args = parser.parse_args()
+
+    snapshot = build_org(args.accounts, args.policies)
+    rng = random.Random(9)
+    accounts = [n for n, node in snapshot["nodes"].items() if node["kind"] == "account"]
+    queries = [(rng.choice(accounts), f"{rng.choice(SERVICES)}:{rng.choice(VERBS)}{rng.choice(NOUNS)}")
+               for _ in range(args.queries)]
+
+    started = time.perf_counter()
+    analyzer = ScpAnalyzer(snapshot)
+    build_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    expected = [naive_denied(snapshot, account, action) for account, action in queries]
+    naive_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = [analyzer.decide(account, action).denied for account, action in queries]
+    analyzer_s = time.perf_counter() - started
+    assert actual == expected, "analyzer and naive evaluation disagree"
+
+    actions = sorted({action for _, action in queries})[:200]
+    started = time.perf_counter()
+    for action in actions:
+        analyzer.search(action)
+    search_s = time.perf_counter() - started
+
+    print(f"{args.accounts} accounts, {len(snapshot['policies'])} SCPs, "
+          f"{len(analyzer.statements)} statements, {len(analyzer._profiles)} distinct profiles")
+    print(f"build:     {build_s * 1000:8.1f} ms")
+    print(f"naive:     {naive_s / len(queries) * 1e6:8.1f} us/query")
+    print(f"analyzer:  {analyzer_s / len(queries) * 1e6:8.1f} us/query "
+          f"({naive_s / analyzer_s:.0f}x, {sum(actual)} denied)")
+    print(f"org-wide search: {search_s / len(actions) * 1000:.2f} ms per action across {analyzer.accounts} accounts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Security Hub Ingestion Benchmark
+================================
+Backfills a local Security Hub stand-in into SQLite through
+SecurityHubIngester, crashing twice along the way (once resuming from the
+saved NextToken, once after the token has expired), then runs an
+incremental sync after a batch of updates and one with nothing changed.
+Reports how many findings each sync downloaded, so re-downloads show up.
+
+Usage: python benchmarks/bench_securityhub_ingest.py [--findings 1000000] [--updates 10000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from securityhub_ingest import SecurityHubIngester, format_timestamp, parse_timestamp
+
+LABELS = ["CRITICAL", "HIGH", "MEDIUM", "LOW", "INFORMATIONAL"]
+WORKFLOW = ["NEW", "NOTIFIED", "RESOLVED", "SUPPRESSED"]
+NOW = 1_790_000_000.0
+
+
+class StandInError(Exception):
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.response = {"Error": {"Code": code, "Message": message}}
+
+
+class LocalSecurityHub:
+    """GetFindings over compact arrays: UpdatedAt filter, UpdatedAt sort, NextToken paging"""
+
+    def __init__(self, findings: int, seed: int = 11):
+        rng = np.random.default_rng(seed)
+        self.updated = np.round(NOW - rng.uniform(60, 90 * 86400, findings), 3)
+        self.severity = rng.choice(len(LABELS), findings, p=[0.02, 0.1, 0.4, 0.3, 0.18])
+        self.workflow = rng.choice(len(WORKFLOW), findings, p=[0.6, 0.1, 0.25, 0.05])
+        self.account = rng.integers(0, 487, findings)
+        self._sort()
+        self.served = 0
+        self.crash_after = None
+        self._token_epoch = 0
+
+    def _sort(self):
+        order = np.argsort(self.updated, kind="stable")
+        self.ids = getattr(self, "ids", np.arange(len(self.updated)))[order]
+        for name in ("updated", "severity", "workflow", "account"):
+            setattr(self, name, getattr(self, name)[order])
+        self._times = self.updated.tolist()
+
+    def update(self, count: int, at: float, seed: int = 5):
+        """Move `count` findings forward in time as if their workflow changed"""
+        picks = np.random.default_rng(seed).choice(len(self.ids), count, replace=False)
+        self.updated[picks] = np.round(at + np.arange(count) * 0.001, 3)
+        self.workflow[picks] = WORKFLOW.index("RESOLVED")
+        self._sort()
+
+    def expire_tokens(self):
+        self._token_epoch += 1
+
+    def open_counts(self) -> dict:
+        open_ = np.isin(self.workflow, [0, 1])
+        counts = np.bincount(self.severity[open_], minlength=len(LABELS))
+        return {label if label != "INFORMATIONAL" else "INFO": int(c) for label, c in zip(LABELS, counts)}
+
+    def get_findings(self, Filters, SortCriteria, MaxResults, NextToken=None):
+        assert SortCriteria == [{"Field": "UpdatedAt", "SortOrder": "asc"}]
+        window = Filters["UpdatedAt"][0]
+        start, end = parse_timestamp(window["Start"]), parse_timestamp(window["End"])
+        offset = bisect_left(self._times, start)
+        if NextToken:
+            epoch, query, position = NextToken.split("|")
+            if int(epoch) != self._token_epoch or query != f"{start}:{end}":
+                raise StandInError("InvalidInputException", "The NextToken is invalid or has expired")
+            offset = int(position)
+        if self.crash_after is not None:
+            if self.crash_after == 0:
+                self.crash_after = None
+                raise ConnectionResetError("connection reset by peer")
+            self.crash_after -= 1
+        stop = min(offset + MaxResults, bisect_right(self._times, end))
+        findings = [self._finding(i) for i in range(offset, stop)]
+        self.served += len(findings)
+        page = {"Findings": findings}
+        if stop < bisect_right(self._times, end):
+            page["NextToken"] = f"{self._token_epoch}|{start}:{end}|{stop}"
+        return page
+
+    def _finding(self, i: int) -> dict:
+        account = f"{100000000000 + int(self.account[i])}"
+        return {
+            "Id": f"arn:aws:securityhub:us-east-1:{account}:subscription/aws-foundational/v/1.0.0/finding/"
+                  f"{int(self.ids[i]):012x}",
+            "AwsAccountId": account,
+            "Region": "us-east-1",
+            "ProductName": "Security Hub",
+            "GeneratorId": "aws-foundational-security-best-practices/v/1.0.0/S3.4",
+            "Title": "S3 buckets should have server-side encryption enabled",
+            "Resources": [{"Type": "AwsS3Bucket", "Id": f"arn:aws:s3:::bucket-{int(self.ids[i])}"}],
+            "Severity": {"Label": LABELS[int(self.severity[i])]},
+            "Workflow": {"Status": WORKFLOW[int(self.workflow[i])]},
+            "RecordState": "ACTIVE",
+            "Compliance": {"Status": "FAILED"},
+            "FirstObservedAt": format_timestamp(NOW - 100 * 86400),
+            "UpdatedAt": format_timestamp(float(self.updated[i])),
+        }
+
+
+def run(label: str, hub: LocalSecurityHub, db: Database, now: float):
+    ingester = SecurityHubIngester(db, hub, scope="us-east-1", settle_s=0)
+    served = hub.served
+    started = time.perf_counter()
+    try:
+        stats = ingester.sync(now=now)
+        outcome = f"{stats.pages:,} pages{' (resumed)' if stats.resumed else ''}"
+    except ConnectionResetError as exc:
+        outcome = f"crashed: {exc}"
+    elapsed = time.perf_counter() - started
+    print(f"{label:>30} {hub.served - served:>11,} {ingester.count():>11,} {elapsed:7.1f}s  {outcome}")
+    return ingester
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--findings", type=int, default=1_000_000)
+    parser.add_argument("--updates", type=int, default=10_000)
+    args = parser.parse_args()
+
+    hub = LocalSecurityHub(args.findings)
+    pages = args.findings // 100
+    with tempfile.TemporaryDirectory() as root:
+        db = Database.sqlite(os.path.join(root, "securityhub.db"))
+        print(f"{'sync':>30} {'downloaded':>11} {'stored':>11} {'time':>8}")
+        hub.crash_after = int(pages * 0.4)
+        run("backfill (crash at 40%)", hub, db, NOW)
+        run("resume from NextToken", hub, db, NOW)
+        # A second backfill window that dies, then outlives its pagination token
+        hub.update(args.findings // 5, NOW + 10)
+        hub.crash_after = pages // 10
+        run("re-sync (crash at 50%)", hub, db, NOW + 3600)
+        hub.expire_tokens()
+        run("resume, token expired", hub, db, NOW + 3600)
+        hub.update(args.updates, NOW + 7200)
+        run(f"incremental ({args.updates:,} updated)", hub, db, NOW + 10800)
+        ingester = run("incremental (no changes)", hub, db, NOW + 14400)
+        assert ingester.count() == args.findings, "every finding stored exactly once"
+        stored, expected = ingester.open_counts(), hub.open_counts()
+        assert all(stored.get(k, 0) == v for k, v in expected.items()), (stored, expected)
+        print(f"open findings by severity match the stand-in: {expected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Shared Snapshot Benchmark
+=========================
+Memory held per additional session when every session reads the org-wide
+frames through the shared snapshot vs. each session keeping its own copy
+(what st.cache_data hands back on every call). Allocations are measured
+with tracemalloc, which numpy and pandas buffers report to.
+
+Usage: python benchmarks/bench_shared_snapshot.py [--rows 2000000] [--sessions 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from entitlements import EntitlementModel
+from shared_snapshot import SharedSnapshot
+
+OUS = ["Production", "Development", "Staging", "Security", "Data Analytics", "Shared Services", "Sandbox"]
+ROLES = ["SUPER_ADMIN", "SECURITY_ADMIN", "COMPLIANCE_OFFICER", "AUDITOR", "FINOPS_ANALYST", "VIEWER"]
+
+
+def org_frames(rows: int) -> dict:
+    """An account x region x rule evaluation cube plus the rollups derived from it"""
+    rng = np.random.default_rng(7)
+    accounts = rng.integers(0, 487, rows)
+    evaluations = rng.integers(1, 50, rows)
+    cube = pd.DataFrame({
+        "account_id": pd.Categorical.from_codes(accounts, [str(100000000000 + a) for a in range(487)]),
+        "ou": pd.Categorical.from_codes(accounts % len(OUS), OUS),
+        "region": pd.Categorical.from_codes(rng.integers(0, 17, rows), [f"region-{r}" for r in range(17)]),
+        "rule_name": pd.Categorical.from_codes(rng.integers(0, 300, rows), [f"rule-{r}" for r in range(300)]),
+        "evaluations": evaluations,
+        "compliant": (evaluations * rng.uniform(0.7, 1.0, rows)).astype(np.int64),
+        "evaluated_at": rng.uniform(1.7e9, 1.8e9, rows),
+        "resource_arn": [f"arn:aws:config:::{i:012d}" for i in range(rows)],
+    })
+    ou = cube.groupby("ou", observed=True)[["evaluations", "compliant"]].sum().reset_index()
+    ou["score"] = (100 * ou["compliant"] / ou["evaluations"]).round(1)
+    account = cube.groupby("account_id", observed=True)[["evaluations", "compliant"]].sum().reset_index()
+    return {"cube": cube, "ou": ou, "account": account}
+
+
+def read(frames: dict) -> float:
+    """What a rerun does with the frames: column reads and reductions"""
+    cube = frames["cube"]
+    return float(cube["compliant"].sum() / max(cube["evaluations"].sum(), 1)) + len(frames["ou"]["score"].tolist())
+
+
+def measure(sessions: int, open_session) -> tuple:
+    """Bytes retained per session after `sessions` sessions have each opened their frames"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    held = []
+    for i in range(sessions):
+        frames = open_session(ROLES[i % len(ROLES)])
+        read(frames)
+        held.append(frames)
+    elapsed = time.perf_counter() - started
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return retained / sessions, elapsed / sessions * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--sessions", type=int, default=200)
+    args = parser.parse_args()
+
+    entitlements = EntitlementModel()
+    shared = SharedSnapshot(lambda: org_frames(args.rows), entitlements)
+    snapshot = shared.current()
+    print(f"snapshot v{snapshot.version}: {args.rows:,} cube rows, {snapshot.nbytes / 1e6:,.0f} MB")
+
+    def shared_session(role):
+        view = shared.current().view(entitlements.for_user({"role": role}))
+        return {name: view.frame(name) for name in snapshot.frames}
+
+    def copied_session(role):
+        return {name: frame.copy() for name, frame in snapshot.frames.items()}
+
+    copies = max(1, min(args.sessions, 10))  # private copies of the full cube add up quickly
+    print(f"{'mode':>16} {'sessions':>9} {'per session':>13} {'open + read':>12}")
+    for label, open_session, sessions in (("shared snapshot", shared_session, args.sessions),
+                                          ("private copies", copied_session, copies)):
+        per_session, ms = measure(sessions, open_session)
+        print(f"{label:>16} {sessions:9d} {per_session / 1e3:10,.1f} KB {ms:10.2f}ms")
+
+    # A session that writes to its frame copies only what it touched
+    view = shared.current().view(entitlements.for_user({"role": "SUPER_ADMIN"}))
+    tracemalloc.start()
+    cube = view.frame("cube")
+    cube["score"] = 100.0 * cube["compliant"] / cube["evaluations"]
+    cube.loc[0, "evaluations"] = 0
+    written = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    untouched = snapshot.frames["cube"]
+    assert "score" not in untouched and untouched.loc[0, "evaluations"] != 0
+    print(f"session writing two columns: {written / 1e6:,.1f} MB copied, shared snapshot unchanged")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Terraform Drift Benchmark
+=========================
+Drift checks of the guardrail workspaces against local state / plan fixtures.
+
+- Fixtures mimic `terraform show -json` output: SCPs, Config rules and
+  StackSet instances spread over child modules
+- Scenarios: first check, unchanged exports, one workspace drifting, a
+  re-rendered plan with the same values, a resource deleted outside
+  Terraform; each asserts the statuses it expects
+- The baseline parses both exports and compares every resource's values
+  on every check, serially
+
+Usage: python benchmarks/bench_terraform_drift.py [--resources 20000]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from terraform_drift import DRIFTED, HEALTHY, PLAN_FILE, STATE_FILE, DriftDetector, managed_resources
+
+WORKSPACES = {
+    "scp-deployment": "aws_organizations_policy",
+    "config-rules": "aws_config_organization_managed_rule",
+    "stacksets": "aws_cloudformation_stack_set_instance",
+}
+
+
+def resource(kind: str, module: str, i: int) -> dict:
+    values = {
+        "id": f"{kind}-{i:06d}",
+        "name": f"guardrail-{i:06d}",
+        "description": f"Managed by aws-guardrails ({module})",
+        "tags": {"owner": "cloud-governance", "portfolio": f"portfolio-{i % 8}", "managed-by": "terraform"},
+        "tags_all": {"owner": "cloud-governance", "portfolio": f"portfolio-{i % 8}", "managed-by": "terraform"},
+    }
+    if kind == "aws_organizations_policy":
+        values["content"] = json.dumps({"Version": "2012-10-17", "Statement": [
+            {"Effect": "Deny", "Action": [f"service{i % 40}:Delete*"], "Resource": "*"}]})
+    elif kind == "aws_config_organization_managed_rule":
+        values.update(rule_identifier="S3_BUCKET_SERVER_SIDE_ENCRYPTION_ENABLED", maximum_execution_frequency="",
+                      excluded_accounts=[str(100000000000 + a) for a in range(i % 5)])
+    else:
+        values.update(region=f"region-{i % 17}", account_id=str(100000000000 + i % 487),
+                      parameter_overrides={"Retention": str(30 + i % 60)})
+    return {"address": f"module.{module}.{kind}.r{i}", "mode": "managed", "type": kind, "name": f"r{i}",
+            "provider_name": "registry.terraform.io/hashicorp/aws", "schema_version": 0, "values": values,
+            "sensitive_values": {}}
+
+
+def root_module(kind: str, count: int) -> dict:
+    modules = {}
+    for i in range(count):
+        module = f"portfolio_{i % 8}"
+        modules.setdefault(module, []).append(resource(kind, module, i))
+    return {"resources": [], "child_modules": [{"address": f"module.{m}", "resources": r}
+                                                for m, r in modules.items()]}
+
+
+def write(directory: str, state_root: dict, refreshed_root: dict, pretty: bool = False) -> None:
+    os.makedirs(directory, exist_ok=True)
+    indent = 1 if pretty else None
+    with open(os.path.join(directory, STATE_FILE), "w") as fp:
+        json.dump({"format_version": "1.0", "terraform_version": "1.9.5",
+                   "values": {"root_module": state_root}}, fp, indent=indent)
+    changes = [{"address": r["address"], "mode": "managed", "type": r["type"], "change": {"actions": ["no-op"]}}
+               for r in managed_resources(refreshed_root)]
+    with open(os.path.join(directory, PLAN_FILE), "w") as fp:
+        json.dump({"format_version": "1.2", "terraform_version": "1.9.5",
+                   "prior_state": {"format_version": "1.0", "values": {"root_module": refreshed_root}},
+                   "resource_changes": changes}, fp, indent=indent)
+
+
+def naive_check(root: str) -> dict:
+    """Parse both exports and compare every resource's values"""
+    drifted = {}
+    for workspace in WORKSPACES:
+        with open(os.path.join(root, workspace, STATE_FILE)) as fp:
+            state = {r["address"]: r["values"] for r in managed_resources(json.load(fp)["values"]["root_module"])}
+        with open(os.path.join(root, workspace, PLAN_FILE)) as fp:
+            plan = json.load(fp)
+        refreshed = {r["address"]: r["values"]
+                     for r in managed_resources(plan["prior_state"]["values"]["root_module"])}
+        drifted[workspace] = sum(1 for address, values in state.items() if refreshed.get(address) != values)
+    return drifted
+
+
+def timed(fn, repeat: int = 1):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--resources", type=int, default=20_000, help="managed resources per workspace")
+    args = parser.parse_args()
+
+    rng = random.Random(20)
+    with tempfile.TemporaryDirectory() as root:
+        roots = {ws: root_module(kind, args.resources) for ws, kind in WORKSPACES.items()}
+        for ws, module in roots.items():
+            write(os.path.join(root, ws), module, module)
+        size = sum(os.path.getsize(os.path.join(root, ws, f)) for ws in WORKSPACES for f in (STATE_FILE, PLAN_FILE))
+        print(f"{len(WORKSPACES)} workspaces x {args.resources:,} resources, {size / 1e6:,.0f} MB of exports")
+        print(f"{'check':>36} {'time':>9} {'parsed':>7}  changed")
+
+        def report(label, detector, expect):
+            results, elapsed = timed(detector.check_all)
+            parsed = sum(1 for r in results if r.parsed)
+            changed = [r.workspace for r in results if r.changed]
+            print(f"{label:>36} {elapsed * 1000:7.0f}ms {parsed:>7}  {', '.join(changed) or '-'}")
+            for r in results:
+                assert (r.status, r.drifted) == expect.get(r.workspace, (HEALTHY, 0)), (r.workspace, r.status, r.drifted)
+            return results
+
+        db = Database.sqlite(os.path.join(root, "drift.db"))
+        serial = DriftDetector(Database.sqlite(os.path.join(root, "serial.db")), root, list(WORKSPACES))
+        _, elapsed = timed(lambda: [serial.check(ws) for ws in serial.workspaces])
+        print(f"{'first check, serial':>36} {elapsed * 1000:7.0f}ms {len(WORKSPACES):>7}  (all)")
+        detector = DriftDetector(db, root, list(WORKSPACES))
+        report("first check, parallel", detector, {})
+        report("exports unchanged", detector, {})
+        _, elapsed = timed(lambda: naive_check(root))
+        print(f"{'baseline (parse + compare all)':>36} {elapsed * 1000:7.0f}ms {len(WORKSPACES):>7}")
+
+        # Someone edits SCPs in the console: their refreshed values no longer match state
+        drift = rng.sample(range(args.resources), 25)
+        refreshed = json.loads(json.dumps(roots["scp-deployment"]))
+        edited = [r for module in refreshed["child_modules"] for r in module["resources"]
+                  if int(r["name"][1:]) in drift]
+        for r in edited:
+            r["values"]["tags"]["owner"] = "console-edit"
+        write(os.path.join(root, "scp-deployment"), roots["scp-deployment"], refreshed)
+        report("25 SCPs edited outside Terraform", detector, {"scp-deployment": (DRIFTED, 25)})
+        assert detector.status("scp-deployment").detail == sorted(r["address"] for r in edited)[:20]
+        _, elapsed = timed(lambda: naive_check(root))
+        print(f"{'baseline (parse + compare all)':>36} {elapsed * 1000:7.0f}ms {len(WORKSPACES):>7}")
+
+        # Same values, different bytes: parsed again, but no status change
+        write(os.path.join(root, "config-rules"), roots["config-rules"], roots["config-rules"], pretty=True)
+        report("config-rules re-rendered, no drift", detector, {"scp-deployment": (DRIFTED, 25)})
+
+        # A StackSet instance deleted by hand disappears from the refreshed state
+        pruned = json.loads(json.dumps(roots["stacksets"]))
+        pruned["child_modules"][0]["resources"].pop()
+        write(os.path.join(root, "stacksets"), roots["stacksets"], pruned)
+        report("1 StackSet instance deleted", detector,
+               {"scp-deployment": (DRIFTED, 25), "stacksets": (DRIFTED, 1)})
+
+        # The drift is reconciled: apply, then export fresh state and plan
+        write(os.path.join(root, "scp-deployment"), refreshed, refreshed)
+        report("scp-deployment reconciled", detector, {"stacksets": (DRIFTED, 1)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Card Templates
+==============
+Compiled HTML templates for the dashboard's cards, rendered in batches.
+
+- A template is parsed once into literal chunks and fields; rendering is
+  a join, and every field is HTML-escaped unless the template names it raw
+- Whitespace between tags is dropped at compile time, so a list of cards
+  stays one markdown HTML block and carries no indentation
+- `render_many` joins a whole list into a single string, so a list of cards
+  costs one `st.markdown` delta instead of one per card
+- Each rendered card is cached on its template and field values, so an
+  unchanged card is a dictionary lookup on the next rerun or session
+
+Styling lives in CSS classes in the app's stylesheet; the templates carry
+only per-item colors.
+"""
+
+import html
+import re
+import string
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import pandas as pd
+from cachetools import LRUCache
+
+MAX_CARDS = 8192
+
+GREEN, AMBER, RED, PURPLE, GREY = "#10b981", "#f59e0b", "#ef4444", "#8b5cf6", "#8b949e"
+
+STATS_COLUMNS = ["template", "renders", "hits", "avg_render_us"]
+
+_BETWEEN_TAGS = re.compile(r">\s+<")
+_LINE_BREAKS = re.compile(r"\s*\n\s*")
+
+
+@dataclass
+class CardStats:
+    """Cache effectiveness for one template"""
+
+    renders: int = 0
+    hits: int = 0
+    render_us: float = 0.0
+
+
+_cards: LRUCache = LRUCache(maxsize=MAX_CARDS)
+_stats: Dict[str, CardStats] = {}
+_lock = threading.Lock()
+
+
+class CardTemplate:
+    """`str.format`-style HTML template compiled once; fields are escaped unless listed in `raw`"""
+
+    def __init__(self, name: str, source: str, raw: Iterable[str] = ()):
+        self.name = name
+        self.raw = frozenset(raw)
+        compact = _LINE_BREAKS.sub(" ", _BETWEEN_TAGS.sub("><", source.strip()))
+        self._chunks: List[str] = []
+        self._fields: List[Tuple[str, str]] = []
+        for literal, field, spec, conversion in string.Formatter().parse(compact):
+            if conversion:
+                raise ValueError(f"{name}: conversions are not supported ({field}!{conversion})")
+            self._chunks.append(literal)
+            if field is not None:
+                self._fields.append((field, spec or ""))
+        self.fields = tuple(dict.fromkeys(field for field, _ in self._fields))
+
+    def _format(self, field: str, spec: str, value: Any) -> str:
+        text = format(value, spec) if spec else str(value)
+        return text if field in self.raw else html.escape(text)
+
+    def render(self, item: Mapping[str, Any]) -> str:
+        """One card; served from the cache when the same values were rendered before"""
+        values = tuple(item[field] for field in self.fields)
+        try:
+            key = (self.name, values)
+            hash(key)
+        except TypeError:
+            key = (self.name, repr(values))
+        with _lock:
+            card = _cards.get(key)
+            stats = _stats.setdefault(self.name, CardStats())
+            if card is not None:
+                stats.hits += 1
+                return card
+        started = time.perf_counter()
+        parts = []
+        for literal, (field, spec) in zip(self._chunks, self._fields):
+            parts.append(literal)
+            parts.append(self._format(field, spec, item[field]))
+        parts.extend(self._chunks[len(self._fields):])
+        card = "".join(parts)
+        elapsed = (time.perf_counter() - started) * 1e6
+        with _lock:
+            _cards[key] = card
+            stats.renders += 1
+            stats.render_us += elapsed
+        return card
+
+    def render_many(self, items: Iterable[Mapping[str, Any]], wrapper: Optional["CardTemplate"] = None,
+                    **context: Any) -> str:
+        """Every item's card joined into one HTML block, optionally inside a `{cards}` wrapper"""
+        cards = "".join(self.render(item) for item in items)
+        if wrapper is None:
+            return f"<div>{cards}</div>"
+        return wrapper.render({**context, "cards": cards})
+
+
+def card_stats() -> pd.DataFrame:
+    """Renders, cache hits and mean render time per template"""
+    with _lock:
+        rows = [(name, s.renders, s.hits, s.render_us / max(s.renders, 1)) for name, s in _stats.items()]
+    frame = pd.DataFrame(rows, columns=STATS_COLUMNS)
+    return frame.round({"avg_render_us": 1}).sort_values("hits", ascending=False, ignore_index=True)
+
+
+def clear():
+    with _lock:
+        _cards.clear()
+        _stats.clear()
+
+
+def severity_color(severity: str) -> str:
+    return RED if severity in ("CRITICAL", "HIGH") else AMBER
+
+
+def status_color(status: str) -> str:
+    return GREEN if status == "PASS" else RED if status == "FAIL" else AMBER
+
+
+# ----------------------------------------------------------------------
+# Templates
+# ----------------------------------------------------------------------
+
+METRIC = CardTemplate("metric", """
+    <div class="metric-card">
+        <div class="metric-value status-{tone}">{value}</div>
+        <div class="metric-label">{label}</div>
+    </div>
+""")
+
+METRIC_ROW = CardTemplate("metric_row", '<div class="metric-row">{cards}</div>', raw=("cards",))
+
+LINK = CardTemplate("link", """
+    <div class="github-card">
+        <div class="card-title"><span class="card-icon">{icon}</span><span>{title}</span></div>
+        <div style="color: {color};" class="card-headline">{headline}</div>
+        <div class="card-meta">{meta}</div>
+    </div>
+""")
+
+PULL_REQUEST = CardTemplate("pull_request", """
+    <div class="github-card">
+        <div class="card-row">
+            <div><span class="pr-number">{number}</span><span class="pr-title">{title}</span></div>
+            <span style="color: {color};">{status}</span>
+        </div>
+        <div class="card-meta">👤 {author} • {checks} • ⏱️ {time}</div>
+    </div>
+""")
+
+PIPELINE_STAGE = CardTemplate("pipeline_stage", """
+    <div class="pipeline-stage stage-{status}">{icon} {name} <span class="stage-time">{time}</span></div>
+""")
+
+PIPELINE = CardTemplate("pipeline", '<div class="pipeline">{cards}</div>', raw=("cards",))
+
+FINDING = CardTemplate("finding", """
+    <div class="finding-card" style="border-left-color: {color};">
+        <div class="card-row"><span>{query}</span><span style="color: {color};" class="card-tag">{severity}</span></div>
+        <div class="card-meta">📁 {file}:{line}</div>
+    </div>
+""")
+
+POLICY = CardTemplate("policy", """
+    <div class="item-card">
+        <div class="card-row">
+            <span class="mono">{name}.rego</span><span style="color: {color};" class="card-tag">{status}</span>
+        </div>
+        <div class="card-meta">Evaluated {resources} resources{eval_time}</div>
+    </div>
+""")
+
+GUARDRAIL = CardTemplate("guardrail", """
+    <div class="item-card">
+        <div class="card-row">
+            <span>{name}</span>
+            <span class="type-badge" style="background: {color}20; color: {color};">{type}</span>
+        </div>
+        <div class="card-meta">🟢 {status} • {accounts} accounts</div>
+    </div>
+""")
+
+WORKSPACE = CardTemplate("workspace", """
+    <div class="card-row workspace-row">
+        <span class="workspace-name">{workspace}</span><span style="color: {color};" title="{detail}">{summary}</span>
+    </div>
+""")
+
+TERRAFORM = CardTemplate("terraform", """
+    <div class="github-card">
+        <div class="card-title"><span class="card-icon">📋</span><span>Terraform Cloud</span></div>
+        {cards}
+    </div>
+""", raw=("cards",))
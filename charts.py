@@ -0,0 +1,295 @@
+"""
+Chart Factory
+=============
+Builders for the dashboard's Plotly figures, cached by input data.
+
+- The dark theme (transparent background, muted ticks, faint grid, legend
+  above the plot) is one registered Plotly template instead of a layout
+  dict repeated on every chart; figures are shown with `theme=None` so
+  Streamlit does not restyle them
+- Each builder is wrapped by `cached_figure`: its arguments are hashed
+  (DataFrames and Series with pandas' row hashing) and an identical call
+  from any session or rerun returns the already built and validated figure
+- Per-chart build / hit counts and the build time saved feed the admin
+  Render Diagnostics panel
+
+Cached figures are shared between sessions and must not be mutated;
+st.plotly_chart only reads them.
+"""
+
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, Callable, Dict
+
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+from cachetools import LRUCache
+
+TEMPLATE = "guardrails_dark"
+MAX_FIGURES = 256
+
+TEXT = "#e5e7eb"
+MUTED = "#9ca3af"
+GRID = "rgba(255,255,255,0.1)"
+TRANSPARENT = "rgba(0,0,0,0)"
+GREEN, AMBER, RED, PURPLE, BLUE, GREY = "#10b981", "#f59e0b", "#ef4444", "#8b5cf6", "#3b82f6", "#6b7280"
+
+STATS_COLUMNS = ["chart", "builds", "hits", "avg_build_ms", "saved_ms"]
+
+pio.templates[TEMPLATE] = go.layout.Template(layout=dict(
+    font=dict(family="Inter, sans-serif", color=TEXT),
+    colorway=[PURPLE, GREEN, AMBER, BLUE, RED, GREY],
+    paper_bgcolor=TRANSPARENT,
+    plot_bgcolor=TRANSPARENT,
+    margin=dict(l=0, r=0, t=10, b=0),
+    xaxis=dict(showgrid=False, zeroline=False, tickfont=dict(color=MUTED)),
+    yaxis=dict(showgrid=True, gridcolor=GRID, zeroline=False, tickfont=dict(color=MUTED)),
+    legend=dict(orientation="h", yanchor="bottom", y=1.02, font=dict(color=TEXT)),
+    hoverlabel=dict(font=dict(family="Inter, sans-serif")),
+))
+
+
+# ----------------------------------------------------------------------
+# Cache
+# ----------------------------------------------------------------------
+
+@dataclass
+class ChartStats:
+    """Cache effectiveness for one chart builder"""
+
+    builds: int = 0
+    hits: int = 0
+    build_ms: float = 0.0
+
+
+_figures: LRUCache = LRUCache(maxsize=MAX_FIGURES)
+_stats: Dict[str, ChartStats] = {}
+_lock = threading.Lock()
+
+
+def _feed(digest, value: Any):
+    """Fold one argument into the digest; pandas objects are hashed row-wise"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        names = list(value.columns) if isinstance(value, pd.DataFrame) else [value.name]
+        digest.update(repr((type(value).__name__, value.shape, names, value.index.name)).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, pd.Index):
+        digest.update(pd.util.hash_pandas_object(value).to_numpy().tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}[{len(value)}]".encode())
+        for item in value:
+            _feed(digest, item)
+    elif isinstance(value, dict):
+        digest.update(f"dict[{len(value)}]".encode())
+        for key, item in value.items():
+            _feed(digest, key)
+            _feed(digest, item)
+    else:
+        digest.update(repr(value).encode())
+    digest.update(b"\x1f")
+
+
+def data_key(*args: Any) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for value in args:
+        _feed(digest, value)
+    return digest.hexdigest()
+
+
+def cached_figure(build: Callable[..., go.Figure]) -> Callable[..., go.Figure]:
+    """Memoize a figure builder on a hash of its arguments (process-wide, LRU-bounded)"""
+    name = build.__name__
+
+    @wraps(build)
+    def wrapper(*args):
+        key = (name, data_key(*args))
+        with _lock:
+            figure = _figures.get(key)
+            stats = _stats.setdefault(name, ChartStats())
+            if figure is not None:
+                stats.hits += 1
+                return figure
+        started = time.perf_counter()
+        figure = build(*args)
+        elapsed = (time.perf_counter() - started) * 1000
+        with _lock:
+            _figures[key] = figure
+            stats.builds += 1
+            stats.build_ms += elapsed
+        return figure
+
+    return wrapper
+
+
+def chart_stats() -> pd.DataFrame:
+    """Builds, cache hits and estimated build time saved per chart"""
+    with _lock:
+        rows = [
+            (name, s.builds, s.hits, s.build_ms / max(s.builds, 1), s.hits * s.build_ms / max(s.builds, 1))
+            for name, s in _stats.items()
+        ]
+    frame = pd.DataFrame(rows, columns=STATS_COLUMNS)
+    return frame.round({"avg_build_ms": 2, "saved_ms": 1}).sort_values("saved_ms", ascending=False,
+                                                                       ignore_index=True)
+
+
+def clear():
+    with _lock:
+        _figures.clear()
+        _stats.clear()
+
+
+def _figure(height: int, **layout) -> go.Figure:
+    return go.Figure(layout=dict(template=TEMPLATE, height=height, **layout))
+
+
+# ----------------------------------------------------------------------
+# Overview
+# ----------------------------------------------------------------------
+
+@cached_figure
+def policy_distribution(policy_types: list, policy_counts: list) -> go.Figure:
+    fig = _figure(280, xaxis=dict(tickfont=dict(color=TEXT)))
+    fig.add_trace(go.Bar(
+        x=policy_types,
+        y=policy_counts,
+        marker=dict(color=[PURPLE, GREEN, AMBER, BLUE, GREY], line=dict(color="rgba(255,255,255,0.2)", width=1)),
+        text=policy_counts,
+        textposition="outside",
+        textfont=dict(color="white", size=12),
+    ))
+    return fig
+
+
+@cached_figure
+def framework_scores(frameworks: list, scores: list) -> go.Figure:
+    fig = _figure(
+        180, margin=dict(l=0, r=10, t=10, b=0),
+        xaxis=dict(range=[0, 100], showticklabels=False),
+        yaxis=dict(showgrid=False, tickfont=dict(color=TEXT, size=11)),
+    )
+    fig.add_trace(go.Bar(
+        y=frameworks,
+        x=scores,
+        orientation="h",
+        marker=dict(color=[GREEN if s >= 90 else AMBER for s in scores]),
+        text=[f"{s}%" for s in scores],
+        textposition="inside",
+        textfont=dict(color="white", size=11),
+    ))
+    return fig
+
+
+# ----------------------------------------------------------------------
+# GitHub & CI/CD
+# ----------------------------------------------------------------------
+
+@cached_figure
+def pipeline_metrics(days: list, runs: list, failures: list) -> go.Figure:
+    fig = _figure(280, xaxis=dict(tickfont=dict(color=TEXT)), barmode="group")
+    fig.add_trace(go.Bar(
+        x=days, y=runs, name="Total Runs",
+        marker=dict(color=BLUE),
+        text=runs, textposition="outside", textfont=dict(color="white", size=10),
+    ))
+    fig.add_trace(go.Bar(x=days, y=failures, name="Failures", marker=dict(color=RED)))
+    return fig
+
+
+# ----------------------------------------------------------------------
+# Policy scans
+# ----------------------------------------------------------------------
+
+@cached_figure
+def kics_donut(passed: int, low: int, medium: int, high: int, checks: int) -> go.Figure:
+    fig = _figure(
+        220, margin=dict(l=10, r=10, t=10, b=10), showlegend=False,
+        annotations=[dict(text=f"<b>{checks}</b><br>Checks", x=0.5, y=0.5,
+                          font=dict(size=12, color="white"), showarrow=False)],
+    )
+    fig.add_trace(go.Pie(
+        values=[passed, low, medium, high],
+        labels=["Passed", "Low", "Medium", "High"],
+        hole=0.65,
+        marker=dict(colors=[GREEN, GREY, AMBER, RED]),
+        textinfo="label+value",
+        textfont=dict(size=10, color="white"),
+    ))
+    return fig
+
+
+# ----------------------------------------------------------------------
+# AWS compliance
+# ----------------------------------------------------------------------
+
+@cached_figure
+def ou_compliance(ous: list, scores: list, accounts: list) -> go.Figure:
+    fig = _figure(
+        350, margin=dict(l=0, r=20, t=10, b=0),
+        xaxis=dict(range=[0, 100], showgrid=True, gridcolor=GRID),
+        yaxis=dict(showgrid=False, tickfont=dict(color=TEXT, size=11)),
+    )
+    fig.add_trace(go.Bar(
+        y=ous,
+        x=scores,
+        orientation="h",
+        marker=dict(color=[GREEN if s >= 90 else AMBER if s >= 80 else RED for s in scores]),
+        text=[f"{s}% ({a} accounts)" for s, a in zip(scores, accounts)],
+        textposition="inside",
+        textfont=dict(color="white", size=11),
+    ))
+    return fig
+
+
+# ----------------------------------------------------------------------
+# Trends
+# ----------------------------------------------------------------------
+
+@cached_figure
+def compliance_trend(trend: pd.DataFrame) -> go.Figure:
+    fig = _figure(300, yaxis=dict(range=[80, 100]))
+    fig.add_trace(go.Scatter(
+        x=trend.index, y=trend["org"],
+        fill="tozeroy",
+        fillcolor="rgba(16, 185, 129, 0.2)",
+        line=dict(color=GREEN, width=2),
+        mode="lines",
+        hovertemplate="%{x|%b %d}<br>Score: %{y:.1f}%<extra></extra>",
+    ))
+    fig.add_hline(y=90, line_dash="dash", line_color=AMBER, annotation_text="Target: 90%")
+    return fig
+
+
+@cached_figure
+def findings_trend(findings: pd.DataFrame) -> go.Figure:
+    fig = _figure(300)
+    weeks = findings.index
+    for severity, label, color in (("CRITICAL", "Critical", RED), ("HIGH", "High", AMBER),
+                                   ("MEDIUM", "Medium", "#a855f7")):
+        values = findings[severity] if severity in findings else pd.Series(0, index=weeks)
+        fig.add_trace(go.Scatter(x=weeks, y=values, name=label, line=dict(color=color, width=2),
+                                 mode="lines+markers"))
+    return fig
+
+
+@cached_figure
+def deployment_frequency(deployments: pd.DataFrame) -> go.Figure:
+    fig = _figure(280, xaxis=dict(tickfont=dict(color=TEXT)), barmode="group")
+    months = deployments.index
+    for column, label, color in (("scp", "SCP Deployments", PURPLE), ("config_rules", "Config Rules", AMBER),
+                                 ("opa", "OPA Policy Updates", GREEN)):
+        values = deployments[column] if column in deployments else pd.Series(0, index=months)
+        fig.add_trace(go.Bar(x=months, y=values, name=label, marker_color=color))
+    return fig
+
+
+@cached_figure
+def archive_history(history: pd.DataFrame, y_title: str) -> go.Figure:
+    fig = _figure(280, yaxis=dict(title=dict(text=y_title, font=dict(color=MUTED))))
+    for series in history.columns:
+        fig.add_trace(go.Scatter(x=history.index, y=history[series], name=str(series), mode="lines+markers"))
+    return fig
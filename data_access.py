@@ -0,0 +1,938 @@
+"""
+Data Access Layer
+=================
+One process-wide entry point for every dataset the tabs display.
+
+- Each data source is memoized in its own TTL + LRU cache sized by
+  CACHE_TTL_SECONDS / CACHE_MAX_SIZE
+- Concurrent misses on the same key are single-flighted: one caller loads,
+  the others wait for its result instead of hitting the backend again
+- Entries can be invalidated per key or per source
+- Hit / miss / eviction counters feed the sidebar System Status block
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import pandas as pd
+from cachetools import TTLCache
+
+import demo_data
+from profiler import span
+from scheduler import PRIORITY_HIGH
+from settings import get_settings
+
+CONFIG_RULES = "config_rules"
+COMPLIANCE_ROLLUPS = "compliance_rollups"
+KICS_RESULTS = "kics_results"
+OPA_RESULTS = "opa_results"
+PULL_REQUESTS = "pull_requests"
+PIPELINE_RUNS = "pipeline_runs"
+COMPLIANCE_TREND = "compliance_trend"
+FINDINGS_TREND = "findings_trend"
+DEPLOYMENT_FREQUENCY = "deployment_frequency"
+POLICY_INDEX = "policy_index"
+SCP_ANALYSIS = "scp_analysis"
+FINDINGS_PAGE = "findings_page"
+FINDINGS_COUNT = "findings_count"
+FINDINGS_FACETS = "findings_facets"
+ARCHIVE_PARTITIONS = "archive_partitions"
+ARCHIVE_HISTORY = "archive_history"
+TERRAFORM_DRIFT = "terraform_drift"
+RULE_EVALUATION = "rule_evaluation"
+
+JOB_CONFIG_SYNC = "config_sync"
+JOB_GITHUB_SYNC = "github_sync"
+JOB_KICS_SCAN = "kics_scan"
+JOB_OPA_VALIDATE = "opa_validate"
+JOB_POLICY_INDEX = "policy_index"
+JOB_SCP_SYNC = "scp_sync"
+JOB_SECURITYHUB_SYNC = "securityhub_sync"
+JOB_EVIDENCE_ARCHIVE = "evidence_archive"
+JOB_EVIDENCE_EXPORT = "evidence_export"
+JOB_TERRAFORM_DRIFT = "terraform_drift"
+JOB_ENTITLEMENTS_RELOAD = "entitlements_reload"
+JOB_NOTIFY = "notify"
+JOB_RULE_EVALUATION = "rule_evaluation"
+
+logger = logging.getLogger(__name__)
+
+PARTIAL_PUBLISH_INTERVAL_S = 10  # how often a running Config sweep publishes what has landed
+
+
+@dataclass
+class CacheStats:
+    """Counters for one data source"""
+
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / lookups if lookups else 0.0
+
+
+class _CountingTTLCache(TTLCache):
+    """TTLCache that records LRU evictions and TTL expirations"""
+
+    def __init__(self, maxsize: int, ttl: float, stats: CacheStats):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self._stats = stats
+
+    def popitem(self):
+        item = super().popitem()
+        self._stats.evictions += 1
+        return item
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        if expired:
+            self._stats.expirations += len(expired)
+        return expired
+
+
+class DataSource:
+    """A loader memoized with TTL/LRU eviction and single-flight misses"""
+
+    def __init__(self, name: str, loader: Callable[..., Any], maxsize: int, ttl: float):
+        self.name = name
+        self.loader = loader
+        self.stats = CacheStats()
+        self._cache = _CountingTTLCache(maxsize, ttl, self.stats)
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, *args: Hashable) -> Any:
+        key = args
+        with self._lock:
+            try:
+                value = self._cache[key]
+            except KeyError:
+                pass
+            else:
+                self.stats.hits += 1
+                return value
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.stats.misses += 1
+            else:
+                self.stats.coalesced += 1
+        if not leader:
+            return future.result()
+        try:
+            value = self.loader(*args)
+        except BaseException as exc:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            self._cache[key] = value
+            self._inflight.pop(key, None)
+        future.set_result(value)
+        return value
+
+    def refresh(self, *args: Hashable) -> Any:
+        """Reload and swap the entry in place; readers keep the old value meanwhile"""
+        value = self.loader(*args)
+        with self._lock:
+            self._cache[args] = value
+        return value
+
+    def invalidate(self, *args: Hashable) -> bool:
+        with self._lock:
+            removed = self._cache.pop(args, None) is not None
+            if removed:
+                self.stats.invalidations += 1
+            return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            # pop() per key: MutableMapping.clear() would go through popitem()
+            # and be counted as LRU evictions on older cachetools releases
+            for key in list(self._cache):
+                self._cache.pop(key, None)
+                self.stats.invalidations += 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._cache)
+
+
+class DataAccess:
+    """Registry of cached data sources shared by all sessions"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._sources: Dict[str, DataSource] = {}
+
+    def register(self, name: str, loader: Callable[..., Any], ttl: Optional[float] = None) -> DataSource:
+        source = DataSource(name, loader, self.maxsize, self.ttl if ttl is None else ttl)
+        self._sources[name] = source
+        return source
+
+    def source(self, name: str) -> DataSource:
+        return self._sources[name]
+
+    def get(self, name: str, *args: Hashable) -> Any:
+        with span(f"data.{name}"):
+            return self._sources[name].get(*args)
+
+    def refresh(self, name: str, *args: Hashable) -> Any:
+        return self._sources[name].refresh(*args)
+
+    def invalidate(self, name: str, *args: Hashable) -> bool:
+        return self._sources[name].invalidate(*args)
+
+    def invalidate_source(self, name: str) -> None:
+        self._sources[name].clear()
+
+    def stats(self) -> Dict[str, CacheStats]:
+        return {name: source.stats for name, source in self._sources.items()}
+
+    def totals(self) -> CacheStats:
+        total = CacheStats()
+        for stats in self.stats().values():
+            for field in vars(total):
+                setattr(total, field, getattr(total, field) + getattr(stats, field))
+        return total
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+@lru_cache(maxsize=1)
+def get_database():
+    """Connection pool shared by the persistent stores"""
+    from database import Database
+    return Database.from_settings(get_settings())
+
+
+@lru_cache(maxsize=1)
+def get_snapshot_store():
+    """Persistent compliance snapshot shared by every session"""
+    from snapshot_store import SnapshotStore
+    return SnapshotStore(get_database())
+
+
+@lru_cache(maxsize=1)
+def get_trend_store():
+    """Pre-aggregated compliance / findings / deployment history"""
+    from trend_store import TrendStore
+    return TrendStore(get_database())
+
+
+@lru_cache(maxsize=1)
+def get_findings_store():
+    """Resource-level findings for the explorer; seeded with demo rows outside live mode"""
+    from findings_store import DEMO, FindingsStore
+    store = FindingsStore(get_database())
+    if get_settings().aws_live_data:
+        store.clear_source(DEMO)
+    elif not store.count(source=DEMO):
+        store.load_frame(DEMO, demo_data.findings())
+    return store
+
+
+@lru_cache(maxsize=1)
+def get_config_collector():
+    """One collector per process so STS credentials and clients are shared"""
+    from aws_collector import ConfigCollector
+    return ConfigCollector.from_settings(get_settings())
+
+
+@lru_cache(maxsize=1)
+def get_opa_engine():
+    """OPA server pool kept running for the life of the process"""
+    import atexit
+    from opa_engine import OpaEngine
+    engine = OpaEngine.from_settings(get_settings())
+    atexit.register(engine.close)
+    return engine
+
+
+@lru_cache(maxsize=1)
+def get_authenticator():
+    """Credential store, hashing pool and session tokens shared by every session"""
+    import atexit
+    from auth_store import DATABASE, Authenticator
+    settings = get_settings()
+    authenticator = Authenticator.from_settings(settings, get_database() if settings.auth_backend == DATABASE else None)
+    atexit.register(authenticator.close)
+    return authenticator
+
+
+@lru_cache(maxsize=1)
+def get_entitlements():
+    """Role / user grants that the shared snapshot projects ahead of time"""
+    from entitlements import EntitlementModel
+    return EntitlementModel.from_settings(get_settings())
+
+
+@lru_cache(maxsize=1)
+def get_policy_index():
+    """Content-hash index of the local policy repository clone"""
+    from policy_index import PolicyIndex
+    return PolicyIndex.from_settings(get_settings(), get_database())
+
+
+@lru_cache(maxsize=1)
+def get_drift_detector():
+    """Per-resource drift check of the Terraform workspaces"""
+    from terraform_drift import DriftDetector
+    return DriftDetector.from_settings(get_settings(), get_database())
+
+
+@lru_cache(maxsize=1)
+def get_notifier():
+    """Durable alert outbox and the channels it sends digests to"""
+    from notifications import Notifier
+    return Notifier.from_settings(get_settings(), get_database())
+
+
+@lru_cache(maxsize=1)
+def get_rule_engine():
+    """Columnar resource inventory and the vectorized Config rule checks"""
+    from rule_engine import RuleEngine
+    return RuleEngine.from_settings(get_settings())
+
+
+def rule_evaluation_enabled() -> bool:
+    settings = get_settings()
+    return bool(settings.rule_inventory_path) or (settings.aws_live_data and bool(settings.aws_config_aggregator))
+
+
+def notifications_enabled() -> bool:
+    return get_settings().notifications_enabled and bool(get_notifier().channels)
+
+
+def securityhub_enabled() -> bool:
+    settings = get_settings()
+    return settings.aws_live_data and settings.securityhub_enabled
+
+
+def archive_enabled() -> bool:
+    from evidence_archive import AVAILABLE
+    return AVAILABLE and bool(get_settings().archive_dir)
+
+
+@lru_cache(maxsize=1)
+def get_evidence_archive():
+    """Date / OU partitioned Parquet snapshots under ARCHIVE_DIR"""
+    from evidence_archive import EvidenceArchive
+    return EvidenceArchive.from_settings(get_settings())
+
+
+def sync_config_compliance(on_progress: Optional[Callable[[float, str], None]] = None,
+                           on_partial: Optional[Callable[[], None]] = None) -> dict:
+    """Sweep the organization and ingest only what changed since the last sync
+
+    Finished (account, region) endpoints are written in batches while the
+    sweep runs; `on_partial` is called after each batch so the dashboard can
+    publish what has landed so far.
+    """
+    from aws_collector import CollectionReport
+    from snapshot_store import IngestStats
+    store = get_snapshot_store()
+    findings = get_findings_store()
+    collector = get_config_collector()
+    accounts = collector.list_accounts()
+    stats = IngestStats()
+    state = {"done": 0, "planned": len(accounts), "flushed_at": time.monotonic(),
+             "findings_upserted": 0, "findings_resolved": 0}
+    pending = []
+    # Transitions the notifier has not read yet outlive the retention window
+    unread_since = get_notifier().cursor("config") if notifications_enabled() else None
+
+    def ingest():
+        batch = CollectionReport(results=pending[:], wall_time_s=0.0)
+        pending.clear()
+        for name, value in vars(store.ingest_report(batch, retain_since=unread_since)).items():
+            setattr(stats, name, getattr(stats, name) + value)
+        upserted, resolved = findings.ingest_report(batch)
+        state["findings_upserted"] += upserted
+        state["findings_resolved"] += resolved
+        state["flushed_at"] = time.monotonic()
+
+    def on_planned(endpoints: int):
+        state["planned"] = endpoints
+
+    def on_result(result):
+        state["done"] += 1
+        pending.append(result)
+        if on_progress is not None:
+            on_progress(state["done"] / max(state["planned"], 1),
+                        f"{state['done']}/{state['planned']} account-regions")
+        if time.monotonic() - state["flushed_at"] >= PARTIAL_PUBLISH_INTERVAL_S:
+            ingest()
+            if on_partial is not None:
+                on_partial()
+
+    report = collector.collect(accounts=accounts, on_result=on_result, on_planned=on_planned,
+                               watermarks=store.watermarks("config"))
+    ingest()
+    # Once per sweep: ANALYZE scans the whole table, and partial flushes run on the dispatch thread
+    findings.analyze()
+    return {
+        "latency": report.latency_frame().to_dict("records"),
+        "wall_time_s": report.wall_time_s,
+        "throttles": report.throttles,
+        "endpoints": report.accounts,
+        "accounts_skipped": stats.accounts_skipped,
+        "rows_upserted": stats.rows_upserted,
+        "findings_upserted": state["findings_upserted"],
+        "findings_resolved": state["findings_resolved"],
+    }
+
+
+# ============================================================================
+# LOADERS
+# ============================================================================
+
+def _load_config_rules() -> dict:
+    if not get_settings().aws_live_data:
+        return demo_data.config_compliance()
+    scheduler = get_scheduler()
+    store = get_snapshot_store()
+    if store.last_sync("config") is None:
+        scheduler.submit(JOB_CONFIG_SYNC, PRIORITY_HIGH)
+    sync = scheduler.last_result(JOB_CONFIG_SYNC)
+    if sync:
+        sync["latency"] = pd.DataFrame(sync["latency"])
+    return {"accounts": store.account_count(), "rules": store.rule_summary(), "sync": sync}
+
+
+def _load_compliance_rollups() -> dict:
+    if not get_settings().aws_live_data:
+        return demo_data.compliance_rollups()
+    from aggregation import ComplianceAggregator
+    aggregator = ComplianceAggregator(get_snapshot_store().evaluation_frame())
+    # The cube goes out with the rollups so portfolio-limited views can rebuild the org-wide ones
+    return {**aggregator.rollups(), "cube": aggregator.cube}
+
+
+def _load_rule_evaluation() -> dict:
+    if not rule_evaluation_enabled():
+        return demo_data.rule_evaluation()
+    from aws_collector import format_rule_summary
+    evaluation = get_rule_engine().evaluation
+    if evaluation is None:
+        get_scheduler().submit(JOB_RULE_EVALUATION, PRIORITY_HIGH)
+        return {"resources": 0, "elapsed_s": 0.0, "load_s": 0.0,
+                "rules": format_rule_summary(pd.DataFrame(columns=["rule_name"]))}
+    return {
+        "resources": evaluation.inventory.resources,
+        "elapsed_s": evaluation.elapsed_s,
+        "load_s": evaluation.inventory.load_s,
+        "rules": format_rule_summary(evaluation.rule_summary()),
+    }
+
+
+# Last summary parsed from each KICS results path, served while the file is being rewritten
+_last_kics_summary: Dict[str, dict] = {}
+
+
+def _load_kics_results() -> dict:
+    path = get_settings().kics_results_path
+    if path:
+        from kics_ingest import JsonStreamError, load_kics_summary
+        try:
+            summary = load_kics_summary(path)
+            mtime = os.path.getmtime(path) if summary is not None else None
+        except (JsonStreamError, OSError) as exc:
+            # KICS rewrites the report mid-scan; keep showing the last complete one
+            logger.warning("KICS results %s unreadable (%s); keeping the last good summary", path, exc)
+            return _last_kics_summary.get(path) or demo_data.kics_results()
+        if summary is not None:
+            from trend_store import KICS_FINDINGS
+            # Keyed by the report's mtime, so re-reading the same scan is a no-op
+            get_trend_store().record(KICS_FINDINGS, summary["severity_counts"], mtime)
+            _last_kics_summary[path] = summary
+            return summary
+    return demo_data.kics_results()
+
+
+def _opa_configured() -> bool:
+    plan_dir = get_settings().terraform_plan_dir
+    return bool(plan_dir) and os.path.isdir(plan_dir) and get_opa_engine().available
+
+
+def _load_opa_results() -> dict:
+    if not _opa_configured():
+        return demo_data.opa_results()
+    scheduler = get_scheduler()
+    summary = scheduler.last_result(JOB_OPA_VALIDATE)
+    if summary is None:
+        scheduler.submit(JOB_OPA_VALIDATE, PRIORITY_HIGH)
+        return {"policies": 0, "passed": 0, "violations": 0, "resources": 0, "results": [], "plans": 0,
+                "timings": pd.DataFrame()}
+    summary["timings"] = pd.DataFrame(summary["timings"])
+    return summary
+
+
+def _load_compliance_trend(days: int):
+    from trend_store import COMPLIANCE_SCORE
+    store = get_trend_store()
+    if not store.has_data(COMPLIANCE_SCORE):
+        return demo_data.compliance_trend(days)
+    return store.wide(COMPLIANCE_SCORE, days, series=["org"])
+
+
+def _load_findings_trend(weeks: int):
+    from trend_store import KICS_FINDINGS, SECURITYHUB_FINDINGS, WEEK
+    store = get_trend_store()
+    # Security Hub aggregates every product's findings; KICS scans are the fallback
+    metric = next((m for m in (SECURITYHUB_FINDINGS, KICS_FINDINGS) if store.has_data(m)), None)
+    if metric is None:
+        return demo_data.findings_trend()
+    return store.wide(metric, weeks * 7, series=["CRITICAL", "HIGH", "MEDIUM"], granularity=WEEK, agg="last")
+
+
+def _load_deployment_frequency(months: int):
+    from trend_store import DEPLOYMENTS, MONTH
+    store = get_trend_store()
+    if not store.has_data(DEPLOYMENTS):
+        return demo_data.deployment_frequency()
+    return store.wide(DEPLOYMENTS, months * 31, granularity=MONTH, agg="sum")
+
+
+def _load_policy_index() -> dict:
+    if not get_settings().policy_repo_path:
+        return demo_data.policy_index()
+    index = get_policy_index()
+    if index.state() is None:
+        get_scheduler().submit(JOB_POLICY_INDEX, PRIORITY_HIGH)
+    return index.summary()
+
+
+def _load_terraform_drift() -> list:
+    if not get_settings().terraform_drift_dir:
+        return demo_data.terraform_drift()
+    detector = get_drift_detector()
+    statuses = detector.statuses()
+    if len(statuses) < len(detector.workspaces):
+        get_scheduler().submit(JOB_TERRAFORM_DRIFT, PRIORITY_HIGH)
+    return [{**vars(drift), "summary": drift.summary} for drift in statuses]
+
+
+def _load_scp_analysis():
+    from scp_analyzer import EMPTY_SNAPSHOT, ScpAnalyzer
+    if not get_settings().aws_live_data:
+        return ScpAnalyzer(demo_data.scp_organization())
+    scheduler = get_scheduler()
+    snapshot = scheduler.last_result(JOB_SCP_SYNC)
+    if snapshot is None:
+        scheduler.submit(JOB_SCP_SYNC, PRIORITY_HIGH)
+    return ScpAnalyzer(snapshot or EMPTY_SNAPSHOT)
+
+
+def _load_findings_page(filters, sort: str, descending: bool, page: int, page_size: int):
+    # The filtered total is cached on its own so paging and re-sorting skip the COUNT
+    total = get_data_access().get(FINDINGS_COUNT, filters)
+    return get_findings_store().page(filters, sort, descending, page, page_size, total=total)
+
+
+def _load_findings_count(filters) -> int:
+    return get_findings_store().count(filters)
+
+
+def _load_findings_facets(ous=None) -> dict:
+    return get_findings_store().facets(ous)
+
+
+def _load_archive_partitions(dataset: str) -> list:
+    return get_evidence_archive().partitions(dataset) if archive_enabled() else []
+
+
+def _load_archive_history(dataset: str, days: int):
+    if not archive_enabled():
+        return pd.DataFrame()
+    return get_evidence_archive().history(dataset, days)
+
+
+def _snapshot_frames() -> dict:
+    """Org-wide frames published to every session through the shared snapshot"""
+    access = get_data_access()
+    frames = dict(access.get(COMPLIANCE_ROLLUPS))
+    frames["config_rules"] = access.get(CONFIG_RULES)["rules"]
+    return frames
+
+
+def _scoped_frames(frames) -> dict:
+    """Rule, framework and Config Rules frames rebuilt from a portfolio-scoped cube"""
+    cube = frames.get("cube")
+    if cube is None:  # demo rollups have no cube; their org-wide frames are withheld
+        return {}
+    from aggregation import ComplianceAggregator
+    from aws_collector import format_rule_summary
+    aggregator = ComplianceAggregator.from_cube(cube)
+    by_rule = aggregator.by_rule()
+    config_rules = format_rule_summary(pd.DataFrame({
+        "rule_name": by_rule["rule_name"],
+        "compliant": by_rule["accounts_compliant"],
+        "non_compliant": by_rule["accounts_non_compliant"],
+        "last_evaluated": pd.NaT,
+    }))
+    # The cube carries no evaluation times; each rule's latest is kept from the org-wide table
+    last_evaluated = frames["config_rules"].set_index("Rule")["Last Evaluated"]
+    config_rules["Last Evaluated"] = config_rules["Rule"].map(last_evaluated).fillna("—")
+    return {"rule": by_rule, "framework": aggregator.by_framework(), "config_rules": config_rules}
+
+
+def _github_sync_result() -> Optional[dict]:
+    """Latest GitHub sync, queuing the first one if none has finished yet"""
+    scheduler = get_scheduler()
+    result = scheduler.last_result(JOB_GITHUB_SYNC)
+    if result is None:
+        scheduler.submit(JOB_GITHUB_SYNC, PRIORITY_HIGH)
+    return result
+
+
+def _load_pull_requests() -> list:
+    if not get_settings().github_token:
+        return demo_data.pull_requests()
+    result = _github_sync_result()
+    return result["pull_requests"] if result else []
+
+
+def _load_pipeline_runs() -> dict:
+    if not get_settings().github_token:
+        return demo_data.pipeline_runs()
+    result = _github_sync_result()
+    return result["pipeline_runs"] if result else {"days": [], "runs": [], "failures": []}
+
+
+# ============================================================================
+# BACKGROUND JOBS
+# ============================================================================
+
+def _job_config_sync(ctx) -> dict:
+    return sync_config_compliance(on_progress=ctx.progress, on_partial=_publish_compliance)
+
+
+def _job_scp_sync(ctx) -> dict:
+    from scp_analyzer import fetch_organization
+    return fetch_organization(get_config_collector().management_client("organizations"))
+
+
+def _job_securityhub_sync(ctx) -> Optional[dict]:
+    if not securityhub_enabled():
+        return None
+    from securityhub_ingest import SecurityHubIngester
+    from trend_store import SECURITYHUB_FINDINGS
+    # Built per run so a delegated-admin client always carries fresh STS credentials
+    ingester = SecurityHubIngester.from_settings(get_settings(), get_database(), get_config_collector())
+    stats = ingester.sync(on_progress=ctx.progress)
+    get_trend_store().record(SECURITYHUB_FINDINGS, ingester.open_counts())
+    _notify_securityhub(ingester)
+    return vars(stats)
+
+
+def _job_github_sync(ctx) -> Optional[dict]:
+    settings = get_settings()
+    if not settings.github_token:
+        return None
+    import asyncio
+    from github_client import GitHubClient
+    return asyncio.run(GitHubClient.from_settings(settings, get_database()).sync())
+
+
+def _after_github_sync():
+    _refresh(PULL_REQUESTS, PIPELINE_RUNS)()
+    # Every sync re-reads a week of runs; the trend store counts each run once
+    result = get_scheduler().last_result(JOB_GITHUB_SYNC) or {}
+    from trend_store import DEPLOYMENTS
+    deployments = [(run["id"], run["series"], run["completed_at"]) for run in result.get("deployments", [])]
+    if get_trend_store().increment_events(DEPLOYMENTS, deployments):
+        get_data_access().invalidate_source(DEPLOYMENT_FREQUENCY)
+
+
+def _job_policy_index(ctx) -> Optional[dict]:
+    if not get_settings().policy_repo_path:
+        return None
+    return vars(get_policy_index().sync(on_progress=ctx.progress))
+
+
+def _job_opa_validate(ctx) -> Optional[dict]:
+    if not _opa_configured():
+        return None
+    from opa_engine import OpaReport, plan_files
+    engine = get_opa_engine()
+    plans = list(plan_files(get_settings().terraform_plan_dir))
+    policies = engine.policies()
+    evaluations = []
+    for evaluation in engine.iter_evaluations(plans, policies):
+        evaluations.append(evaluation)
+        ctx.progress(len(evaluations) / max(len(plans), 1), f"{len(evaluations)}/{len(plans)} plans")
+    summary = OpaReport(policies=policies, evaluations=evaluations, wall_time_s=0.0).summary()
+    summary["timings"] = summary["timings"].to_dict("records")
+    return summary
+
+
+def _job_terraform_drift(ctx) -> Optional[dict]:
+    if not get_settings().terraform_drift_dir:
+        return None
+    started = time.perf_counter()
+    results = get_drift_detector().check_all()
+    return {
+        "workspaces": len(results),
+        "parsed": [drift.workspace for drift in results if drift.parsed],
+        "changed": [drift.workspace for drift in results if drift.changed],
+        "elapsed_s": time.perf_counter() - started,
+    }
+
+
+def _job_rule_evaluation(ctx) -> Optional[dict]:
+    if not rule_evaluation_enabled():
+        return None
+    engine = get_rule_engine()
+    if engine.paths:
+        parsed = engine.load()
+    else:
+        # No exports: read the inventory through the aggregator's advanced query
+        engine.fetch(get_config_collector().management_client("config"), get_settings().aws_config_aggregator)
+        parsed = True
+    evaluation = engine.evaluate()
+    return {
+        "resources": evaluation.inventory.resources,
+        "parsed": parsed,
+        "load_s": evaluation.inventory.load_s,
+        "elapsed_s": evaluation.elapsed_s,
+    }
+
+
+def _job_entitlements_reload(ctx) -> dict:
+    entitlements = get_entitlements()
+    return {"changed": entitlements.reload(), "version": entitlements.version}
+
+
+def _after_entitlements_reload():
+    # Project the new grants now rather than on the first rerun that needs them
+    result = get_scheduler().last_result(JOB_ENTITLEMENTS_RELOAD) or {}
+    if result.get("changed"):
+        get_shared_snapshot().reproject()
+
+
+def _after_terraform_drift():
+    # Most checks find the same status; only a change is worth redrawing the card for
+    result = get_scheduler().last_result(JOB_TERRAFORM_DRIFT) or {}
+    if result.get("changed"):
+        get_data_access().refresh(TERRAFORM_DRIFT)
+        _notify_drift(result["changed"])
+
+
+def _job_evidence_archive(ctx) -> Optional[dict]:
+    if not archive_enabled():
+        return None
+    # Both stores create their tables (and the demo findings) on first use
+    get_snapshot_store()
+    get_findings_store()
+    return get_evidence_archive().snapshot_all(get_database())
+
+
+def _job_evidence_export(ctx, dataset: str, date: str, fmt: str) -> dict:
+    return vars(get_evidence_archive().export(dataset, date, fmt))
+
+
+def _publish_compliance() -> dict:
+    """Reload the compliance sources and publish them as a new shared snapshot"""
+    access = get_data_access()
+    access.refresh(CONFIG_RULES)
+    rollups = access.refresh(COMPLIANCE_ROLLUPS)
+    get_shared_snapshot().refresh()
+    access.invalidate_source(FINDINGS_PAGE)
+    access.invalidate_source(FINDINGS_COUNT)
+    access.invalidate_source(FINDINGS_FACETS)
+    return rollups
+
+
+def _after_config_sync():
+    # Only the completed sweep is a trend sample; partial publishes are not
+    get_trend_store().record_compliance(_publish_compliance())
+    get_data_access().invalidate_source(COMPLIANCE_TREND)
+    _notify_config_changes()
+
+
+def _notify_config_changes():
+    """Config rules that turned NON_COMPLIANT since the last sweep that notified"""
+    if not notifications_enabled():
+        return
+    from notifications import Event
+    notifier = get_notifier()
+    since = notifier.cursor("config")
+    if since is None:
+        # First run: existing findings are the baseline, not news
+        notifier.advance("config", time.time())
+        return
+    # Transitions only: a rule that stays NON_COMPLIANT through re-evaluations is not news again
+    transitions = get_snapshot_store().transitions_since(since)
+    if transitions.empty:
+        return
+    flipped = transitions[transitions["compliance_type"] == "NON_COMPLIANT"]
+    # Keyed on when the rule turned non-compliant, so only a later recovery and relapse is a new event
+    notifier.publish(
+        Event(f"config/{row.account_id}/{row.region}/{row.rule_name}/{row.changed_at:.0f}", "config", "HIGH",
+              row.rule_name, f"{row.account_id} {row.region}",
+              f"{row.non_compliant_resources} non-compliant resources", row.changed_at)
+        for row in flipped.itertuples()
+    )
+    notifier.advance("config", float(transitions["changed_at"].max()))
+
+
+def _notify_drift(workspaces: list):
+    if not notifications_enabled():
+        return
+    from notifications import Event
+    from terraform_drift import DRIFTED, ERROR, MISSING
+    severities = {DRIFTED: "HIGH", ERROR: "MEDIUM", MISSING: "LOW"}
+    detector = get_drift_detector()
+    events = []
+    for workspace in workspaces:
+        drift = detector.status(workspace)
+        if drift is not None and drift.status in severities:
+            events.append(Event(f"drift/{workspace}/{drift.status}/{drift.changed_at}", "terraform",
+                                severities[drift.status], "Terraform drift", workspace, drift.summary,
+                                drift.changed_at))
+    get_notifier().publish(events)
+
+
+def _notify_securityhub(ingester):
+    """New or reopened HIGH / CRITICAL findings, once per finding"""
+    if not notifications_enabled():
+        return
+    from kics_ingest import SEVERITIES
+    from notifications import Event
+    notifier = get_notifier()
+    since = notifier.cursor("securityhub")
+    if since is None:
+        notifier.advance("securityhub", ingester.high_water() or time.time())
+        return
+    findings = ingester.open_since(since)
+    if findings.empty:
+        return
+    # Keyed on when the finding last opened: updates while open are one event, a reopen is a new one
+    notifier.publish(
+        Event(f"securityhub/{row.finding_id}/{row.opened_at:.0f}", "securityhub", SEVERITIES[row.severity_rank], row.title,
+              f"{row.account_id} {row.region}", row.resource_id, row.updated_at)
+        for row in findings.itertuples()
+    )
+    notifier.advance("securityhub", float(findings["updated_at"].max()))
+
+
+def _job_notify(ctx) -> Optional[dict]:
+    if not notifications_enabled():
+        return None
+    return get_notifier().run()
+
+
+def _refresh(*names: str) -> Callable[..., None]:
+    """Job handler / hook that reloads sources off the request path"""
+    def refresh(ctx=None):
+        access = get_data_access()
+        for name in names:
+            access.refresh(name)
+    return refresh
+
+
+def _invalidate(*names: str) -> Callable[[], None]:
+    """Hook that drops cached sources so the next read goes to the backend"""
+    def invalidate():
+        access = get_data_access()
+        for name in names:
+            access.invalidate_source(name)
+    return invalidate
+
+
+@lru_cache(maxsize=1)
+def get_scheduler():
+    """Background job scheduler shared by every session"""
+    import atexit
+    from scheduler import JobScheduler
+    settings = get_settings()
+    scheduler = JobScheduler(get_database(), workers=settings.scheduler_workers)
+    scheduler.register(JOB_CONFIG_SYNC, _job_config_sync, on_success=_after_config_sync)
+    scheduler.register(JOB_OPA_VALIDATE, _job_opa_validate, on_success=_refresh(OPA_RESULTS))
+    scheduler.register(JOB_KICS_SCAN, _refresh(KICS_RESULTS),
+                       on_success=lambda: get_data_access().invalidate_source(FINDINGS_TREND))
+    scheduler.register(JOB_GITHUB_SYNC, _job_github_sync, on_success=_after_github_sync)
+    scheduler.register(JOB_SCP_SYNC, _job_scp_sync, on_success=_refresh(SCP_ANALYSIS))
+    scheduler.register(JOB_SECURITYHUB_SYNC, _job_securityhub_sync, on_success=_invalidate(FINDINGS_TREND))
+    scheduler.register(JOB_POLICY_INDEX, _job_policy_index, on_success=_refresh(POLICY_INDEX))
+    scheduler.register(JOB_TERRAFORM_DRIFT, _job_terraform_drift, on_success=_after_terraform_drift)
+    scheduler.register(JOB_EVIDENCE_ARCHIVE, _job_evidence_archive,
+                       on_success=_invalidate(ARCHIVE_PARTITIONS, ARCHIVE_HISTORY))
+    scheduler.register(JOB_EVIDENCE_EXPORT, _job_evidence_export)
+    scheduler.register(JOB_ENTITLEMENTS_RELOAD, _job_entitlements_reload, on_success=_after_entitlements_reload)
+    scheduler.register(JOB_NOTIFY, _job_notify)
+    scheduler.register(JOB_RULE_EVALUATION, _job_rule_evaluation, on_success=_refresh(RULE_EVALUATION))
+    if settings.aws_live_data:
+        scheduler.schedule(JOB_CONFIG_SYNC, settings.config_sync_interval_seconds)
+        scheduler.schedule(JOB_SCP_SYNC, settings.scp_sync_interval_seconds)
+    if securityhub_enabled():
+        scheduler.schedule(JOB_SECURITYHUB_SYNC, settings.securityhub_sync_interval_seconds)
+    if settings.github_token:
+        scheduler.schedule(JOB_GITHUB_SYNC, settings.github_sync_interval_seconds)
+    if settings.policy_repo_path:
+        scheduler.schedule(JOB_POLICY_INDEX, settings.policy_index_interval_seconds)
+    if settings.terraform_drift_dir:
+        scheduler.schedule(JOB_TERRAFORM_DRIFT, settings.terraform_drift_interval_seconds)
+    if rule_evaluation_enabled():
+        scheduler.schedule(JOB_RULE_EVALUATION, settings.rule_evaluation_interval_seconds)
+    if notifications_enabled():
+        scheduler.schedule(JOB_NOTIFY, settings.notify_interval_seconds)
+    if settings.entitlements_file:
+        scheduler.schedule(JOB_ENTITLEMENTS_RELOAD, settings.entitlements_reload_seconds)
+    if archive_enabled():
+        scheduler.schedule(JOB_EVIDENCE_ARCHIVE, settings.archive_interval_seconds)
+    scheduler.start()
+    atexit.register(scheduler.stop)
+    return scheduler
+
+
+@lru_cache(maxsize=1)
+def get_shared_snapshot():
+    """Read-only org-wide frames, swapped as a whole after each Config sync"""
+    from shared_snapshot import SharedSnapshot
+    return SharedSnapshot(_snapshot_frames, get_entitlements(), derive=_scoped_frames)
+
+
+@lru_cache(maxsize=1)
+def get_data_access() -> DataAccess:
+    """Process-wide data access layer"""
+    settings = get_settings()
+    access = DataAccess(maxsize=settings.cache_max_size, ttl=settings.cache_ttl_seconds)
+    access.register(CONFIG_RULES, _load_config_rules)
+    access.register(COMPLIANCE_ROLLUPS, _load_compliance_rollups)
+    access.register(KICS_RESULTS, _load_kics_results)
+    access.register(OPA_RESULTS, _load_opa_results)
+    access.register(PULL_REQUESTS, _load_pull_requests)
+    access.register(PIPELINE_RUNS, _load_pipeline_runs)
+    access.register(POLICY_INDEX, _load_policy_index)
+    access.register(SCP_ANALYSIS, _load_scp_analysis)
+    access.register(TERRAFORM_DRIFT, _load_terraform_drift)
+    access.register(RULE_EVALUATION, _load_rule_evaluation)
+    access.register(FINDINGS_PAGE, _load_findings_page)
+    access.register(FINDINGS_COUNT, _load_findings_count)
+    access.register(FINDINGS_FACETS, _load_findings_facets)
+    access.register(ARCHIVE_PARTITIONS, _load_archive_partitions)
+    access.register(ARCHIVE_HISTORY, _load_archive_history)
+    access.register(COMPLIANCE_TREND, _load_compliance_trend)
+    access.register(FINDINGS_TREND, _load_findings_trend)
+    access.register(DEPLOYMENT_FREQUENCY, _load_deployment_frequency)
+    return access
@@ -0,0 +1,198 @@
+"""
+Database Access
+===============
+Thin DB-API layer shared by the persistent stores.
+
+- PostgreSQL when DB_HOST is set and psycopg2 is installed, pooled to DB_POOL_SIZE
+- SQLite fallback (SQLITE_PATH) with one WAL connection per thread
+- Statements are written with '?' placeholders and translated per dialect
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+try:
+    import psycopg2
+    from psycopg2.pool import ThreadedConnectionPool
+except ImportError:  # SQLite fallback only
+    psycopg2 = None
+    ThreadedConnectionPool = None
+
+logger = logging.getLogger(__name__)
+
+_PLACEHOLDER = re.compile(r"\?")
+
+
+class Database:
+    """Dialect-aware connection manager for PostgreSQL or SQLite"""
+
+    def __init__(self, dialect: str, pool=None, sqlite_path: str = ""):
+        self.dialect = dialect
+        self._pool = pool
+        self._sqlite_path = sqlite_path
+        self._local = threading.local()
+
+    @classmethod
+    def sqlite(cls, path: str) -> "Database":
+        if path != ":memory:":
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+        return cls("sqlite", sqlite_path=path)
+
+    @classmethod
+    def postgres(cls, host: str, port: int, dbname: str, user: str, password: str,
+                 sslmode: str = "prefer", pool_size: int = 10) -> "Database":
+        if ThreadedConnectionPool is None:
+            raise RuntimeError("psycopg2 is required for PostgreSQL")
+        pool = ThreadedConnectionPool(
+            1, max(1, pool_size),
+            host=host, port=port, dbname=dbname, user=user, password=password,
+            sslmode=sslmode, connect_timeout=5,
+        )
+        return cls("postgres", pool=pool)
+
+    @classmethod
+    def from_settings(cls, settings) -> "Database":
+        """PostgreSQL if configured and reachable, otherwise SQLite"""
+        if settings.db_backend in ("auto", "postgres") and settings.db_host and psycopg2 is not None:
+            try:
+                return cls.postgres(
+                    settings.db_host, settings.db_port, settings.db_name, settings.db_user,
+                    settings.db_password, settings.db_ssl_mode, settings.db_pool_size,
+                )
+            except Exception as exc:
+                if settings.db_backend == "postgres":
+                    raise
+                logger.warning("PostgreSQL unavailable (%s); falling back to SQLite", exc)
+        return cls.sqlite(settings.sqlite_path)
+
+    # ------------------------------------------------------------------
+    # Connections
+    # ------------------------------------------------------------------
+
+    def _sqlite_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._sqlite_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def connection(self):
+        if self.dialect == "sqlite":
+            yield self._sqlite_connection()
+            return
+        conn = self._pool.getconn()
+        try:
+            yield conn
+        finally:
+            self._pool.putconn(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Connection whose work is committed on success and rolled back on error"""
+        with self.connection() as conn:
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def sql(self, statement: str) -> str:
+        """Translate '?' placeholders for the active dialect"""
+        if self.dialect == "postgres":
+            return _PLACEHOLDER.sub("%s", statement)
+        return statement
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def execute(self, statement: str, params: Sequence = (), conn=None) -> int:
+        if conn is None:
+            with self.transaction() as conn:
+                return self.execute(statement, params, conn)
+        cur = conn.cursor()
+        try:
+            cur.execute(self.sql(statement), tuple(params))
+            return cur.rowcount
+        finally:
+            cur.close()
+
+    def executemany(self, statement: str, rows: Iterable[Sequence], conn=None) -> int:
+        rows = [tuple(r) for r in rows]
+        if not rows:
+            return 0
+        if conn is None:
+            with self.transaction() as conn:
+                return self.executemany(statement, rows, conn)
+        cur = conn.cursor()
+        try:
+            cur.executemany(self.sql(statement), rows)
+            return len(rows)
+        finally:
+            cur.close()
+
+    def executescript(self, statements: Iterable[str]) -> None:
+        with self.transaction() as conn:
+            for statement in statements:
+                self.execute(statement, conn=conn)
+
+    def query(self, statement: str, params: Sequence = (), conn=None) -> List[tuple]:
+        if conn is None:
+            # A transaction, so pooled PostgreSQL connections never idle inside one
+            with self.transaction() as conn:
+                return self.query(statement, params, conn)
+        cur = conn.cursor()
+        try:
+            cur.execute(self.sql(statement), tuple(params))
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+    def query_one(self, statement: str, params: Sequence = ()) -> Optional[tuple]:
+        rows = self.query(statement, params)
+        return rows[0] if rows else None
+
+    def iter_query(self, statement: str, params: Sequence = (), batch_size: int = 50000) -> Iterator[List[tuple]]:
+        """Rows in batches of `batch_size`, so large exports never hold the whole result
+
+        PostgreSQL uses a named (server-side) cursor; SQLite steps its cursor lazily.
+        """
+        with self.transaction() as conn:
+            if self.dialect == "postgres":
+                cur = conn.cursor(name=f"stream_{uuid.uuid4().hex[:12]}")
+                cur.itersize = batch_size
+            else:
+                cur = conn.cursor()
+            try:
+                cur.execute(self.sql(statement), tuple(params))
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        return
+                    yield rows
+            finally:
+                cur.close()
+
+    def query_frame(self, statement: str, params: Sequence = (), columns: Optional[List[str]] = None) -> pd.DataFrame:
+        with self.transaction() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute(self.sql(statement), tuple(params))
+                rows = cur.fetchall()
+                names = columns or [d[0] for d in cur.description]
+            finally:
+                cur.close()
+        return pd.DataFrame.from_records(rows, columns=names)
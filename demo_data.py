@@ -0,0 +1,260 @@
+"""
+Demo Data
+=========
+Static sample data shown when a live backend is not configured.
+Shapes match what the live data sources return.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+
+def config_compliance() -> dict:
+    """AWS Config rule compliance (AWS Compliance tab)"""
+    return {
+        "accounts": 487,
+        "rules": pd.DataFrame({
+            "Rule": ["s3-bucket-server-side-encryption-enabled", "ec2-imdsv2-check", "rds-storage-encrypted", "ebs-encrypted-volumes", "iam-password-policy"],
+            "Compliant": [487, 485, 456, 478, 487],
+            "Non-Compliant": [0, 2, 31, 9, 0],
+            "Compliance %": ["100%", "99.6%", "93.6%", "98.2%", "100%"],
+            "Last Evaluated": ["5 min ago", "5 min ago", "5 min ago", "5 min ago", "5 min ago"]
+        }),
+    }
+
+
+def rule_evaluation() -> dict:
+    """Local re-scoring of the Config rules over the resource inventory (AWS Compliance tab)"""
+    return {
+        "resources": 1_048_576,
+        "elapsed_s": 0.041,
+        "load_s": 0.0,
+        "rules": pd.DataFrame({
+            "Rule": ["s3-bucket-server-side-encryption-enabled", "ec2-imdsv2-check", "rds-storage-encrypted", "ebs-encrypted-volumes", "iam-password-policy"],
+            "Compliant": [211_904, 308_221, 18_967, 402_317, 487],
+            "Non-Compliant": [0, 1_214, 2_031, 3_902, 0],
+            "Compliance %": ["100%", "99.6%", "90.3%", "99%", "100%"],
+            "Last Evaluated": ["5 min ago", "5 min ago", "5 min ago", "5 min ago", "5 min ago"]
+        }),
+    }
+
+
+def compliance_rollups() -> dict:
+    """OU and framework rollups (Overview and AWS Compliance tabs)"""
+    ous = ['Production', 'Development', 'Staging', 'Security', 'Data Analytics', 'Shared Services', 'Sandbox']
+    return {
+        "ou": pd.DataFrame({
+            "ou": ous,
+            "portfolio": ous,  # each top-level OU is its own portfolio
+            "accounts": [145, 98, 45, 32, 67, 65, 35],
+            "score": [98, 94, 96, 99, 92, 95, 78],
+        }),
+        "framework": pd.DataFrame({
+            "framework": ['CIS', 'SOC2', 'PCI', 'HIPAA'],
+            "score": [96, 94, 88, 92],
+        }),
+    }
+
+
+def kics_results() -> dict:
+    """Latest KICS scan (Policy Scans tab)"""
+    return {
+        "severity_counts": {"HIGH": 3, "MEDIUM": 12, "LOW": 8},
+        "severity_deltas": {"HIGH": "-2", "MEDIUM": "+1", "LOW": "0"},
+        "files_scanned": 234,
+        "checks_passed": 211,
+        "top_findings": [
+            {"severity": "HIGH", "query": "S3 Bucket Without Encryption", "file": "terraform/modules/s3/main.tf", "line": 23},
+            {"severity": "HIGH", "query": "Security Group Open to Internet", "file": "terraform/modules/vpc/security.tf", "line": 45},
+            {"severity": "MEDIUM", "query": "RDS Without Multi-AZ", "file": "terraform/modules/rds/main.tf", "line": 67},
+        ],
+    }
+
+
+def opa_results() -> dict:
+    """Latest OPA evaluation of Terraform plans (Policy Scans tab)"""
+    return {
+        "policies": 45,
+        "passed": 42,
+        "violations": 3,
+        "resources": 156,
+        "deltas": {"passed": "+2", "violations": "-1"},
+        "results": [
+            {"name": "require_encryption", "status": "PASS", "resources": 34},
+            {"name": "restrict_regions", "status": "PASS", "resources": 28},
+            {"name": "require_tags", "status": "FAIL", "resources": 12},
+            {"name": "security_group_rules", "status": "PASS", "resources": 18},
+            {"name": "iam_least_privilege", "status": "WARN", "resources": 8},
+        ],
+    }
+
+
+def policy_index() -> dict:
+    """Policies in the governance repository by type (status bar and Overview tab)"""
+    return {
+        "total": 156,
+        "by_type": {"SCPs": 24, "OPA/Rego": 45, "Config Rules": 52, "Sentinel": 18, "Custom": 17},
+        "commit": "a41f9c2",
+        "last_commit": "2 hours ago",
+    }
+
+
+def terraform_drift() -> list:
+    """Drift status per Terraform workspace (Terraform Cloud card)"""
+    return [
+        {"workspace": "scp-deployment", "status": "healthy", "summary": "Drift: None", "resources": 64, "drifted": 0, "detail": []},
+        {"workspace": "config-rules", "status": "healthy", "summary": "Drift: None", "resources": 118, "drifted": 0, "detail": []},
+        {"workspace": "stacksets", "status": "healthy", "summary": "Drift: None", "resources": 37, "drifted": 0, "detail": []},
+    ]
+
+
+def pull_requests() -> list:
+    """Recent pull requests on the policy repository (GitHub & CI/CD tab)"""
+    return [
+        {"number": "#156", "title": "Add IMDSv2 enforcement SCP for all OUs", "author": "security-team", "status": "🟢 Merged", "checks": "✓ All passed", "time": "2 hours ago"},
+        {"number": "#155", "title": "Update OPA policy for RDS encryption", "author": "cloud-arch", "status": "🟡 Open", "checks": "✓ All passed", "time": "5 hours ago"},
+        {"number": "#154", "title": "New Sentinel policy for cost tags", "author": "finops", "status": "🟡 Open", "checks": "⚠ 1 warning", "time": "1 day ago"},
+        {"number": "#153", "title": "Fix KICS false positive in S3 module", "author": "devsecops", "status": "🔴 Failed", "checks": "✗ KICS failed", "time": "1 day ago"},
+    ]
+
+
+def pipeline_runs() -> dict:
+    """Workflow runs and failures per day (GitHub & CI/CD tab)"""
+    return {
+        "days": ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
+        "runs": [23, 31, 28, 35, 29, 12, 8],
+        "failures": [2, 1, 3, 2, 1, 0, 1],
+    }
+
+
+def compliance_trend(days: int) -> pd.DataFrame:
+    """Org compliance score history (Trends tab); weekly points past six months"""
+    dates = pd.date_range(end=pd.Timestamp.now(tz="UTC").normalize(), periods=days, freq="D")
+    noise = np.random.default_rng(7).uniform(-1, 1, days)
+    scores = np.clip(94.2 - 0.1 * np.arange(days)[::-1] * min(1.0, 90 / days) + noise, 0, 100)
+    scores[-1] = 94.2
+    trend = pd.DataFrame({"org": scores}, index=pd.Index(dates, name="bucket"))
+    return trend.resample("W-MON", label="left", closed="left").mean() if days > 180 else trend
+
+
+def findings_trend() -> pd.DataFrame:
+    """Open findings by severity per week (Trends tab)"""
+    return pd.DataFrame({
+        "CRITICAL": [5, 4, 6, 3, 4, 2, 3, 2],
+        "HIGH": [23, 25, 22, 20, 18, 19, 16, 15],
+        "MEDIUM": [67, 65, 70, 62, 58, 55, 52, 48],
+    }, index=pd.Index(['W1', 'W2', 'W3', 'W4', 'W5', 'W6', 'W7', 'W8'], name="bucket"))
+
+
+def deployment_frequency() -> pd.DataFrame:
+    """Policy deployments per month (Trends tab)"""
+    return pd.DataFrame({
+        "scp": [8, 12, 10, 15, 11, 14],
+        "config_rules": [15, 18, 22, 19, 25, 21],
+        "opa": [23, 28, 31, 35, 29, 33],
+    }, index=pd.Index(['Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'], name="bucket"))
+
+
+def scp_organization() -> dict:
+    """OU tree, SCP documents and attachments (AWS Compliance tab)"""
+    ous = compliance_rollups()["ou"]
+    nodes = {"r-demo": {"name": "Root", "parent": None, "kind": "root"}}
+    attachments = {"r-demo": ["p-full", "p-s3", "p-imds", "p-tooling", "p-org"]}
+    account = 100000000000
+    for index, row in enumerate(ous.itertuples()):
+        ou_id = f"ou-demo-{index}"
+        nodes[ou_id] = {"name": row.ou, "parent": "r-demo", "kind": "ou"}
+        attachments[ou_id] = ["p-full"] if row.ou == "Sandbox" else ["p-full", "p-regions"]
+        slug = row.ou.lower().replace(" ", "-")
+        for number in range(row.accounts):
+            account += 1
+            nodes[str(account)] = {"name": f"{slug}-{number + 1:03d}", "parent": ou_id, "kind": "account"}
+            attachments[str(account)] = ["p-full"]
+
+    def policy(name, *statements):
+        return {"name": name, "content": json.dumps({"Version": "2012-10-17", "Statement": list(statements)},
+                                                     indent=2)}
+
+    global_services = ["iam:*", "organizations:*", "sts:*", "cloudfront:*", "route53:*", "route53domains:*",
+                       "support:*", "budgets:*", "ce:*", "health:*", "trustedadvisor:*", "waf:*", "shield:*",
+                       "globalaccelerator:*", "kms:*", "s3:GetBucketLocation", "s3:ListAllMyBuckets",
+                       "account:*", "billing:*", "pricing:*", "sso:*", "identitystore:*", "ecr-public:*"]
+    policies = {
+        "p-full": policy("FullAWSAccess", {"Effect": "Allow", "Action": "*", "Resource": "*"}),
+        "p-s3": policy("Deny Public S3", {
+            "Sid": "DenyPublicAccessBlockChanges", "Effect": "Deny",
+            "Action": ["s3:PutAccountPublicAccessBlock", "s3:DeleteAccountPublicAccessBlock",
+                       "s3:PutBucketPublicAccessBlock", "s3:DeleteBucketPublicAccessBlock"],
+            "Resource": "*",
+        }, {
+            "Sid": "DenyPublicAcls", "Effect": "Deny", "Action": ["s3:PutBucketAcl", "s3:PutObjectAcl"],
+            "Resource": "*",
+            "Condition": {"StringEquals": {"s3:x-amz-acl": ["public-read", "public-read-write"]}},
+        }),
+        "p-imds": policy("Require IMDSv2", {
+            "Sid": "RequireImdsV2OnLaunch", "Effect": "Deny", "Action": "ec2:RunInstances",
+            "Resource": "arn:aws:ec2:*:*:instance/*",
+            "Condition": {"StringNotEquals": {"ec2:MetadataHttpTokens": "required"}},
+        }, {
+            "Sid": "DenyImdsDowngrade", "Effect": "Deny", "Action": "ec2:ModifyInstanceMetadataOptions",
+            "Resource": "*",
+            "Condition": {"StringNotEquals": {"ec2:Attribute/HttpTokens": "required"}},
+        }),
+        "p-regions": policy("Restrict Regions", {
+            "Sid": "DenyOutsideApprovedRegions", "Effect": "Deny", "NotAction": global_services,
+            "Resource": "*",
+            "Condition": {"StringNotEquals": {"aws:RequestedRegion": ["us-east-1", "us-west-2", "eu-west-1"]}},
+        }),
+        "p-tooling": policy("Protect Security Tooling", {
+            "Sid": "ProtectCloudTrail", "Effect": "Deny",
+            "Action": ["cloudtrail:StopLogging", "cloudtrail:DeleteTrail", "cloudtrail:UpdateTrail",
+                       "cloudtrail:PutEventSelectors"],
+            "Resource": "*",
+        }, {
+            "Sid": "ProtectGuardDutyAndConfig", "Effect": "Deny",
+            "Action": ["guardduty:Delete*", "guardduty:Disassociate*", "guardduty:StopMonitoringMembers",
+                       "config:Delete*", "config:Stop*", "securityhub:Disable*", "securityhub:Delete*"],
+            "Resource": "*",
+        }),
+        "p-org": policy("Deny Leaving Org", {
+            "Sid": "DenyLeaveOrganization", "Effect": "Deny", "Action": "organizations:LeaveOrganization",
+            "Resource": "*",
+        }),
+    }
+    return {"nodes": nodes, "policies": policies, "attachments": attachments}
+
+
+def findings(rows: int = 5000, seed: int = 3) -> pd.DataFrame:
+    """Resource-level non-compliant findings (Findings Explorer)"""
+    rng = np.random.default_rng(seed)
+    org = scp_organization()["nodes"]
+    accounts = [(account_id, org[node["parent"]]["name"]) for account_id, node in org.items()
+                if node["kind"] == "account"]
+    rules = {
+        "s3-bucket-server-side-encryption-enabled": ("AWS::S3::Bucket", "HIGH", "bucket-{n}"),
+        "ec2-imdsv2-check": ("AWS::EC2::Instance", "MEDIUM", "i-{n:017x}"),
+        "rds-storage-encrypted": ("AWS::RDS::DBInstance", "HIGH", "db-{n}"),
+        "ebs-encrypted-volumes": ("AWS::EC2::Volume", "MEDIUM", "vol-{n:017x}"),
+        "iam-password-policy": ("AWS::::Account", "LOW", "account-{n}"),
+        "restricted-ssh": ("AWS::EC2::SecurityGroup", "CRITICAL", "sg-{n:017x}"),
+    }
+    names = list(rules)
+    picks = rng.integers(0, len(accounts), rows)
+    rule_picks = rng.choice(len(names), rows, p=[0.2, 0.3, 0.1, 0.25, 0.05, 0.1])
+    now = pd.Timestamp.now(tz="UTC").timestamp()
+    first_seen = now - rng.exponential(30 * 86400, rows)
+    regions = np.array(["us-east-1", "us-west-2", "eu-west-1"])[rng.integers(0, 3, rows)]
+    frame = pd.DataFrame({
+        "account_id": [accounts[i][0] for i in picks],
+        "ou": [accounts[i][1] for i in picks],
+        "region": regions,
+        "rule_name": [names[i] for i in rule_picks],
+        "severity": [rules[names[i]][1] for i in rule_picks],
+        "resource_type": [rules[names[i]][0] for i in rule_picks],
+        "resource_id": [rules[names[i]][2].format(n=n) for n, i in enumerate(rule_picks)],
+        "first_seen": first_seen,
+        "last_seen": np.full(rows, now),
+    })
+    return frame.drop_duplicates(["account_id", "region", "rule_name", "resource_id"])
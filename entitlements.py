@@ -0,0 +1,176 @@
+"""
+Entitlements
+============
+Which datasets each role may read, and which portfolios its rows are limited to.
+
+- An Entitlement is an immutable (role, datasets, portfolios) value; users
+  with the same grants share one, so projections are keyed on it
+- Role entitlements are projected at publish time; a user grant is resolved
+  on the user's first rerun and projected ahead of time from then on
+- Role grants default to ROLE_DATASETS with every portfolio; an
+  ENTITLEMENTS_FILE can narrow datasets / portfolios per role and per user
+- Row scoping uses the frame's `portfolio` column; an org-wide aggregate
+  without one is rebuilt from the scoped rows where it can be, otherwise it
+  is withheld from a portfolio-limited entitlement
+- Account-level data read outside the snapshot is granted by dataset name
+  too ("findings", "scp", "rule_evaluation", "evidence"): findings and SCP
+  denies are limited to the OUs in the entitlement's portfolios, while the
+  resource re-score and evidence exports need every portfolio (`org_wide`)
+- `reload()` re-reads the file only when it changed and bumps `version`,
+  which is what tells the shared snapshot to re-project
+
+An entitlements file looks like
+{"roles": {"FINOPS_ANALYST": {"portfolios": ["Data Analytics", "Sandbox"]}},
+ "users": {"alice": {"portfolios": ["Production"]}}};
+a missing `datasets` / `portfolios` key keeps the role's default, null means all.
+"""
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, replace
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import yaml
+except ImportError:  # JSON entitlements files only
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+SCOPE_COLUMN = "portfolio"
+
+# Datasets per role; roles not listed here (or None) see every dataset.
+# Account-level detail is withheld from the read-only business roles.
+ORG_ROLLUPS = frozenset({"ou", "portfolio", "framework", "rule", "config_rules"})
+ROLE_DATASETS: Dict[str, Optional[FrozenSet[str]]] = {
+    "SUPER_ADMIN": None,
+    "SECURITY_ADMIN": None,
+    "COMPLIANCE_OFFICER": None,
+    "CLOUD_ARCHITECT": None,
+    "DEVSECOPS_ENGINEER": None,
+    "AUDITOR": None,
+    "FINOPS_ANALYST": ORG_ROLLUPS,
+    "VIEWER": ORG_ROLLUPS,
+}
+DEFAULT_DATASETS = ORG_ROLLUPS  # unknown roles get the most restricted view
+
+
+@dataclass(frozen=True)
+class Entitlement:
+    """Datasets a role may read (None = all) and portfolios its rows are limited to (None = all)"""
+
+    role: str
+    datasets: Optional[FrozenSet[str]] = None
+    portfolios: Optional[FrozenSet[str]] = None
+
+    def visible(self, name: str) -> bool:
+        return self.datasets is None or name in self.datasets
+
+    def org_wide(self, name: str) -> bool:
+        """Whether the dataset may be read unscoped, for data with no portfolio to filter on"""
+        return self.visible(name) and self.portfolios is None
+
+    def rows(self, frame: pd.DataFrame) -> Optional[np.ndarray]:
+        """Positions of the rows in scope; None when every row is"""
+        if self.portfolios is None or SCOPE_COLUMN not in frame:
+            return None
+        return np.flatnonzero(frame[SCOPE_COLUMN].isin(self.portfolios).to_numpy())
+
+
+def _names(value: Any) -> Optional[FrozenSet[str]]:
+    return None if value is None else frozenset(str(v) for v in value)
+
+
+def _apply(base: Entitlement, grant: Mapping[str, Any]) -> Entitlement:
+    """`base` with the keys present in a file entry overriding it"""
+    changes = {key: _names(grant[key]) for key in ("datasets", "portfolios") if key in grant}
+    return replace(base, **changes) if changes else base
+
+
+class EntitlementModel:
+    """Role and user grants, swapped as a whole when the entitlements file changes"""
+
+    def __init__(self, roles: Optional[Mapping[str, Mapping[str, Any]]] = None,
+                 users: Optional[Mapping[str, Mapping[str, Any]]] = None, path: str = ""):
+        self.path = path
+        self.version = 0
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        # (role entitlements, user grants, user entitlements resolved so far)
+        self._grants: Tuple[Dict[str, Entitlement], Dict[str, Mapping], Dict[Tuple[str, str], Entitlement]] = ({}, {}, {})
+        if path:
+            self.reload()
+        else:
+            self.update(roles or {}, users or {})
+
+    @classmethod
+    def from_settings(cls, settings) -> "EntitlementModel":
+        return cls(path=settings.entitlements_file)
+
+    def update(self, roles: Mapping[str, Mapping[str, Any]], users: Mapping[str, Mapping[str, Any]]) -> int:
+        """Replace every grant; returns the new version"""
+        by_role = {role: Entitlement(role, datasets) for role, datasets in ROLE_DATASETS.items()}
+        for role, grant in roles.items():
+            by_role[role] = _apply(by_role.get(role, Entitlement(role, DEFAULT_DATASETS)), grant)
+        with self._lock:
+            self._grants = (by_role, dict(users), {})
+            self.version += 1
+            return self.version
+
+    def reload(self) -> bool:
+        """Re-read the entitlements file if it changed since the last read"""
+        if not self.path:
+            return False
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            logger.warning("Entitlements file %s not found; keeping the current grants", self.path)
+            return False
+        if mtime == self._mtime:
+            return False
+        with open(self.path, "r", encoding="utf-8") as fp:
+            if self.path.endswith((".yaml", ".yml")):
+                if yaml is None:
+                    raise RuntimeError("PyYAML is required for a YAML entitlements file")
+                entries = yaml.safe_load(fp) or {}
+            else:
+                entries = json.load(fp)
+        self._mtime = mtime
+        self.update(entries.get("roles") or {}, entries.get("users") or {})
+        return True
+
+    def for_user(self, user: Mapping[str, Any]) -> Entitlement:
+        """The entitlement a signed-in user reads with; a dictionary lookup"""
+        by_role, by_user, resolved = self._grants
+        role = user.get("role") or ""
+        entitlement = by_role.get(role) or Entitlement(role, DEFAULT_DATASETS)
+        grant = by_user.get(user.get("username"))
+        if grant is None:
+            return entitlement
+        # A user grant applies on top of whichever role the user signs in with
+        key = (user.get("username"), role)
+        if key not in resolved:
+            resolved[key] = _apply(entitlement, grant)
+        return resolved[key]
+
+    def entitlements(self) -> List[Entitlement]:
+        """Every role's entitlement plus those of users seen since the last change, to project ahead of time"""
+        by_role, _, resolved = self._grants
+        return list(dict.fromkeys([*by_role.values(), *resolved.values()]))
+
+    def describe(self) -> pd.DataFrame:
+        """One row per role grant, for the admin diagnostics"""
+        by_role = self._grants[0]
+
+        def label(names: Optional[Iterable[str]]) -> str:
+            return "all" if names is None else ", ".join(sorted(names)) or "none"
+
+        return pd.DataFrame(
+            [(e.role, label(e.datasets), label(e.portfolios)) for e in by_role.values()],
+            columns=["role", "datasets", "portfolios"],
+        )
@@ -0,0 +1,345 @@
+"""
+Evidence Archive
+================
+Columnar cold storage of compliance and findings snapshots for audit evidence.
+
+- A snapshot streams a dataset out of the database in batches and writes
+  zstd Parquet partitioned Hive-style by date and OU
+  (`<dataset>/date=YYYY-MM-DD/ou=<OU>/part-N.parquet`); re-running a day
+  replaces that day's partition
+- ARCHIVE_DIR is a local path or any pyarrow filesystem URI
+  (`s3://bucket/prefix`), so old snapshots can live in object storage
+- Reads go through pyarrow.dataset: a date range prunes whole partitions and
+  only the projected columns are decoded, one record batch at a time
+- CSV and XLSX exports are generated from a partition batch by batch
+  (xlsxwriter constant_memory mode, a new sheet every 1,048,575 rows), so
+  memory stays bounded however large the organization is
+
+pyarrow is optional; without it the archive is disabled.
+"""
+
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional, Sequence
+from urllib.parse import quote
+
+import pandas as pd
+
+from database import Database
+from kics_ingest import SEVERITIES
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pa_fs
+    import pyarrow.parquet as pq
+except ImportError:  # archive and exports disabled
+    pa = None
+
+AVAILABLE = pa is not None
+
+COMPLIANCE = "compliance"
+FINDINGS = "findings"
+DATASETS = (FINDINGS, COMPLIANCE)
+
+CSV = "csv"
+XLSX = "xlsx"
+EXPORT_FORMATS = (CSV, XLSX)
+
+UNASSIGNED = "Unassigned"
+BATCH_ROWS = 65536
+XLSX_MAX_ROWS = 1_048_576  # per sheet, header included
+
+# Archived columns per dataset (the date and OU are partition keys)
+COLUMNS = {
+    COMPLIANCE: [
+        ("account_id", "string"), ("account_name", "string"), ("portfolio", "string"), ("region", "string"),
+        ("rule_name", "string"), ("compliance_type", "string"), ("non_compliant_resources", "int64"),
+        ("evaluated_at", "timestamp"), ("updated_at", "timestamp"),
+    ],
+    FINDINGS: [
+        ("source", "string"), ("account_id", "string"), ("region", "string"), ("rule_name", "string"),
+        ("severity", "string"), ("resource_type", "string"), ("resource_id", "string"),
+        ("first_seen", "timestamp"), ("last_seen", "timestamp"),
+    ],
+}
+
+_SEVERITY_NAME = f"CASE severity_rank {' '.join(f'WHEN {r} THEN {s!r}' for r, s in enumerate(SEVERITIES))} END"
+
+# Each query returns the OU first and is ordered by it, so one Parquet writer is open at a time
+_QUERIES = {
+    COMPLIANCE: """
+        SELECT COALESCE(a.ou, 'Unassigned'), c.account_id, COALESCE(a.name, ''),
+               COALESCE(a.portfolio, 'Unassigned'), c.region, c.rule_name, c.compliance_type,
+               c.non_compliant_resources, c.evaluated_at, c.updated_at
+        FROM config_compliance c
+        LEFT JOIN accounts a ON a.account_id = c.account_id
+        ORDER BY 1
+    """,
+    FINDINGS: f"""
+        SELECT ou, source, account_id, region, rule_name, {_SEVERITY_NAME}, resource_type, resource_id,
+               first_seen, last_seen
+        FROM findings
+        ORDER BY ou
+    """,
+}
+
+
+def _arrow_type(kind: str):
+    return {"string": pa.string(), "int64": pa.int64(), "timestamp": pa.timestamp("ms", tz="UTC")}[kind]
+
+
+def schema(dataset: str):
+    """Arrow schema of one archived dataset, without the partition keys"""
+    return pa.schema([(name, _arrow_type(kind)) for name, kind in COLUMNS[dataset]])
+
+
+def _partitioning():
+    return ds.partitioning(pa.schema([("date", pa.string()), ("ou", pa.string())]), flavor="hive")
+
+
+def today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+@dataclass
+class ExportResult:
+    """A finished export file"""
+
+    path: str
+    rows: int
+    bytes: int
+    wall_time_s: float
+
+
+class EvidenceArchive:
+    """Date / OU partitioned Parquet snapshots with lazy reads and bounded-memory exports"""
+
+    def __init__(self, uri: str, export_dir: str = "data/exports"):
+        if pa is None:
+            raise RuntimeError("pyarrow is required for the evidence archive")
+        if "://" in uri:
+            self.fs, self.root = pa_fs.FileSystem.from_uri(uri)
+        else:
+            self.fs, self.root = pa_fs.LocalFileSystem(), os.path.abspath(uri).replace(os.sep, "/")
+        self.root = self.root.rstrip("/")
+        self.export_dir = export_dir
+
+    @classmethod
+    def from_settings(cls, settings) -> "EvidenceArchive":
+        return cls(settings.archive_dir, settings.export_dir)
+
+    def _path(self, *parts: str) -> str:
+        return "/".join((self.root, *parts))
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def _batch(self, dataset: str, columns: Sequence[tuple]):
+        arrays = []
+        for (name, kind), values in zip(COLUMNS[dataset], columns):
+            if kind == "timestamp":
+                millis = pc.multiply(pa.array(values, pa.float64()), 1000).cast(pa.int64(), safe=False)
+                arrays.append(millis.cast(_arrow_type(kind)))
+            else:
+                arrays.append(pa.array(values, _arrow_type(kind)))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema(dataset))
+
+    def snapshot(self, db: Database, dataset: str, date: Optional[str] = None,
+                 batch_size: int = BATCH_ROWS) -> int:
+        """Write today's (or `date`'s) partition of a dataset from the database; returns rows written"""
+        date = date or today()
+        staging = self._path(dataset, f"_staging-{date}")
+        self.fs.create_dir(staging)
+        self.fs.delete_dir_contents(staging)
+        writer, current, rows, parts = None, None, 0, {}
+        try:
+            for batch_rows in db.iter_query(_QUERIES[dataset], batch_size=batch_size):
+                columns = list(zip(*batch_rows))
+                ous, batch = columns[0], self._batch(dataset, columns[1:])
+                start = 0
+                # Rows arrive ordered by OU, so each run of equal OUs is one slice
+                for index in range(1, len(ous) + 1):
+                    if index < len(ous) and ous[index] == ous[start]:
+                        continue
+                    ou = ous[start] or UNASSIGNED
+                    if ou != current:
+                        if writer is not None:
+                            writer.close()
+                        directory = f"{staging}/ou={quote(ou, safe='')}"
+                        self.fs.create_dir(directory)
+                        # '' and 'Unassigned' sort apart but share a directory
+                        parts[ou] = parts.get(ou, -1) + 1
+                        writer = pq.ParquetWriter(f"{directory}/part-{parts[ou]}.parquet", schema(dataset),
+                                                  filesystem=self.fs, compression="zstd")
+                        current = ou
+                    writer.write_batch(batch.slice(start, index - start))
+                    start = index
+                rows += len(ous)
+        finally:
+            if writer is not None:
+                writer.close()
+        self._publish(staging, self._path(dataset, f"date={date}"))
+        for fmt in EXPORT_FORMATS:
+            # Exports of the replaced partition are stale
+            stale = self.export_path(dataset, date, fmt)
+            if os.path.exists(stale):
+                os.remove(stale)
+        return rows
+
+    def _publish(self, staging: str, target: str):
+        """Replace a date partition with a fully written staging directory"""
+        if self.fs.get_file_info(target).type != pa_fs.FileType.NotFound:
+            self.fs.delete_dir(target)
+        # File by file, because object stores cannot rename directories
+        for info in self.fs.get_file_info(pa_fs.FileSelector(staging, recursive=True)):
+            if info.type == pa_fs.FileType.File:
+                destination = target + info.path[len(staging):]
+                self.fs.create_dir(destination.rsplit("/", 1)[0])
+                self.fs.move(info.path, destination)
+        self.fs.delete_dir(staging)
+
+    def snapshot_all(self, db: Database, date: Optional[str] = None) -> dict:
+        """One partition of every dataset; returns rows written per dataset"""
+        return {dataset: self.snapshot(db, dataset, date) for dataset in DATASETS}
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def partitions(self, dataset: str) -> List[str]:
+        """Archived dates of a dataset, newest first (a directory listing, no file reads)"""
+        selector = pa_fs.FileSelector(self._path(dataset), allow_not_found=True)
+        return sorted(
+            (info.base_name[len("date="):] for info in self.fs.get_file_info(selector)
+             if info.type == pa_fs.FileType.Directory and info.base_name.startswith("date=")),
+            reverse=True,
+        )
+
+    def scan(self, dataset: str, start: Optional[str] = None, end: Optional[str] = None,
+             columns: Optional[List[str]] = None, ous: Sequence[str] = (),
+             batch_size: int = BATCH_ROWS) -> Iterator:
+        """Record batches of the partitions between `start` and `end` (ISO dates, inclusive)"""
+        if not self.partitions(dataset):
+            return
+        expression = None
+        for clause in (
+            ds.field("date") >= start if start else None,
+            ds.field("date") <= end if end else None,
+            ds.field("ou").isin(list(ous)) if ous else None,
+        ):
+            if clause is not None:
+                expression = clause if expression is None else expression & clause
+        source = ds.dataset(self._path(dataset), filesystem=self.fs, format="parquet", partitioning=_partitioning())
+        # Minimal readahead: a slow consumer (the XLSX writer) must not let decoded batches pile up
+        yield from source.to_batches(columns=columns, filter=expression, batch_size=batch_size,
+                                     batch_readahead=1, fragment_readahead=1, use_threads=False,
+                                     fragment_scan_options=ds.ParquetFragmentScanOptions(pre_buffer=False))
+
+    def group_counts(self, dataset: str, keys: List[str], start: Optional[str] = None,
+                     end: Optional[str] = None) -> pd.DataFrame:
+        """Row counts per `keys` over a date range, aggregated one batch at a time"""
+        partials = [
+            pa.Table.from_batches([batch]).group_by(keys).aggregate([([], "count_all")])
+            for batch in self.scan(dataset, start, end, columns=keys) if batch.num_rows
+        ]
+        if not partials:
+            return pd.DataFrame(columns=[*keys, "rows"])
+        merged = pa.concat_tables(partials).group_by(keys).aggregate([("count_all", "sum")])
+        return merged.rename_columns([*keys, "rows"]).to_pandas().sort_values(keys, ignore_index=True)
+
+    def history(self, dataset: str, days: int) -> pd.DataFrame:
+        """Per-day rollup of the last `days` of partitions, for the Trends tab
+
+        Findings: open findings per severity. Compliance: score per OU.
+        """
+        start = (datetime.now(timezone.utc).date() - timedelta(days=days)).isoformat()
+        if dataset == FINDINGS:
+            counts = self.group_counts(FINDINGS, ["date", "severity"], start)
+            return counts.pivot(index="date", columns="severity", values="rows").fillna(0).astype(int)
+        counts = self.group_counts(COMPLIANCE, ["date", "ou", "compliance_type"], start)
+        evaluated = counts[counts["compliance_type"].isin(["COMPLIANT", "NON_COMPLIANT"])]
+        totals = evaluated.groupby(["date", "ou"])["rows"].sum()
+        compliant = evaluated[evaluated["compliance_type"] == "COMPLIANT"].groupby(["date", "ou"])["rows"].sum()
+        score = (100.0 * compliant.reindex(totals.index, fill_value=0) / totals.clip(lower=1)).round(1)
+        return score.unstack("ou")
+
+    # ------------------------------------------------------------------
+    # Exports
+    # ------------------------------------------------------------------
+
+    def export_path(self, dataset: str, date: str, fmt: str) -> str:
+        return os.path.join(self.export_dir, f"{dataset}-{date}.{fmt}")
+
+    def export_ready(self, dataset: str, date: str, fmt: str) -> Optional[str]:
+        path = self.export_path(dataset, date, fmt)
+        return path if os.path.exists(path) else None
+
+    def export(self, dataset: str, date: str, fmt: str) -> ExportResult:
+        """Write one archived partition to CSV or XLSX without loading it whole"""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"unknown export format {fmt!r}")
+        started = time.perf_counter()
+        path = self.export_path(dataset, date, fmt)
+        os.makedirs(self.export_dir, exist_ok=True)
+        partial = f"{path}.partial"
+        columns = ["date", "ou", *(name for name, _ in COLUMNS[dataset])]
+        batches = self.scan(dataset, date, date, columns=columns)
+        rows = self._write_csv(partial, dataset, columns, batches) if fmt == CSV else \
+            self._write_xlsx(partial, dataset, columns, batches)
+        os.replace(partial, path)
+        return ExportResult(path, rows, os.path.getsize(path), time.perf_counter() - started)
+
+    def _write_csv(self, path: str, dataset: str, columns: List[str], batches) -> int:
+        fields = [pa.field("date", pa.string()), pa.field("ou", pa.string()), *schema(dataset)]
+        rows = 0
+        with pa_csv.CSVWriter(path, pa.schema(fields)) as writer:
+            for batch in batches:
+                writer.write_batch(batch.select(columns))
+                rows += batch.num_rows
+        return rows
+
+    def _write_xlsx(self, path: str, dataset: str, columns: List[str], batches) -> int:
+        import xlsxwriter
+        workbook = xlsxwriter.Workbook(path, {"constant_memory": True})  # rows are flushed as written
+        header = workbook.add_format({"bold": True})
+        timestamp = workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+        sheet, row, rows = None, XLSX_MAX_ROWS, 0
+        try:
+            for batch in batches:
+                values, kinds = [], []
+                for column in batch.select(columns).columns:
+                    if pa.types.is_timestamp(column.type):
+                        # Excel serial days, computed per column instead of per datetime cell
+                        column = pc.add(pc.divide(column.cast(pa.int64()), 86400000.0), 25569.0)
+                    values.append(column.to_pylist())
+                    kinds.append(timestamp if pa.types.is_floating(column.type) else
+                                 str if pa.types.is_string(column.type) else None)
+                for record in zip(*values):
+                    if row == XLSX_MAX_ROWS:
+                        sheet = workbook.add_worksheet(f"{dataset} {len(workbook.worksheets()) + 1}")
+                        sheet.write_row(0, 0, columns, header)
+                        sheet.freeze_panes(1, 0)
+                        write_string, write_number, row = sheet.write_string, sheet.write_number, 1
+                    # Typed writers skip write()'s per-cell type sniffing and URL matching
+                    for col, (value, kind) in enumerate(zip(record, kinds)):
+                        if value is None:
+                            continue
+                        if kind is str:
+                            write_string(row, col, value)
+                        elif kind is None:
+                            write_number(row, col, value)
+                        else:
+                            write_number(row, col, value, kind)
+                    row += 1
+                rows += batch.num_rows
+            if sheet is None:
+                workbook.add_worksheet(dataset).write_row(0, 0, columns, header)
+        finally:
+            workbook.close()
+        return rows
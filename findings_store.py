@@ -0,0 +1,293 @@
+"""
+Findings Store
+==============
+Resource-level non-compliant findings, queried one page at a time.
+
+- One row per (source, account, region, rule, resource); `first_seen`
+  survives re-syncs so findings can be filtered and sorted by age
+- Filters (account, OU, rule, severity, age, resource prefix) become WHERE
+  clauses; sorting and LIMIT / OFFSET run in the database, so a page costs
+  the same whether the table holds a thousand rows or a million
+- Every filterable column leads a composite (column, first_seen,
+  finding_id) index, which is also the ORDER BY, so a filtered or sorted
+  page is an index range scan that stops after LIMIT rows
+- Facet values for the filter widgets come from DISTINCT scans of those
+  indexes
+
+Severity is stored as its rank in kics_ingest.SEVERITIES (0 = CRITICAL), so
+sorting by severity is an integer sort.
+"""
+
+import hashlib
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import pandas as pd
+
+from aws_collector import CollectionReport
+from database import Database
+from kics_ingest import SEVERITIES, SEVERITY_RANK
+
+CONFIG = "config"
+DEMO = "demo"
+
+DEFAULT_SEVERITY = "MEDIUM"
+# Config rules carry no severity of their own
+RULE_SEVERITY: Dict[str, str] = {
+    "s3-bucket-server-side-encryption-enabled": "HIGH",
+    "ec2-imdsv2-check": "MEDIUM",
+    "rds-storage-encrypted": "HIGH",
+    "ebs-encrypted-volumes": "MEDIUM",
+    "iam-password-policy": "LOW",
+}
+
+PAGE_COLUMNS = ["account_id", "ou", "region", "rule_name", "severity", "resource_type", "resource_id",
+                "first_seen", "last_seen"]
+SORT_COLUMNS = {
+    "first_seen": "first_seen",
+    "last_seen": "last_seen",
+    "severity": "severity_rank",
+    "account_id": "account_id",
+    "ou": "ou",
+    "rule_name": "rule_name",
+    "resource_id": "resource_id",
+}
+FACET_COLUMNS = ("account_id", "ou", "rule_name")
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS findings (
+        finding_id TEXT PRIMARY KEY,
+        source TEXT NOT NULL,
+        account_id TEXT NOT NULL,
+        ou TEXT NOT NULL DEFAULT '',
+        region TEXT NOT NULL DEFAULT '',
+        rule_name TEXT NOT NULL,
+        severity_rank INTEGER NOT NULL,
+        resource_type TEXT NOT NULL DEFAULT '',
+        resource_id TEXT NOT NULL,
+        first_seen DOUBLE PRECISION NOT NULL,
+        last_seen DOUBLE PRECISION NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_findings_first_seen ON findings (first_seen, finding_id)",
+    "CREATE INDEX IF NOT EXISTS ix_findings_account ON findings (account_id, first_seen, finding_id)",
+    "CREATE INDEX IF NOT EXISTS ix_findings_ou ON findings (ou, first_seen, finding_id)",
+    "CREATE INDEX IF NOT EXISTS ix_findings_rule ON findings (rule_name, first_seen, finding_id)",
+    "CREATE INDEX IF NOT EXISTS ix_findings_severity ON findings (severity_rank, first_seen, finding_id)",
+    "CREATE INDEX IF NOT EXISTS ix_findings_resource ON findings (resource_id, first_seen, finding_id)",
+    "CREATE INDEX IF NOT EXISTS ix_findings_source ON findings (source, account_id, region)",
+]
+
+_UPSERT_FINDING = """
+    INSERT INTO findings (finding_id, source, account_id, ou, region, rule_name, severity_rank,
+                          resource_type, resource_id, first_seen, last_seen)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (finding_id) DO UPDATE SET
+        ou = excluded.ou,
+        severity_rank = excluded.severity_rank,
+        resource_type = excluded.resource_type,
+        last_seen = excluded.last_seen
+"""
+
+
+def finding_id(source: str, account_id: str, region: str, rule_name: str, resource_id: str) -> str:
+    key = "\x1f".join((source, account_id, region, rule_name, resource_id))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def rule_severity(rule_name: str) -> int:
+    return SEVERITY_RANK[RULE_SEVERITY.get(rule_name, DEFAULT_SEVERITY)]
+
+
+@dataclass(frozen=True)
+class FindingsFilter:
+    """Column filters pushed down into the WHERE clause; hashable for caching"""
+
+    accounts: Tuple[str, ...] = ()
+    ous: Tuple[str, ...] = ()
+    rules: Tuple[str, ...] = ()
+    severities: Tuple[str, ...] = ()
+    min_age_days: Optional[float] = None
+    max_age_days: Optional[float] = None
+    resource_prefix: str = ""
+
+    def where(self, now: Optional[float] = None) -> Tuple[str, list]:
+        now = time.time() if now is None else now
+        clauses, params = [], []
+        for column, values in (("account_id", self.accounts), ("ou", self.ous), ("rule_name", self.rules)):
+            if values:
+                clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        if self.severities:
+            clauses.append(f"severity_rank IN ({', '.join('?' * len(self.severities))})")
+            params.extend(SEVERITY_RANK[s] for s in self.severities)
+        if self.min_age_days is not None:
+            clauses.append("first_seen <= ?")
+            params.append(now - self.min_age_days * 86400)
+        if self.max_age_days is not None:
+            clauses.append("first_seen >= ?")
+            params.append(now - self.max_age_days * 86400)
+        if self.resource_prefix:
+            # A range rather than LIKE, so both dialects can use the resource_id index
+            clauses.append("resource_id >= ? AND resource_id < ?")
+            params.extend((self.resource_prefix, self.resource_prefix + "\uffff"))
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+
+@dataclass
+class FindingsPage:
+    """One page of findings plus what the pager needs"""
+
+    rows: pd.DataFrame
+    total: int
+    page: int
+    page_size: int
+
+    @property
+    def pages(self) -> int:
+        return max(1, math.ceil(self.total / self.page_size))
+
+    @property
+    def first_row(self) -> int:
+        return (self.page - 1) * self.page_size + 1 if self.total else 0
+
+    @property
+    def last_row(self) -> int:
+        return min(self.total, self.page * self.page_size)
+
+
+class FindingsStore:
+    """Indexed resource-level findings with server-side filtering and paging"""
+
+    def __init__(self, db: Database):
+        self.db = db
+        self.db.executescript(SCHEMA)
+
+    # ------------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------------
+
+    def replace_scope(self, source: str, account_id: str, region: str, findings: Iterable[Mapping],
+                      ou: str = "", now: Optional[float] = None, conn=None) -> Tuple[int, int]:
+        """Make one account/region's findings exactly `findings`; returns (upserted, resolved)
+
+        Each finding needs rule_name and resource_id; resource_type and
+        severity (a SEVERITIES name) are optional.
+        """
+        if conn is None:
+            with self.db.transaction() as conn:
+                return self.replace_scope(source, account_id, region, findings, ou, now, conn)
+        now = time.time() if now is None else now
+        existing = {row[0] for row in self.db.query(
+            "SELECT finding_id FROM findings WHERE source = ? AND account_id = ? AND region = ?",
+            (source, account_id, region), conn=conn,
+        )}
+        rows = {}
+        for finding in findings:
+            fid = finding_id(source, account_id, region, finding["rule_name"], finding["resource_id"])
+            severity = finding.get("severity")
+            rows[fid] = (fid, source, account_id, ou or "", region, finding["rule_name"],
+                         SEVERITY_RANK[severity] if severity else rule_severity(finding["rule_name"]),
+                         finding.get("resource_type", ""), finding["resource_id"],
+                         finding.get("first_seen", now), now)
+        self.db.executemany(_UPSERT_FINDING, rows.values(), conn=conn)
+        resolved = [(fid,) for fid in existing if fid not in rows]
+        self.db.executemany("DELETE FROM findings WHERE finding_id = ?", resolved, conn=conn)
+        return len(rows), len(resolved)
+
+    def ingest_report(self, report: CollectionReport) -> Tuple[int, int]:
+        """Resource-level findings from a collector sweep; unchanged and failed accounts are left alone
+
+        Planner statistics are not refreshed here, since a sweep ingests in
+        batches; call `analyze()` once the sweep's last batch is in.
+        """
+        upserted = resolved = 0
+        now = time.time()
+        with self.db.transaction() as conn:
+            for result in report.results:
+                if result.error or result.unchanged:
+                    continue
+                by_region: Dict[str, List[dict]] = {result.region: []}
+                for rule in result.rules:
+                    by_region.setdefault(rule.region or result.region, []).extend(
+                        {"rule_name": rule.rule_name, **resource} for resource in rule.resources
+                    )
+                for region, findings in by_region.items():
+                    counts = self.replace_scope(CONFIG, result.account_id, region, findings,
+                                                result.ou or "", now, conn)
+                    upserted += counts[0]
+                    resolved += counts[1]
+        return upserted, resolved
+
+    def load_frame(self, source: str, frame: pd.DataFrame):
+        """Bulk-replace a whole source from a frame with PAGE_COLUMNS (demo data, benchmarks)"""
+        rows = (
+            (finding_id(source, r.account_id, r.region, r.rule_name, r.resource_id), source, r.account_id, r.ou,
+             r.region, r.rule_name, SEVERITY_RANK[r.severity], r.resource_type, r.resource_id,
+             float(r.first_seen), float(r.last_seen))
+            for r in frame.itertuples(index=False)
+        )
+        with self.db.transaction() as conn:
+            self.db.execute("DELETE FROM findings WHERE source = ?", (source,), conn=conn)
+            self.db.executemany(_UPSERT_FINDING, rows, conn=conn)
+        self.analyze()
+
+    def analyze(self):
+        """Refresh planner statistics so filters pick the most selective index"""
+        self.db.execute("ANALYZE findings")
+
+    def clear_source(self, source: str) -> int:
+        return self.db.execute("DELETE FROM findings WHERE source = ?", (source,))
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def count(self, filters: FindingsFilter = FindingsFilter(), source: Optional[str] = None) -> int:
+        where, params = filters.where()
+        if source is not None:
+            where = f"{where} AND source = ?" if where else "WHERE source = ?"
+            params.append(source)
+        row = self.db.query_one(f"SELECT COUNT(*) FROM findings {where}", params)
+        return int(row[0]) if row else 0
+
+    def page(self, filters: FindingsFilter = FindingsFilter(), sort: str = "first_seen",
+             descending: bool = False, page: int = 1, page_size: int = 50,
+             total: Optional[int] = None) -> FindingsPage:
+        """One sorted page of the filtered findings
+
+        Pass `total` when the filtered count is already known (it does not
+        change while paging) to skip the COUNT query.
+        """
+        order = SORT_COLUMNS.get(sort)
+        if order is None:
+            raise ValueError(f"cannot sort findings by {sort!r}")
+        direction = "DESC" if descending else "ASC"
+        # finding_id breaks ties, so pages never overlap when a sync stamps many rows at once
+        keys = [order, "first_seen", "finding_id"] if order != "first_seen" else ["first_seen", "finding_id"]
+        page = max(1, page)
+        where, params = filters.where()
+        frame = self.db.query_frame(
+            "SELECT account_id, ou, region, rule_name, severity_rank, resource_type, resource_id, "
+            f"first_seen, last_seen FROM findings {where} "
+            f"ORDER BY {', '.join(f'{key} {direction}' for key in keys)} LIMIT ? OFFSET ?",
+            [*params, page_size, (page - 1) * page_size], columns=PAGE_COLUMNS,
+        )
+        frame["severity"] = [SEVERITIES[rank] for rank in frame["severity"]]
+        for column in ("first_seen", "last_seen"):
+            frame[column] = pd.to_datetime(frame[column], unit="s", utc=True)
+        return FindingsPage(frame, self.count(filters) if total is None else total, page, page_size)
+
+    def facets(self, ous: Optional[Tuple[str, ...]] = None) -> Dict[str, List[str]]:
+        """Distinct account, OU and rule values for the filter widgets, only those within `ous` if given"""
+        if ous is not None and not ous:
+            return {column: [] for column in FACET_COLUMNS}
+        where, params = FindingsFilter(ous=ous or ()).where()
+        return {
+            column: [row[0] for row in self.db.query(
+                f"SELECT DISTINCT {column} FROM findings {where} ORDER BY {column}", params)]
+            for column in FACET_COLUMNS
+        }
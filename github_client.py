@@ -0,0 +1,353 @@
+"""
+GitHub Client
+=============
+Async ingestion of pull requests, check runs and workflow runs for the
+policy repository.
+
+- One pooled httpx.AsyncClient per sync (HTTP/2 when `h2` is installed);
+  a semaphore caps concurrent requests at GITHUB_CONCURRENCY
+- Paginated lists fetch page 1, read the last page from the Link header and
+  fetch the remaining pages concurrently
+- Every GET sends If-None-Match with the stored ETag; a 304 reuses the
+  stored body and does not count against the primary rate limit
+- Stored ETags are read per URL as a sync requests it, and entries no sync
+  has requested for ETAG_RETENTION_S (old commits, past date windows) are
+  pruned after each sync
+- Primary (x-ratelimit-remaining) and secondary (retry-after / 403 abuse)
+  limits are honoured by waiting, never by failing the sync
+- Successful push / manual runs of the deployment workflows are reported as
+  policy deployments for the Trends tab
+"""
+
+import asyncio
+import json
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+import httpx
+
+from aws_collector import format_age
+from database import Database
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 multiplexing in httpx)
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+PER_PAGE = 100
+MAX_ATTEMPTS = 5
+SECONDARY_LIMIT_WAIT = 60.0  # GitHub's advice when no retry-after is given
+ETAG_RETENTION_S = 7 * 86400  # stored responses not requested for this long are dropped
+
+# Deployment series -> text in the workflow file path or name
+DEPLOYMENT_WORKFLOWS = {"scp": "scp-deployment", "config_rules": "config-rules", "opa": "opa"}
+DEPLOY_EVENTS = ("push", "workflow_dispatch")  # pull request runs only plan
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS http_etags (
+        url TEXT PRIMARY KEY,
+        etag TEXT NOT NULL,
+        body TEXT NOT NULL,
+        link TEXT NOT NULL DEFAULT '',
+        fetched_at DOUBLE PRECISION NOT NULL
+    )
+    """,
+]
+
+_UPSERT_ETAG = """
+    INSERT INTO http_etags (url, etag, body, link, fetched_at) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (url) DO UPDATE SET
+        etag = excluded.etag, body = excluded.body, link = excluded.link, fetched_at = excluded.fetched_at
+"""
+
+_LAST_PAGE = re.compile(r'<[^>]*[?&]page=(\d+)[^>]*>;\s*rel="last"')
+
+
+class GitHubError(RuntimeError):
+    """GitHub answered with a non-retryable error"""
+
+
+@dataclass
+class RequestStats:
+    """What a sync cost against the API"""
+
+    requests: int = 0
+    not_modified: int = 0
+    retries: int = 0
+    rate_limit_wait_s: float = 0.0
+
+    @property
+    def billable(self) -> int:
+        return self.requests - self.not_modified
+
+
+class ETagStore:
+    """Persistent url -> (etag, body, link header) cache, read one URL at a time"""
+
+    def __init__(self, db: Database):
+        self.db = db
+        self.db.executescript(SCHEMA)
+
+    def get(self, url: str) -> Optional[Tuple[str, str, str]]:
+        row = self.db.query_one("SELECT etag, body, link FROM http_etags WHERE url = ?", (url,))
+        return (row[0], row[1], row[2]) if row else None
+
+    def save(self, entries: Dict[str, Tuple[str, str, str]], revalidated: Iterable[str] = ()):
+        """Store fresh responses, mark 304s as still in use and prune the rest"""
+        now = time.time()
+        self.db.executemany(_UPSERT_ETAG, [(url, *entry, now) for url, entry in entries.items()])
+        self.db.executemany("UPDATE http_etags SET fetched_at = ? WHERE url = ?",
+                            [(now, url) for url in revalidated])
+        self.prune(now)
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Drop entries no sync has requested within ETAG_RETENTION_S"""
+        now = time.time() if now is None else now
+        return self.db.execute("DELETE FROM http_etags WHERE fetched_at < ?", (now - ETAG_RETENTION_S,))
+
+
+class GitHubClient:
+    """Concurrent, conditional-request client for one repository"""
+
+    def __init__(self, repo: str, token: str = "", base_url: str = "https://api.github.com",
+                 concurrency: int = 4, etags: Optional[ETagStore] = None, timeout: float = 30.0,
+                 deployment_workflows: Optional[Mapping[str, str]] = None):
+        self.repo = repo
+        self.deployment_workflows = dict(DEPLOYMENT_WORKFLOWS if deployment_workflows is None
+                                         else deployment_workflows)
+        self.token = token
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = max(1, concurrency)
+        self.etags = etags
+        self.timeout = timeout
+        self.stats = RequestStats()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._cache: Dict[str, Optional[Tuple[str, str, str]]] = {}
+        self._dirty: Dict[str, Tuple[str, str, str]] = {}
+        self._revalidated: Set[str] = set()
+        self._paused_until = 0.0
+
+    @classmethod
+    def from_settings(cls, settings, db: Optional[Database] = None) -> "GitHubClient":
+        return cls(
+            repo=settings.github_repo,
+            token=settings.github_token,
+            base_url=settings.github_api_url,
+            concurrency=settings.github_concurrency,
+            etags=ETagStore(db) if db is not None else None,
+            deployment_workflows=parse_workflows(settings.deployment_workflows) or None,
+        )
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+
+    async def __aenter__(self) -> "GitHubClient":
+        headers = {"Accept": "application/vnd.github+json", "X-GitHub-Api-Version": "2022-11-28"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url, headers=headers, timeout=self.timeout, http2=HTTP2,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.stats = RequestStats()
+        self._cache = {}
+        self._dirty = {}
+        self._revalidated = set()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._client.aclose()
+        self._client = None
+        if self.etags:
+            self.etags.save(self._dirty, self._revalidated)
+
+    async def _wait_for_pause(self):
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _pause(self, seconds: float):
+        """Hold every request (not just this one) until the limit clears"""
+        now = time.monotonic()
+        until = max(self._paused_until, now + seconds)
+        # Waiters share the pause, so only the time it was extended by is wall time lost
+        self.stats.rate_limit_wait_s += until - max(self._paused_until, now)
+        self._paused_until = until
+
+    async def get(self, path: str, params: Optional[dict] = None) -> Tuple[object, str]:
+        """GET with ETag revalidation and rate-limit backoff; returns (json, Link header)"""
+        url = str(httpx.URL(self.base_url + path, params=params))
+        if url not in self._cache:
+            self._cache[url] = self.etags.get(url) if self.etags else None
+        cached = self._cache[url]
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            await self._wait_for_pause()
+            async with self._semaphore:
+                response = await self._client.get(url, headers=headers)
+            self.stats.requests += 1
+            if response.status_code == 304 and cached:
+                self.stats.not_modified += 1
+                self._revalidated.add(url)
+                return json.loads(cached[1]), cached[2]
+            if response.status_code == 200:
+                etag = response.headers.get("etag")
+                link = response.headers.get("link", "")
+                if etag:
+                    self._cache[url] = self._dirty[url] = (etag, response.text, link)
+                return response.json(), link
+            wait = self._rate_limit_wait(response)
+            if wait is None or attempt == MAX_ATTEMPTS:
+                raise GitHubError(f"GET {path} -> {response.status_code}: {response.text[:200]}")
+            self.stats.retries += 1
+            self._pause(wait)
+        raise GitHubError(f"GET {path} failed after {MAX_ATTEMPTS} attempts")
+
+    @staticmethod
+    def _rate_limit_wait(response: httpx.Response) -> Optional[float]:
+        """Seconds to back off for a rate-limited response, None if not retryable"""
+        headers = response.headers
+        if response.status_code in (403, 429):
+            if "retry-after" in headers:
+                return float(headers["retry-after"])
+            if headers.get("x-ratelimit-remaining") == "0" and "x-ratelimit-reset" in headers:
+                return max(0.0, float(headers["x-ratelimit-reset"]) - time.time()) + 1
+            if "secondary rate limit" in response.text.lower():
+                return SECONDARY_LIMIT_WAIT
+            return None
+        return 2.0 if response.status_code in (502, 503, 504) else None
+
+    async def paginate(self, path: str, params: Optional[dict] = None, max_pages: Optional[int] = None,
+                       key: Optional[str] = None) -> List[dict]:
+        """Every item of a paginated list; pages after the first are fetched concurrently"""
+        params = {**(params or {}), "per_page": PER_PAGE}
+        first, link = await self.get(path, {**params, "page": 1})
+        match = _LAST_PAGE.search(link)
+        last = int(match.group(1)) if match else 1
+        if max_pages is not None:
+            last = min(last, max_pages)
+        rest = await asyncio.gather(*(self.get(path, {**params, "page": page}) for page in range(2, last + 1)))
+        pages = [first] + [body for body, _ in rest]
+        return [item for page in pages for item in (page[key] if key else page)]
+
+    # ------------------------------------------------------------------
+    # Endpoints
+    # ------------------------------------------------------------------
+
+    async def pull_requests(self, limit: int = 100) -> List[dict]:
+        pages = -(-limit // PER_PAGE)
+        prs = await self.paginate(f"/repos/{self.repo}/pulls",
+                                  {"state": "all", "sort": "updated", "direction": "desc"}, max_pages=pages)
+        return prs[:limit]
+
+    async def check_runs(self, sha: str) -> List[dict]:
+        body, _ = await self.get(f"/repos/{self.repo}/commits/{sha}/check-runs", {"per_page": PER_PAGE})
+        return body.get("check_runs", [])
+
+    async def workflow_runs(self, days: int = 7) -> List[dict]:
+        since = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+        return await self.paginate(f"/repos/{self.repo}/actions/runs", {"created": f">={since}"},
+                                   key="workflow_runs")
+
+    async def sync(self, pr_limit: int = 100, checks_for: int = 20, days: int = 7) -> dict:
+        """PRs, their check runs and recent workflow runs, shaped for the dashboard"""
+        async with self:
+            prs, runs = await asyncio.gather(self.pull_requests(pr_limit), self.workflow_runs(days))
+            recent = prs[:checks_for]
+            checks = await asyncio.gather(*(self.check_runs(pr["head"]["sha"]) for pr in recent))
+        return {
+            "pull_requests": [pr_summary(pr, check_runs) for pr, check_runs in zip(recent, checks)],
+            "pipeline_runs": pipeline_summary(runs, days),
+            "deployments": deployment_runs(runs, self.deployment_workflows),
+            "stats": vars(self.stats).copy(),
+        }
+
+
+# ----------------------------------------------------------------------------
+# Dashboard shapes
+# ----------------------------------------------------------------------------
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")) if value else None
+
+
+def checks_label(check_runs: List[dict]) -> str:
+    if not check_runs:
+        return "○ No checks"
+    failed = [c["name"] for c in check_runs if c.get("conclusion") in ("failure", "timed_out", "cancelled")]
+    if failed:
+        return f"✗ {failed[0]} failed" if len(failed) == 1 else f"✗ {len(failed)} checks failed"
+    if any(c.get("status") != "completed" for c in check_runs):
+        return "⏳ Running"
+    warnings = sum(1 for c in check_runs if c.get("conclusion") in ("neutral", "action_required"))
+    if warnings:
+        return f"⚠ {warnings} warning" + ("s" if warnings > 1 else "")
+    return "✓ All passed"
+
+
+def pr_summary(pr: dict, check_runs: List[dict]) -> dict:
+    checks = checks_label(check_runs)
+    if pr.get("merged_at"):
+        status = "🟢 Merged"
+    elif pr.get("state") == "closed":
+        status = "⚫ Closed"
+    elif checks.startswith("✗"):
+        status = "🔴 Failed"
+    else:
+        status = "🟡 Open"
+    return {
+        "number": f"#{pr['number']}",
+        "title": pr["title"],
+        "author": (pr.get("user") or {}).get("login", "unknown"),
+        "status": status,
+        "checks": checks,
+        "time": format_age(_parse_time(pr.get("updated_at"))),
+    }
+
+
+def parse_workflows(text: str) -> Dict[str, str]:
+    """series=pattern lists, e.g. "scp=scp-deployment,opa=opa-policies" """
+    pairs = (item.partition("=") for item in text.split(","))
+    return {series.strip(): pattern.strip().lower() for series, _, pattern in pairs if pattern.strip()}
+
+
+def deployment_runs(runs: List[dict], workflows: Mapping[str, str]) -> List[dict]:
+    """Successful deployment workflow runs as (id, series, completed_at epoch) records"""
+    deployments = []
+    for run in runs:
+        if run.get("conclusion") != "success" or run.get("event") not in DEPLOY_EVENTS:
+            continue
+        workflow = f"{run.get('path', '')} {run.get('name', '')}".lower()
+        series = next((name for name, pattern in workflows.items() if pattern in workflow), None)
+        completed = _parse_time(run.get("updated_at") or run.get("created_at"))
+        if series and completed:
+            deployments.append({"id": str(run["id"]), "series": series, "completed_at": completed.timestamp()})
+    return deployments
+
+
+def pipeline_summary(runs: List[dict], days: int = 7) -> dict:
+    """Workflow runs and failures per day, oldest day first"""
+    today = datetime.now(timezone.utc).date()
+    dates = [today - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+    totals = {d: 0 for d in dates}
+    failures = {d: 0 for d in dates}
+    for run in runs:
+        created = _parse_time(run.get("created_at"))
+        if created is None or created.date() not in totals:
+            continue
+        totals[created.date()] += 1
+        if run.get("conclusion") == "failure":
+            failures[created.date()] += 1
+    return {
+        "days": [d.strftime("%a") for d in dates],
+        "runs": [totals[d] for d in dates],
+        "failures": [failures[d] for d in dates],
+    }
@@ -0,0 +1,392 @@
+"""
+Streaming KICS Results Ingestion
+================================
+Parses KICS `results.json` and SARIF output incrementally.
+
+- The document is read in fixed-size chunks; only one finding is ever
+  decoded at a time, so memory stays bounded for multi-hundred-MB scans
+- Findings are stored column-wise: interned query and file tables plus
+  compact integer arrays for query, file and line per finding
+- The summary feeds the Policy Scans tab (severity metrics, pie chart and
+  Top Findings list)
+"""
+
+import json
+import os
+import re
+from array import array
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, TextIO
+
+import numpy as np
+import pandas as pd
+
+SEVERITIES = ("CRITICAL", "HIGH", "MEDIUM", "LOW", "INFO", "TRACE")
+SEVERITY_RANK = {name: rank for rank, name in enumerate(SEVERITIES)}
+SARIF_LEVELS = {"error": "HIGH", "warning": "MEDIUM", "note": "LOW", "none": "INFO"}
+
+CHUNK_SIZE = 1 << 20  # 1 MiB of text per read
+
+_NON_WS = re.compile(r"\S")
+_STRUCTURAL = re.compile(r'[\[\]{}"]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r"[,\]}\s]")
+_DECODER = json.JSONDecoder()
+
+
+class JsonStreamError(ValueError):
+    """Malformed or truncated JSON input"""
+
+
+class JsonStreamReader:
+    """Pull-style JSON reader over a text stream with a bounded buffer"""
+
+    def __init__(self, fp: TextIO, chunk_size: int = CHUNK_SIZE):
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._buf = ""
+        self._pos = 0
+        self.bytes_read = 0
+
+    def _fill(self) -> int:
+        """Drop consumed text, append a chunk, and return how far indexes shifted"""
+        chunk = self._fp.read(self._chunk_size)
+        if not chunk:
+            raise JsonStreamError("unexpected end of JSON input")
+        self.bytes_read += len(chunk)
+        shift = self._pos
+        self._buf = self._buf[shift:] + chunk
+        self._pos = 0
+        return shift
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of input)"""
+        if self._pos < len(self._buf) and self._buf[self._pos] not in " \t\r\n":
+            return self._buf[self._pos]
+        while True:
+            match = _NON_WS.search(self._buf, self._pos)
+            if match:
+                self._pos = match.start()
+                return self._buf[self._pos]
+            self._pos = len(self._buf)
+            try:
+                self._fill()
+            except JsonStreamError:
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise JsonStreamError(f"expected {char!r} at offset {self.bytes_read - len(self._buf) + self._pos}")
+        self._pos += 1
+
+    def consume_if(self, char: str) -> bool:
+        if self.peek() == char:
+            self._pos += 1
+            return True
+        return False
+
+    def _string_end(self, i: int) -> int:
+        """Index after the closing quote of the string opening at i"""
+        i += 1
+        while True:
+            match = _STRING_SPECIAL.search(self._buf, i)
+            if match is None:
+                i = len(self._buf)
+                i -= self._fill()
+                continue
+            i = match.start()
+            if self._buf[i] == '"':
+                return i + 1
+            # Backslash escape: make sure the escaped character is buffered
+            while i + 1 >= len(self._buf):
+                i -= self._fill()
+            i += 2
+
+    def _value_end(self) -> int:
+        """Index just past the value starting at the current position"""
+        first = self.peek()
+        i = self._pos
+        if first == '"':
+            return self._string_end(i)
+        if first in "{[":
+            depth = 0
+            while True:
+                match = _STRUCTURAL.search(self._buf, i)
+                if match is None:
+                    i = len(self._buf)
+                    i -= self._fill()
+                    continue
+                i = match.start()
+                char = self._buf[i]
+                if char == '"':
+                    i = self._string_end(i)
+                    continue
+                depth += 1 if char in "{[" else -1
+                i += 1
+                if depth == 0:
+                    return i
+        if not first:
+            raise JsonStreamError("unexpected end of JSON input")
+        while True:
+            match = _SCALAR_END.search(self._buf, i)
+            if match:
+                return match.start()
+            try:
+                i -= self._fill()
+            except JsonStreamError:
+                return len(self._buf)
+
+    def read_value(self):
+        """Decode the next value (use for small values only)"""
+        self.peek()
+        try:
+            value, end = _DECODER.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            pass  # most likely cut off at the chunk boundary
+        else:
+            # A scalar ending exactly at the buffer edge may continue in the next chunk
+            if end < len(self._buf):
+                self._pos = end
+                return value
+        end = self._value_end()
+        text = self._buf[self._pos:end]
+        self._pos = end
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as exc:
+            raise JsonStreamError(str(exc)) from exc
+
+    def skip_value(self) -> None:
+        """Skip the next value without decoding it"""
+        self._pos = self._value_end()
+
+    def iter_members(self) -> Iterator[str]:
+        """Yield object keys; the caller must consume each member's value"""
+        self.expect("{")
+        if self.consume_if("}"):
+            return
+        while True:
+            name = self.read_value()
+            self.expect(":")
+            yield name
+            if self.consume_if(","):
+                continue
+            self.expect("}")
+            return
+
+    def iter_items(self) -> Iterator[int]:
+        """Yield array positions; the caller must consume each element"""
+        self.expect("[")
+        if self.consume_if("]"):
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            if self.consume_if(","):
+                continue
+            self.expect("]")
+            return
+
+
+@dataclass
+class KicsFindings:
+    """Column-oriented KICS findings"""
+
+    queries: List[dict] = field(default_factory=list)
+    files: List[str] = field(default_factory=list)
+    query_idx: array = field(default_factory=lambda: array("I"))
+    file_idx: array = field(default_factory=lambda: array("I"))
+    line: array = field(default_factory=lambda: array("I"))
+    _file_ids: Dict[str, int] = field(default_factory=dict, repr=False)
+
+    def add_query(self, name: str = "", severity: str = "INFO", **extra) -> int:
+        self.queries.append({"name": name, "severity": severity, **extra})
+        return len(self.queries) - 1
+
+    def add(self, query: int, file_name: str, line: int) -> None:
+        file_id = self._file_ids.get(file_name)
+        if file_id is None:
+            file_id = self._file_ids[file_name] = len(self.files)
+            self.files.append(file_name)
+        self.query_idx.append(query)
+        self.file_idx.append(file_id)
+        self.line.append(max(0, int(line or 0)))
+
+    def __len__(self) -> int:
+        return len(self.query_idx)
+
+    def severity_codes(self) -> np.ndarray:
+        """Severity rank per finding (0 = CRITICAL)"""
+        per_query = np.array(
+            [SEVERITY_RANK.get(q["severity"], SEVERITY_RANK["INFO"]) for q in self.queries], dtype=np.int8,
+        )
+        if not len(self):
+            return np.zeros(0, dtype=np.int8)
+        return per_query[np.frombuffer(self.query_idx, dtype=np.uint32)]
+
+    def severity_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.severity_codes(), minlength=len(SEVERITIES))
+        return {name: int(counts[rank]) for rank, name in enumerate(SEVERITIES)}
+
+    def top(self, limit: int = 10) -> List[dict]:
+        """Highest-severity findings first, in scan order within a severity"""
+        codes = self.severity_codes()
+        order = np.lexsort((np.arange(len(codes)), codes))[:limit]
+        return [
+            {
+                "severity": self.queries[self.query_idx[i]]["severity"],
+                "query": self.queries[self.query_idx[i]]["name"],
+                "file": self.files[self.file_idx[i]],
+                "line": self.line[i],
+            }
+            for i in order
+        ]
+
+    def to_frame(self) -> pd.DataFrame:
+        query_idx = np.frombuffer(self.query_idx, dtype=np.uint32)
+        # Several queries may share a name; categories must be unique
+        name_codes, names = pd.factorize(pd.Index([q["name"] for q in self.queries]))
+        return pd.DataFrame({
+            "severity": pd.Categorical.from_codes(self.severity_codes(), SEVERITIES),
+            "query": pd.Categorical.from_codes(name_codes[query_idx] if len(query_idx) else [], names),
+            "file": pd.Categorical.from_codes(np.frombuffer(self.file_idx, dtype=np.uint32), self.files),
+            "line": np.frombuffer(self.line, dtype=np.uint32),
+        })
+
+    def failed_queries(self) -> int:
+        """Queries with at least one finding"""
+        hits = np.bincount(np.frombuffer(self.query_idx, dtype=np.uint32), minlength=len(self.queries))
+        return int(np.count_nonzero(hits))
+
+
+@dataclass
+class KicsScan:
+    """Scan-level summary plus columnar findings"""
+
+    findings: KicsFindings
+    files_scanned: int = 0
+    queries_total: int = 0
+    bytes_read: int = 0
+
+    def summary(self, top_limit: int = 10) -> dict:
+        """Shape consumed by the Policy Scans tab"""
+        return {
+            "severity_counts": self.findings.severity_counts(),
+            "severity_deltas": {},
+            "files_scanned": self.files_scanned,
+            "checks_passed": max(0, self.queries_total - self.findings.failed_queries()),
+            "top_findings": self.findings.top(top_limit),
+            "findings": self.findings,
+        }
+
+
+def _ingest_kics_json(reader: JsonStreamReader) -> KicsScan:
+    scan = KicsScan(findings=KicsFindings())
+    findings = scan.findings
+    for name in reader.iter_members():
+        if name == "queries":
+            for _ in reader.iter_items():
+                query = findings.add_query()
+                meta = findings.queries[query]
+                for member in reader.iter_members():
+                    if member == "files":
+                        for _ in reader.iter_items():
+                            entry = reader.read_value()
+                            findings.add(query, entry.get("file_name", ""), entry.get("line", 0))
+                    elif member == "query_name":
+                        meta["name"] = reader.read_value()
+                    elif member == "severity":
+                        meta["severity"] = str(reader.read_value()).upper()
+                    elif member in ("query_id", "platform", "category"):
+                        meta[member] = reader.read_value()
+                    else:
+                        reader.skip_value()
+        elif name == "files_scanned":
+            scan.files_scanned = int(reader.read_value() or 0)
+        elif name == "queries_total":
+            scan.queries_total = int(reader.read_value() or 0)
+        else:
+            reader.skip_value()
+    return scan
+
+
+def _ingest_sarif(reader: JsonStreamReader) -> KicsScan:
+    scan = KicsScan(findings=KicsFindings())
+    findings = scan.findings
+    for name in reader.iter_members():
+        if name != "runs":
+            reader.skip_value()
+            continue
+        for _ in reader.iter_items():
+            rule_queries: Dict[str, int] = {}
+            rule_names: Dict[str, str] = {}
+            for member in reader.iter_members():
+                if member == "tool":
+                    tool = reader.read_value()
+                    rules = tool.get("driver", {}).get("rules", [])
+                    scan.queries_total += len(rules)
+                    rule_names = {r.get("id", ""): r.get("name") or r.get("shortDescription", {}).get("text", "") for r in rules}
+                elif member == "results":
+                    for _ in reader.iter_items():
+                        result = reader.read_value()
+                        severity = SARIF_LEVELS.get(result.get("level", "warning"), "MEDIUM")
+                        rule_id = result.get("ruleId", "")
+                        key = f"{rule_id}:{severity}"
+                        query = rule_queries.get(key)
+                        if query is None:
+                            query = rule_queries[key] = findings.add_query(
+                                name=rule_names.get(rule_id) or result.get("message", {}).get("text", rule_id),
+                                severity=severity, query_id=rule_id,
+                            )
+                        for location in result.get("locations") or [{}]:
+                            physical = location.get("physicalLocation", {})
+                            findings.add(
+                                query,
+                                physical.get("artifactLocation", {}).get("uri", ""),
+                                physical.get("region", {}).get("startLine", 0),
+                            )
+                elif member == "artifacts":
+                    count = 0
+                    for _ in reader.iter_items():
+                        reader.skip_value()
+                        count += 1
+                    scan.files_scanned += count
+                else:
+                    reader.skip_value()
+    if not scan.files_scanned:
+        scan.files_scanned = len(findings.files)
+    return scan
+
+
+def _looks_like_sarif(path: str) -> bool:
+    if path.endswith(".sarif"):
+        return True
+    with open(path, "r", encoding="utf-8") as fp:
+        head = fp.read(4096)
+    return '"runs"' in head or "sarif" in head.lower()
+
+
+def ingest_kics(path: str, chunk_size: int = CHUNK_SIZE) -> KicsScan:
+    """Stream a KICS results.json or SARIF file into a KicsScan"""
+    parse = _ingest_sarif if _looks_like_sarif(path) else _ingest_kics_json
+    with open(path, "r", encoding="utf-8") as fp:
+        reader = JsonStreamReader(fp, chunk_size)
+        scan = parse(reader)
+        scan.bytes_read = reader.bytes_read
+    return scan
+
+
+@lru_cache(maxsize=4)
+def _cached_summary(path: str, mtime_ns: int, size: int) -> dict:
+    return ingest_kics(path).summary()
+
+
+def load_kics_summary(path: str) -> Optional[dict]:
+    """Summary for the Policy Scans tab; re-parsed only when the file changes"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return _cached_summary(path, stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,581 @@
+"""
+Notification Pipeline
+=====================
+Outbound alerts to Slack, PagerDuty, Jira and email, coalesced into digests.
+
+- Producers hand events to `Notifier.publish`; an event is stored once per
+  channel in `notification_events`, so publishing it again never re-alerts
+- Events are grouped per channel and digest window (NOTIFY_DIGEST_WINDOWS);
+  a closed window becomes one outbox message however many events it holds
+- The outbox is a table, so queued and failing messages survive restarts; a
+  message id is a hash of its channel, window and event keys, and doubles
+  as the idempotency key (PagerDuty dedup_key, Jira label, email Message-ID)
+- Delivery is async on one httpx.AsyncClient: each channel drains its own
+  queue behind a token bucket (NOTIFY_RATE_LIMITS); retryable failures back
+  off exponentially with jitter or as Retry-After says, and are
+  dead-lettered after NOTIFY_MAX_ATTEMPTS
+- A message is leased before it is sent, so overlapping runs never send it
+  twice, and a send cut short by a crash is retried once the lease expires
+
+Endpoints come from settings, so the pipeline runs unchanged against local
+HTTP / SMTP stand-ins. Slack webhooks take no idempotency key: a message
+re-sent after a crash can appear twice there.
+"""
+
+import asyncio
+import email.utils
+import hashlib
+import json
+import logging
+import random
+import smtplib
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from email.message import EmailMessage
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import httpx
+import pandas as pd
+
+from database import Database
+from kics_ingest import SEVERITIES, SEVERITY_RANK
+from region_fanout import TokenBucket, parse_limits
+
+logger = logging.getLogger(__name__)
+
+SLACK = "slack"
+PAGERDUTY = "pagerduty"
+JIRA = "jira"
+EMAIL = "email"
+
+PENDING = "pending"
+SENT = "sent"
+DEAD = "dead"
+
+DEFAULT_WINDOWS = {SLACK: 300.0, PAGERDUTY: 60.0, JIRA: 900.0, EMAIL: 900.0}
+DEFAULT_MIN_SEVERITY = {SLACK: "MEDIUM", PAGERDUTY: "CRITICAL", JIRA: "HIGH", EMAIL: "HIGH"}
+DEFAULT_RATES = {SLACK: 1.0, PAGERDUTY: 2.0, JIRA: 1.0, EMAIL: 0.5}
+DEFAULT_MAX_ATTEMPTS = 8
+BACKOFF_S = 30.0            # first retry delay; doubles per attempt
+MAX_BACKOFF_S = 3600.0
+LEASE_S = 120.0             # a claimed message is due again after this if never resolved
+BATCH = 100                 # messages one run claims per channel
+DIGEST_SUBJECTS = 10        # subjects listed per group; the rest are counted
+RETENTION_S = 30 * 86400    # event keys and sent messages kept this long
+
+PAGERDUTY_EVENTS_URL = "https://events.pagerduty.com/v2/enqueue"
+PAGERDUTY_SEVERITY = {"CRITICAL": "critical", "HIGH": "error", "MEDIUM": "warning"}
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS notification_events (
+        channel TEXT NOT NULL,
+        event_key TEXT NOT NULL,
+        window_start DOUBLE PRECISION NOT NULL,
+        severity_rank INTEGER NOT NULL,
+        payload TEXT NOT NULL,
+        message_id TEXT,
+        created_at DOUBLE PRECISION NOT NULL,
+        PRIMARY KEY (channel, event_key)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_notification_events_open ON notification_events (message_id, channel, window_start)",
+    """
+    CREATE TABLE IF NOT EXISTS notification_outbox (
+        message_id TEXT PRIMARY KEY,
+        channel TEXT NOT NULL,
+        window_start DOUBLE PRECISION NOT NULL,
+        events INTEGER NOT NULL,
+        severity_rank INTEGER NOT NULL,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at DOUBLE PRECISION NOT NULL,
+        last_error TEXT NOT NULL DEFAULT '',
+        created_at DOUBLE PRECISION NOT NULL,
+        sent_at DOUBLE PRECISION
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_notification_outbox_due ON notification_outbox (status, channel, next_attempt_at)",
+    """
+    CREATE TABLE IF NOT EXISTS notification_cursors (
+        source TEXT PRIMARY KEY,
+        position DOUBLE PRECISION NOT NULL
+    )
+    """,
+]
+
+_INSERT_EVENT = """
+    INSERT INTO notification_events (channel, event_key, window_start, severity_rank, payload, created_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (channel, event_key) DO NOTHING
+"""
+
+_INSERT_MESSAGE = """
+    INSERT INTO notification_outbox (message_id, channel, window_start, events, severity_rank, payload,
+                                     status, next_attempt_at, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (message_id) DO NOTHING
+"""
+
+_UPSERT_CURSOR = """
+    INSERT INTO notification_cursors (source, position) VALUES (?, ?)
+    ON CONFLICT (source) DO UPDATE SET position = excluded.position
+"""
+
+SUMMARY_COLUMNS = ["channel", "status", "messages", "events", "oldest_age_s"]
+
+
+def parse_severities(text: str) -> Dict[str, str]:
+    """'slack=MEDIUM, pagerduty=CRITICAL' -> {'slack': 'MEDIUM', 'pagerduty': 'CRITICAL'}"""
+    pairs = (item.partition("=") for item in text.split(","))
+    return {name.strip(): value.strip().upper() for name, _, value in pairs if value.strip().upper() in SEVERITY_RANK}
+
+
+def _rank(severity: str) -> int:
+    return SEVERITY_RANK.get(severity.upper(), len(SEVERITIES))
+
+
+@dataclass
+class Event:
+    """Something worth telling people about; `key` identifies it however often it is published"""
+
+    key: str
+    source: str
+    severity: str
+    group: str                  # what a digest groups on, e.g. the Config rule
+    subject: str                # what it happened to, e.g. "123456789012 us-east-1"
+    detail: str = ""
+    occurred_at: float = field(default_factory=time.time)
+
+
+@dataclass
+class Digest:
+    """One channel's events for one window, grouped for reading"""
+
+    channel: str
+    window_start: float
+    events: int
+    severity: str
+    groups: List[dict]
+
+    @classmethod
+    def build(cls, channel: str, window_start: float, events: Iterable[Event]) -> "Digest":
+        groups: Dict[Tuple[str, str], dict] = {}
+        count, top = 0, len(SEVERITIES)
+        for event in sorted(events, key=lambda e: (_rank(e.severity), e.occurred_at)):
+            count += 1
+            top = min(top, _rank(event.severity))
+            group = groups.setdefault((event.source, event.group), {
+                "source": event.source, "group": event.group, "severity": event.severity.upper(),
+                "count": 0, "subjects": [],
+            })
+            group["count"] += 1
+            if len(group["subjects"]) < DIGEST_SUBJECTS:
+                group["subjects"].append(event.subject)
+        ordered = sorted(groups.values(), key=lambda g: (_rank(g["severity"]), -g["count"], g["group"]))
+        return cls(channel, window_start, count, SEVERITIES[top] if top < len(SEVERITIES) else "INFO", ordered)
+
+    @property
+    def title(self) -> str:
+        if len(self.groups) == 1:
+            group = self.groups[0]
+            return f"[{self.severity}] {group['group']}: {group['count']:,} affected"
+        return f"[{self.severity}] {self.events:,} guardrail alerts across {len(self.groups)} checks"
+
+    def lines(self) -> List[str]:
+        lines = []
+        for group in self.groups:
+            more = group["count"] - len(group["subjects"])
+            subjects = ", ".join(group["subjects"]) + (f" and {more:,} more" if more > 0 else "")
+            lines.append(f"{group['severity']} {group['source']} / {group['group']} ({group['count']:,}): {subjects}")
+        return lines
+
+
+class DeliveryError(Exception):
+    """A send failed; retryable failures wait `retry_after_s` when the endpoint gave one"""
+
+    def __init__(self, message: str, retryable: bool = True, retry_after_s: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after_s = retry_after_s
+
+
+def _check(response: httpx.Response) -> None:
+    if response.status_code < 300:
+        return
+    retry_after = response.headers.get("retry-after")
+    try:
+        retry_after_s = float(retry_after) if retry_after else None
+    except ValueError:
+        retry_after_s = None
+    retryable = response.status_code in (408, 429) or response.status_code >= 500
+    raise DeliveryError(f"HTTP {response.status_code}: {response.text[:200]}", retryable, retry_after_s)
+
+
+# ----------------------------------------------------------------------------
+# Channels
+# ----------------------------------------------------------------------------
+
+class Channel(ABC):
+    """One destination; `send` raises DeliveryError when the message did not land"""
+
+    @abstractmethod
+    async def send(self, client: httpx.AsyncClient, message_id: str, digest: Digest, attempt: int) -> None:
+        """Deliver one digest"""
+
+
+class SlackChannel(Channel):
+    """Incoming webhook"""
+
+    def __init__(self, webhook_url: str):
+        self.webhook_url = webhook_url
+
+    async def send(self, client, message_id, digest, attempt):
+        body = "\n".join(f"• {line}" for line in digest.lines())
+        _check(await client.post(self.webhook_url, json={
+            "text": digest.title,
+            "blocks": [
+                {"type": "header", "text": {"type": "plain_text", "text": digest.title[:150]}},
+                {"type": "section", "text": {"type": "mrkdwn", "text": body[:3000]}},
+            ],
+        }))
+
+
+class PagerDutyChannel(Channel):
+    """Events API v2; the message id is the dedup_key, so a re-send updates the same incident"""
+
+    def __init__(self, routing_key: str, events_url: str = PAGERDUTY_EVENTS_URL):
+        self.routing_key = routing_key
+        self.events_url = events_url
+
+    async def send(self, client, message_id, digest, attempt):
+        _check(await client.post(self.events_url, json={
+            "routing_key": self.routing_key,
+            "event_action": "trigger",
+            "dedup_key": message_id,
+            "payload": {
+                "summary": digest.title[:1024],
+                "source": "aws-guardrails",
+                "severity": PAGERDUTY_SEVERITY.get(digest.severity, "info"),
+                "custom_details": {"alerts": digest.lines()},
+            },
+        }))
+
+
+class JiraChannel(Channel):
+    """One issue per digest, labelled with the message id; a retry looks the label up before creating"""
+
+    def __init__(self, url: str, user: str, api_token: str, project_key: str, issue_type: str = "Task"):
+        self.url = url.rstrip("/")
+        self.auth = (user, api_token)
+        self.project_key = project_key
+        self.issue_type = issue_type
+
+    async def send(self, client, message_id, digest, attempt):
+        label = f"guardrails-{message_id[:16]}"
+        if attempt > 1:
+            # The previous attempt may have created the issue before failing
+            response = await client.get(f"{self.url}/rest/api/2/search", auth=self.auth,
+                                        params={"jql": f'labels = "{label}"', "maxResults": 1, "fields": "key"})
+            _check(response)
+            if response.json().get("total", 0):
+                return
+        _check(await client.post(f"{self.url}/rest/api/2/issue", auth=self.auth, json={"fields": {
+            "project": {"key": self.project_key},
+            "issuetype": {"name": self.issue_type},
+            "summary": digest.title[:250],
+            "description": "\n".join(f"* {line}" for line in digest.lines()),
+            "labels": ["aws-guardrails", label],
+        }}))
+
+
+class EmailChannel(Channel):
+    """SMTP, on a thread; the Message-ID carries the message id so mail clients can drop repeats"""
+
+    def __init__(self, server: str, port: int, sender: str, recipients: List[str], user: str = "",
+                 password: str = "", starttls: bool = True, timeout: float = 30.0):
+        self.server = server
+        self.port = port
+        self.sender = sender
+        self.recipients = recipients
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    async def send(self, client, message_id, digest, attempt):
+        await asyncio.to_thread(self._send, message_id, digest)
+
+    def _send(self, message_id: str, digest: Digest) -> None:
+        message = EmailMessage()
+        message["Subject"] = f"[AWS Guardrails] {digest.title}"
+        message["From"] = self.sender
+        message["To"] = ", ".join(self.recipients)
+        message["Date"] = email.utils.formatdate(localtime=True)
+        message["Message-ID"] = f"<{message_id}@aws-guardrails>"
+        message.set_content("\n".join(digest.lines()))
+        try:
+            with smtplib.SMTP(self.server, self.port, timeout=self.timeout) as smtp:
+                if self.starttls:
+                    smtp.starttls()
+                if self.user:
+                    smtp.login(self.user, self.password)
+                smtp.send_message(message)
+        except smtplib.SMTPResponseException as exc:
+            raise DeliveryError(f"SMTP {exc.smtp_code}: {exc.smtp_error!r}", retryable=400 <= exc.smtp_code < 500)
+        except smtplib.SMTPRecipientsRefused as exc:
+            raise DeliveryError(f"recipients refused: {sorted(exc.recipients)}", retryable=False)
+        except (smtplib.SMTPException, OSError) as exc:
+            raise DeliveryError(f"SMTP: {exc}")
+
+
+# ----------------------------------------------------------------------------
+# Notifier
+# ----------------------------------------------------------------------------
+
+@dataclass
+class DeliveryStats:
+    """What one delivery run did"""
+
+    digests: int = 0
+    sent: int = 0
+    retried: int = 0
+    dead: int = 0
+    rate_limit_wait_s: float = 0.0
+    wall_time_s: float = 0.0
+
+
+class Notifier:
+    """Durable event store, digest builder and rate-limited sender for the configured channels"""
+
+    def __init__(self, db: Database, channels: Mapping[str, Channel],
+                 windows: Optional[Mapping[str, float]] = None,
+                 min_severity: Optional[Mapping[str, str]] = None,
+                 rates: Optional[Mapping[str, float]] = None,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS, backoff_s: float = BACKOFF_S, lease_s: float = LEASE_S,
+                 timeout: float = 30.0):
+        self.db = db
+        self.db.executescript(SCHEMA)
+        self.channels = dict(channels)
+        self.windows = {**DEFAULT_WINDOWS, **(windows or {})}
+        self.min_rank = {name: _rank(severity)
+                         for name, severity in {**DEFAULT_MIN_SEVERITY, **(min_severity or {})}.items()}
+        rates = {**DEFAULT_RATES, **(rates or {})}
+        # Kept for the process, so the limits hold across runs
+        self.buckets = {name: TokenBucket(rates.get(name, 1.0)) for name in self.channels}
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_s = backoff_s
+        self.lease_s = lease_s
+        self.timeout = timeout
+
+    @classmethod
+    def from_settings(cls, settings, db: Database) -> "Notifier":
+        channels: Dict[str, Channel] = {}
+        if settings.feature_slack and settings.slack_webhook_url:
+            channels[SLACK] = SlackChannel(settings.slack_webhook_url)
+        if settings.pagerduty_key:
+            channels[PAGERDUTY] = PagerDutyChannel(settings.pagerduty_key, settings.pagerduty_events_url)
+        if settings.feature_jira and settings.jira_url and settings.jira_api_token:
+            channels[JIRA] = JiraChannel(settings.jira_url, settings.jira_user, settings.jira_api_token,
+                                         settings.jira_project_key)
+        if settings.smtp_server and settings.smtp_to:
+            channels[EMAIL] = EmailChannel(
+                settings.smtp_server, settings.smtp_port, settings.smtp_from or settings.smtp_user,
+                [address.strip() for address in settings.smtp_to.split(",") if address.strip()],
+                settings.smtp_user, settings.smtp_password, settings.smtp_starttls,
+            )
+        return cls(
+            db, channels,
+            windows=parse_limits(settings.notify_digest_windows),
+            min_severity=parse_severities(settings.notify_min_severity),
+            rates=parse_limits(settings.notify_rate_limits),
+            max_attempts=settings.notify_max_attempts,
+        )
+
+    # ------------------------------------------------------------------
+    # Producers
+    # ------------------------------------------------------------------
+
+    def publish(self, events: Iterable[Event], now: Optional[float] = None) -> int:
+        """Store events for every channel whose minimum severity they meet; returns rows offered"""
+        now = time.time() if now is None else now
+        rows = []
+        for event in events:
+            rank = _rank(event.severity)
+            payload = json.dumps(asdict(event))
+            for name in self.channels:
+                if rank <= self.min_rank.get(name, len(SEVERITIES)):
+                    window = self.windows.get(name, DEFAULT_WINDOWS[SLACK])
+                    rows.append((name, event.key, now - now % window, rank, payload, now))
+        return self.db.executemany(_INSERT_EVENT, rows)
+
+    def cursor(self, source: str) -> Optional[float]:
+        """How far a producer has published, or None before its first run"""
+        row = self.db.query_one("SELECT position FROM notification_cursors WHERE source = ?", (source,))
+        return row[0] if row else None
+
+    def advance(self, source: str, position: float) -> None:
+        self.db.execute(_UPSERT_CURSOR, (source, position))
+
+    # ------------------------------------------------------------------
+    # Digests
+    # ------------------------------------------------------------------
+
+    def digest(self, now: Optional[float] = None) -> int:
+        """Turn every closed window's events into one outbox message; returns messages created"""
+        now = time.time() if now is None else now
+        windows = self.db.query(
+            "SELECT channel, window_start FROM notification_events WHERE message_id IS NULL "
+            "GROUP BY channel, window_start ORDER BY window_start"
+        )
+        created = 0
+        for channel, window_start in windows:
+            if window_start + self.windows.get(channel, DEFAULT_WINDOWS[SLACK]) > now:
+                continue  # still collecting
+            with self.db.transaction() as conn:
+                rows = self.db.query(
+                    "SELECT event_key, payload FROM notification_events "
+                    "WHERE channel = ? AND window_start = ? AND message_id IS NULL",
+                    (channel, window_start), conn=conn,
+                )
+                if not rows:
+                    continue
+                keys = sorted(key for key, _ in rows)
+                message_id = hashlib.sha256("\n".join([channel, repr(window_start), *keys]).encode()).hexdigest()[:32]
+                digest = Digest.build(channel, window_start, (Event(**json.loads(payload)) for _, payload in rows))
+                self.db.execute(_INSERT_MESSAGE, (
+                    message_id, channel, window_start, digest.events, _rank(digest.severity),
+                    json.dumps(asdict(digest)), PENDING, now, now,
+                ), conn=conn)
+                self.db.execute(
+                    "UPDATE notification_events SET message_id = ? "
+                    "WHERE channel = ? AND window_start = ? AND message_id IS NULL",
+                    (message_id, channel, window_start), conn=conn,
+                )
+            created += 1
+        self._prune(now)
+        return created
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - RETENTION_S
+        with self.db.transaction() as conn:
+            self.db.execute("DELETE FROM notification_events WHERE message_id IS NOT NULL AND created_at < ?",
+                            (cutoff,), conn=conn)
+            self.db.execute("DELETE FROM notification_outbox WHERE status <> ? AND created_at < ?",
+                            (PENDING, cutoff), conn=conn)
+
+    # ------------------------------------------------------------------
+    # Delivery
+    # ------------------------------------------------------------------
+
+    def run(self) -> dict:
+        """Digest closed windows and deliver what is due (the scheduled job)"""
+        digests = self.digest()
+        stats = asyncio.run(self.deliver())
+        stats.digests = digests
+        return vars(stats)
+
+    async def deliver(self) -> DeliveryStats:
+        """Send every due message, each channel at its own rate"""
+        started = time.perf_counter()
+        stats = DeliveryStats()
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            await asyncio.gather(*(self._drain(name, channel, client, stats)
+                                   for name, channel in self.channels.items()))
+        stats.wall_time_s = time.perf_counter() - started
+        return stats
+
+    async def _drain(self, name: str, channel: Channel, client: httpx.AsyncClient, stats: DeliveryStats) -> None:
+        due = self.db.query(
+            "SELECT message_id FROM notification_outbox WHERE status = ? AND channel = ? AND next_attempt_at <= ? "
+            "ORDER BY severity_rank, created_at LIMIT ?",
+            (PENDING, name, time.time(), BATCH),
+        )
+        for (message_id,) in due:
+            claimed = self._claim(message_id)
+            if claimed is None:
+                continue  # another run holds it
+            attempt, payload = claimed
+            delay = self.buckets[name].reserve()
+            if delay:
+                stats.rate_limit_wait_s += delay
+                await asyncio.sleep(delay)
+            try:
+                try:
+                    await channel.send(client, message_id, Digest(**json.loads(payload)), attempt)
+                except httpx.TransportError as exc:
+                    raise DeliveryError(f"{type(exc).__name__}: {exc}") from exc
+            except DeliveryError as exc:
+                if self._failed(name, message_id, attempt, exc):
+                    stats.retried += 1
+                else:
+                    stats.dead += 1
+                if exc.retry_after_s is not None:
+                    break  # the endpoint asked for a pause; the rest stay due for the next run
+                continue
+            self.db.execute("UPDATE notification_outbox SET status = ?, sent_at = ?, last_error = '' "
+                            "WHERE message_id = ?", (SENT, time.time(), message_id))
+            stats.sent += 1
+
+    def _claim(self, message_id: str) -> Optional[Tuple[int, str]]:
+        """Lease a due message; returns (attempt number, payload), or None if it is not due any more"""
+        now = time.time()
+        with self.db.transaction() as conn:
+            claimed = self.db.execute(
+                "UPDATE notification_outbox SET attempts = attempts + 1, next_attempt_at = ? "
+                "WHERE message_id = ? AND status = ? AND next_attempt_at <= ?",
+                (now + self.lease_s, message_id, PENDING, now), conn=conn,
+            )
+            if claimed != 1:
+                return None
+            attempts, payload = self.db.query(
+                "SELECT attempts, payload FROM notification_outbox WHERE message_id = ?", (message_id,), conn=conn,
+            )[0]
+        return int(attempts), payload
+
+    def _failed(self, channel: str, message_id: str, attempt: int, exc: DeliveryError) -> bool:
+        """Reschedule or dead-letter a failed send; returns whether it will be retried"""
+        if not exc.retryable or attempt >= self.max_attempts:
+            logger.warning("Notification %s to %s dead after %d attempts: %s", message_id, channel, attempt, exc)
+            self.db.execute("UPDATE notification_outbox SET status = ?, last_error = ? WHERE message_id = ?",
+                            (DEAD, str(exc)[:500], message_id))
+            return False
+        if exc.retry_after_s is not None:
+            delay = exc.retry_after_s
+        else:
+            delay = min(self.backoff_s * 2 ** (attempt - 1), MAX_BACKOFF_S) * random.uniform(0.5, 1.0)
+        self.db.execute("UPDATE notification_outbox SET next_attempt_at = ?, last_error = ? WHERE message_id = ?",
+                        (time.time() + delay, str(exc)[:500], message_id))
+        return True
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def summary(self, now: Optional[float] = None) -> pd.DataFrame:
+        """Messages and events per channel and status; events still in an open window count as 'collecting'"""
+        now = time.time() if now is None else now
+        rows = [
+            (channel, status, int(messages), int(events), now - oldest)
+            for channel, status, messages, events, oldest in self.db.query(
+                "SELECT channel, status, COUNT(*), SUM(events), MIN(created_at) FROM notification_outbox "
+                "GROUP BY channel, status"
+            )
+        ]
+        rows += [
+            (channel, "collecting", 0, int(events), now - oldest)
+            for channel, events, oldest in self.db.query(
+                "SELECT channel, COUNT(*), MIN(created_at) FROM notification_events WHERE message_id IS NULL "
+                "GROUP BY channel"
+            )
+        ]
+        frame = pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+        return frame.round({"oldest_age_s": 0}).sort_values(["channel", "status"], ignore_index=True)
+
+    def dead_letters(self, limit: int = 20) -> pd.DataFrame:
+        return self.db.query_frame(
+            "SELECT message_id, channel, events, attempts, last_error, created_at FROM notification_outbox "
+            "WHERE status = ? ORDER BY created_at DESC LIMIT ?", (DEAD, limit),
+        )
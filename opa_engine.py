@@ -0,0 +1,402 @@
+"""
+OPA Evaluation Engine
+=====================
+Evaluates Terraform plan JSON against the Rego policies in batches.
+
+- A pool of long-lived `opa run --server` processes, one per worker, keeps the
+  compiled policies loaded (and reloads them on change via --watch); a
+  server whose process has exited is replaced when it is next taken
+- Plans are streamed through the pool over keep-alive HTTP; each plan body is
+  read once and sent as-is, never re-serialized per policy
+- Each policy package is queried on its own so OPA's eval timer gives the
+  per-policy cost of every plan; slow Rego rules show up in timing_frame()
+- Findings are keyed by (policy, resource address)
+
+Policies follow the conftest layout: every package under OPA_PACKAGE_PREFIX
+(default `terraform`) may define `deny` and `warn` sets of messages or of
+objects with `address` / `msg`, and optionally a `resources` set naming the
+addresses it checked.
+"""
+
+import json
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import requests
+
+PlanInput = Union[str, bytes, dict]
+
+STARTUP_TIMEOUT = 30.0
+LEVELS = ("deny", "warn")
+
+
+class OpaError(RuntimeError):
+    """An OPA server failed to start or answer"""
+
+
+@dataclass
+class PolicyFinding:
+    """One deny / warn result"""
+
+    plan: str
+    policy: str
+    address: str
+    level: str
+    message: str
+
+
+@dataclass
+class PlanEvaluation:
+    """Every policy's verdict on one plan"""
+
+    plan: str
+    resources: int = 0
+    findings: List[PolicyFinding] = field(default_factory=list)
+    evaluated: Dict[str, int] = field(default_factory=dict)  # policy -> resources checked
+    eval_ns: Dict[str, int] = field(default_factory=dict)    # policy -> OPA eval time
+    error: Optional[str] = None
+
+
+@dataclass
+class OpaReport:
+    """Outcome of one batch"""
+
+    policies: List[str]
+    evaluations: List[PlanEvaluation]
+    wall_time_s: float
+
+    @property
+    def plans(self) -> int:
+        return len(self.evaluations)
+
+    @property
+    def failed(self) -> List[PlanEvaluation]:
+        return [e for e in self.evaluations if e.error]
+
+    def findings(self) -> List[PolicyFinding]:
+        return [f for e in self.evaluations for f in e.findings]
+
+    def results_by_key(self) -> Dict[Tuple[str, str], List[PolicyFinding]]:
+        """Findings grouped by (policy, resource address)"""
+        keyed: Dict[Tuple[str, str], List[PolicyFinding]] = {}
+        for finding in self.findings():
+            keyed.setdefault((finding.policy, finding.address), []).append(finding)
+        return keyed
+
+    def timing_frame(self) -> pd.DataFrame:
+        """Per-policy evaluation time across the batch, slowest first"""
+        rows = []
+        for policy in self.policies:
+            samples = np.array([e.eval_ns[policy] for e in self.evaluations if policy in e.eval_ns], dtype=np.float64)
+            if not len(samples):
+                continue
+            samples /= 1e6
+            rows.append({
+                "policy": policy,
+                "evaluations": len(samples),
+                "mean_ms": round(float(samples.mean()), 3),
+                "p95_ms": round(float(np.percentile(samples, 95)), 3),
+                "max_ms": round(float(samples.max()), 3),
+                "total_ms": round(float(samples.sum()), 1),
+            })
+        frame = pd.DataFrame(rows, columns=["policy", "evaluations", "mean_ms", "p95_ms", "max_ms", "total_ms"])
+        return frame.sort_values("total_ms", ascending=False, ignore_index=True)
+
+    def summary(self) -> dict:
+        """Shape expected by the Policy Scans tab"""
+        levels: Dict[str, set] = {policy: set() for policy in self.policies}
+        for finding in self.findings():
+            levels.setdefault(finding.policy, set()).add(finding.level)
+        timings = self.timing_frame().set_index("policy")
+        results = []
+        for policy in self.policies:
+            status = "FAIL" if "deny" in levels[policy] else "WARN" if "warn" in levels[policy] else "PASS"
+            results.append({
+                "name": policy,
+                "status": status,
+                "resources": sum(e.evaluated.get(policy, 0) for e in self.evaluations),
+                "mean_ms": float(timings["mean_ms"].get(policy, 0.0)),
+            })
+        violations = sum(1 for r in results if r["status"] == "FAIL")
+        return {
+            "policies": len(self.policies),
+            "passed": len(self.policies) - violations,
+            "violations": violations,
+            "resources": sum(e.resources for e in self.evaluations),
+            "deltas": {},
+            "results": results,
+            "plans": self.plans,
+            "timings": self.timing_frame(),
+        }
+
+
+# ----------------------------------------------------------------------------
+# Server process
+# ----------------------------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class OpaServer:
+    """One `opa run --server` process with its policies loaded"""
+
+    def __init__(self, binary: str, policy_paths: Sequence[str], timeout: float = 60.0):
+        self.binary = binary
+        self.policy_paths = list(policy_paths)
+        self.timeout = timeout
+        self.port = _free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.session = requests.Session()
+        self._process: Optional[subprocess.Popen] = None
+
+    def start(self) -> "OpaServer":
+        command = [self.binary, "run", "--server", "--watch", "--log-level", "error",
+                   "--addr", f"127.0.0.1:{self.port}", *self.policy_paths]
+        self._process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise OpaError(f"{self.binary} exited with status {self._process.returncode}")
+            try:
+                if self.session.get(f"{self.base_url}/health", timeout=1).ok:
+                    return self
+            except requests.ConnectionError:
+                pass
+            time.sleep(0.05)
+        self.close()
+        raise OpaError(f"{self.binary} did not become healthy within {STARTUP_TIMEOUT:.0f}s")
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def packages(self) -> List[str]:
+        """Dotted names of every loaded package"""
+        response = self.session.get(f"{self.base_url}/v1/policies", timeout=self.timeout)
+        response.raise_for_status()
+        names = set()
+        for module in response.json().get("result", []):
+            path = module.get("ast", {}).get("package", {}).get("path", [])
+            names.add(".".join(str(term["value"]) for term in path[1:]))  # path[0] is `data`
+        return sorted(names)
+
+    def query(self, package: str, body: bytes) -> Tuple[dict, int]:
+        """Evaluate one package; returns its document and OPA's eval time in ns"""
+        response = self.session.post(
+            f"{self.base_url}/v1/data/{package.replace('.', '/')}?metrics=true",
+            data=body, headers={"Content-Type": "application/json"}, timeout=self.timeout,
+        )
+        response.raise_for_status()
+        payload = response.json()
+        return payload.get("result") or {}, int(payload.get("metrics", {}).get("timer_rego_query_eval_ns", 0))
+
+    def close(self):
+        self.session.close()
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        self._process = None
+
+
+# ----------------------------------------------------------------------------
+# Engine
+# ----------------------------------------------------------------------------
+
+def _resource_addresses(plan: dict) -> List[str]:
+    return [change["address"] for change in plan.get("resource_changes", []) if "address" in change]
+
+
+def _finding_address(entry, addresses: Sequence[str]) -> str:
+    """Resource a deny / warn entry refers to, '' when it names none"""
+    if isinstance(entry, dict):
+        return str(entry.get("address") or entry.get("resource") or "")
+    message = str(entry)
+    matches = [address for address in addresses if address in message]
+    return max(matches, key=len) if matches else ""
+
+
+def _finding_message(entry) -> str:
+    if isinstance(entry, dict):
+        return str(entry.get("msg") or entry.get("message") or json.dumps(entry, sort_keys=True))
+    return str(entry)
+
+
+class OpaEngine:
+    """Evaluate many plans against every policy package on a pool of OPA servers"""
+
+    def __init__(self, binary: str, policy_paths: Sequence[str], workers: int = 4,
+                 package_prefix: str = "terraform"):
+        self.binary = binary
+        self.policy_paths = list(policy_paths)
+        self.workers = max(1, workers)
+        self.package_prefix = package_prefix.strip(".")
+        self._servers: List[OpaServer] = []
+        self._idle: "queue.Queue[OpaServer]" = queue.Queue()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings) -> "OpaEngine":
+        return cls(
+            binary=settings.opa_binary,
+            policy_paths=[settings.opa_policy_dir],
+            workers=settings.opa_workers,
+            package_prefix=settings.opa_package_prefix,
+        )
+
+    @property
+    def available(self) -> bool:
+        return shutil.which(self.binary) is not None and all(os.path.exists(p) for p in self.policy_paths)
+
+    def start(self):
+        """Start the server pool (idempotent)"""
+        with self._lock:
+            if self._servers:
+                return
+            servers = [OpaServer(self.binary, self.policy_paths) for _ in range(self.workers)]
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                started = [pool.submit(server.start) for server in servers]
+            errors = [f.exception() for f in started if f.exception()]
+            if errors:
+                for server in servers:
+                    server.close()
+                raise errors[0]
+            self._servers = servers
+            for server in servers:
+                self._idle.put(server)
+
+    def close(self):
+        with self._lock:
+            for server in self._servers:
+                server.close()
+            self._servers = []
+            self._idle = queue.Queue()
+
+    def __enter__(self) -> "OpaEngine":
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def policies(self) -> List[str]:
+        """Packages under the prefix, named relative to it"""
+        self.start()
+        server = self._acquire()
+        try:
+            packages = server.packages()
+        finally:
+            self._idle.put(server)
+        prefix = self.package_prefix + "."
+        return [p[len(prefix):] for p in packages if p.startswith(prefix)]
+
+    def _acquire(self) -> OpaServer:
+        """An idle server, restarted first if its process has exited"""
+        server = self._idle.get()
+        if server.alive:
+            return server
+        replacement = OpaServer(self.binary, self.policy_paths)
+        try:
+            replacement.start()
+        except OpaError:
+            # Back in the pool, so it never shrinks; the next taker retries the restart
+            self._idle.put(server)
+            raise
+        server.close()
+        with self._lock:
+            self._servers = [replacement if s is server else s for s in self._servers]
+        return replacement
+
+    def _evaluate_one(self, name: str, plan: PlanInput, policies: Sequence[str]) -> PlanEvaluation:
+        evaluation = PlanEvaluation(plan=name)
+        try:
+            if isinstance(plan, dict):
+                document, body = plan, json.dumps({"input": plan}).encode()
+            else:
+                if isinstance(plan, bytes):
+                    raw = plan
+                else:
+                    with open(plan, "rb") as fp:
+                        raw = fp.read()
+                document, body = json.loads(raw), b'{"input":' + raw + b"}"
+        except (OSError, ValueError) as exc:
+            evaluation.error = f"unreadable plan: {exc}"
+            return evaluation
+        addresses = _resource_addresses(document)
+        evaluation.resources = len(addresses)
+        try:
+            server = self._acquire()
+        except OpaError as exc:
+            evaluation.error = str(exc)
+            return evaluation
+        try:
+            for policy in policies:
+                result, eval_ns = server.query(f"{self.package_prefix}.{policy}", body)
+                evaluation.eval_ns[policy] = eval_ns
+                checked = result.get("resources")
+                evaluation.evaluated[policy] = len(checked) if isinstance(checked, list) else len(addresses)
+                for level in LEVELS:
+                    for entry in result.get(level) or []:
+                        evaluation.findings.append(PolicyFinding(
+                            plan=name, policy=policy, address=_finding_address(entry, addresses),
+                            level=level, message=_finding_message(entry),
+                        ))
+        except requests.RequestException as exc:
+            evaluation.error = str(exc)
+        finally:
+            self._idle.put(server)
+        return evaluation
+
+    def iter_evaluations(self, plans: Iterable[Tuple[str, PlanInput]],
+                         policies: Optional[Sequence[str]] = None) -> Iterator[PlanEvaluation]:
+        """Stream (name, plan) pairs through the pool, yielding results as they finish
+
+        A plan is a file path, raw JSON bytes or a parsed dict. At most two
+        plans per worker are in flight, so large batches are never fully loaded.
+        """
+        policies = list(policies) if policies is not None else self.policies()
+        plans = iter(plans)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = set()
+            exhausted = False
+            while pending or not exhausted:
+                while not exhausted and len(pending) < 2 * self.workers:
+                    try:
+                        name, plan = next(plans)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending.add(pool.submit(self._evaluate_one, name, plan, policies))
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    def evaluate(self, plans: Iterable[Tuple[str, PlanInput]]) -> OpaReport:
+        started = time.perf_counter()
+        policies = self.policies()
+        evaluations = list(self.iter_evaluations(plans, policies))
+        return OpaReport(policies=policies, evaluations=evaluations, wall_time_s=time.perf_counter() - started)
+
+
+def plan_files(directory: str) -> Iterator[Tuple[str, str]]:
+    """(name, path) for every *.json plan under a directory"""
+    for root, _, files in os.walk(directory):
+        for filename in sorted(files):
+            if filename.endswith(".json"):
+                path = os.path.join(root, filename)
+                yield os.path.relpath(path, directory), path
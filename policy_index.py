@@ -0,0 +1,274 @@
+"""
+Policy Repository Index
+=======================
+Counts the policies in a local clone of the governance repository.
+
+- Files under `policies/` and `terraform/` are classified as SCPs,
+  OPA/Rego, Config Rules, Sentinel or Custom policies
+- Every indexed file keeps a content hash, so a file is only re-parsed when
+  its bytes actually changed
+- Each sync diffs the last indexed commit against HEAD
+  (`git diff --name-only`) and touches only those paths; an unchanged HEAD
+  costs one `git rev-parse` and no file I/O
+- Without a usable previous commit (first run, rewritten history, not a git
+  checkout) the tree is walked in full, still skipping unchanged hashes
+"""
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+from aws_collector import format_age
+from database import Database
+
+SCP = "SCPs"
+OPA = "OPA/Rego"
+CONFIG_RULE = "Config Rules"
+SENTINEL = "Sentinel"
+CUSTOM = "Custom"
+POLICY_TYPES = (SCP, OPA, CONFIG_RULE, SENTINEL, CUSTOM)
+
+INDEXED_DIRS = ("policies", "terraform")
+
+# Policy file formats outside the known policies/<type>/ directories
+_CUSTOM_EXTENSIONS = {".json", ".yaml", ".yml", ".py", ".guard", ".cue"}
+_POLICY_DIRS = {"scp": SCP, "opa": OPA, "sentinel": SENTINEL, "config-rules": CONFIG_RULE}
+_TF_SCP = re.compile(r'^\s*resource\s+"aws_organizations_policy"', re.M)
+_TF_CONFIG_RULE = re.compile(r'^\s*resource\s+"aws_config_(?:organization_\w+_)?(?:config_)?rule"', re.M)
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS policy_files (
+        path TEXT NOT NULL,
+        policy_type TEXT NOT NULL,
+        policies INTEGER NOT NULL,
+        content_hash TEXT NOT NULL,
+        indexed_at DOUBLE PRECISION NOT NULL,
+        PRIMARY KEY (path, policy_type)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS policy_index_state (
+        repo TEXT PRIMARY KEY,
+        commit_sha TEXT NOT NULL,
+        committed_at DOUBLE PRECISION,
+        indexed_at DOUBLE PRECISION NOT NULL
+    )
+    """,
+]
+
+_UPSERT_STATE = """
+    INSERT INTO policy_index_state (repo, commit_sha, committed_at, indexed_at) VALUES (?, ?, ?, ?)
+    ON CONFLICT (repo) DO UPDATE SET
+        commit_sha = excluded.commit_sha, committed_at = excluded.committed_at, indexed_at = excluded.indexed_at
+"""
+
+
+@dataclass
+class IndexStats:
+    """What one sync touched"""
+
+    commit: str = ""
+    full_walk: bool = False
+    candidates: int = 0
+    parsed: int = 0
+    removed: int = 0
+    elapsed_s: float = 0.0
+
+
+# ----------------------------------------------------------------------------
+# Classification
+# ----------------------------------------------------------------------------
+
+def classify(path: str, content: bytes) -> Dict[str, int]:
+    """Policy type -> number of policies defined by one repository file"""
+    parts = path.split("/")
+    _, ext = os.path.splitext(path)
+    ext = ext.lower()
+    if ext == ".rego":
+        return {} if path.endswith("_test.rego") else {OPA: 1}
+    if ext == ".sentinel":
+        return {SENTINEL: 1}
+    if parts[0] == "terraform":
+        if ext != ".tf":
+            return {}
+        text = content.decode("utf-8", errors="replace")
+        counts = {SCP: len(_TF_SCP.findall(text)), CONFIG_RULE: len(_TF_CONFIG_RULE.findall(text))}
+        return {kind: count for kind, count in counts.items() if count}
+    if parts[0] != "policies" or len(parts) < 2 or ext not in _CUSTOM_EXTENSIONS:
+        return {}
+    kind = _POLICY_DIRS.get(parts[1]) if len(parts) > 2 else None
+    if kind in (OPA, SENTINEL):
+        return {}  # data and fixtures next to .rego / .sentinel files
+    if kind == SCP or (kind is None and ext == ".json" and _is_iam_document(content)):
+        return {SCP: 1} if _is_iam_document(content) else {}
+    return {kind or CUSTOM: 1}
+
+
+def _is_iam_document(content: bytes) -> bool:
+    try:
+        document = json.loads(content)
+    except ValueError:
+        return False
+    return isinstance(document, dict) and "Statement" in document
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+# ----------------------------------------------------------------------------
+# Index
+# ----------------------------------------------------------------------------
+
+class PolicyIndex:
+    """Content-hash index of one local policy repository clone"""
+
+    def __init__(self, db: Database, repo_path: str):
+        self.db = db
+        self.repo_path = os.path.abspath(repo_path)
+        self.db.executescript(SCHEMA)
+
+    @classmethod
+    def from_settings(cls, settings, db: Database) -> "PolicyIndex":
+        return cls(db, settings.policy_repo_path)
+
+    # ------------------------------------------------------------------
+    # git
+    # ------------------------------------------------------------------
+
+    def _git(self, *args: str) -> Optional[str]:
+        try:
+            completed = subprocess.run(["git", "-C", self.repo_path, *args], capture_output=True,
+                                       text=True, check=True)
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        return completed.stdout
+
+    def _changed_paths(self, since: str, head: str) -> Optional[List[str]]:
+        """Indexed paths that differ between two commits; None if `since` is unusable"""
+        output = self._git("diff", "--name-only", "--no-renames", "-z", since, head, "--", *INDEXED_DIRS)
+        return None if output is None else [path for path in output.split("\0") if path]
+
+    def _all_paths(self) -> List[str]:
+        output = self._git("ls-files", "-z", "--", *INDEXED_DIRS)
+        if output is not None:
+            return [path for path in output.split("\0") if path]
+        paths = []
+        for top in INDEXED_DIRS:
+            for root, dirs, files in os.walk(os.path.join(self.repo_path, top)):
+                dirs[:] = [d for d in dirs if not d.startswith(".")]
+                paths.extend(os.path.relpath(os.path.join(root, name), self.repo_path).replace(os.sep, "/")
+                             for name in files)
+        return paths
+
+    # ------------------------------------------------------------------
+    # Sync
+    # ------------------------------------------------------------------
+
+    def state(self) -> Optional[tuple]:
+        """(commit_sha, committed_at, indexed_at) of the last sync"""
+        return self.db.query_one(
+            "SELECT commit_sha, committed_at, indexed_at FROM policy_index_state WHERE repo = ?",
+            (self.repo_path,),
+        )
+
+    def sync(self, on_progress: Optional[Callable[[float, str], None]] = None) -> IndexStats:
+        """Bring the index up to date with HEAD, re-parsing only changed files"""
+        started = time.perf_counter()
+        head = (self._git("rev-parse", "HEAD") or "").strip()
+        state = self.state()
+        stats = IndexStats(commit=head)
+        if head and state and state[0] == head:
+            stats.elapsed_s = time.perf_counter() - started
+            return stats
+
+        paths = self._changed_paths(state[0], head) if head and state and state[0] else None
+        if paths is None:
+            stats.full_walk = True
+            paths = self._all_paths()
+        stats.candidates = len(paths)
+        stats.parsed, stats.removed = self._apply(paths, stats.full_walk, on_progress)
+
+        committed_at = self._git("show", "-s", "--format=%ct", head) if head else None
+        self.db.execute(_UPSERT_STATE, (self.repo_path, head, float(committed_at) if committed_at else None,
+                                        time.time()))
+        stats.elapsed_s = time.perf_counter() - started
+        return stats
+
+    def _hashes(self, paths: Optional[List[str]]) -> Dict[str, str]:
+        """Stored content hash per path (all paths, or just the given ones)"""
+        if paths is None:
+            return dict(self.db.query("SELECT DISTINCT path, content_hash FROM policy_files"))
+        known = {}
+        for start in range(0, len(paths), 500):
+            chunk = paths[start:start + 500]
+            known.update(self.db.query(
+                f"SELECT DISTINCT path, content_hash FROM policy_files WHERE path IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            ))
+        return known
+
+    def _apply(self, paths: Iterable[str], full_walk: bool,
+               on_progress: Optional[Callable[[float, str], None]]) -> tuple:
+        paths = list(paths)
+        known = self._hashes(None if full_walk else paths)
+        rows, stale, seen = [], [], set()
+        now = time.time()
+        for done, path in enumerate(paths, 1):
+            seen.add(path)
+            if on_progress is not None:
+                on_progress(done / len(paths), f"{done}/{len(paths)} files")
+            try:
+                with open(os.path.join(self.repo_path, path), "rb") as fp:
+                    content = fp.read()
+            except OSError:
+                if path in known:
+                    stale.append(path)
+                continue
+            digest = content_hash(content)
+            if known.get(path) == digest:
+                continue
+            stale.append(path)
+            # Files that define no policy still get a row so their hash is remembered
+            counts = classify(path, content) or {"": 0}
+            rows.extend((path, kind, count, digest, now) for kind, count in counts.items())
+        if full_walk:
+            stale.extend(path for path in known if path not in seen)
+        parsed = {row[0] for row in rows}
+        with self.db.transaction() as conn:
+            self.db.executemany("DELETE FROM policy_files WHERE path = ?", [(path,) for path in stale], conn=conn)
+            self.db.executemany(
+                "INSERT INTO policy_files (path, policy_type, policies, content_hash, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?)", rows, conn=conn,
+            )
+        return len(parsed), sum(1 for path in stale if path not in parsed)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def counts(self) -> Dict[str, int]:
+        """Policies per type, every type present"""
+        rows = dict(self.db.query(
+            "SELECT policy_type, SUM(policies) FROM policy_files WHERE policy_type <> '' GROUP BY policy_type"
+        ))
+        return {kind: int(rows.get(kind) or 0) for kind in POLICY_TYPES}
+
+    def summary(self) -> dict:
+        """Shape of demo_data.policy_index()"""
+        state = self.state()
+        counts = self.counts()
+        return {
+            "total": sum(counts.values()),
+            "by_type": counts,
+            "commit": state[0][:7] if state and state[0] else None,
+            "last_commit": format_age(datetime.fromtimestamp(state[1], tz=timezone.utc))
+            if state and state[1] else "Never",
+        }
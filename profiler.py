@@ -0,0 +1,147 @@
+"""
+Render Profiler
+===============
+Opt-in timing spans for Streamlit reruns.
+
+- `span(name)` times a block: tabs, chart construction, data fetches
+- Spans only record while a profiled run is active on the current thread,
+  so disabled sessions and background jobs pay one attribute lookup
+- Durations are kept per section in a bounded window shared by every
+  session and summarized as p50 / p95 for latency budgets
+- Each session keeps the span tree of its latest run for drill-down
+
+Sections are dotted names: `rerun`, `tab.<name>`, `chart.<name>`, `data.<source>`.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+WINDOW = 500  # most recent samples kept per section
+
+SUMMARY_COLUMNS = ["section", "samples", "p50_ms", "p95_ms", "max_ms", "mean_ms"]
+
+
+@dataclass
+class RunTrace:
+    """Spans of one profiled rerun, in completion order"""
+
+    session_id: str
+    started: float = field(default_factory=time.perf_counter)
+    spans: List[Tuple[str, int, float]] = field(default_factory=list)  # (name, depth, ms)
+    depth: int = 0
+    total_ms: float = 0.0
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.spans, columns=["section", "depth", "ms"])
+
+
+class RenderProfiler:
+    """Process-wide span aggregator"""
+
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._sessions: set = set()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def begin(self, session_id: str) -> RunTrace:
+        """Start profiling the current thread's rerun"""
+        trace = RunTrace(session_id)
+        self._local.trace = trace
+        return trace
+
+    def end(self) -> Optional[RunTrace]:
+        """Finish the current rerun; records its total as the `rerun` section"""
+        trace = getattr(self._local, "trace", None)
+        if trace is None:
+            return None
+        self._local.trace = None
+        trace.total_ms = (time.perf_counter() - trace.started) * 1000
+        self._record("rerun", trace.total_ms)
+        with self._lock:
+            self._sessions.add(trace.session_id)
+        return trace
+
+    @property
+    def active(self) -> bool:
+        return getattr(self._local, "trace", None) is not None
+
+    @contextmanager
+    def span(self, name: str):
+        trace = getattr(self._local, "trace", None)
+        if trace is None:
+            yield
+            return
+        trace.depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            trace.depth -= 1
+            trace.spans.append((name, trace.depth, elapsed))
+            self._record(name, elapsed)
+
+    def _record(self, name: str, elapsed_ms: float):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(elapsed_ms)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._sessions.clear()
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def summary(self) -> pd.DataFrame:
+        """p50 / p95 per section across all profiled sessions, slowest first"""
+        with self._lock:
+            snapshot = {name: np.fromiter(samples, dtype=np.float64) for name, samples in self._samples.items()}
+        rows = [
+            (name, len(values), *np.percentile(values, [50, 95]), values.max(), values.mean())
+            for name, values in snapshot.items() if len(values)
+        ]
+        frame = pd.DataFrame(rows, columns=SUMMARY_COLUMNS).round(2)
+        return frame.sort_values("p95_ms", ascending=False, ignore_index=True)
+
+    def export(self) -> str:
+        """JSON export of the summary for offline analysis"""
+        with self._lock:
+            sessions = len(self._sessions)
+        return json.dumps({
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "window": self.window,
+            "sessions": sessions,
+            "sections": self.summary().to_dict("records"),
+        }, indent=2)
+
+
+@lru_cache(maxsize=1)
+def get_profiler() -> RenderProfiler:
+    """Profiler shared by every session"""
+    return RenderProfiler()
+
+
+def span(name: str):
+    """Shorthand for get_profiler().span(name)"""
+    return get_profiler().span(name)
@@ -0,0 +1,236 @@
+"""
+Multi-Region Fan-Out
+====================
+Schedules per-(account, region) AWS work across one bounded worker pool.
+
+- Every task names the service it calls; each service has its own
+  concurrency limit, so a slow or throttled service never holds every worker
+- Every API operation draws from a token bucket per account and region
+  before each call (a botocore before-call hook), keeping request rates under
+  the service quotas instead of leaning on throttling retries
+- Enabled regions (opt-in regions included only once opted in) are
+  discovered per account and cached for REGION_CACHE_TTL_S
+- Tasks may schedule follow-up tasks (discover regions -> collect each), and
+  results are handed back as each task finishes, in completion order
+
+Limits and rates are configured as "service=value" lists, for example
+COLLECTOR_SERVICE_LIMITS="config=24,ec2=8".
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, List, Mapping, Optional, Tuple
+
+from cachetools import TTLCache
+
+REGION_CACHE_TTL_S = 24 * 3600
+REGION_CACHE_SIZE = 4096
+
+# Concurrent tasks per service (capped at the pool size)
+SERVICE_LIMITS: Dict[str, int] = {"config": 24, "securityhub": 8, "ec2": 8}
+# Sustained calls per second per API operation, account and region (also the burst size)
+API_RATES: Dict[str, float] = {"config": 8.0, "securityhub": 5.0, "ec2": 10.0, "organizations": 1.0}
+DEFAULT_API_RATE = 5.0
+
+ENABLED_REGION_STATES = ["opt-in-not-required", "opted-in"]
+
+
+def parse_limits(text: str) -> Dict[str, float]:
+    """'config=24, ec2=8' -> {'config': 24.0, 'ec2': 8.0}; malformed entries are skipped"""
+    limits = {}
+    for item in text.split(","):
+        name, _, value = item.partition("=")
+        try:
+            limits[name.strip()] = float(value)
+        except ValueError:
+            continue
+    return limits
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, holding up to `burst` (default `rate`)"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = max(rate, 1e-6)
+        self.burst = max(burst if burst is not None else rate, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_s = 0.0
+
+    def reserve(self) -> float:
+        """Take one token without waiting; returns how long the caller must wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            # A negative balance is this caller's place in the queue
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.waited_s += delay
+        return delay
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until one is available; returns the time waited"""
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+        return delay
+
+
+class ApiRateLimiter:
+    """Token buckets per (scope, service, operation), applied through botocore hooks"""
+
+    def __init__(self, rates: Optional[Mapping[str, float]] = None, default_rate: float = DEFAULT_API_RATE):
+        self.rates = dict(API_RATES if rates is None else rates)
+        self.default_rate = default_rate
+        self._buckets: Dict[tuple, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, scope: Hashable, service: str, operation: str) -> TokenBucket:
+        key = (scope, service, operation)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.setdefault(key, TokenBucket(self.rates.get(service, self.default_rate)))
+        return bucket
+
+    def attach(self, client, scope: Hashable) -> None:
+        """Make every call through `client` take a token from its bucket first"""
+        service = client.meta.service_model.service_name
+
+        def before_call(model=None, **kwargs):
+            self.bucket(scope, service, model.name if model is not None else "").acquire()
+
+        client.meta.events.register("before-call", before_call)
+
+    @property
+    def waited_s(self) -> float:
+        with self._lock:
+            return sum(bucket.waited_s for bucket in self._buckets.values())
+
+
+class RegionDiscovery:
+    """Enabled regions per account, cached; an optional allow-list narrows them"""
+
+    def __init__(self, describe: Callable[[Hashable], List[str]], allowed: Iterable[str] = (),
+                 ttl: float = REGION_CACHE_TTL_S):
+        self._describe = describe
+        self.allowed = frozenset(allowed)
+        self._cache: TTLCache = TTLCache(maxsize=REGION_CACHE_SIZE, ttl=ttl)
+        self._lock = threading.Lock()
+        self._scope_locks: Dict[Hashable, threading.Lock] = {}
+        self.lookups = 0
+
+    def _scope_lock(self, scope: Hashable) -> threading.Lock:
+        with self._lock:
+            return self._scope_locks.setdefault(scope, threading.Lock())
+
+    def regions(self, scope: Hashable) -> List[str]:
+        with self._lock:
+            cached = self._cache.get(scope)
+        if cached is None:
+            # One lookup per scope: concurrent misses wait for it instead of repeating it
+            with self._scope_lock(scope):
+                with self._lock:
+                    cached = self._cache.get(scope)
+                if cached is None:
+                    cached = sorted(self._describe(scope))
+                    with self._lock:
+                        self._cache[scope] = cached
+                        self.lookups += 1
+        return [r for r in cached if r in self.allowed] if self.allowed else list(cached)
+
+    def invalidate(self, scope: Hashable) -> None:
+        with self._lock:
+            self._cache.pop(scope, None)
+
+
+def describe_enabled_regions(ec2_client) -> List[str]:
+    """Regions enabled for the caller's account (DescribeRegions without AllRegions)"""
+    response = ec2_client.describe_regions(Filters=[{"Name": "opt-in-status", "Values": ENABLED_REGION_STATES}])
+    return [region["RegionName"] for region in response.get("Regions", [])]
+
+
+@dataclass
+class Task:
+    """One unit of fan-out work against a single service"""
+
+    service: str
+    fn: Callable[..., Any]
+    args: Tuple = ()
+    key: Hashable = None
+
+
+@dataclass
+class FanOutStats:
+    """Counters for one run"""
+
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    peak_by_service: Dict[str, int] = field(default_factory=dict)
+
+
+class FanOut:
+    """Bounded pool that dispatches tasks only while their service has a free slot"""
+
+    def __init__(self, max_workers: int, service_limits: Optional[Mapping[str, float]] = None,
+                 thread_name_prefix: str = "fanout"):
+        self.max_workers = max(1, max_workers)
+        limits = SERVICE_LIMITS if service_limits is None else service_limits
+        self.service_limits = {name: max(1, min(int(limit), self.max_workers)) for name, limit in limits.items()}
+        self.thread_name_prefix = thread_name_prefix
+
+    def limit(self, service: str) -> int:
+        return self.service_limits.get(service, self.max_workers)
+
+    def run(self, tasks: Iterable[Task],
+            on_done: Callable[[Task, Future], Optional[Iterable[Task]]]) -> FanOutStats:
+        """Run tasks and any follow-ups `on_done` returns; blocks until all finish
+
+        `on_done` runs on the calling thread, one task at a time, so it can
+        update shared state without locks.
+        """
+        stats = FanOutStats()
+        queues: Dict[str, Deque[Task]] = {}
+        running: Dict[str, int] = {}
+        inflight: Dict[Future, Task] = {}
+
+        def enqueue(new_tasks: Iterable[Task]):
+            for task in new_tasks:
+                queues.setdefault(task.service, deque()).append(task)
+                stats.submitted += 1
+
+        enqueue(tasks)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.thread_name_prefix) as pool:
+            while True:
+                # Round-robin over services so one long queue cannot starve the others
+                progressed = True
+                while progressed and len(inflight) < self.max_workers:
+                    progressed = False
+                    for service, queue in queues.items():
+                        if queue and running.get(service, 0) < self.limit(service) \
+                                and len(inflight) < self.max_workers:
+                            task = queue.popleft()
+                            inflight[pool.submit(task.fn, *task.args)] = task
+                            running[service] = running.get(service, 0) + 1
+                            stats.peak_by_service[service] = max(stats.peak_by_service.get(service, 0),
+                                                                 running[service])
+                            progressed = True
+                if not inflight:
+                    break
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = inflight.pop(future)
+                    running[task.service] -= 1
+                    stats.completed += 1
+                    if future.exception() is not None:
+                        stats.failed += 1
+                    follow_ups = on_done(task, future)
+                    if follow_ups:
+                        enqueue(follow_ups)
+        return stats
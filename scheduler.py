@@ -0,0 +1,317 @@
+"""
+Background Job Scheduler
+========================
+Runs data refreshes on a worker pool so no Streamlit rerun ever waits on one.
+
+- Jobs are queued by priority (lower runs first), FIFO within a priority
+- Submitting a job that is already queued or running returns the existing job,
+  so two users pressing the same button share one run
+- Periodic schedules enqueue the same deduplicated jobs on an interval
+- Status and progress live in a small `jobs` table that pages poll cheaply
+
+Handlers are plain functions `handler(ctx, **params)`; they report progress
+through `ctx.progress()` and may return a JSON-serializable result.
+"""
+
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 0     # a user pressed a button
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 9      # periodic refresh
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+INTERRUPTED = "interrupted"
+ACTIVE = (QUEUED, RUNNING)
+
+PROGRESS_INTERVAL = 0.5  # seconds between progress writes per job
+RETENTION_S = 7 * 86400
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        job_id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        dedupe_key TEXT NOT NULL,
+        priority INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        progress DOUBLE PRECISION NOT NULL DEFAULT 0,
+        message TEXT NOT NULL DEFAULT '',
+        requested_by TEXT NOT NULL DEFAULT '',
+        result TEXT,
+        error TEXT,
+        enqueued_at DOUBLE PRECISION NOT NULL,
+        started_at DOUBLE PRECISION,
+        finished_at DOUBLE PRECISION
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_jobs_enqueued ON jobs (enqueued_at)",
+    "CREATE INDEX IF NOT EXISTS ix_jobs_kind_status ON jobs (kind, status, finished_at)",
+]
+
+JOB_COLUMNS = ["job_id", "kind", "status", "priority", "progress", "message",
+               "requested_by", "enqueued_at", "started_at", "finished_at", "error"]
+
+Handler = Callable[..., Optional[dict]]
+
+
+@dataclass
+class _Job:
+    job_id: str
+    kind: str
+    key: str
+    priority: int
+    params: Dict[str, Any]
+    status: str = QUEUED
+
+
+@dataclass
+class _Schedule:
+    kind: str
+    every_s: float
+    priority: int
+    params: Dict[str, Any] = field(default_factory=dict)
+    next_run: float = 0.0
+
+
+class JobContext:
+    """Handed to handlers for progress reporting"""
+
+    def __init__(self, scheduler: "JobScheduler", job: _Job):
+        self.scheduler = scheduler
+        self.job_id = job.job_id
+        self.kind = job.kind
+        self._last_write = 0.0
+
+    def progress(self, fraction: float, message: str = "", force: bool = False):
+        """Record progress (0..1); intermediate writes are throttled to one per PROGRESS_INTERVAL"""
+        now = time.monotonic()
+        if not force and fraction < 1.0 and now - self._last_write < PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+        self.scheduler.db.execute(
+            "UPDATE jobs SET progress = ?, message = ? WHERE job_id = ?",
+            (min(max(fraction, 0.0), 1.0), message, self.job_id),
+        )
+
+
+def dedupe_key(kind: str, params: Dict[str, Any]) -> str:
+    return kind if not params else f"{kind}:{json.dumps(params, sort_keys=True, default=str)}"
+
+
+class JobScheduler:
+    """Priority job queue with a fixed worker pool and periodic schedules"""
+
+    def __init__(self, db: Database, workers: int = 2):
+        self.db = db
+        self.db.executescript(SCHEMA)
+        self.workers = max(1, workers)
+        self._handlers: Dict[str, Handler] = {}
+        self._on_success: Dict[str, Callable[[], None]] = {}
+        self._schedules: List[_Schedule] = []
+        self._heap: List[Tuple[int, int, str]] = []
+        self._jobs: Dict[str, _Job] = {}          # queued / running jobs by id
+        self._active: Dict[str, str] = {}         # dedupe key -> job id
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._threads: List[threading.Thread] = []
+
+    # ------------------------------------------------------------------
+    # Registration
+    # ------------------------------------------------------------------
+
+    def register(self, kind: str, handler: Handler, on_success: Optional[Callable[[], None]] = None):
+        """Add a job kind; on_success runs after its result has been recorded"""
+        self._handlers[kind] = handler
+        if on_success is not None:
+            self._on_success[kind] = on_success
+
+    def schedule(self, kind: str, every_s: float, priority: int = PRIORITY_LOW,
+                 run_at_start: bool = True, **params):
+        """Enqueue `kind` every `every_s` seconds (deduplicated like any submit)"""
+        first = time.monotonic() if run_at_start else time.monotonic() + every_s
+        with self._cond:
+            self._schedules.append(_Schedule(kind, every_s, priority, params, first))
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        if self._threads:
+            return
+        # Jobs left queued or running by a previous process will never finish
+        self.db.execute(
+            "UPDATE jobs SET status = ?, finished_at = ? WHERE status IN (?, ?)",
+            (INTERRUPTED, time.time(), *ACTIVE),
+        )
+        self.db.execute("DELETE FROM jobs WHERE finished_at < ?", (time.time() - RETENTION_S,))
+        self._stopping = False
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        timer = threading.Thread(target=self._tick, name="job-timer", daemon=True)
+        timer.start()
+        self._threads.append(timer)
+
+    def stop(self, timeout: float = 5.0):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    # ------------------------------------------------------------------
+    # Submission
+    # ------------------------------------------------------------------
+
+    def submit(self, kind: str, priority: int = PRIORITY_NORMAL, requested_by: str = "",
+               **params) -> Tuple[str, bool]:
+        """Queue a job; returns (job_id, created). An active duplicate is reused."""
+        if kind not in self._handlers:
+            raise KeyError(f"no handler registered for job kind {kind!r}")
+        key = dedupe_key(kind, params)
+        with self._cond:
+            existing = self._jobs.get(self._active.get(key, ""))
+            if existing is not None:
+                if existing.status == QUEUED and priority < existing.priority:
+                    # Re-push at the higher priority; the stale heap entry is skipped
+                    existing.priority = priority
+                    heapq.heappush(self._heap, (priority, next(self._seq), existing.job_id))
+                    self.db.execute("UPDATE jobs SET priority = ? WHERE job_id = ?", (priority, existing.job_id))
+                    self._cond.notify_all()
+                return existing.job_id, False
+            job = _Job(uuid.uuid4().hex[:12], kind, key, priority, params)
+            self.db.execute(
+                "INSERT INTO jobs (job_id, kind, dedupe_key, priority, status, requested_by, enqueued_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job.job_id, kind, key, priority, QUEUED, requested_by, time.time()),
+            )
+            self._jobs[job.job_id] = job
+            self._active[key] = job.job_id
+            heapq.heappush(self._heap, (priority, next(self._seq), job.job_id))
+            self._cond.notify_all()
+            return job.job_id, True
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def _next_job(self) -> Optional[_Job]:
+        with self._cond:
+            while True:
+                if self._stopping:
+                    return None
+                while self._heap:
+                    _, _, job_id = heapq.heappop(self._heap)
+                    job = self._jobs.get(job_id)
+                    if job is not None and job.status == QUEUED:
+                        job.status = RUNNING
+                        return job
+                self._cond.wait()
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                self._run(job)
+            except Exception:  # keep the worker alive if the jobs table is unreachable
+                logger.exception("job %s (%s) could not be recorded", job.job_id, job.kind)
+                with self._cond:
+                    self._jobs.pop(job.job_id, None)
+                    if self._active.get(job.key) == job.job_id:
+                        del self._active[job.key]
+
+    def _run(self, job: _Job):
+        self.db.execute("UPDATE jobs SET status = ?, started_at = ? WHERE job_id = ?",
+                        (RUNNING, time.time(), job.job_id))
+        status, result, error = SUCCEEDED, None, None
+        try:
+            result = self._handlers[job.kind](JobContext(self, job), **job.params)
+        except Exception as exc:
+            logger.exception("job %s (%s) failed", job.job_id, job.kind)
+            status, error = FAILED, f"{type(exc).__name__}: {exc}"
+        self.db.execute(
+            "UPDATE jobs SET status = ?, progress = CASE WHEN ? THEN 1 ELSE progress END, "
+            "result = ?, error = ?, finished_at = ? WHERE job_id = ?",
+            (status, status == SUCCEEDED, None if result is None else json.dumps(result, default=str),
+             error, time.time(), job.job_id),
+        )
+        with self._cond:
+            job.status = status
+            self._jobs.pop(job.job_id, None)
+            if self._active.get(job.key) == job.job_id:
+                del self._active[job.key]
+        callback = self._on_success.get(job.kind)
+        if status == SUCCEEDED and callback is not None:
+            try:
+                callback()
+            except Exception:
+                logger.exception("on_success hook for %s failed", job.kind)
+
+    def _tick(self):
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                now = time.monotonic()
+                due = [s for s in self._schedules if s.next_run <= now]
+                for item in due:
+                    item.next_run = now + item.every_s
+                wake = min((s.next_run for s in self._schedules), default=now + 60) - now
+            for item in due:
+                try:
+                    self.submit(item.kind, item.priority, requested_by="schedule", **item.params)
+                except Exception:
+                    logger.exception("could not enqueue scheduled %s job", item.kind)
+            with self._cond:
+                if not self._stopping:
+                    self._cond.wait(timeout=max(wake, 0.05))
+
+    # ------------------------------------------------------------------
+    # Status
+    # ------------------------------------------------------------------
+
+    def has_active(self, kind: Optional[str] = None) -> bool:
+        """Whether any (or any `kind`) job is queued or running in this process"""
+        with self._cond:
+            return any(kind is None or job.kind == kind for job in self._jobs.values())
+
+    def recent(self, limit: int = 10) -> pd.DataFrame:
+        """Latest jobs, newest first (one indexed query)"""
+        frame = self.db.query_frame(
+            f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs ORDER BY enqueued_at DESC LIMIT ?",
+            (limit,), columns=JOB_COLUMNS,
+        )
+        frame[["message", "error"]] = frame[["message", "error"]].fillna("")
+        return frame
+
+    def last_result(self, kind: str) -> Optional[dict]:
+        """Result of the most recent successful `kind` job"""
+        row = self.db.query_one(
+            "SELECT result FROM jobs WHERE kind = ? AND status = ? ORDER BY finished_at DESC LIMIT 1",
+            (kind, SUCCEEDED),
+        )
+        return json.loads(row[0]) if row and row[0] else None
@@ -0,0 +1,412 @@
+"""
+SCP Analyzer
+============
+Effective Service Control Policy permissions for every account in the
+organization.
+
+- The OU tree and attached SCPs are loaded once; each node's inherited deny
+  statements and per-level allow statements are precomputed, and accounts
+  with identical inheritance share one interned profile
+- Action and resource patterns live in wildcard tries shared by all
+  statements, so a lookup walks the queried string once instead of
+  fnmatch-ing every statement; results are memoized per (action, resource)
+- Per-account decisions then cost a few set intersections (microseconds),
+  and an organization-wide search evaluates each distinct profile once
+- Each policy's size is reported against the 5,120-character SCP limit as
+  stored (policies created through the API or Terraform keep their
+  whitespace), next to the minified size it could be cut to
+
+Denies carrying a Condition are reported as conditional: whether they apply
+depends on the request context.
+"""
+
+import json
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+SCP_MAX_CHARS = 5120
+MAX_SCPS_PER_TARGET = 5
+MATCH_CACHE_SIZE = 4096  # distinct (action, resource) lookups memoized
+FULL_ACCESS = "FullAWSAccess"
+
+ROOT = "root"
+OU = "ou"
+ACCOUNT = "account"
+
+BUDGET_COLUMNS = ["policy", "characters", "budget_pct", "headroom", "minified", "statements", "targets", "accounts"]
+SEARCH_COLUMNS = ["account_id", "account", "ou", "decision", "reason"]
+DENY_COLUMNS = ["policy", "sid", "actions", "resources", "conditional", "attached_to"]
+
+
+# ----------------------------------------------------------------------------
+# Wildcard trie
+# ----------------------------------------------------------------------------
+
+class _TrieNode:
+    __slots__ = ("children", "star", "any", "rules", "is_star")
+
+    def __init__(self, is_star: bool = False):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.star: Optional["_TrieNode"] = None  # '*' child
+        self.any: Optional["_TrieNode"] = None   # '?' child
+        self.rules: Set[int] = set()
+        self.is_star = is_star
+
+
+class PatternTrie:
+    """IAM-style glob patterns ('*' and '?') mapped to the rules that use them"""
+
+    def __init__(self, case_sensitive: bool = True):
+        self.case_sensitive = case_sensitive
+        self.root = _TrieNode()
+        self.patterns = 0
+
+    def add(self, pattern: str, rule: int):
+        node = self.root
+        for char in pattern if self.case_sensitive else pattern.lower():
+            if char == "*":
+                if node.star is None:
+                    node.star = _TrieNode(is_star=True)
+                node = node.star
+            elif char == "?":
+                if node.any is None:
+                    node.any = _TrieNode()
+                node = node.any
+            else:
+                child = node.children.get(char)
+                if child is None:
+                    child = node.children[char] = _TrieNode()
+                node = child
+        if not node.rules:
+            self.patterns += 1
+        node.rules.add(rule)
+
+    def match(self, value: str) -> Set[int]:
+        """Rules with at least one pattern matching `value`"""
+        if not self.case_sensitive:
+            value = value.lower()
+        end = len(value)
+        matched: Set[int] = set()
+        stack = [(self.root, 0)]
+        seen = set()
+        while stack:
+            node, pos = stack.pop()
+            if (id(node), pos) in seen:
+                continue
+            seen.add((id(node), pos))
+            if node.star is not None:
+                stack.append((node.star, pos))  # '*' matching nothing
+            if pos == end:
+                matched |= node.rules
+                continue
+            if node.is_star:
+                stack.append((node, pos + 1))   # '*' absorbing one more character
+            child = node.children.get(value[pos])
+            if child is not None:
+                stack.append((child, pos + 1))
+            if node.any is not None:
+                stack.append((node.any, pos + 1))
+        return matched
+
+
+# ----------------------------------------------------------------------------
+# Organization snapshot
+# ----------------------------------------------------------------------------
+
+EMPTY_SNAPSHOT = {"nodes": {}, "policies": {}, "attachments": {}}
+
+
+def fetch_organization(org) -> dict:
+    """Snapshot of the OU tree, SCP documents and attachments from an Organizations client
+
+    The result is JSON-serializable so it can be stored as a job result.
+    """
+    nodes: Dict[str, dict] = {}
+    roots = org.list_roots()["Roots"]
+    stack = []
+    for root in roots:
+        nodes[root["Id"]] = {"name": "Root", "parent": None, "kind": ROOT}
+        stack.append(root["Id"])
+    while stack:
+        parent = stack.pop()
+        for page in org.get_paginator("list_accounts_for_parent").paginate(ParentId=parent):
+            for account in page["Accounts"]:
+                if account.get("Status", "ACTIVE") == "ACTIVE":
+                    nodes[account["Id"]] = {"name": account.get("Name", account["Id"]), "parent": parent,
+                                            "kind": ACCOUNT}
+        for page in org.get_paginator("list_organizational_units_for_parent").paginate(ParentId=parent):
+            for ou in page["OrganizationalUnits"]:
+                nodes[ou["Id"]] = {"name": ou["Name"], "parent": parent, "kind": OU}
+                stack.append(ou["Id"])
+
+    policies: Dict[str, dict] = {}
+    attachments: Dict[str, List[str]] = {}
+    for page in org.get_paginator("list_policies").paginate(Filter="SERVICE_CONTROL_POLICY"):
+        for summary in page["Policies"]:
+            policy = org.describe_policy(PolicyId=summary["Id"])["Policy"]
+            policies[summary["Id"]] = {"name": summary["Name"], "content": policy["Content"]}
+            for targets in org.get_paginator("list_targets_for_policy").paginate(PolicyId=summary["Id"]):
+                for target in targets["Targets"]:
+                    attachments.setdefault(target["TargetId"], []).append(summary["Id"])
+    return {"nodes": nodes, "policies": policies, "attachments": attachments}
+
+
+def _as_list(value) -> List[str]:
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def minified_size(content: str) -> int:
+    """Characters the policy would occupy with whitespace outside strings dropped"""
+    try:
+        return len(json.dumps(json.loads(content), separators=(",", ":"), ensure_ascii=False))
+    except ValueError:
+        return len(content)
+
+
+# ----------------------------------------------------------------------------
+# Analyzer
+# ----------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class _Statement:
+    policy_id: str
+    sid: str
+    effect: str
+    actions: Tuple[str, ...]
+    resources: Tuple[str, ...]
+    not_action: bool
+    not_resource: bool
+    conditional: bool
+
+
+@dataclass
+class Decision:
+    """Outcome of one (account, action, resource) query"""
+
+    denied: bool
+    conditional: bool = False
+    reasons: List[str] = field(default_factory=list)
+
+    @property
+    def label(self) -> str:
+        if self.denied:
+            return "Denied"
+        return "Conditionally denied" if self.conditional else "Allowed"
+
+
+@dataclass(frozen=True)
+class _Profile:
+    """Interned inheritance of one or more accounts"""
+
+    denies: FrozenSet[int]
+    allow_levels: Tuple[Tuple[str, FrozenSet[int]], ...]  # (level label, allow rules attached there)
+
+
+class ScpAnalyzer:
+    """Precomputed effective SCP denies for every account"""
+
+    def __init__(self, snapshot: dict):
+        self.nodes: Dict[str, dict] = snapshot["nodes"]
+        self.policies: Dict[str, dict] = snapshot["policies"]
+        self.attachments: Dict[str, List[str]] = snapshot["attachments"]
+        self.statements: List[_Statement] = []
+        self._policy_rules: Dict[str, List[int]] = {}
+        self._actions = PatternTrie(case_sensitive=False)
+        self._not_actions = PatternTrie(case_sensitive=False)
+        self._resources = PatternTrie()
+        self._not_resources = PatternTrie()
+        self._not_action_rules: Set[int] = set()
+        self._not_resource_rules: Set[int] = set()
+        self._match_cache: Dict[Tuple[str, str], FrozenSet[int]] = {}
+        for policy_id, policy in self.policies.items():
+            self._policy_rules[policy_id] = [self._intern(policy_id, s) for s in self._parse(policy["content"])]
+
+        self._paths: Dict[str, Tuple[str, ...]] = {}
+        self._profiles: Dict[_Profile, _Profile] = {}
+        self.account_profiles: Dict[str, _Profile] = {}
+        for node_id, node in self.nodes.items():
+            if node["kind"] == ACCOUNT:
+                self.account_profiles[node_id] = self._profile(self._path(node_id))
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _parse(content: str) -> List[dict]:
+        try:
+            document = json.loads(content)
+        except ValueError:
+            return []
+        return [s for s in _as_list(document.get("Statement")) if isinstance(s, dict)]
+
+    def _intern(self, policy_id: str, raw: dict) -> int:
+        rule = len(self.statements)
+        not_action = "NotAction" in raw
+        not_resource = "NotResource" in raw
+        actions = tuple(_as_list(raw.get("NotAction" if not_action else "Action")))
+        resources = tuple(_as_list(raw.get("NotResource" if not_resource else "Resource"))) or ("*",)
+        self.statements.append(_Statement(policy_id, raw.get("Sid", ""), raw.get("Effect", "Allow"),
+                                          actions, resources, not_action, not_resource, bool(raw.get("Condition"))))
+        for action in actions:
+            (self._not_actions if not_action else self._actions).add(action, rule)
+        for resource in resources:
+            (self._not_resources if not_resource else self._resources).add(resource, rule)
+        if not_action:
+            self._not_action_rules.add(rule)
+        if not_resource:
+            self._not_resource_rules.add(rule)
+        return rule
+
+    def _path(self, node_id: str) -> Tuple[str, ...]:
+        """Node ids from the root down to `node_id`"""
+        path = self._paths.get(node_id)
+        if path is None:
+            parent = self.nodes[node_id]["parent"]
+            path = (self._path(parent) if parent in self.nodes else ()) + (node_id,)
+            self._paths[node_id] = path
+        return path
+
+    def _profile(self, path: Tuple[str, ...]) -> _Profile:
+        denies: Set[int] = set()
+        levels = []
+        for node_id in path:
+            allows = set()
+            for policy_id in self.attachments.get(node_id, []):
+                for rule in self._policy_rules.get(policy_id, []):
+                    (denies if self.statements[rule].effect == "Deny" else allows).add(rule)
+            # Labelled by OU name, not id, so sibling accounts intern to one profile
+            node = self.nodes[node_id]
+            levels.append(("the account" if node["kind"] == ACCOUNT else node["name"], frozenset(allows)))
+        profile = _Profile(frozenset(denies), tuple(levels))
+        return self._profiles.setdefault(profile, profile)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _matching(self, action: str, resource: str) -> FrozenSet[int]:
+        """Every statement (allow or deny) that applies to this action and resource"""
+        key = (action, resource)
+        rules = self._match_cache.get(key)
+        if rules is None:
+            by_action = self._actions.match(action) | (self._not_action_rules - self._not_actions.match(action))
+            by_resource = (self._resources.match(resource)
+                           | (self._not_resource_rules - self._not_resources.match(resource)))
+            if len(self._match_cache) >= MATCH_CACHE_SIZE:
+                self._match_cache.clear()
+            rules = self._match_cache[key] = frozenset(by_action & by_resource)
+        return rules
+
+    def _describe(self, rule: int) -> str:
+        statement = self.statements[rule]
+        name = self.policies[statement.policy_id]["name"]
+        return f"{name} / {statement.sid}" if statement.sid else name
+
+    def _decide(self, profile: _Profile, rules: FrozenSet[int]) -> Decision:
+        denies = sorted(profile.denies & rules)
+        unconditional = [r for r in denies if not self.statements[r].conditional]
+        if unconditional:
+            return Decision(True, reasons=[self._describe(r) for r in unconditional])
+        for level, allows in profile.allow_levels:
+            if not allows & rules:
+                return Decision(True, reasons=[f"not allowed by any SCP on {level}"])
+        return Decision(False, conditional=bool(denies), reasons=[self._describe(r) for r in denies])
+
+    def decide(self, account_id: str, action: str, resource: str = "*") -> Decision:
+        """Whether SCPs deny `action` on `resource` in one account"""
+        return self._decide(self.account_profiles[account_id], self._matching(action, resource))
+
+    def search(self, action: str, resource: str = "*", include_allowed: bool = False) -> pd.DataFrame:
+        """Every account where SCPs deny (or conditionally deny) an action"""
+        rules = self._matching(action, resource)
+        decisions = {profile: self._decide(profile, rules) for profile in self._profiles}
+        rows = []
+        for account_id, profile in self.account_profiles.items():
+            decision = decisions[profile]
+            if decision.denied or decision.conditional or include_allowed:
+                rows.append((account_id, self.nodes[account_id]["name"], self._ou_name(account_id),
+                             decision.label, "; ".join(decision.reasons)))
+        return pd.DataFrame(rows, columns=SEARCH_COLUMNS)
+
+    def effective_denies(self, account_id: str) -> pd.DataFrame:
+        """Deny statements that reach one account, with where each is attached"""
+        attached_at = {}
+        for node_id in self._path(account_id):
+            for policy_id in self.attachments.get(node_id, []):
+                attached_at.setdefault(policy_id, self.nodes[node_id]["name"])
+        rows = []
+        for rule in sorted(self.account_profiles[account_id].denies):
+            statement = self.statements[rule]
+            actions = ("NOT " if statement.not_action else "") + ", ".join(statement.actions)
+            resources = ("NOT " if statement.not_resource else "") + ", ".join(statement.resources)
+            rows.append((self.policies[statement.policy_id]["name"], statement.sid, actions, resources,
+                         statement.conditional, attached_at.get(statement.policy_id, "")))
+        return pd.DataFrame(rows, columns=DENY_COLUMNS)
+
+    def _ou_name(self, account_id: str) -> str:
+        parent = self.nodes[account_id]["parent"]
+        return self.nodes[parent]["name"] if parent in self.nodes else ""
+
+    # ------------------------------------------------------------------
+    # Summaries
+    # ------------------------------------------------------------------
+
+    def coverage(self) -> Dict[str, int]:
+        """Accounts each policy applies to, directly or through an OU"""
+        counts = {policy_id: 0 for policy_id in self.policies}
+        for account_id in self.account_profiles:
+            for policy_id in {p for node in self._path(account_id) for p in self.attachments.get(node, [])}:
+                if policy_id in counts:
+                    counts[policy_id] += 1
+        return counts
+
+    def budget(self) -> pd.DataFrame:
+        """Character budget per policy against the 5,120-character limit, fullest first"""
+        targets: Dict[str, int] = {}
+        for attached in self.attachments.values():
+            for policy_id in attached:
+                targets[policy_id] = targets.get(policy_id, 0) + 1
+        coverage = self.coverage()
+        rows = []
+        for policy_id, policy in self.policies.items():
+            # The limit applies to the text as stored, which only the console minifies
+            size = len(policy["content"])
+            rows.append((policy["name"], size, round(100.0 * size / SCP_MAX_CHARS, 1), SCP_MAX_CHARS - size,
+                         minified_size(policy["content"]), len(self._policy_rules[policy_id]),
+                         targets.get(policy_id, 0), coverage[policy_id]))
+        frame = pd.DataFrame(rows, columns=BUDGET_COLUMNS)
+        return frame.sort_values("characters", ascending=False, ignore_index=True)
+
+    def crowded_targets(self) -> List[str]:
+        """OUs and accounts already at the SCPs-per-target quota"""
+        return [self.nodes[target]["name"] for target, attached in self.attachments.items()
+                if target in self.nodes and len(attached) >= MAX_SCPS_PER_TARGET]
+
+    def guardrails(self) -> List[dict]:
+        """Deny-bearing SCPs for the Active Guardrails list, widest coverage first"""
+        coverage = self.coverage()
+        items = [
+            {"name": policy["name"], "type": "SCP", "status": "Active" if coverage[policy_id] else "Detached",
+             "accounts": coverage[policy_id]}
+            for policy_id, policy in self.policies.items()
+            if policy["name"] != FULL_ACCESS
+            and any(self.statements[r].effect == "Deny" for r in self._policy_rules[policy_id])
+        ]
+        return sorted(items, key=lambda item: -item["accounts"])
+
+    @property
+    def accounts(self) -> int:
+        return len(self.account_profiles)
+
+
+def account_options(analyzer: ScpAnalyzer, ous: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    """account id -> 'name (id)' for pickers, only accounts directly under `ous` if given"""
+    allowed = None if ous is None else set(ous)
+    return {account_id: f"{analyzer.nodes[account_id]['name']} ({account_id})"
+            for account_id in sorted(analyzer.account_profiles, key=lambda a: analyzer.nodes[a]["name"])
+            if allowed is None or analyzer._ou_name(account_id) in allowed}
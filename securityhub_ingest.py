@@ -0,0 +1,325 @@
+"""
+Security Hub Findings Ingestion
+===============================
+Incremental pull of findings from the delegated-admin aggregation region.
+
+- `GetFindings` is read in UpdatedAt order inside a fixed [start, end]
+  window; the next sync starts where the last window ended, so a backfill
+  or re-sync never downloads a finding again unless it was updated
+- Findings are upserted by their ASFF Id; an update only wins if it is not
+  older than the stored row
+- Each page and the cursor that follows it commit in one transaction, so a
+  crash resumes from the saved NextToken (or, if that token has expired,
+  from the newest UpdatedAt already stored)
+- Rows keep only the columns the dashboard filters on; severity is stored
+  as its rank in kics_ingest.SEVERITIES behind a (record state, workflow,
+  severity) index, so open-findings counts never touch the table
+- securityhub_opened records when each finding last became open; a finding
+  that is resolved and reopened gets a new opened_at, so it is news again
+
+The client is injectable, so the ingester runs unchanged against any local
+stand-in for the Security Hub endpoint.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from database import Database
+from kics_ingest import SEVERITIES, SEVERITY_RANK
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 100       # the GetFindings maximum
+SETTLE_S = 60         # windows end this far in the past so late writes are not skipped
+OPEN_WORKFLOW = ("NEW", "NOTIFIED")
+EXPIRED_TOKEN_CODES = frozenset({"InvalidInputException", "InvalidNextTokenException"})
+# ASFF labels that differ from the KICS severities
+SEVERITY_LABELS = {"INFORMATIONAL": "INFO"}
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS securityhub_findings (
+        finding_id TEXT PRIMARY KEY,
+        account_id TEXT NOT NULL,
+        region TEXT NOT NULL DEFAULT '',
+        product TEXT NOT NULL DEFAULT '',
+        generator_id TEXT NOT NULL DEFAULT '',
+        title TEXT NOT NULL DEFAULT '',
+        resource_type TEXT NOT NULL DEFAULT '',
+        resource_id TEXT NOT NULL DEFAULT '',
+        severity_rank INTEGER NOT NULL,
+        workflow_status TEXT NOT NULL,
+        record_state TEXT NOT NULL,
+        compliance_status TEXT NOT NULL DEFAULT '',
+        first_observed DOUBLE PRECISION,
+        updated_at DOUBLE PRECISION NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_securityhub_open "
+    "ON securityhub_findings (record_state, workflow_status, severity_rank)",
+    "CREATE INDEX IF NOT EXISTS ix_securityhub_account ON securityhub_findings (account_id, severity_rank)",
+    """
+    CREATE TABLE IF NOT EXISTS securityhub_opened (
+        finding_id TEXT PRIMARY KEY,
+        opened_at DOUBLE PRECISION NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS securityhub_cursor (
+        scope TEXT PRIMARY KEY,
+        window_start DOUBLE PRECISION NOT NULL,
+        window_end DOUBLE PRECISION,
+        high_water DOUBLE PRECISION,
+        next_token TEXT,
+        synced_at DOUBLE PRECISION
+    )
+    """,
+]
+
+_UPSERT_FINDING = """
+    INSERT INTO securityhub_findings (finding_id, account_id, region, product, generator_id, title,
+                                      resource_type, resource_id, severity_rank, workflow_status,
+                                      record_state, compliance_status, first_observed, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (finding_id) DO UPDATE SET
+        severity_rank = excluded.severity_rank,
+        workflow_status = excluded.workflow_status,
+        record_state = excluded.record_state,
+        compliance_status = excluded.compliance_status,
+        title = excluded.title,
+        updated_at = excluded.updated_at
+    WHERE excluded.updated_at >= securityhub_findings.updated_at
+"""
+
+_UPSERT_CURSOR = """
+    INSERT INTO securityhub_cursor (scope, window_start, window_end, high_water, next_token, synced_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (scope) DO UPDATE SET
+        window_start = excluded.window_start,
+        window_end = excluded.window_end,
+        high_water = excluded.high_water,
+        next_token = excluded.next_token,
+        synced_at = COALESCE(excluded.synced_at, securityhub_cursor.synced_at)
+"""
+
+
+# An open finding keeps the time it opened; a closed one drops it, so reopening stamps a new time
+_MARK_OPENED = """
+    INSERT INTO securityhub_opened (finding_id, opened_at) VALUES (?, ?)
+    ON CONFLICT (finding_id) DO NOTHING
+"""
+
+
+def is_open(row: tuple) -> bool:
+    """Whether a finding_row is active and unresolved"""
+    return row[10] == "ACTIVE" and row[9] in OPEN_WORKFLOW
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[float]:
+    """ASFF ISO 8601 timestamp to epoch seconds"""
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def format_timestamp(epoch: float) -> str:
+    """Epoch seconds to the millisecond ISO 8601 form DateFilter expects"""
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def severity_rank(finding: dict) -> int:
+    label = (finding.get("Severity") or {}).get("Label", "INFORMATIONAL")
+    return SEVERITY_RANK.get(SEVERITY_LABELS.get(label, label), SEVERITY_RANK["INFO"])
+
+
+def finding_row(finding: dict) -> tuple:
+    """The stored columns of one ASFF finding"""
+    resource = (finding.get("Resources") or [{}])[0]
+    return (
+        finding["Id"],
+        finding.get("AwsAccountId", ""),
+        finding.get("Region", ""),
+        finding.get("ProductName", ""),
+        finding.get("GeneratorId", ""),
+        finding.get("Title", ""),
+        resource.get("Type", ""),
+        resource.get("Id", ""),
+        severity_rank(finding),
+        (finding.get("Workflow") or {}).get("Status", "NEW"),
+        finding.get("RecordState", "ACTIVE"),
+        (finding.get("Compliance") or {}).get("Status", ""),
+        parse_timestamp(finding.get("FirstObservedAt")),
+        parse_timestamp(finding["UpdatedAt"]),
+    )
+
+
+@dataclass
+class IngestStats:
+    """What one sync downloaded and wrote"""
+
+    pages: int = 0
+    downloaded: int = 0
+    resumed: bool = False
+    window_start: float = 0.0
+    window_end: float = 0.0
+    wall_time_s: float = 0.0
+
+
+class SecurityHubIngester:
+    """Pulls aggregated findings into the shared database, one UpdatedAt window per sync"""
+
+    def __init__(self, db: Database, client, scope: str = "aggregator", page_size: int = PAGE_SIZE,
+                 settle_s: float = SETTLE_S):
+        self.db = db
+        self.client = client
+        self.scope = scope
+        self.page_size = min(max(1, page_size), PAGE_SIZE)
+        self.settle_s = settle_s
+        self.db.executescript(SCHEMA)
+
+    @classmethod
+    def from_settings(cls, settings, db: Database, collector) -> "SecurityHubIngester":
+        """Reads the aggregation region, assuming into the delegated admin when one is set"""
+        region = settings.securityhub_region or settings.aws_default_region
+        if settings.securityhub_admin_account:
+            client = collector.member_client(settings.securityhub_admin_account, "securityhub", region)
+        else:
+            client = collector.management_client("securityhub", region)
+        return cls(db, client, scope=region)
+
+    # ------------------------------------------------------------------
+    # Cursor
+    # ------------------------------------------------------------------
+
+    def cursor(self) -> Optional[Tuple[float, Optional[float], Optional[float], Optional[str]]]:
+        """(window_start, window_end, high_water, next_token) of the last sync"""
+        return self.db.query_one(
+            "SELECT window_start, window_end, high_water, next_token FROM securityhub_cursor WHERE scope = ?",
+            (self.scope,),
+        )
+
+    def last_sync(self) -> Optional[float]:
+        row = self.db.query_one("SELECT synced_at FROM securityhub_cursor WHERE scope = ?", (self.scope,))
+        return row[0] if row else None
+
+    # ------------------------------------------------------------------
+    # Sync
+    # ------------------------------------------------------------------
+
+    def sync(self, on_progress: Optional[Callable[[float, str], None]] = None,
+             now: Optional[float] = None) -> IngestStats:
+        """Download everything updated since the last completed window
+
+        An unfinished window (a crash or a failed page) is resumed first;
+        a fresh window only starts once it completes.
+        """
+        started = time.perf_counter()
+        stats = IngestStats()
+        cursor = self.cursor()
+        token = None
+        if cursor is not None and cursor[1] is not None:
+            start, end, high_water, token = cursor
+            stats.resumed = True
+        else:
+            start = cursor[0] if cursor is not None else 0.0
+            end = (time.time() if now is None else now) - self.settle_s
+            high_water = None
+            if end <= start:
+                return stats
+            self.db.execute(_UPSERT_CURSOR, (self.scope, start, end, None, None, None))
+        stats.window_start, stats.window_end = start, end
+
+        while True:
+            try:
+                page = self._get_page(start, end, token)
+            except Exception as exc:
+                if token is None or _error_code(exc) not in EXPIRED_TOKEN_CODES:
+                    raise
+                # The saved token outlived the API's pagination session: everything
+                # up to high_water is stored, so restart the window from there
+                logger.warning("Security Hub NextToken rejected (%s); resuming from the stored high water", exc)
+                start, token = high_water if high_water is not None else start, None
+                continue
+            findings = page.get("Findings", [])
+            token = page.get("NextToken") or None
+            rows = [finding_row(f) for f in findings]
+            if rows:
+                high_water = max(high_water or 0.0, max(row[-1] for row in rows))
+            with self.db.transaction() as conn:
+                self.db.executemany(_UPSERT_FINDING, rows, conn=conn)
+                self.db.executemany(_MARK_OPENED, [(row[0], row[-1]) for row in rows if is_open(row)], conn=conn)
+                self.db.executemany("DELETE FROM securityhub_opened WHERE finding_id = ?",
+                                    [(row[0],) for row in rows if not is_open(row)], conn=conn)
+                if token:
+                    self.db.execute(_UPSERT_CURSOR, (self.scope, start, end, high_water, token, None), conn=conn)
+                else:
+                    # Window complete: the next sync begins where this one ended
+                    self.db.execute(_UPSERT_CURSOR, (self.scope, end, None, None, None, time.time()), conn=conn)
+            stats.pages += 1
+            stats.downloaded += len(rows)
+            if on_progress is not None:
+                done = ((high_water or start) - stats.window_start) / max(end - stats.window_start, 1e-9)
+                on_progress(min(done, 1.0), f"{stats.downloaded:,} findings")
+            if not token:
+                break
+        stats.wall_time_s = time.perf_counter() - started
+        return stats
+
+    def _get_page(self, start: float, end: float, token: Optional[str]) -> dict:
+        kwargs = {
+            "Filters": {"UpdatedAt": [{"Start": format_timestamp(start), "End": format_timestamp(end)}]},
+            "SortCriteria": [{"Field": "UpdatedAt", "SortOrder": "asc"}],
+            "MaxResults": self.page_size,
+        }
+        if token:
+            kwargs["NextToken"] = token
+        return self.client.get_findings(**kwargs)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def open_counts(self) -> Dict[str, int]:
+        """Active, unresolved findings per severity (served from ix_securityhub_open)"""
+        rows = self.db.query(
+            "SELECT severity_rank, COUNT(*) FROM securityhub_findings "
+            f"WHERE record_state = 'ACTIVE' AND workflow_status IN ({', '.join('?' * len(OPEN_WORKFLOW))}) "
+            "GROUP BY severity_rank",
+            OPEN_WORKFLOW,
+        )
+        counts = {name: 0 for name in SEVERITIES[:4]}
+        for rank, count in rows:
+            counts[SEVERITIES[rank]] = counts.get(SEVERITIES[rank], 0) + int(count)
+        return counts
+
+    def open_since(self, since: float, max_rank: int = SEVERITY_RANK["HIGH"]) -> pd.DataFrame:
+        """Active, unresolved findings at least as severe as `max_rank` updated after `since`,
+        with when each last became open"""
+        return self.db.query_frame(
+            "SELECT f.finding_id, f.account_id, f.region, f.title, f.resource_id, f.severity_rank, f.updated_at, "
+            "COALESCE(o.opened_at, f.first_observed, 0) AS opened_at "
+            "FROM securityhub_findings f LEFT JOIN securityhub_opened o ON o.finding_id = f.finding_id "
+            "WHERE f.updated_at > ? AND f.severity_rank <= ? AND f.record_state = 'ACTIVE' "
+            f"AND f.workflow_status IN ({', '.join('?' * len(OPEN_WORKFLOW))}) ORDER BY f.updated_at",
+            (since, max_rank, *OPEN_WORKFLOW),
+        )
+
+    def high_water(self) -> Optional[float]:
+        row = self.db.query_one("SELECT MAX(updated_at) FROM securityhub_findings")
+        return row[0] if row else None
+
+    def count(self) -> int:
+        row = self.db.query_one("SELECT COUNT(*) FROM securityhub_findings")
+        return int(row[0]) if row else 0
+
+
+def _error_code(exc: Exception) -> str:
+    return (getattr(exc, "response", None) or {}).get("Error", {}).get("Code", "")
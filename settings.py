@@ -0,0 +1,236 @@
+"""
+Platform Settings
+=================
+Typed view over the environment variables documented in .env.example.
+
+- Values are read once per process and shared by every Streamlit session
+- A local .env file is honoured when python-dotenv is installed
+- Everything defaults to demo mode, so the dashboard runs with no AWS access
+"""
+
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+try:
+    from dotenv import load_dotenv
+except ImportError:  # python-dotenv is optional at runtime
+    load_dotenv = None
+
+
+def env_str(name: str, default: str = "") -> str:
+    """Read a string environment variable"""
+    return os.getenv(name, default).strip()
+
+
+def env_bool(name: str, default: bool = False) -> bool:
+    """Read a boolean feature flag (true/false, 1/0, yes/no)"""
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer environment variable, falling back on bad input"""
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Process-wide configuration"""
+
+    app_env: str
+    aws_org_id: str
+    aws_mgmt_account: str
+    aws_assume_role: str
+    aws_external_id: str
+    aws_default_region: str
+    aws_live_data: bool
+    aws_config_aggregator: str
+    collector_max_workers: int
+    collect_resource_details: bool
+    multi_region: bool
+    collector_regions: str
+    collector_service_limits: str
+    collector_api_rates: str
+    securityhub_enabled: bool
+    securityhub_region: str
+    securityhub_admin_account: str
+    securityhub_sync_interval_seconds: int
+    rule_inventory_path: str
+    rule_parameters: str
+    rule_evaluation_interval_seconds: int
+    db_backend: str
+    db_host: str
+    db_port: int
+    db_name: str
+    db_user: str
+    db_password: str
+    db_ssl_mode: str
+    db_pool_size: int
+    sqlite_path: str
+    archive_dir: str
+    archive_interval_seconds: int
+    export_dir: str
+    cache_ttl_seconds: int
+    cache_max_size: int
+    kics_results_path: str
+    opa_binary: str
+    opa_policy_dir: str
+    opa_package_prefix: str
+    opa_workers: int
+    terraform_plan_dir: str
+    terraform_drift_dir: str
+    terraform_workspaces: str
+    terraform_drift_interval_seconds: int
+    policy_repo_path: str
+    policy_index_interval_seconds: int
+    scheduler_workers: int
+    config_sync_interval_seconds: int
+    scp_sync_interval_seconds: int
+    render_profiling: bool
+    auth_backend: str
+    auth_users_file: str
+    auth_secret_key: str
+    auth_cookie_expiry_days: int
+    auth_hash_cost: int
+    auth_workers: int
+    auth_max_attempts: int
+    auth_lockout_seconds: int
+    entitlements_file: str
+    entitlements_reload_seconds: int
+    notifications_enabled: bool
+    feature_slack: bool
+    feature_jira: bool
+    slack_webhook_url: str
+    pagerduty_key: str
+    pagerduty_events_url: str
+    jira_url: str
+    jira_user: str
+    jira_api_token: str
+    jira_project_key: str
+    smtp_server: str
+    smtp_port: int
+    smtp_user: str
+    smtp_password: str
+    smtp_from: str
+    smtp_to: str
+    smtp_starttls: bool
+    notify_interval_seconds: int
+    notify_digest_windows: str
+    notify_min_severity: str
+    notify_rate_limits: str
+    notify_max_attempts: int
+    tab_routing: str
+    github_token: str
+    github_repo: str
+    github_api_url: str
+    github_concurrency: int
+    github_sync_interval_seconds: int
+    deployment_workflows: str
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            app_env=env_str("APP_ENV", "development"),
+            aws_org_id=env_str("AWS_ORG_ID"),
+            aws_mgmt_account=env_str("AWS_MGMT_ACCOUNT"),
+            aws_assume_role=env_str("AWS_ASSUME_ROLE", "GuardrailsComplianceRole"),
+            aws_external_id=env_str("AWS_EXTERNAL_ID"),
+            aws_default_region=env_str("AWS_DEFAULT_REGION", "us-east-1"),
+            aws_live_data=env_bool("AWS_LIVE_DATA"),
+            aws_config_aggregator=env_str("AWS_CONFIG_AGGREGATOR"),
+            collector_max_workers=env_int("COLLECTOR_MAX_WORKERS", 32),
+            collect_resource_details=env_bool("COLLECT_RESOURCE_DETAILS", True),
+            multi_region=env_bool("FEATURE_MULTI_REGION"),
+            collector_regions=env_str("COLLECTOR_REGIONS"),
+            collector_service_limits=env_str("COLLECTOR_SERVICE_LIMITS"),
+            collector_api_rates=env_str("COLLECTOR_API_RATES"),
+            securityhub_enabled=env_bool("SECURITYHUB_ENABLED", True),
+            securityhub_region=env_str("SECURITYHUB_REGION"),
+            securityhub_admin_account=env_str("SECURITYHUB_ADMIN_ACCOUNT"),
+            securityhub_sync_interval_seconds=env_int("SECURITYHUB_SYNC_INTERVAL_SECONDS", 900),
+            rule_inventory_path=env_str("RULE_INVENTORY_PATH"),
+            rule_parameters=env_str("RULE_PARAMETERS"),
+            rule_evaluation_interval_seconds=env_int("RULE_EVALUATION_INTERVAL_SECONDS", 900),
+            db_backend=env_str("DB_BACKEND", "auto").lower(),
+            db_host=env_str("DB_HOST"),
+            db_port=env_int("DB_PORT", 5432),
+            db_name=env_str("DB_NAME", "guardrails"),
+            db_user=env_str("DB_USER", "guardrails_app"),
+            db_password=env_str("DB_PASSWORD"),
+            db_ssl_mode=env_str("DB_SSL_MODE", "prefer"),
+            db_pool_size=env_int("DB_POOL_SIZE", 10),
+            sqlite_path=env_str("SQLITE_PATH", "data/guardrails.db"),
+            archive_dir=env_str("ARCHIVE_DIR", "data/archive"),
+            archive_interval_seconds=env_int("ARCHIVE_INTERVAL_SECONDS", 86400),
+            export_dir=env_str("EXPORT_DIR", "data/exports"),
+            cache_ttl_seconds=env_int("CACHE_TTL_SECONDS", 300),
+            cache_max_size=env_int("CACHE_MAX_SIZE", 1000),
+            kics_results_path=env_str("KICS_RESULTS_PATH"),
+            opa_binary=env_str("OPA_BINARY", "opa"),
+            opa_policy_dir=env_str("OPA_POLICY_DIR", "policies/opa"),
+            opa_package_prefix=env_str("OPA_PACKAGE_PREFIX", "terraform"),
+            opa_workers=env_int("OPA_WORKERS", 4),
+            terraform_plan_dir=env_str("TERRAFORM_PLAN_DIR"),
+            terraform_drift_dir=env_str("TERRAFORM_DRIFT_DIR"),
+            terraform_workspaces=env_str("TERRAFORM_WORKSPACES", "scp-deployment,config-rules,stacksets"),
+            terraform_drift_interval_seconds=env_int("TERRAFORM_DRIFT_INTERVAL_SECONDS", 900),
+            policy_repo_path=env_str("POLICY_REPO_PATH"),
+            policy_index_interval_seconds=env_int("POLICY_INDEX_INTERVAL_SECONDS", 300),
+            scheduler_workers=env_int("SCHEDULER_WORKERS", 2),
+            config_sync_interval_seconds=env_int("CONFIG_SYNC_INTERVAL_SECONDS", 900),
+            scp_sync_interval_seconds=env_int("SCP_SYNC_INTERVAL_SECONDS", 3600),
+            render_profiling=env_bool("RENDER_PROFILING"),
+            auth_backend=env_str("AUTH_BACKEND", "demo").lower(),
+            auth_users_file=env_str("AUTH_USERS_FILE"),
+            auth_secret_key=env_str("AUTH_SECRET_KEY"),
+            auth_cookie_expiry_days=env_int("AUTH_COOKIE_EXPIRY_DAYS", 30),
+            auth_hash_cost=env_int("AUTH_HASH_COST", 14),
+            auth_workers=env_int("AUTH_WORKERS", 4),
+            auth_max_attempts=env_int("AUTH_MAX_ATTEMPTS", 5),
+            auth_lockout_seconds=env_int("AUTH_LOCKOUT_SECONDS", 300),
+            entitlements_file=env_str("ENTITLEMENTS_FILE"),
+            entitlements_reload_seconds=env_int("ENTITLEMENTS_RELOAD_SECONDS", 60),
+            notifications_enabled=env_bool("NOTIFICATIONS_ENABLED"),
+            feature_slack=env_bool("FEATURE_SLACK", True),
+            feature_jira=env_bool("FEATURE_JIRA", True),
+            slack_webhook_url=env_str("SLACK_WEBHOOK_URL"),
+            pagerduty_key=env_str("PAGERDUTY_KEY"),
+            pagerduty_events_url=env_str("PAGERDUTY_EVENTS_URL", "https://events.pagerduty.com/v2/enqueue"),
+            jira_url=env_str("JIRA_URL"),
+            jira_user=env_str("JIRA_USER"),
+            jira_api_token=env_str("JIRA_API_TOKEN"),
+            jira_project_key=env_str("JIRA_PROJECT_KEY", "SEC"),
+            smtp_server=env_str("SMTP_SERVER"),
+            smtp_port=env_int("SMTP_PORT", 587),
+            smtp_user=env_str("SMTP_USER"),
+            smtp_password=env_str("SMTP_PASSWORD"),
+            smtp_from=env_str("SMTP_FROM"),
+            smtp_to=env_str("SMTP_TO"),
+            smtp_starttls=env_bool("SMTP_STARTTLS", True),
+            notify_interval_seconds=env_int("NOTIFY_INTERVAL_SECONDS", 30),
+            notify_digest_windows=env_str("NOTIFY_DIGEST_WINDOWS", "slack=300,pagerduty=60,jira=900,email=900"),
+            notify_min_severity=env_str("NOTIFY_MIN_SEVERITY", "slack=MEDIUM,pagerduty=CRITICAL,jira=HIGH,email=HIGH"),
+            notify_rate_limits=env_str("NOTIFY_RATE_LIMITS", "slack=1,pagerduty=2,jira=1,email=0.5"),
+            notify_max_attempts=env_int("NOTIFY_MAX_ATTEMPTS", 8),
+            tab_routing=env_str("TAB_ROUTING", "lazy").lower(),
+            github_token=env_str("GITHUB_TOKEN"),
+            github_repo=env_str("GITHUB_REPO", "company/aws-governance-policies"),
+            github_api_url=env_str("GITHUB_API_URL", "https://api.github.com"),
+            github_concurrency=env_int("GITHUB_CONCURRENCY", 4),
+            github_sync_interval_seconds=env_int("GITHUB_SYNC_INTERVAL_SECONDS", 300),
+            deployment_workflows=env_str("DEPLOYMENT_WORKFLOWS"),
+        )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load settings once per process"""
+    if load_dotenv is not None:
+        load_dotenv()
+    return Settings.from_env()
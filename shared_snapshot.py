@@ -0,0 +1,173 @@
+"""
+Shared Data Snapshot
+====================
+One read-only, versioned set of org-wide frames shared by every session.
+
+- A published snapshot never changes; a refresh builds the next version off
+  to the side and swaps a single reference, so readers never see a mix
+- Each rerun pins the snapshot it started with, so every tab renders the
+  same version even when a sync lands halfway through the script
+- Sessions receive shallow frames: with pandas copy-on-write nothing is
+  copied unless a session writes to its frame, and then only that column
+- Each entitlement's projection (granted datasets only, rows limited to its
+  portfolios) is built once per snapshot, at publish time for every granted
+  entitlement, so a rerun's view is a dictionary lookup
+- Frames without a portfolio column are org-wide; for a portfolio-limited
+  entitlement the `derive` hook rebuilds them from the scoped frames, and
+  any it cannot rebuild are withheld
+- Projections are rebuilt only when data is published or the entitlements
+  change (`reproject`), never per rerun or per session
+
+Frames handed to `publish()` belong to the snapshot afterwards and must not
+be modified by the caller.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+import pandas as pd
+
+from entitlements import SCOPE_COLUMN, Entitlement, EntitlementModel
+
+
+def _share(frame: pd.DataFrame) -> pd.DataFrame:
+    """A new DataFrame object over the same buffers (copy-on-write)"""
+    return frame.copy(deep=False)
+
+
+# Portfolio-scoped frames -> org-wide frames rebuilt from them
+Derive = Callable[[Mapping[str, pd.DataFrame]], Mapping[str, pd.DataFrame]]
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """One published version of the org-wide frames"""
+
+    version: int
+    published_at: float
+    nbytes: int
+    frames: Mapping[str, pd.DataFrame] = field(repr=False)
+    projections: Dict[Entitlement, Mapping[str, pd.DataFrame]] = field(
+        default_factory=dict, repr=False, compare=False)
+    derive: Optional[Derive] = field(default=None, repr=False, compare=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def project(self, entitlement: Entitlement) -> Mapping[str, pd.DataFrame]:
+        """The frames as `entitlement` sees them, built on first use and kept with the snapshot"""
+        projection = self.projections.get(entitlement)
+        if projection is not None:
+            return projection
+        with self._lock:
+            projection = self.projections.get(entitlement)
+            if projection is None:
+                projection = self._project(entitlement)
+                self.projections[entitlement] = projection
+            return projection
+
+    def _project(self, entitlement: Entitlement) -> Mapping[str, pd.DataFrame]:
+        frames = {}
+        for name, frame in self.frames.items():
+            rows = entitlement.rows(frame)
+            frames[name] = frame if rows is None else frame.take(rows).reset_index(drop=True)
+        if entitlement.portfolios is not None:
+            # Org-wide aggregates would leak other portfolios: rebuilt from the scoped rows or withheld
+            derived = self.derive(frames) if self.derive is not None else {}
+            frames = {**{name: frame for name, frame in frames.items() if SCOPE_COLUMN in frame}, **derived}
+        # Scoping runs first, so a derived frame may be built from a dataset the entitlement cannot read
+        return MappingProxyType({name: frame for name, frame in frames.items() if entitlement.visible(name)})
+
+    def retain(self, entitlements: Iterable[Entitlement]) -> None:
+        """Project every entitlement in `entitlements` and drop the projections of any other"""
+        keep = list(entitlements)
+        for entitlement in keep:
+            self.project(entitlement)
+        with self._lock:
+            for stale in set(self.projections).difference(keep):
+                del self.projections[stale]
+
+    def view(self, entitlement: Entitlement) -> "SnapshotView":
+        return SnapshotView(self, entitlement, self.project(entitlement))
+
+
+@dataclass(frozen=True)
+class SnapshotView:
+    """A snapshot as one entitlement is allowed to see it"""
+
+    snapshot: Snapshot
+    entitlement: Entitlement
+    frames: Mapping[str, pd.DataFrame] = field(repr=False)
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.version
+
+    @property
+    def role(self) -> str:
+        return self.entitlement.role
+
+    def visible(self, name: str) -> bool:
+        """Whether the dataset is granted and, for a portfolio-limited view, could be scoped"""
+        return name in self.frames
+
+    def frame(self, name: str) -> pd.DataFrame:
+        """Projected frame; a zero-row slice when the dataset is hidden"""
+        frame = self.frames.get(name)
+        if frame is None:
+            frame = self.snapshot.frames.get(name)
+            return pd.DataFrame() if frame is None else frame.iloc[0:0]
+        return _share(frame)
+
+    def ous(self) -> Optional[Tuple[str, ...]]:
+        """OUs in this view's portfolios, for scoping data read outside the snapshot; None when all are"""
+        if self.entitlement.portfolios is None:
+            return None
+        return tuple(self.frame("ou")["ou"].astype(str)) if self.visible("ou") else ()
+
+
+class SharedSnapshot:
+    """Holder of the current snapshot, built lazily and swapped atomically"""
+
+    def __init__(self, builder: Callable[[], Mapping[str, pd.DataFrame]],
+                 entitlements: Optional[EntitlementModel] = None, derive: Optional[Derive] = None):
+        self._builder = builder
+        self.entitlements = entitlements or EntitlementModel()
+        self._derive = derive
+        self._current: Optional[Snapshot] = None
+        self._lock = threading.Lock()
+
+    def current(self) -> Snapshot:
+        """The latest published snapshot; the first caller builds it"""
+        snapshot = self._current
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            if self._current is None:
+                self._current = self._make(self._builder(), 1)
+            return self._current
+
+    def publish(self, frames: Mapping[str, pd.DataFrame]) -> Snapshot:
+        with self._lock:
+            version = self._current.version + 1 if self._current is not None else 1
+            snapshot = self._make(frames, version)
+            self._current = snapshot
+        return snapshot
+
+    def refresh(self) -> Snapshot:
+        """Rebuild from the builder; readers keep the previous version meanwhile"""
+        return self.publish(self._builder())
+
+    def reproject(self) -> Snapshot:
+        """Rebuild the current snapshot's projections after the entitlements changed"""
+        snapshot = self.current()
+        snapshot.retain(self.entitlements.entitlements())
+        return snapshot
+
+    def _make(self, frames: Mapping[str, pd.DataFrame], version: int) -> Snapshot:
+        nbytes = sum(int(frame.memory_usage(index=True, deep=True).sum()) for frame in frames.values())
+        snapshot = Snapshot(version, time.time(), nbytes, MappingProxyType(dict(frames)), derive=self._derive)
+        # Projected before the swap, so no reader pays for it
+        snapshot.retain(self.entitlements.entitlements())
+        return snapshot
@@ -0,0 +1,304 @@
+"""
+Compliance Snapshot Store
+=========================
+Persistent per-account, per-rule compliance state for the dashboard.
+
+- Backed by the shared Database (PostgreSQL, or the SQLite fallback)
+- Ingestion writes only rows whose state changed; accounts whose rules were
+  not re-evaluated since their sync watermark are skipped upstream
+- Tabs read indexed aggregates from here instead of calling AWS on rerun
+- A change of compliance type is also appended to compliance_transitions;
+  a re-evaluation that leaves the type as it was is not a transition
+- Transitions are kept TRANSITION_RETENTION_S, and never pruned past a
+  reader's position (the notifier's cursor) that is still behind that
+
+Timestamps are stored as UTC epoch seconds so both dialects compare them
+natively.
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import pandas as pd
+
+from aws_collector import AccountResult, CollectionReport, format_rule_summary, watermark_scope
+from database import Database
+
+TRANSITION_RETENTION_S = 30 * 86400
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS accounts (
+        account_id TEXT PRIMARY KEY,
+        name TEXT NOT NULL DEFAULT '',
+        ou TEXT,
+        portfolio TEXT,
+        updated_at DOUBLE PRECISION NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS config_compliance (
+        account_id TEXT NOT NULL,
+        region TEXT NOT NULL,
+        rule_name TEXT NOT NULL,
+        compliance_type TEXT NOT NULL,
+        non_compliant_resources INTEGER NOT NULL DEFAULT 0,
+        evaluated_at DOUBLE PRECISION,
+        updated_at DOUBLE PRECISION NOT NULL,
+        PRIMARY KEY (account_id, region, rule_name)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_config_compliance_rule ON config_compliance (rule_name, compliance_type)",
+    "CREATE INDEX IF NOT EXISTS ix_config_compliance_updated ON config_compliance (updated_at)",
+    """
+    CREATE TABLE IF NOT EXISTS compliance_transitions (
+        account_id TEXT NOT NULL,
+        region TEXT NOT NULL,
+        rule_name TEXT NOT NULL,
+        compliance_type TEXT NOT NULL,
+        changed_at DOUBLE PRECISION NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_compliance_transitions_changed ON compliance_transitions (changed_at)",
+    """
+    CREATE TABLE IF NOT EXISTS sync_watermarks (
+        source TEXT NOT NULL,
+        scope TEXT NOT NULL,
+        watermark DOUBLE PRECISION,
+        checked_at DOUBLE PRECISION NOT NULL,
+        PRIMARY KEY (source, scope)
+    )
+    """,
+]
+
+_UPSERT_RULE = """
+    INSERT INTO config_compliance
+        (account_id, region, rule_name, compliance_type, non_compliant_resources, evaluated_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (account_id, region, rule_name) DO UPDATE SET
+        compliance_type = excluded.compliance_type,
+        non_compliant_resources = excluded.non_compliant_resources,
+        evaluated_at = excluded.evaluated_at,
+        updated_at = excluded.updated_at
+"""
+
+_UPSERT_WATERMARK = """
+    INSERT INTO sync_watermarks (source, scope, watermark, checked_at) VALUES (?, ?, ?, ?)
+    ON CONFLICT (source, scope) DO UPDATE SET
+        watermark = COALESCE(excluded.watermark, sync_watermarks.watermark),
+        checked_at = excluded.checked_at
+"""
+
+_UPSERT_ACCOUNT = """
+    INSERT INTO accounts (account_id, name, ou, portfolio, updated_at) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (account_id) DO UPDATE SET
+        name = excluded.name,
+        ou = COALESCE(excluded.ou, accounts.ou),
+        portfolio = COALESCE(excluded.portfolio, accounts.portfolio),
+        updated_at = excluded.updated_at
+"""
+
+
+def to_epoch(timestamp: Optional[datetime]) -> Optional[float]:
+    if timestamp is None:
+        return None
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
+
+
+def from_epoch(value: Optional[float]) -> Optional[datetime]:
+    return None if value is None else datetime.fromtimestamp(value, tz=timezone.utc)
+
+
+@dataclass
+class IngestStats:
+    """What a sync actually wrote"""
+
+    accounts_changed: int = 0
+    accounts_skipped: int = 0
+    rows_upserted: int = 0
+    rows_deleted: int = 0
+
+
+class SnapshotStore:
+    """Per-account, per-rule compliance snapshot with delta ingestion"""
+
+    def __init__(self, db: Database):
+        self.db = db
+        self.db.executescript(SCHEMA)
+
+    @classmethod
+    def from_settings(cls, settings) -> "SnapshotStore":
+        return cls(Database.from_settings(settings))
+
+    # ------------------------------------------------------------------
+    # Sync watermarks
+    # ------------------------------------------------------------------
+
+    def watermarks(self, source: str = "config") -> Dict[str, datetime]:
+        """Latest evaluation time ingested per scope (account:region for Config)"""
+        rows = self.db.query(
+            "SELECT scope, watermark FROM sync_watermarks WHERE source = ? AND watermark IS NOT NULL",
+            (source,),
+        )
+        return {scope: from_epoch(watermark) for scope, watermark in rows}
+
+    def last_sync(self, source: str = "config") -> Optional[datetime]:
+        row = self.db.query_one("SELECT MAX(checked_at) FROM sync_watermarks WHERE source = ?", (source,))
+        return from_epoch(row[0]) if row else None
+
+    # ------------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------------
+
+    def ingest_report(self, report: CollectionReport, retain_since: Optional[float] = None) -> IngestStats:
+        """Apply a collector sweep, writing only what changed
+
+        Transitions past retention are pruned, except those after
+        `retain_since` (a position a reader has not consumed yet).
+        """
+        stats = IngestStats()
+        now = time.time()
+        cutoff = now - TRANSITION_RETENTION_S
+        if retain_since is not None:
+            cutoff = min(cutoff, retain_since)
+        with self.db.transaction() as conn:
+            self.db.execute("DELETE FROM compliance_transitions WHERE changed_at < ?", (cutoff,), conn=conn)
+            accounts = {r.account_id: (r.account_id, r.account_name, r.ou, r.portfolio, now)
+                        for r in report.results if not r.error}
+            self.db.executemany(_UPSERT_ACCOUNT, accounts.values(), conn=conn)
+            for result in report.results:
+                if result.error:
+                    continue
+                if result.unchanged:
+                    stats.accounts_skipped += 1
+                    scope = watermark_scope(result.account_id, result.region)
+                    self.db.execute(_UPSERT_WATERMARK, ("config", scope, None, now), conn=conn)
+                    continue
+                upserted, deleted = self._ingest_account(result, now, conn)
+                stats.rows_upserted += upserted
+                stats.rows_deleted += deleted
+                stats.accounts_changed += 1 if (upserted or deleted) else 0
+        return stats
+
+    def _ingest_account(self, result: AccountResult, now: float, conn) -> tuple:
+        current = {
+            (region, rule): (compliance_type, count, evaluated_at)
+            for region, rule, compliance_type, count, evaluated_at in self.db.query(
+                "SELECT region, rule_name, compliance_type, non_compliant_resources, evaluated_at "
+                "FROM config_compliance WHERE account_id = ?",
+                (result.account_id,), conn=conn,
+            )
+        }
+        changed, transitions, seen, watermark = [], [], set(), None
+        for rule in result.rules:
+            evaluated_at = to_epoch(rule.last_evaluated)
+            key = (rule.region or result.region, rule.rule_name)
+            seen.add(key)
+            state = (rule.compliance_type, rule.non_compliant_resources, evaluated_at)
+            previous = current.get(key)
+            if previous != state:
+                changed.append((result.account_id, key[0], rule.rule_name, *state, now))
+            if previous is None or previous[0] != rule.compliance_type:
+                transitions.append((result.account_id, key[0], rule.rule_name, rule.compliance_type, now))
+            if evaluated_at is not None:
+                watermark = evaluated_at if watermark is None else max(watermark, evaluated_at)
+        self.db.executemany(_UPSERT_RULE, changed, conn=conn)
+        self.db.executemany(
+            "INSERT INTO compliance_transitions (account_id, region, rule_name, compliance_type, changed_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            transitions,
+            conn=conn,
+        )
+        # Only prune rules of regions this sweep actually covered
+        swept_regions = {region for region, _ in seen} or {result.region}
+        removed = [key for key in current if key not in seen and key[0] in swept_regions]
+        self.db.executemany(
+            "DELETE FROM config_compliance WHERE account_id = ? AND region = ? AND rule_name = ?",
+            [(result.account_id, region, rule) for region, rule in removed],
+            conn=conn,
+        )
+        scope = watermark_scope(result.account_id, result.region)
+        self.db.execute(_UPSERT_WATERMARK, ("config", scope, watermark, now), conn=conn)
+        return len(changed), len(removed)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def account_count(self) -> int:
+        row = self.db.query_one("SELECT COUNT(*) FROM accounts")
+        return int(row[0]) if row else 0
+
+    def rule_summary(self) -> pd.DataFrame:
+        """Config Rules table: accounts compliant / non-compliant per rule"""
+        summary = self.db.query_frame(
+            """
+            SELECT rule_name,
+                   COUNT(DISTINCT CASE WHEN compliance_type = 'COMPLIANT' THEN account_id END) AS compliant,
+                   COUNT(DISTINCT CASE WHEN compliance_type = 'NON_COMPLIANT' THEN account_id END) AS non_compliant,
+                   MAX(evaluated_at) AS last_evaluated
+            FROM config_compliance
+            GROUP BY rule_name
+            ORDER BY rule_name
+            """
+        )
+        summary["last_evaluated"] = pd.to_datetime(summary["last_evaluated"], unit="s", utc=True)
+        return format_rule_summary(summary)
+
+    def compliance_rows(self, account_id: Optional[str] = None, rule_name: Optional[str] = None) -> pd.DataFrame:
+        clauses, params = [], []
+        if account_id:
+            clauses.append("account_id = ?")
+            params.append(account_id)
+        if rule_name:
+            clauses.append("rule_name = ?")
+            params.append(rule_name)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.db.query_frame(
+            "SELECT account_id, region, rule_name, compliance_type, non_compliant_resources, evaluated_at, updated_at "
+            f"FROM config_compliance {where} ORDER BY account_id, region, rule_name",
+            params,
+        )
+
+    def evaluation_frame(self) -> pd.DataFrame:
+        """Account x rule evaluations with OU / portfolio, for the aggregation engine"""
+        frame = self.db.query_frame(
+            """
+            SELECT c.account_id, COALESCE(a.ou, 'Unassigned') AS ou,
+                   COALESCE(a.portfolio, 'Unassigned') AS portfolio,
+                   c.rule_name, c.compliance_type
+            FROM config_compliance c
+            LEFT JOIN accounts a ON a.account_id = c.account_id
+            WHERE c.compliance_type IN ('COMPLIANT', 'NON_COMPLIANT')
+            """
+        )
+        for column in ("account_id", "ou", "portfolio", "rule_name"):
+            frame[column] = frame[column].astype("category")
+        return frame
+
+    def changed_since(self, since: float) -> pd.DataFrame:
+        """Rows whose state changed after an epoch timestamp"""
+        return self.db.query_frame(
+            "SELECT account_id, region, rule_name, compliance_type, non_compliant_resources, evaluated_at, updated_at "
+            "FROM config_compliance WHERE updated_at > ? ORDER BY updated_at",
+            (since,),
+        )
+
+    def transitions_since(self, since: float) -> pd.DataFrame:
+        """Compliance type changes after an epoch timestamp, with the rule's current resource count"""
+        return self.db.query_frame(
+            """
+            SELECT t.account_id, t.region, t.rule_name, t.compliance_type, t.changed_at,
+                   COALESCE(c.non_compliant_resources, 0) AS non_compliant_resources
+            FROM compliance_transitions t
+            LEFT JOIN config_compliance c
+              ON c.account_id = t.account_id AND c.region = t.region AND c.rule_name = t.rule_name
+            WHERE t.changed_at > ?
+            ORDER BY t.changed_at
+            """,
+            (since,),
+        )
@@ -17,30 +17,29 @@ from datetime import datetime, timedelta
 import json
 import sys
 import os
-import pandas as pd
+import uuid
+from pathlib import Path
 import plotly.express as px
-import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import random
-
-# Simple inline authentication for Streamlit Cloud compatibility
-# This avoids module import issues entirely
-
-def authenticate(username: str, password: str):
-    """Authenticate user credentials"""
-    users = {
-        "admin": {"password": "admin123", "role": "SUPER_ADMIN", "full_name": "Admin User"},
-        "security_lead": {"password": "security123", "role": "SECURITY_ADMIN", "full_name": "Security Lead"},
-        "compliance_mgr": {"password": "compliance123", "role": "COMPLIANCE_OFFICER", "full_name": "Compliance Manager"},
-        "cloud_arch": {"password": "architect123", "role": "CLOUD_ARCHITECT", "full_name": "Cloud Architect"},
-        "finops": {"password": "finops123", "role": "FINOPS_ANALYST", "full_name": "FinOps Analyst"},
-        "devsecops": {"password": "devsec123", "role": "DEVSECOPS_ENGINEER", "full_name": "DevSecOps Engineer"},
-        "auditor": {"password": "audit123", "role": "AUDITOR", "full_name": "Auditor"},
-        "viewer": {"password": "viewer123", "role": "VIEWER", "full_name": "Viewer"},
-    }
-    if username in users and users[username]["password"] == password:
-        return {"username": username, **{k: v for k, v in users[username].items() if k != "password"}}
-    return None
+
+from settings import get_settings
+from data_access import (
+    CONFIG_RULES, KICS_RESULTS, OPA_RESULTS, PULL_REQUESTS, PIPELINE_RUNS,
+    COMPLIANCE_TREND, FINDINGS_TREND, DEPLOYMENT_FREQUENCY, POLICY_INDEX, SCP_ANALYSIS,
+    FINDINGS_PAGE, FINDINGS_FACETS, ARCHIVE_PARTITIONS, ARCHIVE_HISTORY, TERRAFORM_DRIFT, RULE_EVALUATION,
+    JOB_GITHUB_SYNC, JOB_KICS_SCAN, JOB_OPA_VALIDATE, JOB_EVIDENCE_ARCHIVE, JOB_EVIDENCE_EXPORT, JOB_NOTIFY,
+    archive_enabled, get_authenticator, get_data_access, get_entitlements, get_evidence_archive, get_notifier,
+    get_scheduler, get_shared_snapshot, notifications_enabled,
+)
+import cards
+import charts
+from profiler import get_profiler, span
+from scheduler import PRIORITY_HIGH, RUNNING
+from scp_analyzer import MAX_SCPS_PER_TARGET, SCP_MAX_CHARS, account_options
+from findings_store import SORT_COLUMNS as FINDINGS_SORT_COLUMNS, FindingsFilter
+from kics_ingest import SEVERITIES
+from evidence_archive import DATASETS as ARCHIVE_DATASETS, EXPORT_FORMATS, FINDINGS as ARCHIVED_FINDINGS
+from auth_store import DEMO
 
 def render_login_page():
     """Render login page"""
@@ -61,26 +60,33 @@ def render_login_page():
         password = st.text_input("Password", type="password", key="login_pass")
         
         if st.button("Sign In", use_container_width=True, type="primary"):
-            user = authenticate(username, password)
-            if user:
-                st.session_state.current_user = user
+            result = get_authenticator().login(username, password)
+            if result.user:
+                st.session_state.auth_token = result.token
                 st.rerun()
+            elif result.retry_after_s:
+                st.error(f"{result.error}; try again in {result.retry_after_s:.0f}s")
             else:
-                st.error("Invalid credentials")
+                st.error(result.error)
         
-        with st.expander("Demo Credentials"):
-            st.markdown("**admin** / admin123")
-            st.markdown("**security_lead** / security123")
-            st.markdown("**viewer** / viewer123")
+        if get_settings().auth_backend == DEMO:
+            with st.expander("Demo Credentials"):
+                st.markdown("**admin** / admin123")
+                st.markdown("**security_lead** / security123")
+                st.markdown("**viewer** / viewer123")
 
 def logout():
     """Logout user"""
-    if 'current_user' in st.session_state:
-        del st.session_state.current_user
+    token = st.session_state.pop("auth_token", None)
+    if token:
+        get_authenticator().revoke(token)
 
 def get_current_user():
-    """Get current user from session"""
-    return st.session_state.get('current_user')
+    """Signed-in user of this session; the token is re-checked, the password never is"""
+    user = get_authenticator().verify_token(st.session_state.get("auth_token"))
+    if user is None:
+        logout()
+    return user
 
 # Page configuration
 st.set_page_config(
@@ -91,11 +97,28 @@ st.set_page_config(
 )
 
 # Authentication check
-if 'current_user' not in st.session_state:
+current_user = get_current_user()
+if current_user is None:
     render_login_page()
     st.stop()
 
-current_user = st.session_state.current_user
+settings = get_settings()
+
+# Render profiling: on for everyone via RENDER_PROFILING, or per admin session
+profiler = get_profiler()
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex[:12]
+if settings.render_profiling or st.session_state.get("profile_session"):
+    profiler.begin(st.session_state.session_id)
+
+data_access = get_data_access()
+scheduler = get_scheduler()
+config_compliance = data_access.get(CONFIG_RULES)
+kics = data_access.get(KICS_RESULTS)
+policy_index = data_access.get(POLICY_INDEX)
+# Pinned for the whole rerun: every tab renders the same snapshot version,
+# through the projection precomputed for this user's entitlement
+org_data = get_shared_snapshot().current().view(get_entitlements().for_user(current_user))
 
 # Custom CSS - Dark Enterprise Theme
 st.markdown("""
@@ -187,6 +210,25 @@ st.markdown("""
     .stage-running { background: #3b82f620; color: #3b82f6; border: 1px solid #3b82f640; }
     .stage-pending { background: #6b728020; color: #9ca3af; border: 1px solid #6b728040; }
     .stage-failed { background: #ef444420; color: #ef4444; border: 1px solid #ef444440; }
+    .pipeline { display: flex; flex-wrap: wrap; gap: 0.5rem; margin-bottom: 1.5rem; }
+    .stage-time { opacity: 0.7; margin-left: 0.5rem; }
+    
+    /* Card templates (cards.py) */
+    .metric-row { display: grid; grid-template-columns: repeat(6, minmax(0, 1fr)); gap: 1rem; }
+    .card-title { display: flex; align-items: center; margin-bottom: 0.5rem; color: #e5e7eb; font-weight: 500; }
+    .card-icon { font-size: 1.25rem; margin-right: 0.5rem; }
+    .card-headline { font-weight: 500; }
+    .card-meta { color: #8b949e; font-size: 0.8rem; margin-top: 0.5rem; }
+    .card-row { display: flex; justify-content: space-between; align-items: center; color: #e5e7eb; }
+    .card-tag { font-weight: 600; }
+    .pr-number { color: #58a6ff; font-weight: 600; margin-right: 0.5rem; }
+    .finding-card { background: #1a1f2e; border-left: 3px solid; padding: 0.75rem; margin-bottom: 0.5rem; border-radius: 0 8px 8px 0; }
+    .item-card { background: #1a1f2e; border: 1px solid #374151; padding: 0.75rem; margin-bottom: 0.5rem; border-radius: 8px; }
+    .finding-card .card-meta, .item-card .card-meta { color: #6b7280; margin-top: 0.25rem; }
+    .mono { font-family: 'JetBrains Mono', monospace; }
+    .type-badge { padding: 2px 8px; border-radius: 4px; font-size: 0.75rem; }
+    .workspace-row { margin-top: 0.35rem; font-size: 0.8rem; }
+    .workspace-name { color: #a78bfa; font-weight: 500; }
     
     /* Info Cards */
     .info-card {
@@ -250,55 +292,14 @@ with col2:
 
 st.markdown("### 📊 Platform Status")
 
-col1, col2, col3, col4, col5, col6 = st.columns(6)
-
-with col1:
-    st.markdown("""
-    <div class="metric-card">
-        <div class="metric-value status-healthy">487</div>
-        <div class="metric-label">AWS Accounts</div>
-    </div>
-    """, unsafe_allow_html=True)
-
-with col2:
-    st.markdown("""
-    <div class="metric-card">
-        <div class="metric-value status-info">156</div>
-        <div class="metric-label">Policies in Git</div>
-    </div>
-    """, unsafe_allow_html=True)
-
-with col3:
-    st.markdown("""
-    <div class="metric-card">
-        <div class="metric-value status-healthy">94.2%</div>
-        <div class="metric-label">Policy Compliance</div>
-    </div>
-    """, unsafe_allow_html=True)
-
-with col4:
-    st.markdown("""
-    <div class="metric-card">
-        <div class="metric-value status-warning">12</div>
-        <div class="metric-label">Open PRs</div>
-    </div>
-    """, unsafe_allow_html=True)
-
-with col5:
-    st.markdown("""
-    <div class="metric-card">
-        <div class="metric-value status-critical">23</div>
-        <div class="metric-label">KICS Findings</div>
-    </div>
-    """, unsafe_allow_html=True)
-
-with col6:
-    st.markdown("""
-    <div class="metric-card">
-        <div class="metric-value status-healthy">✓</div>
-        <div class="metric-label">Pipeline Healthy</div>
-    </div>
-    """, unsafe_allow_html=True)
+st.markdown(cards.METRIC.render_many([
+    {"tone": "healthy", "value": config_compliance["accounts"], "label": "AWS Accounts"},
+    {"tone": "info", "value": policy_index["total"], "label": "Policies in Git"},
+    {"tone": "healthy", "value": "94.2%", "label": "Policy Compliance"},
+    {"tone": "warning", "value": 12, "label": "Open PRs"},
+    {"tone": "critical", "value": sum(kics["severity_counts"].values()), "label": "KICS Findings"},
+    {"tone": "healthy", "value": "✓", "label": "Pipeline Healthy"},
+], wrapper=cards.METRIC_ROW), unsafe_allow_html=True)
 
 st.markdown("<br>", unsafe_allow_html=True)
 
@@ -306,19 +307,27 @@ st.markdown("<br>", unsafe_allow_html=True)
 # MAIN CONTENT TABS
 # ============================================================================
 
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
-    "🏠 Overview",
-    "📦 GitHub & CI/CD",
-    "🔍 Policy Scans",
-    "☁️ AWS Compliance",
-    "📈 Trends"
-])
-
 # ============================================================================
 # TAB 1: OVERVIEW
 # ============================================================================
 
-with tab1:
+DRIFT_COLORS = {"healthy": cards.GREEN, "pending": cards.AMBER, "drifted": cards.RED, "error": cards.RED}
+
+# Reruns on its own, so a workspace whose drift status changed redraws this
+# card rather than the page; the source is only reloaded after such a change
+@st.fragment(run_every=60 if settings.terraform_drift_dir else None)
+def render_terraform_card():
+    """Terraform Cloud card: drift status per workspace"""
+    workspaces = data_access.get(TERRAFORM_DRIFT)
+    rows = [{**ws, "color": DRIFT_COLORS.get(ws["status"], cards.GREY), "detail": ", ".join(ws["detail"])}
+            for ws in workspaces]
+    if not rows:
+        rows = [{"workspace": "", "color": cards.GREY, "detail": "", "summary": "First drift check queued"}]
+    st.markdown(cards.WORKSPACE.render_many(rows, wrapper=cards.TERRAFORM), unsafe_allow_html=True)
+
+
+def render_overview():
+    """Overview tab"""
     col1, col2 = st.columns([2, 1])
     
     with col1:
@@ -346,103 +355,42 @@ with tab1:
         # Policy Types Chart
         st.markdown("#### Policy Distribution by Type")
         
-        policy_types = ['SCPs', 'OPA/Rego', 'Config Rules', 'Sentinel', 'Custom']
-        policy_counts = [24, 45, 52, 18, 17]
-        
-        fig_policies = go.Figure(data=[go.Bar(
-            x=policy_types,
-            y=policy_counts,
-            marker=dict(
-                color=['#8b5cf6', '#10b981', '#f59e0b', '#3b82f6', '#6b7280'],
-                line=dict(color='rgba(255,255,255,0.2)', width=1)
-            ),
-            text=policy_counts,
-            textposition='outside',
-            textfont=dict(color='white', size=12)
-        )])
-        
-        fig_policies.update_layout(
-            height=280,
-            margin=dict(l=0, r=0, t=10, b=0),
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            xaxis=dict(tickfont=dict(color='#e5e7eb'), showgrid=False),
-            yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)', tickfont=dict(color='#9ca3af'))
-        )
-        st.plotly_chart(fig_policies, use_container_width=True)
+        policy_types = list(policy_index["by_type"])
+        policy_counts = list(policy_index["by_type"].values())
+        
+        with span("chart.policy_distribution"):
+            st.plotly_chart(charts.policy_distribution(policy_types, policy_counts), use_container_width=True, theme=None)
     
     with col2:
         st.markdown("#### 🔗 Quick Links")
         
-        st.markdown("""
-        <div class="github-card">
-            <div style="display: flex; align-items: center; margin-bottom: 0.5rem;">
-                <span style="font-size: 1.25rem; margin-right: 0.5rem;">📁</span>
-                <span style="color: #e5e7eb; font-weight: 500;">Policy Repository</span>
-            </div>
-            <code style="color: #58a6ff; font-size: 0.8rem;">company/aws-governance-policies</code>
-            <div style="margin-top: 0.5rem; color: #8b949e; font-size: 0.8rem;">
-                Last commit: 2 hours ago
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <div class="github-card">
-            <div style="display: flex; align-items: center; margin-bottom: 0.5rem;">
-                <span style="font-size: 1.25rem; margin-right: 0.5rem;">🔄</span>
-                <span style="color: #e5e7eb; font-weight: 500;">Latest Pipeline</span>
-            </div>
-            <div style="color: #10b981; font-weight: 500;">✓ All checks passed</div>
-            <div style="margin-top: 0.5rem; color: #8b949e; font-size: 0.8rem;">
-                Run #1247 • 15 minutes ago
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(cards.LINK.render_many([
+            {"icon": "📁", "title": "Policy Repository", "color": "#58a6ff", "headline": settings.github_repo,
+             "meta": f"Last commit: {policy_index['last_commit']}"},
+            {"icon": "🔄", "title": "Latest Pipeline", "color": cards.GREEN, "headline": "✓ All checks passed",
+             "meta": "Run #1247 • 15 minutes ago"},
+        ]), unsafe_allow_html=True)
         
-        st.markdown("""
-        <div class="github-card">
-            <div style="display: flex; align-items: center; margin-bottom: 0.5rem;">
-                <span style="font-size: 1.25rem; margin-right: 0.5rem;">📋</span>
-                <span style="color: #e5e7eb; font-weight: 500;">Terraform Cloud</span>
-            </div>
-            <div style="color: #a78bfa; font-weight: 500;">aws-guardrails workspace</div>
-            <div style="margin-top: 0.5rem; color: #8b949e; font-size: 0.8rem;">
-                State: Healthy • Drift: None
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        render_terraform_card()
         
         st.markdown("#### 📊 Compliance by Framework")
         
-        frameworks_mini = ['CIS', 'SOC2', 'PCI', 'HIPAA']
-        scores_mini = [96, 94, 88, 92]
-        
-        fig_mini = go.Figure(data=[go.Bar(
-            y=frameworks_mini,
-            x=scores_mini,
-            orientation='h',
-            marker=dict(color=['#10b981' if s >= 90 else '#f59e0b' for s in scores_mini]),
-            text=[f'{s}%' for s in scores_mini],
-            textposition='inside',
-            textfont=dict(color='white', size=11)
-        )])
-        
-        fig_mini.update_layout(
-            height=180,
-            margin=dict(l=0, r=10, t=10, b=0),
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            xaxis=dict(range=[0, 100], showgrid=False, showticklabels=False),
-            yaxis=dict(tickfont=dict(color='#e5e7eb', size=11))
-        )
-        st.plotly_chart(fig_mini, use_container_width=True)
+        if org_data.visible("framework"):
+            framework_rollup = org_data.frame("framework")
+            frameworks_mini = framework_rollup["framework"].tolist()
+            scores_mini = framework_rollup["score"].tolist()
+            
+            with span("chart.framework_mini"):
+                st.plotly_chart(charts.framework_scores(frameworks_mini, scores_mini), use_container_width=True, theme=None)
+        else:
+            st.caption("Framework scores are org-wide and not available for your portfolios")
 
 # ============================================================================
 # TAB 2: GITHUB & CI/CD
 # ============================================================================
 
-with tab2:
+def render_github_cicd():
+    """GitHub & CI/CD tab"""
     st.markdown("#### 🔄 CI/CD Pipeline Status")
     
     # Pipeline visualization
@@ -456,74 +404,32 @@ with tab2:
         {"name": "Verify", "status": "success", "time": "30s"},
     ]
     
-    pipeline_html = '<div style="display: flex; flex-wrap: wrap; gap: 0.5rem; margin-bottom: 1.5rem;">'
-    for stage in stages:
-        status_class = f"stage-{stage['status']}"
-        icon = "✓" if stage['status'] == 'success' else "⏳" if stage['status'] == 'running' else "○"
-        pipeline_html += f'<div class="pipeline-stage {status_class}">{icon} {stage["name"]} <span style="opacity: 0.7; margin-left: 0.5rem;">{stage["time"]}</span></div>'
-    pipeline_html += '</div>'
-    st.markdown(pipeline_html, unsafe_allow_html=True)
+    icons = {"success": "✓", "running": "⏳"}
+    st.markdown(cards.PIPELINE_STAGE.render_many(
+        [{**stage, "icon": icons.get(stage["status"], "○")} for stage in stages], wrapper=cards.PIPELINE,
+    ), unsafe_allow_html=True)
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown("#### 📥 Recent Pull Requests")
         
-        prs = [
-            {"number": "#156", "title": "Add IMDSv2 enforcement SCP for all OUs", "author": "security-team", "status": "🟢 Merged", "checks": "✓ All passed", "time": "2 hours ago"},
-            {"number": "#155", "title": "Update OPA policy for RDS encryption", "author": "cloud-arch", "status": "🟡 Open", "checks": "✓ All passed", "time": "5 hours ago"},
-            {"number": "#154", "title": "New Sentinel policy for cost tags", "author": "finops", "status": "🟡 Open", "checks": "⚠ 1 warning", "time": "1 day ago"},
-            {"number": "#153", "title": "Fix KICS false positive in S3 module", "author": "devsecops", "status": "🔴 Failed", "checks": "✗ KICS failed", "time": "1 day ago"},
-        ]
+        prs = data_access.get(PULL_REQUESTS)
         
-        for pr in prs:
-            status_color = "#10b981" if "Merged" in pr['status'] else "#f59e0b" if "Open" in pr['status'] else "#ef4444"
-            st.markdown(f"""
-            <div class="github-card">
-                <div style="display: flex; justify-content: space-between; align-items: start;">
-                    <div>
-                        <span style="color: #58a6ff; font-weight: 600;">{pr['number']}</span>
-                        <span style="color: #e5e7eb; margin-left: 0.5rem;">{pr['title']}</span>
-                    </div>
-                    <span style="color: {status_color};">{pr['status']}</span>
-                </div>
-                <div style="color: #8b949e; font-size: 0.8rem; margin-top: 0.5rem;">
-                    👤 {pr['author']} • {pr['checks']} • ⏱️ {pr['time']}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+        st.markdown(cards.PULL_REQUEST.render_many(
+            {**pr, "color": cards.GREEN if "Merged" in pr["status"] else cards.AMBER if "Open" in pr["status"]
+             else cards.RED}
+            for pr in prs
+        ), unsafe_allow_html=True)
     
     with col2:
         st.markdown("#### 📊 Pipeline Metrics (7 Days)")
         
-        days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-        runs = [23, 31, 28, 35, 29, 12, 8]
-        failures = [2, 1, 3, 2, 1, 0, 1]
-        
-        fig_pipeline = go.Figure()
-        
-        fig_pipeline.add_trace(go.Bar(
-            x=days, y=runs, name='Total Runs',
-            marker=dict(color='#3b82f6'),
-            text=runs, textposition='outside', textfont=dict(color='white', size=10)
-        ))
-        
-        fig_pipeline.add_trace(go.Bar(
-            x=days, y=failures, name='Failures',
-            marker=dict(color='#ef4444')
-        ))
-        
-        fig_pipeline.update_layout(
-            height=280,
-            margin=dict(l=0, r=0, t=10, b=0),
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            xaxis=dict(tickfont=dict(color='#e5e7eb')),
-            yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)', tickfont=dict(color='#9ca3af')),
-            legend=dict(orientation='h', yanchor='bottom', y=1.02, font=dict(color='#e5e7eb')),
-            barmode='group'
-        )
-        st.plotly_chart(fig_pipeline, use_container_width=True)
+        pipeline = data_access.get(PIPELINE_RUNS)
+        days, runs, failures = pipeline["days"], pipeline["runs"], pipeline["failures"]
+        
+        with span("chart.pipeline_metrics"):
+            st.plotly_chart(charts.pipeline_metrics(days, runs, failures), use_container_width=True, theme=None)
         
         # Repository structure
         st.markdown("#### 📁 Repository Structure")
@@ -545,101 +451,74 @@ aws-governance-policies/
 # TAB 3: POLICY SCANS (KICS + OPA)
 # ============================================================================
 
-with tab3:
+def render_policy_scans():
+    """Policy Scans tab"""
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown("#### 🔍 KICS Scan Results")
         st.markdown("*Infrastructure as Code security scanning*")
         
+        kics_counts = kics["severity_counts"]
+        kics_deltas = kics.get("severity_deltas", {})
+        kics_checks = kics["checks_passed"] + sum(kics_counts.values())
+        kics_high = kics_counts.get("CRITICAL", 0) + kics_counts.get("HIGH", 0)
+        
         # KICS metrics
         kics_col1, kics_col2, kics_col3, kics_col4 = st.columns(4)
         with kics_col1:
-            st.metric("High", "3", "-2")
+            st.metric("High", str(kics_high), kics_deltas.get("HIGH"))
         with kics_col2:
-            st.metric("Medium", "12", "+1")
+            st.metric("Medium", str(kics_counts.get("MEDIUM", 0)), kics_deltas.get("MEDIUM"))
         with kics_col3:
-            st.metric("Low", "8", "0")
+            st.metric("Low", str(kics_counts.get("LOW", 0)), kics_deltas.get("LOW"))
         with kics_col4:
-            st.metric("Files Scanned", "234")
+            st.metric("Files Scanned", str(kics["files_scanned"]))
         
         # KICS findings chart
-        fig_kics = go.Figure(data=[go.Pie(
-            values=[211, 8, 12, 3],
-            labels=['Passed', 'Low', 'Medium', 'High'],
-            hole=0.65,
-            marker=dict(colors=['#10b981', '#6b7280', '#f59e0b', '#ef4444']),
-            textinfo='label+value',
-            textfont=dict(size=10, color='white')
-        )])
-        fig_kics.update_layout(
-            height=220,
-            margin=dict(l=10, r=10, t=10, b=10),
-            paper_bgcolor='rgba(0,0,0,0)',
-            showlegend=False,
-            annotations=[dict(text='<b>234</b><br>Checks', x=0.5, y=0.5, font=dict(size=12, color='white'), showarrow=False)]
-        )
-        st.plotly_chart(fig_kics, use_container_width=True)
+        with span("chart.kics_findings"):
+            st.plotly_chart(charts.kics_donut(
+                kics["checks_passed"], kics_counts.get("LOW", 0), kics_counts.get("MEDIUM", 0), kics_high, kics_checks,
+            ), use_container_width=True, theme=None)
         
         # Top KICS findings
         st.markdown("**Top Findings:**")
-        kics_findings = [
-            {"severity": "HIGH", "query": "S3 Bucket Without Encryption", "file": "terraform/modules/s3/main.tf", "line": 23},
-            {"severity": "HIGH", "query": "Security Group Open to Internet", "file": "terraform/modules/vpc/security.tf", "line": 45},
-            {"severity": "MEDIUM", "query": "RDS Without Multi-AZ", "file": "terraform/modules/rds/main.tf", "line": 67},
-        ]
+        kics_findings = kics["top_findings"]
         
-        for finding in kics_findings:
-            sev_color = "#ef4444" if finding['severity'] == "HIGH" else "#f59e0b"
-            st.markdown(f"""
-            <div style="background: #1a1f2e; border-left: 3px solid {sev_color}; padding: 0.75rem; margin-bottom: 0.5rem; border-radius: 0 8px 8px 0;">
-                <div style="display: flex; justify-content: space-between;">
-                    <span style="color: #e5e7eb;">{finding['query']}</span>
-                    <span style="color: {sev_color}; font-weight: 600;">{finding['severity']}</span>
-                </div>
-                <div style="color: #6b7280; font-size: 0.8rem; margin-top: 0.25rem;">
-                    📁 {finding['file']}:{finding['line']}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+        st.markdown(cards.FINDING.render_many(
+            {**finding, "color": cards.severity_color(finding["severity"])} for finding in kics_findings
+        ), unsafe_allow_html=True)
     
     with col2:
         st.markdown("#### 📋 OPA Policy Evaluation")
         st.markdown("*Terraform plan validation against Rego policies*")
         
+        opa = data_access.get(OPA_RESULTS)
+        opa_deltas = opa.get("deltas", {})
+        
         # OPA metrics
         opa_col1, opa_col2, opa_col3, opa_col4 = st.columns(4)
         with opa_col1:
-            st.metric("Policies", "45")
+            st.metric("Policies", str(opa["policies"]))
         with opa_col2:
-            st.metric("Passed", "42", "+2")
+            st.metric("Passed", str(opa["passed"]), opa_deltas.get("passed"))
         with opa_col3:
-            st.metric("Violations", "3", "-1")
+            st.metric("Violations", str(opa["violations"]), opa_deltas.get("violations"))
         with opa_col4:
-            st.metric("Resources", "156")
+            st.metric("Resources", str(opa["resources"]))
         
         # OPA results
-        opa_policies = [
-            {"name": "require_encryption", "status": "PASS", "resources": 34},
-            {"name": "restrict_regions", "status": "PASS", "resources": 28},
-            {"name": "require_tags", "status": "FAIL", "resources": 12},
-            {"name": "security_group_rules", "status": "PASS", "resources": 18},
-            {"name": "iam_least_privilege", "status": "WARN", "resources": 8},
-        ]
+        opa_policies = opa["results"]
         
-        for policy in opa_policies:
-            status_color = "#10b981" if policy['status'] == "PASS" else "#ef4444" if policy['status'] == "FAIL" else "#f59e0b"
-            st.markdown(f"""
-            <div style="background: #1a1f2e; border: 1px solid #374151; padding: 0.75rem; margin-bottom: 0.5rem; border-radius: 8px;">
-                <div style="display: flex; justify-content: space-between; align-items: center;">
-                    <span style="color: #e5e7eb; font-family: 'JetBrains Mono', monospace;">{policy['name']}.rego</span>
-                    <span style="color: {status_color}; font-weight: 600;">{policy['status']}</span>
-                </div>
-                <div style="color: #6b7280; font-size: 0.8rem; margin-top: 0.25rem;">
-                    Evaluated {policy['resources']} resources
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+        st.markdown(cards.POLICY.render_many(
+            {**policy, "color": cards.status_color(policy["status"]),
+             "eval_time": f" • {policy['mean_ms']:.2f} ms/plan" if "mean_ms" in policy else ""}
+            for policy in opa_policies
+        ), unsafe_allow_html=True)
+        
+        if "timings" in opa:
+            with st.expander(f"⏱️ Policy evaluation time ({opa['plans']} plans)"):
+                st.dataframe(opa["timings"], use_container_width=True, hide_index=True)
         
         st.markdown("---")
         
@@ -661,172 +540,315 @@ deny[msg] {
 # TAB 4: AWS COMPLIANCE
 # ============================================================================
 
-with tab4:
+def render_aws_compliance():
+    """AWS Compliance tab"""
     col1, col2 = st.columns([2, 1])
     
     with col1:
         st.markdown("#### 🏢 Compliance by Organizational Unit")
         
-        ous = ['Production', 'Development', 'Staging', 'Security', 'Data Analytics', 'Shared Services', 'Sandbox']
-        compliance_scores = [98, 94, 96, 99, 92, 95, 78]
-        accounts = [145, 98, 45, 32, 67, 65, 35]
-        colors = ['#10b981' if s >= 90 else '#f59e0b' if s >= 80 else '#ef4444' for s in compliance_scores]
-        
-        fig_ou = go.Figure()
-        
-        fig_ou.add_trace(go.Bar(
-            y=ous,
-            x=compliance_scores,
-            orientation='h',
-            marker=dict(color=colors),
-            text=[f'{s}% ({a} accounts)' for s, a in zip(compliance_scores, accounts)],
-            textposition='inside',
-            textfont=dict(color='white', size=11)
-        ))
-        
-        fig_ou.update_layout(
-            height=350,
-            margin=dict(l=0, r=20, t=10, b=0),
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            xaxis=dict(range=[0, 100], showgrid=True, gridcolor='rgba(255,255,255,0.1)', tickfont=dict(color='#9ca3af')),
-            yaxis=dict(tickfont=dict(color='#e5e7eb', size=11))
-        )
-        st.plotly_chart(fig_ou, use_container_width=True)
+        ou_rollup = org_data.frame("ou")
+        ous = ou_rollup["ou"].tolist()
+        compliance_scores = ou_rollup["score"].tolist()
+        accounts = ou_rollup["accounts"].tolist()
+        
+        with span("chart.ou_compliance"):
+            st.plotly_chart(charts.ou_compliance(ous, compliance_scores, accounts), use_container_width=True, theme=None)
     
     with col2:
         st.markdown("#### 🛡️ Active Guardrails")
         
-        guardrails = [
-            {"name": "Deny Public S3", "type": "SCP", "status": "Active", "accounts": 487},
-            {"name": "Require IMDSv2", "type": "SCP", "status": "Active", "accounts": 487},
-            {"name": "Restrict Regions", "type": "SCP", "status": "Active", "accounts": 452},
+        scp_analysis = data_access.get(SCP_ANALYSIS)
+        guardrails = scp_analysis.guardrails()[:3] + [
             {"name": "S3 Encryption", "type": "Config", "status": "Active", "accounts": 487},
             {"name": "EBS Encryption", "type": "Config", "status": "Active", "accounts": 487},
         ]
         
-        for gr in guardrails:
-            type_color = "#8b5cf6" if gr['type'] == "SCP" else "#f59e0b"
-            st.markdown(f"""
-            <div style="background: #1a1f2e; border: 1px solid #374151; padding: 0.75rem; margin-bottom: 0.5rem; border-radius: 8px;">
-                <div style="display: flex; justify-content: space-between; align-items: center;">
-                    <span style="color: #e5e7eb;">{gr['name']}</span>
-                    <span style="background: {type_color}20; color: {type_color}; padding: 2px 8px; border-radius: 4px; font-size: 0.75rem;">{gr['type']}</span>
-                </div>
-                <div style="color: #6b7280; font-size: 0.8rem; margin-top: 0.25rem;">
-                    🟢 {gr['status']} • {gr['accounts']} accounts
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+        st.markdown(cards.GUARDRAIL.render_many(
+            {**gr, "color": cards.PURPLE if gr["type"] == "SCP" else cards.AMBER} for gr in guardrails
+        ), unsafe_allow_html=True)
     
     st.markdown("---")
     
     # Config Rules compliance
     st.markdown("#### 📊 AWS Config Rules Compliance")
     
-    config_rules = pd.DataFrame({
-        "Rule": ["s3-bucket-server-side-encryption-enabled", "ec2-imdsv2-check", "rds-storage-encrypted", "ebs-encrypted-volumes", "iam-password-policy"],
-        "Compliant": [487, 485, 456, 478, 487],
-        "Non-Compliant": [0, 2, 31, 9, 0],
-        "Compliance %": ["100%", "99.6%", "93.6%", "98.2%", "100%"],
-        "Last Evaluated": ["5 min ago", "5 min ago", "5 min ago", "5 min ago", "5 min ago"]
-    })
+    if org_data.visible("config_rules"):
+        st.dataframe(org_data.frame("config_rules"), use_container_width=True, hide_index=True)
+    else:
+        st.caption("Config rule totals are org-wide and not available for your portfolios")
+    
+    config_sync = config_compliance.get("sync")
+    if config_sync:
+        with st.expander("Collector diagnostics"):
+            st.caption(
+                f"{config_compliance['accounts']} accounts ({config_sync.get('endpoints', 0)} account-regions) in "
+                f"{config_sync['wall_time_s']:.1f}s • "
+                f"{config_sync['throttles']} throttled requests • "
+                f"{config_sync['accounts_skipped']} unchanged account-regions skipped • "
+                f"{config_sync['rows_upserted']} rows updated • "
+                f"{config_sync.get('findings_upserted', 0)} findings updated"
+            )
+            st.dataframe(config_sync["latency"], use_container_width=True, hide_index=True)
+    
+    # The same rules re-scored locally over the resource inventory; it has no portfolio to scope by
+    if org_data.entitlement.org_wide("rule_evaluation"):
+        rule_evaluation = data_access.get(RULE_EVALUATION)
+        st.markdown("#### 🧮 Local Rule Evaluation")
+        if rule_evaluation["resources"]:
+            st.caption(
+                f"{rule_evaluation['resources']:,} inventoried resources re-scored in "
+                f"{rule_evaluation['elapsed_s'] * 1000:.0f} ms • counts are resources, not accounts"
+            )
+        else:
+            st.caption("Loading the resource inventory…")
+        st.dataframe(rule_evaluation["rules"], use_container_width=True, hide_index=True)
+    
+    st.markdown("---")
+    
+    # SCP size budget and effective denies
+    col1, col2 = st.columns([1, 1])
+    
+    with col1:
+        st.markdown("#### 📏 SCP Size Budget")
+        st.caption(f"Characters per policy as stored against the {SCP_MAX_CHARS:,}-character limit; "
+                   f"Achievable is the size once minified")
+        st.dataframe(
+            scp_analysis.budget(),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "budget_pct": st.column_config.ProgressColumn("Budget", format="%.1f%%", min_value=0, max_value=100),
+                "minified": st.column_config.NumberColumn("Achievable", help="Characters once minified"),
+            },
+        )
+        crowded = scp_analysis.crowded_targets()
+        if crowded:
+            st.warning(f"At the {MAX_SCPS_PER_TARGET}-SCP attachment quota: {', '.join(crowded)}")
+    
+    with col2:
+        st.markdown("#### 🔎 Effective Deny Search")
+        scope = org_data.ous()
+        accounts_by_id = account_options(scp_analysis, scope) if org_data.entitlement.visible("scp") else {}
+        search_col1, search_col2 = st.columns([3, 2])
+        with search_col1:
+            deny_action = st.text_input("Action", value="s3:PutBucketPublicAccessBlock", key="scp_action")
+        with search_col2:
+            deny_resource = st.text_input("Resource", value="*", key="scp_resource")
+        if not org_data.entitlement.visible("scp"):
+            st.caption("Per-account SCP decisions are not included in your access")
+        elif not accounts_by_id:
+            st.caption("No accounts in your portfolios to search")
+        elif deny_action.strip():
+            matches = scp_analysis.search(deny_action.strip(), deny_resource.strip() or "*")
+            if scope is not None:
+                matches = matches[matches["account_id"].isin(accounts_by_id)].reset_index(drop=True)
+            denied = int((matches["decision"] == "Denied").sum())
+            st.caption(
+                f"Denied in {denied} of {len(accounts_by_id)} accounts • "
+                f"{len(matches) - denied} conditionally denied"
+            )
+            st.dataframe(matches, use_container_width=True, hide_index=True, height=220)
+        
+        if accounts_by_id:
+            with st.expander("Effective denies for one account"):
+                account_id = st.selectbox("Account", list(accounts_by_id), format_func=accounts_by_id.get,
+                                          key="scp_account")
+                st.dataframe(scp_analysis.effective_denies(account_id), use_container_width=True, hide_index=True)
     
-    st.dataframe(config_rules, use_container_width=True, hide_index=True)
+    st.markdown("---")
+    render_findings_explorer()
+
+
+@st.fragment
+def render_findings_explorer():
+    """Findings explorer: filters, sort and paging run in the database, one page is sent"""
+    st.markdown("#### 🗂️ Findings Explorer")
+    # Portfolio-limited users only ever query the OUs in their portfolios
+    scope = org_data.ous()
+    if not org_data.entitlement.visible("findings"):
+        st.caption("Account-level findings are not included in your access")
+        return
+    if scope == ():
+        st.caption("No OUs in your portfolios")
+        return
+    
+    facets = data_access.get(FINDINGS_FACETS, scope)
+    filter_col1, filter_col2, filter_col3, filter_col4 = st.columns(4)
+    with filter_col1:
+        accounts = st.multiselect("Account", facets["account_id"], key="findings_accounts")
+    with filter_col2:
+        ous = st.multiselect("OU", facets["ou"], key="findings_ous")
+    with filter_col3:
+        rules = st.multiselect("Rule", facets["rule_name"], key="findings_rules")
+    with filter_col4:
+        severities = st.multiselect("Severity", list(SEVERITIES[:4]), key="findings_severities")
+    
+    filter_col1, filter_col2, filter_col3, filter_col4 = st.columns([2, 2, 1, 1])
+    with filter_col1:
+        min_age, max_age = st.slider("Age (days)", 0, 365, (0, 365), key="findings_age")
+    with filter_col2:
+        resource = st.text_input("Resource ID starts with", key="findings_resource")
+    with filter_col3:
+        sort = st.selectbox("Sort by", list(FINDINGS_SORT_COLUMNS), key="findings_sort")
+    with filter_col4:
+        descending = st.toggle("Descending", value=True, key="findings_desc")
+    
+    filters = FindingsFilter(
+        accounts=tuple(accounts), ous=tuple(ous) or scope or (), rules=tuple(rules), severities=tuple(severities),
+        min_age_days=min_age or None, max_age_days=max_age if max_age < 365 else None,
+        resource_prefix=resource.strip(),
+    )
+    # Severity is stored as a rank where 0 is CRITICAL
+    descending_sql = not descending if sort == "severity" else descending
+    
+    pager_col1, pager_col2 = st.columns([1, 4])
+    with pager_col1:
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1, key="findings_page_size")
+    # Any filter or sort change starts again at page 1
+    signature = (filters, sort, descending, page_size)
+    if st.session_state.get("findings_signature") != signature:
+        st.session_state.findings_signature = signature
+        st.session_state.findings_page = 1
+    page_number = st.session_state.get("findings_page", 1)
+    
+    with span("data.findings_page"):
+        page = data_access.get(FINDINGS_PAGE, filters, sort, descending_sql, page_number, page_size)
+    if page_number > page.pages:
+        st.session_state.findings_page = page.pages
+        st.rerun(scope="fragment")
+    with pager_col2:
+        st.number_input(f"Page (of {page.pages:,})", min_value=1, max_value=page.pages, key="findings_page")
+    
+    st.caption(f"Rows {page.first_row:,}–{page.last_row:,} of {page.total:,} findings")
+    st.dataframe(page.rows, use_container_width=True, hide_index=True)
 
 # ============================================================================
 # TAB 5: TRENDS
 # ============================================================================
 
-with tab5:
+def render_trends():
+    """Trends tab"""
     col1, col2 = st.columns(2)
     
     with col1:
-        st.markdown("#### 📈 Compliance Score Trend (90 Days)")
-        
-        dates = pd.date_range(end=datetime.now(), periods=90, freq='D')
-        scores = [85 + i*0.1 + random.uniform(-1, 1) for i in range(90)]
-        scores[-1] = 94.2
-        
-        fig_trend = go.Figure()
-        
-        fig_trend.add_trace(go.Scatter(
-            x=dates, y=scores,
-            fill='tozeroy',
-            fillcolor='rgba(16, 185, 129, 0.2)',
-            line=dict(color='#10b981', width=2),
-            mode='lines',
-            hovertemplate='%{x|%b %d}<br>Score: %{y:.1f}%<extra></extra>'
-        ))
-        
-        fig_trend.add_hline(y=90, line_dash="dash", line_color="#f59e0b", annotation_text="Target: 90%")
-        
-        fig_trend.update_layout(
-            height=300,
-            margin=dict(l=0, r=0, t=10, b=0),
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            xaxis=dict(showgrid=False, tickfont=dict(color='#9ca3af')),
-            yaxis=dict(range=[80, 100], showgrid=True, gridcolor='rgba(255,255,255,0.1)', tickfont=dict(color='#9ca3af'))
-        )
-        st.plotly_chart(fig_trend, use_container_width=True)
+        trend_ranges = {"90 Days": 90, "1 Year": 365, "3 Years": 3 * 365}
+        trend_label = st.session_state.get("trend_range", "90 Days")
+        st.markdown(f"#### 📈 Compliance Score Trend ({trend_label})")
+        st.radio("Range", list(trend_ranges), key="trend_range", horizontal=True, label_visibility="collapsed")
+        
+        trend = data_access.get(COMPLIANCE_TREND, trend_ranges[trend_label])
+        
+        with span("chart.compliance_trend"):
+            st.plotly_chart(charts.compliance_trend(trend), use_container_width=True, theme=None)
     
     with col2:
         st.markdown("#### 🔍 Security Findings Trend")
         
-        weeks = ['W1', 'W2', 'W3', 'W4', 'W5', 'W6', 'W7', 'W8']
-        critical = [5, 4, 6, 3, 4, 2, 3, 2]
-        high = [23, 25, 22, 20, 18, 19, 16, 15]
-        medium = [67, 65, 70, 62, 58, 55, 52, 48]
-        
-        fig_findings = go.Figure()
-        
-        fig_findings.add_trace(go.Scatter(x=weeks, y=critical, name='Critical', line=dict(color='#ef4444', width=2), mode='lines+markers'))
-        fig_findings.add_trace(go.Scatter(x=weeks, y=high, name='High', line=dict(color='#f59e0b', width=2), mode='lines+markers'))
-        fig_findings.add_trace(go.Scatter(x=weeks, y=medium, name='Medium', line=dict(color='#a855f7', width=2), mode='lines+markers'))
-        
-        fig_findings.update_layout(
-            height=300,
-            margin=dict(l=0, r=0, t=10, b=0),
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            xaxis=dict(showgrid=False, tickfont=dict(color='#9ca3af')),
-            yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)', tickfont=dict(color='#9ca3af')),
-            legend=dict(orientation='h', yanchor='bottom', y=1.02, font=dict(color='#e5e7eb'))
-        )
-        st.plotly_chart(fig_findings, use_container_width=True)
+        findings_trend = data_access.get(FINDINGS_TREND, 8)
+        
+        with span("chart.findings_trend"):
+            st.plotly_chart(charts.findings_trend(findings_trend), use_container_width=True, theme=None)
     
     # Deployment frequency
     st.markdown("#### 🚀 Policy Deployment Frequency")
     
-    months = ['Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    scp_deploys = [8, 12, 10, 15, 11, 14]
-    config_deploys = [15, 18, 22, 19, 25, 21]
-    opa_updates = [23, 28, 31, 35, 29, 33]
-    
-    fig_deploys = go.Figure()
-    
-    fig_deploys.add_trace(go.Bar(x=months, y=scp_deploys, name='SCP Deployments', marker_color='#8b5cf6'))
-    fig_deploys.add_trace(go.Bar(x=months, y=config_deploys, name='Config Rules', marker_color='#f59e0b'))
-    fig_deploys.add_trace(go.Bar(x=months, y=opa_updates, name='OPA Policy Updates', marker_color='#10b981'))
-    
-    fig_deploys.update_layout(
-        height=280,
-        margin=dict(l=0, r=0, t=10, b=0),
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        xaxis=dict(tickfont=dict(color='#e5e7eb')),
-        yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)', tickfont=dict(color='#9ca3af')),
-        legend=dict(orientation='h', yanchor='bottom', y=1.02, font=dict(color='#e5e7eb')),
-        barmode='group'
+    deployments = data_access.get(DEPLOYMENT_FREQUENCY, 6)
+    
+    with span("chart.deployment_frequency"):
+        st.plotly_chart(charts.deployment_frequency(deployments), use_container_width=True, theme=None)
+    
+    st.markdown("---")
+    render_evidence_archive()
+
+
+@st.fragment
+def render_evidence_archive():
+    """Evidence archive: history read lazily from old Parquet partitions, exports built off-thread"""
+    st.markdown("#### 🗄️ Evidence Archive")
+    # Archived snapshots and exports cover every account; there is no portfolio to scope them by
+    if not org_data.entitlement.org_wide("evidence"):
+        st.caption("Evidence exports cover the whole organization and need access to every portfolio")
+        return
+    if not archive_enabled():
+        st.caption("Archive disabled: set ARCHIVE_DIR and install pyarrow")
+        return
+    
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        dataset = st.radio("Dataset", ARCHIVE_DATASETS, key="archive_dataset", horizontal=True,
+                           format_func=str.title, label_visibility="collapsed")
+        history = data_access.get(ARCHIVE_HISTORY, dataset, 365)
+        if history.empty:
+            st.info("No archived snapshots yet; one is written at startup and every ARCHIVE_INTERVAL_SECONDS.")
+        else:
+            with span("chart.archive_history"):
+                st.plotly_chart(charts.archive_history(
+                    history, "Open findings" if dataset == ARCHIVED_FINDINGS else "Score %",
+                ), use_container_width=True, theme=None)
+    
+    with col2:
+        partitions = data_access.get(ARCHIVE_PARTITIONS, dataset)
+        if not partitions:
+            if st.button("📸 Snapshot now", key="archive_snapshot", use_container_width=True):
+                scheduler.submit(JOB_EVIDENCE_ARCHIVE, PRIORITY_HIGH, requested_by=current_user["username"])
+                st.rerun()  # a full rerun, so the sidebar jobs panel starts polling
+            return
+        date = st.selectbox("Snapshot", partitions, key="archive_date")
+        fmt = st.radio("Format", EXPORT_FORMATS, key="archive_format", horizontal=True, format_func=str.upper)
+        archive = get_evidence_archive()
+        path = archive.export_ready(dataset, date, fmt)
+        if path:
+            # Read only when clicked, on its own thread; a rerun never holds the export in memory
+            st.download_button(
+                f"⬇️ Download {fmt.upper()}", Path(path).read_bytes, file_name=os.path.basename(path),
+                key="archive_download", on_click="ignore", use_container_width=True,
+            )
+            st.caption(f"{os.path.getsize(path) / 1e6:,.1f} MB")
+        elif scheduler.has_active(JOB_EVIDENCE_EXPORT):
+            st.caption("⏳ Export in progress…")
+        elif st.button("📦 Prepare export", key="archive_export", use_container_width=True):
+            # Built on a worker from the Parquet partition, one record batch at a time
+            scheduler.submit(JOB_EVIDENCE_EXPORT, PRIORITY_HIGH, requested_by=current_user["username"],
+                             dataset=dataset, date=date, fmt=fmt)
+            st.rerun()
+
+# ============================================================================
+# VIEW ROUTING
+# ============================================================================
+
+VIEWS = {
+    "overview": ("🏠 Overview", render_overview),
+    "github": ("📦 GitHub & CI/CD", render_github_cicd),
+    "scans": ("🔍 Policy Scans", render_policy_scans),
+    "compliance": ("☁️ AWS Compliance", render_aws_compliance),
+    "trends": ("📈 Trends", render_trends),
+}
+
+if settings.tab_routing == "tabs":
+    # Every view is built on each rerun; switching tabs is client-side only
+    for tab, (view, (_, render_view)) in zip(st.tabs([label for label, _ in VIEWS.values()]), VIEWS.items()):
+        with tab, span(f"tab.{view}"):
+            render_view()
+else:
+    # Only the selected view queries data and builds figures; ?tab=<view> is bookmarkable
+    requested_view = st.query_params.get("tab")
+    if requested_view in VIEWS and requested_view != st.session_state.get("routed_view"):
+        st.session_state.active_view = requested_view
+    active_view = st.radio(
+        "View", list(VIEWS), key="active_view", format_func=lambda view: VIEWS[view][0],
+        horizontal=True, label_visibility="collapsed",
     )
-    st.plotly_chart(fig_deploys, use_container_width=True)
+    st.session_state.routed_view = active_view
+    st.query_params["tab"] = active_view
+    with span(f"tab.{active_view}"):
+        VIEWS[active_view][1]()
 
 # ============================================================================
 # SIDEBAR
 # ============================================================================
 
-with st.sidebar:
+with st.sidebar, span("sidebar"):
     st.markdown("### 🛡️ AWS Guardrails")
     st.markdown("Policy as Code Platform")
     
@@ -834,27 +856,69 @@ with st.sidebar:
     
     st.markdown("**Quick Actions**")
     
+    def enqueue(kind: str, label: str):
+        _, created = scheduler.submit(kind, PRIORITY_HIGH, requested_by=current_user["username"])
+        st.toast(f"{label} queued" if created else f"{label} already running; following that job")
+    
     if st.button("🔄 Sync from GitHub", use_container_width=True):
-        st.toast("Syncing policies from GitHub...")
+        enqueue(JOB_GITHUB_SYNC, "GitHub sync")
     
     if st.button("🔍 Run KICS Scan", use_container_width=True):
-        st.toast("Starting KICS security scan...")
+        enqueue(JOB_KICS_SCAN, "KICS scan")
     
     if st.button("📋 Validate OPA", use_container_width=True):
-        st.toast("Running OPA policy validation...")
+        enqueue(JOB_OPA_VALIDATE, "OPA validation")
     
     if st.button("🚀 Trigger Deploy", use_container_width=True):
         st.warning("Requires approval for production")
     
+    # Poll the jobs table only while something is queued or running, then
+    # rerun the page once so it picks up the refreshed data
+    @st.fragment(run_every=2 if scheduler.has_active() else None)
+    def render_jobs():
+        jobs = scheduler.recent(limit=5)
+        active = scheduler.has_active()
+        if st.session_state.get("jobs_active") and not active:
+            st.session_state.jobs_active = False
+            st.rerun()
+        # A running sweep publishes partial results; pick them up as they land
+        if active and get_shared_snapshot().current().version != org_data.version:
+            st.rerun()
+        st.session_state.jobs_active = active
+        if jobs.empty:
+            return
+        st.markdown("**Background Jobs**")
+        icons = {"queued": "⏳", "running": "🔄", "succeeded": "✅", "failed": "❌", "interrupted": "⚠️"}
+        for job in jobs.itertuples():
+            label = f"{icons.get(job.status, '•')} {job.kind.replace('_', ' ')} · {job.status}"
+            if job.status == RUNNING:
+                st.progress(float(job.progress or 0), text=f"{label} {job.message}")
+            else:
+                st.caption(label + (f" · {job.error}" if job.error else ""))
+    
+    render_jobs()
+    
     st.markdown("---")
     
     st.markdown("**System Status**")
     st.markdown("🟢 GitHub Connected")
-    st.markdown("🟢 Terraform Cloud")
+    drift_statuses = {ws["status"] for ws in data_access.get(TERRAFORM_DRIFT)}
+    drift_icon = "🔴" if drift_statuses & {"drifted", "error"} else "🟡" if drift_statuses - {"healthy"} else "🟢"
+    st.markdown(f"{drift_icon} Terraform Cloud")
     st.markdown("🟢 AWS Organization")
     st.markdown("🟢 KICS Scanner")
     st.markdown("🟢 OPA Engine")
     
+    cache_totals = data_access.totals()
+    st.caption(
+        f"Data cache: {cache_totals.hits + cache_totals.coalesced} hits • {cache_totals.misses} misses • "
+        f"{cache_totals.evictions} evictions ({cache_totals.hit_rate:.0%} hit rate)"
+    )
+    st.caption(
+        f"Shared snapshot v{org_data.version} • {org_data.snapshot.nbytes / 1024:,.0f} KiB • "
+        f"published {datetime.fromtimestamp(org_data.snapshot.published_at).strftime('%H:%M:%S')}"
+    )
+    
     st.markdown("---")
     
     st.markdown("**Environment**")
@@ -869,3 +933,59 @@ with st.sidebar:
         {datetime.now().strftime("%Y-%m-%d %H:%M")}
     </div>
     """, unsafe_allow_html=True)
+
+# ============================================================================
+# RENDER DIAGNOSTICS (ADMIN ONLY)
+# ============================================================================
+
+run_trace = profiler.end()
+if run_trace is not None:
+    st.session_state.last_trace = run_trace
+
+if current_user.get("role") == "SUPER_ADMIN":
+    with st.sidebar:
+        with st.expander("🩺 Render Diagnostics"):
+            st.toggle("Profile this session", key="profile_session")
+            last_trace = st.session_state.get("last_trace")
+            if last_trace is not None:
+                st.caption(f"Last profiled rerun: {last_trace.total_ms:.0f} ms")
+                st.dataframe(last_trace.frame().query("depth == 0"), use_container_width=True, hide_index=True)
+            render_summary = profiler.summary()
+            if render_summary.empty:
+                st.caption("No profiled reruns yet")
+            else:
+                st.markdown("**All sessions (p50 / p95)**")
+                st.dataframe(render_summary, use_container_width=True, hide_index=True)
+                st.download_button(
+                    "⬇️ Export JSON", profiler.export(), file_name="render_profile.json",
+                    mime="application/json", use_container_width=True,
+                )
+                if st.button("Reset samples", use_container_width=True):
+                    profiler.reset()
+            figure_cache = charts.chart_stats()
+            if not figure_cache.empty:
+                st.markdown("**Figure cache**")
+                st.caption(f"{figure_cache['saved_ms'].sum():,.0f} ms of figure building saved")
+                st.dataframe(figure_cache, use_container_width=True, hide_index=True)
+            card_cache = cards.card_stats()
+            if not card_cache.empty:
+                st.markdown("**Card cache**")
+                st.dataframe(card_cache, use_container_width=True, hide_index=True)
+            entitlements = get_entitlements()
+            st.markdown("**Entitlements**")
+            st.caption(f"v{entitlements.version} • {len(org_data.snapshot.projections)} projections "
+                       f"on snapshot v{org_data.version}")
+            st.dataframe(entitlements.describe(), use_container_width=True, hide_index=True)
+
+if current_user.get("role") == "SUPER_ADMIN" and notifications_enabled():
+    with st.sidebar:
+        with st.expander("📣 Notifications"):
+            notifier = get_notifier()
+            st.caption(f"Channels: {', '.join(notifier.channels)}")
+            st.dataframe(notifier.summary(), use_container_width=True, hide_index=True)
+            dead_letters = notifier.dead_letters()
+            if not dead_letters.empty:
+                st.markdown("**Dead letters**")
+                st.dataframe(dead_letters, use_container_width=True, hide_index=True)
+            if st.button("📤 Send due now", key="notify_now", use_container_width=True):
+                scheduler.submit(JOB_NOTIFY, PRIORITY_HIGH, requested_by=current_user["username"])
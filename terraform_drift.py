@@ -0,0 +1,275 @@
+"""
+Terraform Drift Detection
+=========================
+Compares each workspace's refresh-only plan against its cached state.
+
+- Every workspace directory under TERRAFORM_DRIFT_DIR holds two exports
+  from the pipeline: `state.json` (`terraform show -json`) and `plan.json`
+  (`terraform plan -refresh-only` rendered with `terraform show -json`)
+- Each managed resource in the state is hashed once and the digests are
+  cached; a plan's refreshed `prior_state` is hashed the same way, and only
+  resources whose digest differs (or that disappeared) count as drift
+- Both files are hashed before they are parsed, so an unchanged export
+  costs two reads and no JSON parsing
+- Workspaces are checked in parallel; a check reports whether the
+  workspace's status changed so only those cards need redrawing
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from database import Database
+
+HEALTHY = "healthy"
+DRIFTED = "drifted"
+PENDING = "pending"     # configuration changes planned but not applied; no drift
+MISSING = "missing"     # no exports for the workspace yet
+ERROR = "error"
+
+STATE_FILE = "state.json"
+PLAN_FILE = "plan.json"
+DEFAULT_WORKSPACES = ("scp-deployment", "config-rules", "stacksets")
+DETAIL_LIMIT = 20       # drifted addresses kept per workspace for the card
+
+# Plan actions that leave infrastructure untouched
+_NO_CHANGE = ({"no-op"}, {"read"})
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS terraform_state_resources (
+        workspace TEXT NOT NULL,
+        address TEXT NOT NULL,
+        digest TEXT NOT NULL,
+        PRIMARY KEY (workspace, address)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS terraform_workspaces (
+        workspace TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        resources INTEGER NOT NULL DEFAULT 0,
+        drifted INTEGER NOT NULL DEFAULT 0,
+        pending INTEGER NOT NULL DEFAULT 0,
+        detail TEXT NOT NULL DEFAULT '[]',
+        state_digest TEXT,
+        plan_digest TEXT,
+        checked_at DOUBLE PRECISION NOT NULL,
+        changed_at DOUBLE PRECISION NOT NULL
+    )
+    """,
+]
+
+_UPSERT_WORKSPACE = """
+    INSERT INTO terraform_workspaces (workspace, status, resources, drifted, pending, detail,
+                                      state_digest, plan_digest, checked_at, changed_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (workspace) DO UPDATE SET
+        status = excluded.status,
+        resources = excluded.resources,
+        drifted = excluded.drifted,
+        pending = excluded.pending,
+        detail = excluded.detail,
+        state_digest = excluded.state_digest,
+        plan_digest = excluded.plan_digest,
+        checked_at = excluded.checked_at,
+        changed_at = excluded.changed_at
+"""
+
+
+@dataclass
+class WorkspaceDrift:
+    """Drift status of one workspace"""
+
+    workspace: str
+    status: str
+    resources: int = 0
+    drifted: int = 0
+    pending: int = 0
+    detail: List[str] = field(default_factory=list)
+    checked_at: float = 0.0
+    changed_at: float = 0.0
+    changed: bool = False       # status differs from the previous check
+    parsed: bool = False        # false when both exports were unchanged
+
+    @property
+    def summary(self) -> str:
+        if self.status == DRIFTED:
+            return f"Drift: {self.drifted} resource{'s' if self.drifted != 1 else ''}"
+        if self.status == PENDING:
+            return f"{self.pending} change{'s' if self.pending != 1 else ''} pending"
+        if self.status == MISSING:
+            return "No plan exported"
+        if self.status == ERROR:
+            return self.detail[0] if self.detail else "Unreadable export"
+        return "Drift: None"
+
+
+# ----------------------------------------------------------------------------
+# Plan / state parsing
+# ----------------------------------------------------------------------------
+
+def managed_resources(module: Optional[dict]) -> Iterator[dict]:
+    """Managed resources of a `values.root_module`, child modules included"""
+    stack = [module] if module else []
+    while stack:
+        module = stack.pop()
+        for resource in module.get("resources", ()):
+            if resource.get("mode", "managed") == "managed":
+                yield resource
+        stack.extend(module.get("child_modules", ()))
+
+
+def resource_digest(resource: dict) -> str:
+    """Hash of a resource's attribute values, independent of key order"""
+    values = json.dumps(resource.get("values"), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{resource.get('type', '')}\0{values}".encode()).hexdigest()
+
+
+def digests(module: Optional[dict]) -> Dict[str, str]:
+    return {resource["address"]: resource_digest(resource) for resource in managed_resources(module)}
+
+
+def pending_changes(plan: dict) -> int:
+    """Resources the plan would create, update or destroy"""
+    return sum(1 for change in plan.get("resource_changes", ())
+               if change.get("mode", "managed") == "managed"
+               and set(change.get("change", {}).get("actions", ())) not in _NO_CHANGE)
+
+
+def _read(path: str) -> Tuple[Optional[bytes], Optional[str]]:
+    try:
+        with open(path, "rb") as fp:
+            content = fp.read()
+    except OSError:
+        return None, None
+    return content, hashlib.sha256(content).hexdigest()
+
+
+# ----------------------------------------------------------------------------
+# Detector
+# ----------------------------------------------------------------------------
+
+class DriftDetector:
+    """Per-resource drift check of the Terraform workspaces under one export directory"""
+
+    def __init__(self, db: Database, root: str, workspaces: Iterable[str] = DEFAULT_WORKSPACES):
+        self.db = db
+        self.root = root
+        self.workspaces = list(workspaces)
+        self.db.executescript(SCHEMA)
+
+    @classmethod
+    def from_settings(cls, settings, db: Database) -> "DriftDetector":
+        workspaces = [w.strip() for w in settings.terraform_workspaces.split(",") if w.strip()]
+        return cls(db, settings.terraform_drift_dir, workspaces or DEFAULT_WORKSPACES)
+
+    # ------------------------------------------------------------------
+    # Checks
+    # ------------------------------------------------------------------
+
+    def check_all(self) -> List[WorkspaceDrift]:
+        """Check every workspace in parallel, in configuration order"""
+        with ThreadPoolExecutor(max_workers=max(1, len(self.workspaces)),
+                                thread_name_prefix="drift") as pool:
+            return list(pool.map(self.check, self.workspaces))
+
+    def check(self, workspace: str) -> WorkspaceDrift:
+        previous = self.status(workspace)
+        directory = os.path.join(self.root, workspace)
+        state_bytes, state_digest = _read(os.path.join(directory, STATE_FILE))
+        plan_bytes, plan_digest = _read(os.path.join(directory, PLAN_FILE))
+        now = time.time()
+
+        if previous is not None and (state_digest, plan_digest) == self._export_digests(workspace):
+            # Neither export changed since the last check: nothing to parse
+            self.db.execute("UPDATE terraform_workspaces SET checked_at = ? WHERE workspace = ?", (now, workspace))
+            previous.checked_at = now
+            return previous
+
+        if state_bytes is None or plan_bytes is None:
+            result = WorkspaceDrift(workspace, MISSING)
+        else:
+            try:
+                result = self._compare(workspace, state_bytes, state_digest, plan_bytes)
+            except (ValueError, KeyError, TypeError, AttributeError) as exc:
+                result = WorkspaceDrift(workspace, ERROR, detail=[f"Unreadable export: {exc}"[:200]])
+        result.parsed = True
+        result.checked_at = now
+        result.changed = previous is None or _key(previous) != _key(result)
+        result.changed_at = now if result.changed else previous.changed_at
+        self.db.execute(_UPSERT_WORKSPACE, (
+            workspace, result.status, result.resources, result.drifted, result.pending,
+            json.dumps(result.detail), state_digest, plan_digest, result.checked_at, result.changed_at,
+        ))
+        return result
+
+    def _compare(self, workspace: str, state_bytes: bytes, state_digest: str, plan_bytes: bytes) -> WorkspaceDrift:
+        cached = self._state_digests(workspace, state_bytes, state_digest)
+        plan = json.loads(plan_bytes)
+        refreshed = digests((plan.get("prior_state") or {}).get("values", {}).get("root_module"))
+        drifted = {address for address, digest in cached.items() if refreshed.get(address) != digest}
+        # Terraform's own drift report also covers resources it re-read during the plan
+        drifted.update(change["address"] for change in plan.get("resource_drift", ())
+                       if change.get("address") in cached
+                       and set(change.get("change", {}).get("actions", ())) not in _NO_CHANGE)
+        pending = pending_changes(plan)
+        status = DRIFTED if drifted else PENDING if pending else HEALTHY
+        return WorkspaceDrift(workspace, status, resources=len(cached), drifted=len(drifted), pending=pending,
+                              detail=sorted(drifted)[:DETAIL_LIMIT])
+
+    def _state_digests(self, workspace: str, state_bytes: bytes, state_digest: str) -> Dict[str, str]:
+        """Cached per-resource digests, re-hashed only when the state export changed"""
+        stored = self._export_digests(workspace)
+        if stored is not None and stored[0] == state_digest:
+            return dict(self.db.query(
+                "SELECT address, digest FROM terraform_state_resources WHERE workspace = ?", (workspace,)
+            ))
+        state = json.loads(state_bytes)
+        current = digests(state.get("values", {}).get("root_module"))
+        with self.db.transaction() as conn:
+            self.db.execute("DELETE FROM terraform_state_resources WHERE workspace = ?", (workspace,), conn=conn)
+            self.db.executemany(
+                "INSERT INTO terraform_state_resources (workspace, address, digest) VALUES (?, ?, ?)",
+                [(workspace, address, digest) for address, digest in current.items()], conn=conn,
+            )
+        return current
+
+    def _export_digests(self, workspace: str) -> Optional[Tuple[Optional[str], Optional[str]]]:
+        row = self.db.query_one(
+            "SELECT state_digest, plan_digest FROM terraform_workspaces WHERE workspace = ?", (workspace,)
+        )
+        return (row[0], row[1]) if row else None
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def status(self, workspace: str) -> Optional[WorkspaceDrift]:
+        row = self.db.query_one(
+            "SELECT workspace, status, resources, drifted, pending, detail, checked_at, changed_at "
+            "FROM terraform_workspaces WHERE workspace = ?", (workspace,),
+        )
+        return _from_row(row) if row else None
+
+    def statuses(self) -> List[WorkspaceDrift]:
+        """Last known status of every configured workspace (unchecked ones omitted)"""
+        rows = {row[0]: _from_row(row) for row in self.db.query(
+            "SELECT workspace, status, resources, drifted, pending, detail, checked_at, changed_at "
+            "FROM terraform_workspaces"
+        )}
+        return [rows[workspace] for workspace in self.workspaces if workspace in rows]
+
+
+def _from_row(row: tuple) -> WorkspaceDrift:
+    workspace, status, resources, drifted, pending, detail, checked_at, changed_at = row
+    return WorkspaceDrift(workspace, status, int(resources), int(drifted), int(pending), json.loads(detail),
+                          checked_at, changed_at)
+
+
+def _key(drift: WorkspaceDrift) -> tuple:
+    return drift.status, drift.drifted, drift.pending, tuple(drift.detail)
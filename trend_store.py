@@ -0,0 +1,243 @@
+"""
+Trend Rollup Store
+==================
+Pre-aggregated time series for the Trends tab.
+
+- Every recorded sample is folded into hour, day, week and month buckets as
+  it arrives, so charts read a few hundred rows instead of raw history
+- Gauges (compliance scores, open findings) keep count / sum / min / max /
+  last per bucket; re-recording the same snapshot is a no-op
+- Counters (deployments) add into their buckets; events re-read by every
+  sync (workflow runs) are counted once by id
+- Longer ranges are served from coarser buckets: hourly for a few days,
+  daily up to six months, weekly up to three years, monthly beyond
+
+Buckets are keyed by their UTC start as epoch seconds; weeks start on Monday.
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+import pandas as pd
+
+from database import Database
+
+HOUR = "hour"
+DAY = "day"
+WEEK = "week"
+MONTH = "month"
+GRANULARITIES = (HOUR, DAY, WEEK, MONTH)
+
+HOURLY_RETENTION_S = 14 * 86400
+COUNTED_RETENTION_S = 14 * 86400  # longer than any source re-reads its events
+_MONDAY_OFFSET = 4 * 86400  # the epoch fell on a Thursday
+
+COMPLIANCE_SCORE = "compliance_score"
+KICS_FINDINGS = "kics_findings"
+SECURITYHUB_FINDINGS = "securityhub_findings"
+DEPLOYMENTS = "deployments"
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS metric_rollups (
+        metric TEXT NOT NULL,
+        granularity TEXT NOT NULL,
+        series TEXT NOT NULL,
+        bucket DOUBLE PRECISION NOT NULL,
+        samples INTEGER NOT NULL,
+        value_sum DOUBLE PRECISION NOT NULL,
+        value_min DOUBLE PRECISION NOT NULL,
+        value_max DOUBLE PRECISION NOT NULL,
+        value_last DOUBLE PRECISION NOT NULL,
+        last_at DOUBLE PRECISION NOT NULL,
+        PRIMARY KEY (metric, granularity, series, bucket)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS counted_events (
+        metric TEXT NOT NULL,
+        event_id TEXT NOT NULL,
+        at DOUBLE PRECISION NOT NULL,
+        PRIMARY KEY (metric, event_id)
+    )
+    """,
+]
+
+_UPSERT_GAUGE = """
+    INSERT INTO metric_rollups
+        (metric, granularity, series, bucket, samples, value_sum, value_min, value_max, value_last, last_at)
+    VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?)
+    ON CONFLICT (metric, granularity, series, bucket) DO UPDATE SET
+        samples = metric_rollups.samples + 1,
+        value_sum = metric_rollups.value_sum + excluded.value_sum,
+        value_min = CASE WHEN excluded.value_min < metric_rollups.value_min
+                         THEN excluded.value_min ELSE metric_rollups.value_min END,
+        value_max = CASE WHEN excluded.value_max > metric_rollups.value_max
+                         THEN excluded.value_max ELSE metric_rollups.value_max END,
+        value_last = excluded.value_last,
+        last_at = excluded.last_at
+    WHERE excluded.last_at > metric_rollups.last_at
+"""
+
+_UPSERT_COUNTER = """
+    INSERT INTO metric_rollups
+        (metric, granularity, series, bucket, samples, value_sum, value_min, value_max, value_last, last_at)
+    VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?)
+    ON CONFLICT (metric, granularity, series, bucket) DO UPDATE SET
+        samples = metric_rollups.samples + 1,
+        value_sum = metric_rollups.value_sum + excluded.value_sum,
+        value_last = excluded.value_last,
+        last_at = CASE WHEN excluded.last_at > metric_rollups.last_at
+                       THEN excluded.last_at ELSE metric_rollups.last_at END
+"""
+
+# Which stored column answers each aggregation
+_AGGREGATES = {
+    "mean": "value_sum / samples",
+    "sum": "value_sum",
+    "last": "value_last",
+    "min": "value_min",
+    "max": "value_max",
+}
+
+
+def bucket_start(timestamp: float, granularity: str) -> float:
+    """UTC start of the bucket containing an epoch timestamp"""
+    if granularity == HOUR:
+        return timestamp - timestamp % 3600
+    if granularity == DAY:
+        return timestamp - timestamp % 86400
+    if granularity == WEEK:
+        return timestamp - (timestamp - _MONDAY_OFFSET) % (7 * 86400)
+    if granularity == MONTH:
+        moment = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+        return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc).timestamp()
+    raise ValueError(f"unknown granularity {granularity!r}")
+
+
+def granularity_for(days: float) -> str:
+    """Coarsest bucket that still gives a detailed chart for a range"""
+    if days <= 3:
+        return HOUR
+    if days <= 180:
+        return DAY
+    if days <= 3 * 366:
+        return WEEK
+    return MONTH
+
+
+class TrendStore:
+    """Incrementally maintained hour / day / week / month rollups"""
+
+    def __init__(self, db: Database):
+        self.db = db
+        self.db.executescript(SCHEMA)
+
+    @classmethod
+    def from_settings(cls, settings) -> "TrendStore":
+        return cls(Database.from_settings(settings))
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def _fold(self, statement: str, metric: str, values: Mapping[str, float], at: float):
+        rows = [
+            (metric, granularity, series, bucket_start(at, granularity), value, value, value, value, at)
+            for granularity in GRANULARITIES
+            for series, value in values.items()
+        ]
+        with self.db.transaction() as conn:
+            self.db.executemany(statement, rows, conn=conn)
+            self.db.execute(
+                "DELETE FROM metric_rollups WHERE metric = ? AND granularity = ? AND bucket < ?",
+                (metric, HOUR, at - HOURLY_RETENTION_S), conn=conn,
+            )
+
+    def record(self, metric: str, values: Mapping[str, float], at: Optional[float] = None):
+        """Fold one gauge snapshot (series -> value) into every granularity
+
+        Snapshots not newer than what a bucket already holds are ignored, so
+        recording the same snapshot twice does not skew the averages.
+        """
+        if values:
+            self._fold(_UPSERT_GAUGE, metric, {k: float(v) for k, v in values.items()},
+                       time.time() if at is None else at)
+
+    def increment(self, metric: str, counts: Mapping[str, float], at: Optional[float] = None):
+        """Add event counts (series -> count) into every granularity"""
+        if counts:
+            self._fold(_UPSERT_COUNTER, metric, {k: float(v) for k, v in counts.items()},
+                       time.time() if at is None else at)
+
+    def increment_events(self, metric: str, events: Iterable[Tuple[str, str, float]]) -> int:
+        """Count (event id, series, epoch) events once each, however often they are re-read; returns new events"""
+        events = list({event_id: (event_id, series, at) for event_id, series, at in events}.values())
+        if not events:
+            return 0
+        seen = {row[0] for row in self.db.query(
+            "SELECT event_id FROM counted_events WHERE metric = ? AND at >= ?",
+            (metric, min(at for _, _, at in events)),
+        )}
+        fresh = [event for event in events if event[0] not in seen]
+        with self.db.transaction() as conn:
+            self.db.executemany("INSERT INTO counted_events (metric, event_id, at) VALUES (?, ?, ?)",
+                                [(metric, event_id, at) for event_id, _, at in fresh], conn=conn)
+            self.db.execute("DELETE FROM counted_events WHERE metric = ? AND at < ?",
+                            (metric, time.time() - COUNTED_RETENTION_S), conn=conn)
+        # Hours nest in every coarser bucket, so one fold per hour lands each event correctly
+        hours: Dict[float, Dict[str, float]] = {}
+        for _, series, at in fresh:
+            counts = hours.setdefault(bucket_start(at, HOUR), {})
+            counts[series] = counts.get(series, 0.0) + 1
+        for hour, counts in sorted(hours.items()):
+            self.increment(metric, counts, hour)
+        return len(fresh)
+
+    def record_compliance(self, rollups: Mapping[str, pd.DataFrame], at: Optional[float] = None):
+        """Org, OU and framework scores from a ComplianceAggregator.rollups() result"""
+        values: Dict[str, float] = {}
+        ou = rollups.get("ou")
+        if ou is not None and len(ou):
+            evaluations = ou["evaluations"].sum()
+            values["org"] = round(100.0 * ou["compliant"].sum() / max(evaluations, 1), 2)
+            values.update({f"ou:{row.ou}": row.score for row in ou.itertuples()})
+        framework = rollups.get("framework")
+        if framework is not None:
+            values.update({f"framework:{row.framework}": row.score for row in framework.itertuples()})
+        self.record(COMPLIANCE_SCORE, values, at)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def series(self, metric: str, days: float, series: Optional[Iterable[str]] = None,
+               granularity: Optional[str] = None, agg: str = "mean",
+               end: Optional[float] = None) -> pd.DataFrame:
+        """Long frame of (bucket, series, value) covering the last `days`"""
+        granularity = granularity or granularity_for(days)
+        end = time.time() if end is None else end
+        start = bucket_start(end - days * 86400, granularity)
+        clauses = ["metric = ?", "granularity = ?", "bucket >= ?", "bucket <= ?"]
+        params = [metric, granularity, start, end]
+        names = list(series) if series is not None else []
+        if names:
+            clauses.append(f"series IN ({', '.join('?' * len(names))})")
+            params.extend(names)
+        frame = self.db.query_frame(
+            f"SELECT bucket, series, {_AGGREGATES[agg]} AS value FROM metric_rollups "
+            f"WHERE {' AND '.join(clauses)} ORDER BY series, bucket",
+            params, columns=["bucket", "series", "value"],
+        )
+        frame["bucket"] = pd.to_datetime(frame["bucket"], unit="s", utc=True)
+        return frame
+
+    def wide(self, metric: str, days: float, series: Optional[Iterable[str]] = None,
+             granularity: Optional[str] = None, agg: str = "mean") -> pd.DataFrame:
+        """One column per series, indexed by bucket start"""
+        frame = self.series(metric, days, series, granularity, agg)
+        return frame.pivot(index="bucket", columns="series", values="value").sort_index()
+
+    def has_data(self, metric: str) -> bool:
+        return self.db.query_one("SELECT 1 FROM metric_rollups WHERE metric = ? LIMIT 1", (metric,)) is not None